@@ -18,7 +18,14 @@ load_dotenv()
 
 # アプリケーションのモデルとベースクラスをインポート
 from app.core.database import Base
-from app.models.todo import Todo  # noqa: F401
+from app.models.idempotency_key import IdempotencyKey  # noqa: F401
+from app.models.job import Job  # noqa: F401
+from app.models.lease import Lease  # noqa: F401
+from app.models.refresh_token import RefreshToken  # noqa: F401
+from app.models.tag import Tag  # noqa: F401
+from app.models.todo import Todo, TodoArchive  # noqa: F401
+from app.models.todo_list import TodoList  # noqa: F401
+from app.models.todo_stats import TodoStats  # noqa: F401
 from app.models.user import User  # noqa: F401
 
 # this is the Alembic Config object, which provides
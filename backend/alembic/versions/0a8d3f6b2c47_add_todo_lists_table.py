@@ -0,0 +1,51 @@
+"""Add todo_lists table and todos.list_id
+
+Revision ID: 0a8d3f6b2c47
+Revises: f7c2a9d4e615
+Create Date: 2026-10-19 18:54:03.271859
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0a8d3f6b2c47"
+down_revision: Union[str, None] = "f7c2a9d4e615"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "todo_lists",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_todo_lists_id"), "todo_lists", ["id"], unique=False)
+    op.create_index(op.f("ix_todo_lists_user_id"), "todo_lists", ["user_id"], unique=False)
+
+    # SQLiteは外部キー制約の追加にテーブルの再作成が必要なため batch モードで変更する
+    with op.batch_alter_table("todos") as batch_op:
+        batch_op.add_column(sa.Column("list_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key("fk_todos_list_id", "todo_lists", ["list_id"], ["id"], ondelete="SET NULL")
+    op.create_index("ix_todos_list_id_position", "todos", ["list_id", "position"], unique=False)
+    op.add_column("todos_archive", sa.Column("list_id", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("todos_archive", "list_id")
+    op.drop_index("ix_todos_list_id_position", table_name="todos")
+    with op.batch_alter_table("todos") as batch_op:
+        batch_op.drop_constraint("fk_todos_list_id", type_="foreignkey")
+        batch_op.drop_column("list_id")
+    op.drop_index(op.f("ix_todo_lists_user_id"), table_name="todo_lists")
+    op.drop_index(op.f("ix_todo_lists_id"), table_name="todo_lists")
+    op.drop_table("todo_lists")
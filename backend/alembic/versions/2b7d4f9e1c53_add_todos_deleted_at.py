@@ -0,0 +1,72 @@
+"""Add deleted_at to todos for soft delete and exclude deleted rows from partial indexes
+
+Revision ID: 2b7d4f9e1c53
+Revises: 8e4b6a0d3f17
+Create Date: 2026-10-19 21:42:18.540631
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2b7d4f9e1c53"
+down_revision: Union[str, None] = "8e4b6a0d3f17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("todos", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+
+    # 論理削除されたToDoをインデックスから除く
+    op.drop_index("ix_todos_due_date_incomplete", table_name="todos")
+    op.drop_index("ix_todos_list_id_position", table_name="todos")
+    op.create_index(
+        "ix_todos_list_id_position",
+        "todos",
+        ["list_id", "position"],
+        unique=False,
+        sqlite_where=sa.text("deleted_at IS NULL"),
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.create_index(
+        "ix_todos_due_date_incomplete",
+        "todos",
+        ["due_date"],
+        unique=False,
+        sqlite_where=sa.text("completed IS 0 AND due_date IS NOT NULL AND deleted_at IS NULL"),
+        postgresql_where=sa.text("completed IS false AND due_date IS NOT NULL AND deleted_at IS NULL"),
+    )
+    # 物理削除の対象の検索用
+    op.create_index(
+        "ix_todos_deleted_at",
+        "todos",
+        ["deleted_at"],
+        unique=False,
+        sqlite_where=sa.text("deleted_at IS NOT NULL"),
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    # 論理削除されたToDoは以前のスキーマでは表せないため物理削除する（件数の集計には含まれていない）
+    op.execute("DELETE FROM todo_tags WHERE todo_id IN (SELECT id FROM todos WHERE deleted_at IS NOT NULL)")
+    op.execute("DELETE FROM todos WHERE deleted_at IS NOT NULL")
+
+    op.drop_index("ix_todos_deleted_at", table_name="todos")
+    op.drop_index("ix_todos_due_date_incomplete", table_name="todos")
+    op.drop_index("ix_todos_list_id_position", table_name="todos")
+    op.create_index("ix_todos_list_id_position", "todos", ["list_id", "position"], unique=False)
+    op.create_index(
+        "ix_todos_due_date_incomplete",
+        "todos",
+        ["due_date"],
+        unique=False,
+        sqlite_where=sa.text("completed IS 0 AND due_date IS NOT NULL"),
+        postgresql_where=sa.text("completed IS false AND due_date IS NOT NULL"),
+    )
+    op.drop_column("todos", "deleted_at")
@@ -0,0 +1,36 @@
+"""Add todos.parent_id for subtasks
+
+Revision ID: 5d2e8c1f9a64
+Revises: 0a8d3f6b2c47
+Create Date: 2026-10-19 19:42:11.508314
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2e8c1f9a64"
+down_revision: Union[str, None] = "0a8d3f6b2c47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLiteは外部キー制約の追加にテーブルの再作成が必要なため batch モードで変更する
+    with op.batch_alter_table("todos") as batch_op:
+        batch_op.add_column(sa.Column("parent_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key("fk_todos_parent_id", "todos", ["parent_id"], ["id"], ondelete="CASCADE")
+    op.create_index(op.f("ix_todos_parent_id"), "todos", ["parent_id"], unique=False)
+    op.add_column("todos_archive", sa.Column("parent_id", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("todos_archive", "parent_id")
+    op.drop_index(op.f("ix_todos_parent_id"), table_name="todos")
+    with op.batch_alter_table("todos") as batch_op:
+        batch_op.drop_constraint("fk_todos_parent_id", type_="foreignkey")
+        batch_op.drop_column("parent_id")
@@ -0,0 +1,38 @@
+"""Add updated_at to todos and leases table for the reminder scheduler
+
+Revision ID: 7a3e9c1b5d28
+Revises: 6c1e8a3f5d92
+Create Date: 2026-10-19 23:12:44.207315
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7a3e9c1b5d28"
+down_revision: Union[str, None] = "6c1e8a3f5d92"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 既存の行は NULL のまま（次に更新された時点で設定される）
+    op.add_column("todos", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.create_index(op.f("ix_todos_updated_at"), "todos", ["updated_at"], unique=False)
+    op.create_table(
+        "leases",
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("holder", sa.String(length=200), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("leases")
+    op.drop_index(op.f("ix_todos_updated_at"), table_name="todos")
+    op.drop_column("todos", "updated_at")
@@ -0,0 +1,30 @@
+"""Add version column to todos for optimistic concurrency control
+
+Revision ID: 8e4b6a0d3f17
+Revises: 5d2e8c1f9a64
+Create Date: 2026-10-19 20:31:47.902215
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8e4b6a0d3f17"
+down_revision: Union[str, None] = "5d2e8c1f9a64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 既存の行はバージョン1とする
+    op.add_column("todos", sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+    op.add_column("todos_archive", sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column("todos_archive", "version")
+    op.drop_column("todos", "version")
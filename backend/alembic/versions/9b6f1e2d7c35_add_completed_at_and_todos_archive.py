@@ -0,0 +1,49 @@
+"""Add completed_at to todos and todos_archive table
+
+Revision ID: 9b6f1e2d7c35
+Revises: 5d2e8c41f7a9
+Create Date: 2026-10-19 16:02:44.187215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b6f1e2d7c35'
+down_revision: Union[str, None] = '5d2e8c41f7a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('todos', sa.Column('completed_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_todos_completed_at'), 'todos', ['completed_at'], unique=False)
+    # 既存の完了済みToDoは完了日時が不明のため、移行時点を完了日時とする（すぐにはアーカイブされない）
+    op.execute(sa.text("UPDATE todos SET completed_at = CURRENT_TIMESTAMP WHERE completed = :completed").bindparams(
+        completed=True
+    ))
+
+    op.create_table(
+        'todos_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('completed', sa.Boolean(), nullable=True),
+        sa.Column('position', sa.Integer(), nullable=True),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_todos_archive_archived_at'), 'todos_archive', ['archived_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_todos_archive_archived_at'), table_name='todos_archive')
+    op.drop_table('todos_archive')
+    op.drop_index(op.f('ix_todos_completed_at'), table_name='todos')
+    op.drop_column('todos', 'completed_at')
@@ -0,0 +1,70 @@
+"""Split todo_stats into slot rows
+
+Revision ID: 9d4b2f6e8a13
+Revises: 7a3e9c1b5d28
+Create Date: 2026-10-20 01:05:18.532904
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4b2f6e8a13"
+down_revision: Union[str, None] = "7a3e9c1b5d28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 既存のToDo（論理削除されたToDoを除く）から集計する
+BACKFILL_SELECT = (
+    "COUNT(*), "
+    "COALESCE(SUM(CASE WHEN completed = :completed THEN 1 ELSE 0 END), 0), "
+    "COALESCE(SUM(CASE WHEN priority = 0 THEN 1 ELSE 0 END), 0), "
+    "COALESCE(SUM(CASE WHEN priority = 1 THEN 1 ELSE 0 END), 0), "
+    "COALESCE(SUM(CASE WHEN priority = 2 THEN 1 ELSE 0 END), 0), "
+    "CURRENT_TIMESTAMP FROM todos WHERE deleted_at IS NULL"
+)
+
+
+def _create_table(*key_columns: sa.Column) -> None:
+    op.create_table(
+        "todo_stats",
+        *key_columns,
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("completed", sa.Integer(), nullable=False),
+        sa.Column("priority_high", sa.Integer(), nullable=False),
+        sa.Column("priority_medium", sa.Integer(), nullable=False),
+        sa.Column("priority_low", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint(*[column.name for column in key_columns]),
+    )
+
+
+def upgrade() -> None:
+    # 集計は作り直す（slot 0 に全件を入れる。他の行は、最初に書き込む際の集計し直しで作成される）
+    op.drop_table("todo_stats")
+    _create_table(
+        sa.Column("scope", sa.String(length=50), nullable=False),
+        sa.Column("slot", sa.Integer(), nullable=False),
+    )
+    op.execute(
+        sa.text(
+            "INSERT INTO todo_stats "
+            "(scope, slot, total, completed, priority_high, priority_medium, priority_low, updated_at) "
+            f"SELECT 'global', 0, {BACKFILL_SELECT}"
+        ).bindparams(completed=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("todo_stats")
+    _create_table(sa.Column("scope", sa.String(length=50), nullable=False))
+    op.execute(
+        sa.text(
+            "INSERT INTO todo_stats (scope, total, completed, priority_high, priority_medium, priority_low, updated_at) "
+            f"SELECT 'global', {BACKFILL_SELECT}"
+        ).bindparams(completed=True)
+    )
@@ -0,0 +1,26 @@
+"""Add token_version to users table
+
+Revision ID: b7e41d09c3a2
+Revises: 3f9c2a7d1b04
+Create Date: 2026-10-19 10:02:47.915320
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e41d09c3a2'
+down_revision: Union[str, None] = '3f9c2a7d1b04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
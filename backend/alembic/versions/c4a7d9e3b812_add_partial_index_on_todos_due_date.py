@@ -0,0 +1,34 @@
+"""Add partial index on todos.due_date for incomplete todos
+
+Revision ID: c4a7d9e3b812
+Revises: 9b6f1e2d7c35
+Create Date: 2026-10-19 16:48:12.503917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a7d9e3b812'
+down_revision: Union[str, None] = '9b6f1e2d7c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    where = sa.text('completed IS false AND due_date IS NOT NULL')
+    op.create_index(
+        'ix_todos_due_date_incomplete',
+        'todos',
+        ['due_date'],
+        unique=False,
+        sqlite_where=sa.text('completed IS 0 AND due_date IS NOT NULL'),
+        postgresql_where=where,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todos_due_date_incomplete', table_name='todos')
@@ -0,0 +1,48 @@
+"""Add todo_stats table
+
+Revision ID: e1f3b5c7a920
+Revises: c4a7d9e3b812
+Create Date: 2026-10-19 17:35:27.640113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f3b5c7a920'
+down_revision: Union[str, None] = 'c4a7d9e3b812'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'todo_stats',
+        sa.Column('scope', sa.String(length=50), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('completed', sa.Integer(), nullable=False),
+        sa.Column('priority_high', sa.Integer(), nullable=False),
+        sa.Column('priority_medium', sa.Integer(), nullable=False),
+        sa.Column('priority_low', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('scope'),
+    )
+    # 既存のToDoから集計した行を作成する
+    op.execute(
+        sa.text(
+            "INSERT INTO todo_stats (scope, total, completed, priority_high, priority_medium, priority_low, updated_at) "
+            "SELECT 'global', COUNT(*), "
+            "COALESCE(SUM(CASE WHEN completed = :completed THEN 1 ELSE 0 END), 0), "
+            "COALESCE(SUM(CASE WHEN priority = 0 THEN 1 ELSE 0 END), 0), "
+            "COALESCE(SUM(CASE WHEN priority = 1 THEN 1 ELSE 0 END), 0), "
+            "COALESCE(SUM(CASE WHEN priority = 2 THEN 1 ELSE 0 END), 0), "
+            "CURRENT_TIMESTAMP FROM todos"
+        ).bindparams(completed=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('todo_stats')
@@ -0,0 +1,46 @@
+"""Add tags and todo_tags tables
+
+Revision ID: f7c2a9d4e615
+Revises: e1f3b5c7a920
+Create Date: 2026-10-19 18:12:50.918346
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c2a9d4e615'
+down_revision: Union[str, None] = 'e1f3b5c7a920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_index(op.f('ix_tags_id'), 'tags', ['id'], unique=False)
+    op.create_table(
+        'todo_tags',
+        sa.Column('todo_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['todo_id'], ['todos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('todo_id', 'tag_id'),
+    )
+    op.create_index('ix_todo_tags_tag_id_todo_id', 'todo_tags', ['tag_id', 'todo_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todo_tags_tag_id_todo_id', table_name='todo_tags')
+    op.drop_table('todo_tags')
+    op.drop_index(op.f('ix_tags_id'), table_name='tags')
+    op.drop_table('tags')
@@ -0,0 +1,243 @@
+"""
+キャッシュ（プロセス内LRU または Redis）
+
+- キャッシュキーに名前空間のバージョン番号を含め、データ変更時はバージョンを上げるだけで
+  古いエントリをまとめて無効化する（古いエントリはTTLで自然に消える）
+- キャッシュミス時は同じキーの読み込みを1つに絞る（single-flight）
+  ロックを取得できなかったリクエストは、先行するリクエストが結果を書き込むのを待つ
+- バックエンドの障害時はキャッシュを使わずに読み込む（フェイルオープン）
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.process_state import register_reset
+
+logger = logging.getLogger(__name__)
+
+# ToDo一覧の名前空間（ToDoを変更するすべての処理でバージョンを上げる）
+TODOS_NAMESPACE = "todos"
+
+
+class InMemoryCacheBackend:
+    """プロセス内のLRUキャッシュ（ワーカーごとに独立）"""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_entry(self, key: str, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, value: bytes, ttl: Optional[float], now: float) -> None:
+        self._entries[key] = (value, now + ttl if ttl else None)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._get_entry(key, time.monotonic())
+            return entry[0] if entry else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl, time.monotonic())
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """キーが存在しない場合のみ保存する"""
+        with self._lock:
+            now = time.monotonic()
+            if self._get_entry(key, now) is not None:
+                return False
+            self._store(key, value, ttl, now)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            entry = self._get_entry(key, time.monotonic())
+            value = int(entry[0]) + 1 if entry else 1
+            self._store(key, str(value).encode(), None, time.monotonic())
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Redisのキャッシュ（全ワーカーで共有）"""
+
+    def __init__(self, client: Any, prefix: str = "cache"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self._key(key))
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.client.set(self._key(key), value, px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return bool(self.client.set(self._key(key), value, px=int(ttl * 1000) if ttl else None, nx=True))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self._key(key))
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self._key(key)))
+
+    def clear(self) -> None:
+        pass
+
+
+class Cache:
+    """
+    バージョン管理とsingle-flightを備えたキャッシュ
+
+    Args:
+        backend: InMemoryCacheBackend または RedisCacheBackend
+        ttl: エントリの有効期間（秒）
+        lock_timeout: single-flightのロックの有効期間、およびロック待ちの最大秒数
+    """
+
+    poll_interval = 0.01
+
+    def __init__(self, backend: Any, ttl: float = 60, lock_timeout: float = 5):
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, namespace: str) -> int:
+        """名前空間の現在のバージョン"""
+        value = self.backend.get(f"version:{namespace}")
+        return int(value) if value is not None else 0
+
+    def bump_version(self, namespace: str) -> None:
+        """名前空間のバージョンを上げて、既存のエントリをすべて無効にする"""
+        try:
+            self.backend.incr(f"version:{namespace}")
+        except Exception as e:
+            # 無効化できなかったエントリはTTLの経過で消える
+            logger.warning("Failed to invalidate cache namespace %s: %s", namespace, e)
+
+    def get_or_load(self, namespace: str, key: str, loader: Callable[[], bytes]) -> bytes:
+        """
+        キャッシュから取得し、なければloaderで読み込んで保存する
+
+        キーには名前空間の現在のバージョンが付与される
+        """
+        try:
+            full_key = f"{namespace}:v{self.version(namespace)}:{key}"
+            value = self.backend.get(full_key)
+        except Exception as e:
+            logger.warning("Cache backend unavailable, loading without cache: %s", e)
+            return loader()
+
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        return self._load_once(full_key, loader)
+
+    def _load_once(self, key: str, loader: Callable[[], bytes]) -> bytes:
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex.encode()
+        try:
+            acquired = self.backend.add(lock_key, token, self.lock_timeout)
+        except Exception as e:
+            logger.warning("Cache backend unavailable, loading without cache: %s", e)
+            return loader()
+
+        if not acquired:
+            # 他のリクエストが読み込み中: 結果が書き込まれるのを待つ
+            value = self._wait_for(key)
+            if value is not None:
+                return value
+            # 待ち時間を超えた場合は自分で読み込む（先行するリクエストの失敗・遅延）
+            return loader()
+
+        try:
+            value = self.backend.get(key)
+            if value is None:
+                value = loader()
+                self.backend.set(key, value, self.ttl)
+            return value
+        finally:
+            self._release(lock_key, token)
+
+    def _release(self, lock_key: str, token: bytes) -> None:
+        try:
+            # 有効期限切れで他のリクエストが取得したロックは解放しない
+            if self.backend.get(lock_key) == token:
+                self.backend.delete(lock_key)
+        except Exception as e:
+            logger.warning("Failed to release cache lock %s: %s", lock_key, e)
+
+    def _wait_for(self, key: str) -> Optional[bytes]:
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = self.backend.get(key)
+            if value is not None:
+                return value
+        return None
+
+
+def _create_backend() -> Any:
+    if settings.CACHE_BACKEND == "redis":
+        from app.core.redis_client import get_redis
+
+        return RedisCacheBackend(get_redis())
+    return InMemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+
+_cache: Optional[Cache] = None
+
+
+def get_cache() -> Cache:
+    """設定に応じたキャッシュを取得"""
+    global _cache
+    if _cache is None:
+        _cache = Cache(_create_backend(), settings.CACHE_TTL_SECONDS, settings.CACHE_LOCK_TIMEOUT_SECONDS)
+    return _cache
+
+
+def reset_cache() -> None:
+    """キャッシュを破棄する（テストやフォーク後の初期化用）"""
+    global _cache
+    if _cache is not None:
+        _cache.backend.clear()
+    _cache = None
+
+
+register_reset(reset_cache)
+
+
+def invalidate_todos() -> None:
+    """ToDo一覧のキャッシュを無効にする（ToDoを変更した後に呼び出す）"""
+    if settings.CACHE_ENABLED:
+        get_cache().bump_version(TODOS_NAMESPACE)
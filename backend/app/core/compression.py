@@ -0,0 +1,222 @@
+"""
+レスポンス圧縮ミドルウェア
+
+Accept-Encodingに応じてBrotliまたはgzipでレスポンスを圧縮する。
+nginxを経由しないデプロイ（Railway等）でJSONレスポンスの転送量を削減するためのもの。
+ストリーミングレスポンスはチャンク単位でフラッシュするため、ストリーミングのまま配信される。
+"""
+
+import zlib
+from typing import Callable, Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Brotliは任意依存（未インストール時はgzipのみ使用）
+    brotli = None
+
+# 圧縮しても効果がない、または圧縮してはいけないContent-Type
+EXCLUDED_CONTENT_TYPES = (
+    "text/event-stream",
+    "image/",
+    "video/",
+    "audio/",
+    "application/zip",
+    "application/gzip",
+)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Accept-Encodingヘッダーを解析してエンコーディングごとのq値を返す
+
+    例: "gzip;q=0.8, br" -> {"gzip": 0.8, "br": 1.0}
+    """
+    preferences: Dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        preferences[token] = quality
+    return preferences
+
+
+def select_encoding(header: str, brotli_available: bool = brotli is not None) -> Optional[str]:
+    """
+    クライアントが受け入れ可能なエンコーディングの中から使用するものを選択
+
+    q値が同じ場合はBrotliを優先する。受け入れ可能なものがなければNoneを返す。
+    """
+    preferences = parse_accept_encoding(header)
+    candidates = ["br", "gzip"] if brotli_available else ["gzip"]
+
+    selected: Optional[str] = None
+    selected_quality = 0.0
+    for encoding in candidates:
+        quality = preferences.get(encoding, preferences.get("*", 0.0))
+        if quality > selected_quality:
+            selected, selected_quality = encoding, quality
+    return selected
+
+
+class GzipCompressor:
+    """gzip圧縮器（チャンクごとにSync Flushする）"""
+
+    def __init__(self, level: int = 6):
+        # wbits=31: gzipヘッダー付きのDEFLATEストリーム
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.compress(data)
+        output += self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        return output
+
+
+class BrotliCompressor:
+    """Brotli圧縮器（チャンクごとにフラッシュする）"""
+
+    def __init__(self, quality: int = 4):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        output += self._compressor.finish() if final else self._compressor.flush()
+        return output
+
+
+class CompressionMiddleware:
+    """
+    gzip/Brotli対応のレスポンス圧縮ミドルウェア
+
+    Args:
+        app: ラップするASGIアプリケーション
+        minimum_size: このサイズ（バイト）未満の非ストリーミングレスポンスは圧縮しない
+        gzip_level: gzipの圧縮レベル（1-9）
+        brotli_quality: Brotliの品質（0-11）
+        proxy_header: このリクエストヘッダーが付与されている場合はプロキシが圧縮するものとして何もしない
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        proxy_header: Optional[str] = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.proxy_header = proxy_header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if self.proxy_header and self.proxy_header in headers:
+            # リバースプロキシ側で圧縮されるため二重に圧縮しない
+            await self.app(scope, receive, send)
+            return
+
+        encoding = select_encoding(headers.get("accept-encoding", ""))
+        responder = CompressionResponder(self.app, encoding, self.minimum_size, self._compressor_factory(encoding))
+        await responder(scope, receive, send)
+
+    def _compressor_factory(self, encoding: Optional[str]) -> Optional[Callable]:
+        if encoding == "br":
+            return lambda: BrotliCompressor(self.brotli_quality)
+        if encoding == "gzip":
+            return lambda: GzipCompressor(self.gzip_level)
+        return None
+
+
+class CompressionResponder:
+    """1リクエスト分のレスポンスを圧縮しながら送信する"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encoding: Optional[str],
+        minimum_size: int,
+        compressor_factory: Optional[Callable],
+    ) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.compressor_factory = compressor_factory
+        self.compressor = None
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # ヘッダーの書き換え方が決まるまで送信を保留する
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or headers.get("content-type", "").startswith(
+                EXCLUDED_CONTENT_TYPES
+            )
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self._start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+
+            if self.compressor_factory is None or (len(body) < self.minimum_size and not more_body):
+                # 小さいレスポンスや圧縮非対応クライアントはそのまま送信
+                self.passthrough = True
+                await self._start()
+                await self.send(message)
+                return
+
+            self.compressor = self.compressor_factory()
+            headers["Content-Encoding"] = self.encoding
+            message["body"] = self.compressor.compress(body, final=not more_body)
+            if more_body:
+                # ストリーミングでは最終サイズが不明なのでContent-Lengthを外す
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+
+            await self._start()
+            await self.send(message)
+            return
+
+        # ストリーミングレスポンスの後続チャンク
+        message["body"] = self.compressor.compress(body, final=not more_body)
+        await self.send(message)
+
+    async def _start(self) -> None:
+        if not self.started:
+            self.started = True
+            await self.send(self.initial_message)
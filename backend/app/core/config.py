@@ -19,24 +19,174 @@ class Settings:
     # セキュリティ設定
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
 
+    # JWTの署名・検証に使用するライブラリ（jose または pyjwt）
+    JWT_BACKEND: str = os.getenv("JWT_BACKEND", "jose")
+    # 検証済みトークンのキャッシュ件数（0でキャッシュ無効）
+    JWT_CACHE_SIZE: int = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+
+    # トークン失効チェックのキャッシュ有効期間（秒）
+    # ユーザーの無効化やトークン失効は最大でこの秒数の遅れで反映される
+    TOKEN_REVOCATION_CHECK_SECONDS: int = int(os.getenv("TOKEN_REVOCATION_CHECK_SECONDS", "30"))
+
+    # レスポンス圧縮設定
+    # リバースプロキシ（nginx等）が圧縮する構成ではFalseにする
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() in ("true", "1", "yes")
+    # このサイズ（バイト）未満のレスポンスは圧縮しない
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    # プロキシが圧縮を担当することを示すリクエストヘッダー（付与されていればアプリ側では圧縮しない）
+    COMPRESSION_PROXY_HEADER: str = os.getenv("COMPRESSION_PROXY_HEADER", "X-Proxy-Compression")
+
+    # 読み取りレプリカのURL（カンマ区切り、未指定の場合はすべてプライマリから読み取る）
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    # レプリカの死活確認の間隔（秒）
+    REPLICA_HEALTH_CHECK_SECONDS: int = int(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "10"))
+    # 書き込み後にプライマリから読み取る秒数（レプリカの遅延より長くする）
+    READ_YOUR_WRITES_SECONDS: int = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+    # 書き込みを行ったユーザーの記録先（memory または redis、複数ワーカーではredisを使用）
+    READ_YOUR_WRITES_BACKEND: str = os.getenv("READ_YOUR_WRITES_BACKEND", "memory")
+
+    # 起動時に Base.metadata.create_all でテーブルを作成するか
+    # Alembicでスキーマを管理している環境ではFalseにして起動時のDB往復を省略する
+    DB_AUTO_CREATE: bool = os.getenv("DB_AUTO_CREATE", "True").lower() in ("true", "1", "yes")
+
+    # SQLクエリ計測（リクエストごとのクエリ数・時間）
+    QUERY_COUNTER_ENABLED: bool = os.getenv("QUERY_COUNTER_ENABLED", "True").lower() in ("true", "1", "yes")
+    # 1リクエストあたりのクエリ数の上限（超えた場合に警告ログを出す）
+    QUERY_BUDGET_PER_REQUEST: int = int(os.getenv("QUERY_BUDGET_PER_REQUEST", "10"))
+
+    # バックグラウンドジョブ設定
+    JOBS_ENABLED: bool = os.getenv("JOBS_ENABLED", "True").lower() in ("true", "1", "yes")
+    # このプロセスでジョブを実行するか（専用のプロセスでのみ実行する場合はWebプロセスでFalseにする）
+    JOB_RUNNER_ENABLED: bool = os.getenv("JOB_RUNNER_ENABLED", "True").lower() in ("true", "1", "yes")
+    # 一括操作・並び替えの対象がこの件数を超える場合はジョブとして実行し、202を返す
+    BULK_ASYNC_THRESHOLD: int = int(os.getenv("BULK_ASYNC_THRESHOLD", "500"))
+    # POST /api/todos/batch-ops の1リクエストあたりの最大操作数
+    BATCH_OPS_MAX_OPERATIONS: int = int(os.getenv("BATCH_OPS_MAX_OPERATIONS", "500"))
+    JOB_CONCURRENCY: int = int(os.getenv("JOB_CONCURRENCY", "2"))
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    # この秒数を超えて実行中のジョブはワーカーの異常終了とみなして再実行する
+    JOB_TIMEOUT_SECONDS: int = int(os.getenv("JOB_TIMEOUT_SECONDS", "600"))
+    # 完了したジョブの保存日数
+    JOB_RETENTION_DAYS: int = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+    # 定期実行ジョブの間隔（秒、0で無効）
+    JOB_REBALANCE_INTERVAL_SECONDS: int = int(os.getenv("JOB_REBALANCE_INTERVAL_SECONDS", "86400"))
+    JOB_TOKEN_PURGE_INTERVAL_SECONDS: int = int(os.getenv("JOB_TOKEN_PURGE_INTERVAL_SECONDS", "3600"))
+    JOB_PURGE_INTERVAL_SECONDS: int = int(os.getenv("JOB_PURGE_INTERVAL_SECONDS", "86400"))
+    JOB_ARCHIVE_INTERVAL_SECONDS: int = int(os.getenv("JOB_ARCHIVE_INTERVAL_SECONDS", "3600"))
+    JOB_STATS_REBUILD_INTERVAL_SECONDS: int = int(os.getenv("JOB_STATS_REBUILD_INTERVAL_SECONDS", "86400"))
+    JOB_PURGE_DELETED_INTERVAL_SECONDS: int = int(os.getenv("JOB_PURGE_DELETED_INTERVAL_SECONDS", "3600"))
+    # 期限切れの冪等キーの削除（IDEMPOTENCY_BACKEND=database の場合のみ登録）
+    JOB_IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = int(os.getenv("JOB_IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+
+    # 完了済みToDoのアーカイブ（完了からこの日数が経過したToDoを todos_archive へ移動、0で無効）
+    ARCHIVE_COMPLETED_AFTER_DAYS: int = int(os.getenv("ARCHIVE_COMPLETED_AFTER_DAYS", "30"))
+    # 1トランザクションで移動する件数
+    ARCHIVE_BATCH_SIZE: int = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+    # ToDoの件数の集計を分割する行数（同時に書き込むトランザクションが別の行を更新し、ロックを待ち合わせない）
+    TODO_STATS_SLOTS: int = max(1, int(os.getenv("TODO_STATS_SLOTS", "16")))
+
+    # 論理削除したToDoの物理削除（削除からこの時間が経過するまでは復元できる、0で無効）
+    PURGE_DELETED_AFTER_HOURS: int = int(os.getenv("PURGE_DELETED_AFTER_HOURS", "24"))
+    # 1トランザクションで削除する件数と、バッチの間の待機秒数（書き込みの負荷を抑える）
+    PURGE_DELETED_BATCH_SIZE: int = int(os.getenv("PURGE_DELETED_BATCH_SIZE", "500"))
+    PURGE_DELETED_BATCH_PAUSE_SECONDS: float = float(os.getenv("PURGE_DELETED_BATCH_PAUSE_SECONDS", "0.5"))
+
+    # 期限日のリマインダー（全ワーカーで有効にしてよい。通知はリースを取得した1つのプロセスだけが行う）
+    REMINDERS_ENABLED: bool = os.getenv("REMINDERS_ENABLED", "False").lower() in ("true", "1", "yes")
+    # 通知先: "log"（ログ出力）または "webhook"（REMINDER_WEBHOOK_URL にPOST）
+    REMINDER_SINK: str = os.getenv("REMINDER_SINK", "log")
+    REMINDER_WEBHOOK_URL: str = os.getenv("REMINDER_WEBHOOK_URL", "")
+    # 期限日の何秒前に通知するか
+    REMINDER_LEAD_SECONDS: int = int(os.getenv("REMINDER_LEAD_SECONDS", "0"))
+    # 何秒先までの通知をメモリに読み込むか、および保持する最大件数
+    REMINDER_HORIZON_SECONDS: int = int(os.getenv("REMINDER_HORIZON_SECONDS", "3600"))
+    REMINDER_MAX_PENDING: int = int(os.getenv("REMINDER_MAX_PENDING", "10000"))
+    # 作成・変更されたToDoを読み込む間隔と、前回の読み込みからさかのぼる秒数（長いトランザクションのコミット待ち）
+    REMINDER_POLL_SECONDS: float = float(os.getenv("REMINDER_POLL_SECONDS", "5"))
+    REMINDER_RESCAN_MARGIN_SECONDS: int = int(os.getenv("REMINDER_RESCAN_MARGIN_SECONDS", "60"))
+    # 通知を担当するプロセスのリースの有効期限（担当のプロセスが停止してから引き継ぐまでの秒数）
+    REMINDER_LEASE_SECONDS: int = int(os.getenv("REMINDER_LEASE_SECONDS", "30"))
+
+    # Redis設定（キャッシュ、レート制限等の共有ストア）
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    # キャッシュ設定（ToDo一覧のページ）
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "True").lower() in ("true", "1", "yes")
+    # キャッシュの保存先（memory または redis、複数ワーカー・複数インスタンスではredisを使用。
+    # Gunicornの複数ワーカーでmemoryの場合は gunicorn.conf.py で無効にする）
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+    # memoryバックエンドの最大件数
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    # キャッシュミス時に同じキーの読み込みを待つ最大秒数
+    CACHE_LOCK_TIMEOUT_SECONDS: int = int(os.getenv("CACHE_LOCK_TIMEOUT_SECONDS", "5"))
+
+    # 冪等キー（Idempotency-Key ヘッダー付きの書き込みのレスポンスを保存し、再送には保存したレスポンスを返す）
+    IDEMPOTENCY_ENABLED: bool = os.getenv("IDEMPOTENCY_ENABLED", "True").lower() in ("true", "1", "yes")
+    # 保存先（memory / redis / database、複数ワーカー・複数インスタンスではredisまたはdatabaseを使用。
+    # Gunicornの複数ワーカーでmemoryの場合は gunicorn.conf.py でdatabaseにする）
+    IDEMPOTENCY_BACKEND: str = os.getenv("IDEMPOTENCY_BACKEND", "memory")
+    # 保存したレスポンスの有効期間
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    # memoryバックエンドの最大件数
+    IDEMPOTENCY_MAX_ENTRIES: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    # 同じキーのリクエストの完了を待つ最大秒数（処理中の印の有効期間）
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: int = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", "30"))
+
+    # ログインのレート制限設定
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() in ("true", "1", "yes")
+    # レート制限のカウンター保存先（memory または redis）
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = int(os.getenv("LOGIN_RATE_LIMIT_WINDOW_SECONDS", "60"))
+    # ウィンドウあたりの最大試行回数（IPアドレス単位 / アカウント単位）
+    LOGIN_RATE_LIMIT_PER_IP: int = int(os.getenv("LOGIN_RATE_LIMIT_PER_IP", "20"))
+    LOGIN_RATE_LIMIT_PER_ACCOUNT: int = int(os.getenv("LOGIN_RATE_LIMIT_PER_ACCOUNT", "5"))
+    # X-Forwarded-Forを信頼してクライアントIPを判定するか（信頼できるプロキシ配下のみTrue）
+    TRUST_FORWARDED_FOR: bool = os.getenv("TRUST_FORWARDED_FOR", "False").lower() in ("true", "1", "yes")
+    # 信頼できるプロキシの段数（X-Forwarded-For の右から数えてこの位置をクライアントIPとする。同梱のnginxのみなら1）
+    TRUSTED_PROXY_HOPS: int = max(1, int(os.getenv("TRUSTED_PROXY_HOPS", "1")))
+
+    # 管理者のメールアドレス（カンマ区切り、デバッグ用エンドポイント等へのアクセスを許可）
+    ADMIN_EMAILS: str = os.getenv("ADMIN_EMAILS", "")
+
+    # サンプリングプロファイラ（無効の場合はエンドポイント・ミドルウェアとも登録しない）
+    PROFILER_ENABLED: bool = os.getenv("PROFILER_ENABLED", "False").lower() in ("true", "1", "yes")
+    # サンプリング間隔（ミリ秒）
+    PROFILER_INTERVAL_MS: int = int(os.getenv("PROFILER_INTERVAL_MS", "5"))
+    # /api/debug/profile で指定できる最大秒数
+    PROFILER_MAX_SECONDS: int = int(os.getenv("PROFILER_MAX_SECONDS", "60"))
+    # リクエスト単位のプロファイル結果の保存先（同一ホストのワーカー間で共有される）
+    PROFILER_OUTPUT_DIR: str = os.getenv("PROFILER_OUTPUT_DIR", "/tmp/todo-profiles")
+
+    def get_replica_urls(self) -> List[str]:
+        """読み取りレプリカのURL一覧を取得"""
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+    def get_admin_emails(self) -> List[str]:
+        """管理者のメールアドレス一覧を取得"""
+        return [email.strip().lower() for email in self.ADMIN_EMAILS.split(",") if email.strip()]
+
     # CORS設定
     def get_cors_origins(self) -> List[str]:
         """環境に応じたCORS設定を取得"""
         # 環境変数から追加のオリジンを取得
         frontend_url = os.getenv("FRONTEND_URL", "")
-        
+
         origins = [
             "http://localhost:3000",
             "http://frontend:3000",
         ]
-        
+
         # 本番環境のフロントエンドURLを追加
         if frontend_url:
             origins.append(frontend_url)
             # HTTPSの場合、HTTPも追加（リダイレクト対応）
             if frontend_url.startswith("https://"):
                 origins.append(frontend_url.replace("https://", "http://"))
-        
+
         return origins
 
     @property
@@ -1,8 +1,16 @@
 import os
+import time
+from typing import Optional
 
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import declarative_base, sessionmaker  # 新しいインポート先
 
+from app.core.config import settings
+from app.core.process_state import register_reset
+from app.core.replicas import InMemoryWriteTracker, RedisWriteTracker, ReplicaPool, install_write_tracking
+
 # 環境変数からDATABASE_URLを取得、デフォルトはローカル用
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./db/todos.db")
 
@@ -11,27 +19,122 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./db/todos.db")
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# SQLiteの場合のみcheck_same_threadを設定
-connect_args = {}
-if "sqlite" in DATABASE_URL:
-    connect_args = {"check_same_thread": False}
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+def _connect_args(url: str) -> dict:
+    # SQLiteの場合のみcheck_same_threadを設定
+    if "sqlite" in url:
+        return {"check_same_thread": False}
+    return {}
+
+
+engine = create_engine(DATABASE_URL, connect_args=_connect_args(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# 読み取りレプリカ（DATABASE_REPLICA_URLS未指定の場合は空で、すべてプライマリから読み取る）
+replica_pool = ReplicaPool(
+    [
+        create_engine(url.replace("postgres://", "postgresql://", 1), connect_args=_connect_args(url))
+        for url in settings.get_replica_urls()
+    ],
+    check_interval=settings.REPLICA_HEALTH_CHECK_SECONDS,
+)
+install_write_tracking(SessionLocal)
+
+_write_tracker = None
+
+
+def get_write_tracker():
+    """書き込みを行ったユーザーの記録先を取得（read-your-writes用）"""
+    global _write_tracker
+    if _write_tracker is None:
+        if settings.READ_YOUR_WRITES_BACKEND == "redis":
+            from app.core.redis_client import get_redis
+
+            _write_tracker = RedisWriteTracker(get_redis())
+        else:
+            _write_tracker = InMemoryWriteTracker()
+    return _write_tracker
+
+
+def _reset_database_state() -> None:
+    global _write_tracker
+    engine.dispose(close=False)
+    replica_pool.dispose()
+    _write_tracker = None
+
+
+# フォーク後の子プロセスでは親プロセスの接続を使わず、新しい接続を作る
+register_reset(_reset_database_state)
+
 
-def get_db():
+def request_user_id(request: Optional[Request]) -> Optional[int]:
+    """リクエストのアクセストークンからユーザーIDを取得（検証済みトークンのキャッシュを利用）"""
+    if request is None:
+        return None
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    from app.core.security import decode_token
+
+    payload = decode_token(token)
+    if payload is None or "uid" not in payload:
+        return None
+    return int(payload["uid"])
+
+
+def get_db(request: Request = None):
+    """プライマリのセッション（書き込みを行ったユーザーは一定時間プライマリから読み取るよう記録する）"""
     db = SessionLocal()
+    if replica_pool:
+        user_id = request_user_id(request)
+        if user_id is not None:
+            db.info["on_write_commit"] = lambda: get_write_tracker().mark(user_id, settings.READ_YOUR_WRITES_SECONDS)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(request: Request = None):
+    """
+    読み取り専用のセッション
+
+    レプリカが設定されていればラウンドロビンで振り分ける。
+    直前に書き込みを行ったユーザー、利用可能なレプリカがない場合はプライマリを使う。
+    """
+    replica = None
+    if replica_pool:
+        user_id = request_user_id(request)
+        if user_id is None or not get_write_tracker().is_sticky(user_id):
+            replica = replica_pool.choose()
+
+    if replica is None:
+        db = SessionLocal()
+    else:
+        db = SessionLocal(bind=replica.engine)
+        db.info["read_only"] = True
     try:
         yield db
+    except OperationalError:
+        # 接続エラー等の場合は次の死活確認まで振り分け対象から外す
+        if replica is not None:
+            replica.mark_down(time.monotonic())
+        raise
     finally:
         db.close()
 
 
 def init_db():
     # すべてのモデルをインポート（テーブル作成に必要）
-    from app.models.todo import Todo  # noqa: F401
+    from app.models.idempotency_key import IdempotencyKey  # noqa: F401
+    from app.models.job import Job  # noqa: F401
+    from app.models.lease import Lease  # noqa: F401
+    from app.models.refresh_token import RefreshToken  # noqa: F401
+    from app.models.tag import Tag  # noqa: F401
+    from app.models.todo import Todo, TodoArchive  # noqa: F401
+    from app.models.todo_list import TodoList  # noqa: F401
+    from app.models.todo_stats import TodoStats  # noqa: F401
     from app.models.user import User  # noqa: F401
 
     Base.metadata.create_all(bind=engine)
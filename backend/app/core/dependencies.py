@@ -1,39 +1,127 @@
+from dataclasses import dataclass
+from typing import Any, Dict
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.core.security import verify_token
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.security import decode_token
+from app.core.token_revocation import token_version_cache
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """現在のユーザーを取得"""
-    print(f"[DEBUG] Received token: {token[:20]}..." if token else "[DEBUG] No token received")
-
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="認証情報が無効です",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    email = verify_token(token)
-    print(f"[DEBUG] Verified email: {email}")
 
-    if email is None:
-        raise credentials_exception
+@dataclass(frozen=True)
+class TokenClaims:
+    """アクセストークンに埋め込まれたユーザー情報"""
+
+    user_id: int
+    email: str
+    is_active: bool
+    token_version: int
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "TokenClaims":
+        return cls(
+            user_id=int(payload["uid"]),
+            email=payload["sub"],
+            is_active=bool(payload.get("act", True)),
+            token_version=int(payload["ver"]),
+        )
+
+
+def _decode_claims(token: str) -> TokenClaims:
+    """
+    アクセストークンを検証してクレームを取り出す
 
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
+    ユーザーIDとトークンバージョンを含まない旧形式のトークンは失効を確認できないため拒否する
+    """
+    payload = decode_token(token)
+    if payload is None or payload.get("sub") is None or "uid" not in payload or "ver" not in payload:
+        raise _credentials_exception()
+    return TokenClaims.from_payload(payload)
 
+
+def _authenticate(token: str, db: Session) -> User:
+    # 主キーで検索し、トークンバージョンが一致するかを確認
+    claims = _decode_claims(token)
+    user = db.get(User, claims.user_id)
+    if user is None or user.token_version != claims.token_version:
+        raise _credentials_exception()
     return user
 
 
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """現在のユーザーを取得"""
+    return _authenticate(token, db)
+
+
+def get_current_read_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_db)):
+    """
+    現在のユーザーを読み取りレプリカから取得（ユーザーを参照するだけのエンドポイント向け）
+
+    返すUserは読み取り専用のセッションに属するため、変更してはいけない
+    """
+    return _authenticate(token, db)
+
+
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     """アクティブなユーザーを取得"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="無効なユーザーです")
     return current_user
+
+
+def get_trusted_claims(token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_db)) -> TokenClaims:
+    """
+    トークンのクレームだけでユーザーを認証する（読み取り専用エンドポイント向け）
+
+    usersテーブルは参照せず、キャッシュされたトークンバージョンで失効のみを確認する。
+    キャッシュが有効な間はデータベースへのアクセスが発生しない。
+    """
+    claims = _decode_claims(token)
+    current = token_version_cache.get(claims.user_id, db)
+    if current is None or current[0] != claims.token_version:
+        raise _credentials_exception()
+
+    if not (claims.is_active and current[1]):
+        raise HTTPException(status_code=400, detail="無効なユーザーです")
+    return claims
+
+
+def is_admin_email(email: str) -> bool:
+    """ADMIN_EMAILSに含まれるメールアドレスかどうか"""
+    return email.lower() in settings.get_admin_emails()
+
+
+def get_current_admin_user(current_user: User = Depends(get_current_active_user)):
+    """管理者ユーザーを取得（管理者でない場合は403）"""
+    if not is_admin_email(current_user.email):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="管理者権限が必要です")
+    return current_user
+
+
+def is_admin_authorization(authorization: str) -> bool:
+    """
+    Authorizationヘッダーの値が有効な管理者のトークンかどうか（ミドルウェア向け）
+
+    DBは参照せず、トークンの署名・有効期限とクレームのみで判定する
+    """
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    payload = decode_token(token)
+    if payload is None or payload.get("sub") is None:
+        return False
+    return bool(payload.get("act", True)) and is_admin_email(payload["sub"])
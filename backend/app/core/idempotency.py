@@ -0,0 +1,285 @@
+"""
+冪等キー（Idempotency-Key ヘッダー）
+
+タイムアウト後の再送で同じ書き込みが重複しないよう、キーごとに最初のリクエストのレスポンスを保存し、
+同じキーの再送には保存したレスポンスをそのまま返す（エンドポイントの処理・データベースへのアクセスは行わない）。
+
+- キーはユーザー（アクセストークンのユーザーID）ごとに区別する
+- 最初のリクエストは処理中の印を add（キーがない場合のみ保存）で置いてから実行する。
+  同じキーの同時の再送は完了を待って保存したレスポンスを返す（待ち時間を超えた場合は 409）
+- 保存するのは成功（2xx）のレスポンスのみ。失敗した場合は印を消し、再送で再実行できるようにする
+- 同じキーで内容（メソッド・パス・クエリ・ボディ）の異なるリクエストは 422
+- 保存先はプロセス内LRU・Redis・データベース（IDEMPOTENCY_BACKEND）。エントリはTTLで消える
+- 保存先の障害時は冪等キーを使わずに実行する（フェイルオープン）
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import InMemoryCacheBackend, RedisCacheBackend
+from app.core.config import settings
+from app.core.database import SessionLocal, request_user_id
+from app.core.process_state import register_reset
+from app.models.idempotency_key import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# 保存したレスポンスを返した場合に付けるヘッダー
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+# 保存するレスポンスヘッダー（小文字）
+STORED_HEADERS = ("content-type", "etag", "location")
+
+
+@dataclass
+class StoredResponse:
+    """冪等キーに保存する値（status_code が None の場合は処理中）"""
+
+    fingerprint: str
+    status_code: Optional[int] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    def encode(self) -> bytes:
+        meta = {"f": self.fingerprint, "s": self.status_code, "h": self.headers}
+        return json.dumps(meta, separators=(",", ":")).encode() + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, value: bytes) -> "StoredResponse":
+        meta, _, body = value.partition(b"\n")
+        meta = json.loads(meta)
+        return cls(fingerprint=meta["f"], status_code=meta["s"], headers=meta["h"], body=body)
+
+    def to_response(self) -> Response:
+        return Response(self.body, status_code=self.status_code, headers={**self.headers, REPLAYED_HEADER: "true"})
+
+
+class DatabaseIdempotencyBackend:
+    """
+    データベースの保存先（Redisのない構成で全ワーカーで共有する）
+
+    キャッシュのバックエンドと同じ get / set / add / delete を、リクエストとは別の短いトランザクションで実行する
+    """
+
+    def __init__(self, session_factory: Callable = SessionLocal):
+        self.session_factory = session_factory
+        self.table = IdempotencyKey.__table__
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.session_factory() as db:
+            return db.execute(
+                select(self.table.c.value).where(self.table.c.key == key, self.table.c.expires_at > datetime.utcnow())
+            ).scalar()
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self.session_factory() as db:
+            db.execute(delete(self.table).where(self.table.c.key == key))
+            db.execute(insert(self.table).values(key=key, value=value, expires_at=self._expires_at(ttl)))
+            db.commit()
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """キーが存在しない（または期限切れの）場合のみ保存する（主キーの一意制約で同時の保存を1つに絞る）"""
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            db.execute(delete(self.table).where(self.table.c.key == key, self.table.c.expires_at <= now))
+            try:
+                db.execute(insert(self.table).values(key=key, value=value, expires_at=self._expires_at(ttl)))
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                return False
+            return True
+
+    def delete(self, key: str) -> None:
+        with self.session_factory() as db:
+            db.execute(delete(self.table).where(self.table.c.key == key))
+            db.commit()
+
+    def clear(self) -> None:
+        pass
+
+    @staticmethod
+    def _expires_at(ttl: float) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=ttl)
+
+
+class IdempotencyConflictError(Exception):
+    """冪等キーを使えないリクエスト（処理中・内容の不一致）"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class IdempotencyStore:
+    """
+    冪等キーごとのレスポンスの保存と再利用
+
+    Args:
+        backend: InMemoryCacheBackend / RedisCacheBackend / DatabaseIdempotencyBackend
+        ttl: 保存したレスポンスの有効期間（秒）
+        lock_timeout: 処理中の印の有効期間、および同じキーの完了を待つ最大秒数
+    """
+
+    poll_interval = 0.05
+
+    def __init__(self, backend: Any, ttl: float = 86400, lock_timeout: float = 30):
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+
+    async def run(self, key: str, fingerprint: str, call: Callable[[], Awaitable[Response]]) -> Response:
+        """
+        キーに保存したレスポンスがあれば返し、なければ call を実行して成功したレスポンスを保存する
+
+        同じキーのリクエストが処理中の場合は完了を待つ。処理中のまま待ち時間を超えた場合、
+        または内容の異なるリクエストに使われたキーの場合は IdempotencyConflictError
+        """
+        try:
+            stored = await self._acquire(key, fingerprint)
+        except IdempotencyConflictError:
+            raise
+        except Exception as e:
+            logger.warning("Idempotency backend unavailable, running without idempotency: %s", e)
+            return await call()
+        if stored is not None:
+            return stored.to_response()
+
+        try:
+            response = await call()
+        except BaseException:
+            await self._release(key)
+            raise
+        await self._store_or_release(key, fingerprint, response)
+        return response
+
+    async def _acquire(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """
+        キーに処理中の印を付ける（付けた場合は None を返す）。保存したレスポンスがある場合はそれを返す
+
+        同じキーのリクエストが処理中の場合は、完了するか待ち時間を超えるまで待つ
+        """
+        pending = StoredResponse(fingerprint).encode()
+        deadline = time.monotonic() + self.lock_timeout
+        while not await run_in_threadpool(self.backend.add, key, pending, self.lock_timeout):
+            value = await run_in_threadpool(self.backend.get, key)
+            # 取得までの間に先行するリクエストが失敗して印を消した場合は、もう一度 add を試みる
+            if value is not None:
+                stored = StoredResponse.decode(value)
+                if stored.fingerprint != fingerprint:
+                    raise IdempotencyConflictError(422, "Idempotency-Key was used for a different request")
+                if stored.status_code is not None:
+                    return stored
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflictError(409, "A request with this Idempotency-Key is in progress")
+            await asyncio.sleep(self.poll_interval)
+        return None
+
+    async def _store_or_release(self, key: str, fingerprint: str, response: Response) -> None:
+        """成功したレスポンスを保存し、それ以外の場合は処理中の印を消す（同じキーで再試行できるようにする）"""
+        if not (200 <= response.status_code < 300 and hasattr(response, "body")):
+            await self._release(key)
+            return
+        headers = {name: value for name, value in response.headers.items() if name in STORED_HEADERS}
+        stored = StoredResponse(fingerprint, response.status_code, headers, bytes(response.body))
+        try:
+            await run_in_threadpool(self.backend.set, key, stored.encode(), self.ttl)
+        except Exception as e:
+            logger.warning("Failed to store idempotent response %s: %s", key, e)
+
+    async def _release(self, key: str) -> None:
+        try:
+            await run_in_threadpool(self.backend.delete, key)
+        except Exception as e:
+            logger.warning("Failed to release idempotency key %s: %s", key, e)
+
+
+def _create_backend() -> Any:
+    if settings.IDEMPOTENCY_BACKEND == "redis":
+        from app.core.redis_client import get_redis
+
+        return RedisCacheBackend(get_redis(), prefix="idempotency")
+    if settings.IDEMPOTENCY_BACKEND == "database":
+        return DatabaseIdempotencyBackend()
+    return InMemoryCacheBackend(settings.IDEMPOTENCY_MAX_ENTRIES)
+
+
+_store: Optional[IdempotencyStore] = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """設定に応じた冪等キーの保存先を取得"""
+    global _store
+    if _store is None:
+        _store = IdempotencyStore(
+            _create_backend(), settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS
+        )
+    return _store
+
+
+def reset_idempotency_store() -> None:
+    """保存したレスポンスを破棄する（テストやフォーク後の初期化用）"""
+    global _store
+    if _store is not None:
+        _store.backend.clear()
+    _store = None
+
+
+register_reset(reset_idempotency_store)
+
+
+def request_fingerprint(request: Request, body: bytes) -> str:
+    """同じキーで同じリクエストが再送されたかを判定するためのハッシュ"""
+    digest = hashlib.sha256()
+    for part in (request.method, request.url.path, request.url.query):
+        digest.update(part.encode() + b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class IdempotentRoute(APIRoute):
+    """
+    Idempotency-Key ヘッダー付きの書き込み（POST / PUT / PATCH / DELETE）のレスポンスを保存・再利用するルート
+
+    APIRouter(route_class=IdempotentRoute) で使う。ヘッダーのないリクエストはそのまま実行する。
+    ユーザーはトークンの署名のみで判定する（保存したレスポンスは同じユーザーが既に受け取った内容のため、
+    失効の確認は再送では行わない）。トークンが無効な場合は冪等キーを使わずに実行し、エンドポイントで 401 とする
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if key is None or request.method not in WRITE_METHODS or not settings.IDEMPOTENCY_ENABLED:
+                return await handler(request)
+            user_id = request_user_id(request)
+            if user_id is None:
+                return await handler(request)
+            if not key.strip() or len(key) > MAX_KEY_LENGTH:
+                return JSONResponse({"detail": "Invalid Idempotency-Key header"}, status_code=400)
+
+            # ボディは Request にキャッシュされ、エンドポイントの処理でも再利用される
+            fingerprint = request_fingerprint(request, await request.body())
+            try:
+                return await get_idempotency_store().run(f"{user_id}:{key}", fingerprint, lambda: handler(request))
+            except IdempotencyConflictError as e:
+                return JSONResponse({"detail": e.detail}, status_code=e.status_code)
+
+        return route_handler
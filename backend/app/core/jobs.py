@@ -0,0 +1,319 @@
+"""
+バックグラウンドジョブ
+
+大量のToDoに対する一括操作や定期的なメンテナンス処理を、HTTPリクエストとは別に実行する。
+
+- ジョブはjobsテーブルに保存する（SQLite / PostgreSQL）。プロセスが再起動しても失われない
+- JobRunnerはイベントループ上で動き、ジョブ本体は専用のスレッドプールで実行する
+  （同期エンドポイント用のスレッドプールを占有しない）
+- 複数のワーカーがそれぞれJobRunnerを動かしても、同じジョブは1回だけ実行される
+- 定期実行ジョブは時間枠ごとに unique_key 付きで登録し、ワーカー間での重複登録を防ぐ
+- 失敗したジョブは指数バックオフで再実行する。再実行しても成功しないエラー（NON_RETRYABLE_ERRORS）は
+  1回目で失敗とする
+
+ジョブの処理は job_handler デコレーターで登録する:
+
+    @job_handler("todos.bulk_update")
+    def bulk_update(db: Session, payload: dict) -> dict:
+        ...
+"""
+
+import asyncio
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.job import JOB_FAILED, JOB_PENDING, JOB_RUNNING, JOB_SUCCEEDED, Job
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Session, Dict[str, Any]], Optional[Dict[str, Any]]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+class PermanentJobError(Exception):
+    """再実行しても成功しないジョブの失敗（ジョブの処理で送出すると再実行せずに失敗とする）"""
+
+
+# 再実行しないエラー（処理が登録されていない・対象が存在しない・ペイロードが不正）
+NON_RETRYABLE_ERRORS = (PermanentJobError, LookupError, ValueError, TypeError)
+
+
+def job_handler(job_type: str) -> Callable[[JobHandler], JobHandler]:
+    """ジョブの処理を登録するデコレーター"""
+
+    def register(func: JobHandler) -> JobHandler:
+        _handlers[job_type] = func
+        return func
+
+    return register
+
+
+def get_handler(job_type: str) -> Optional[JobHandler]:
+    return _handlers.get(job_type)
+
+
+def enqueue(
+    db: Session,
+    job_type: str,
+    payload: Optional[Dict[str, Any]] = None,
+    run_at: Optional[datetime] = None,
+    created_by: Optional[int] = None,
+    unique_key: Optional[str] = None,
+) -> Job:
+    """ジョブを登録する（コミットは呼び出し側で行う）"""
+    job = Job(
+        type=job_type,
+        payload=payload or {},
+        status=JOB_PENDING,
+        attempts=0,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        run_at=run_at or datetime.utcnow(),
+        created_by=created_by,
+        unique_key=unique_key,
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+@dataclass
+class RecurringJob:
+    """定期実行ジョブ（interval_seconds ごとに1回登録される）"""
+
+    job_type: str
+    interval_seconds: int
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+    def slot(self, now: datetime) -> int:
+        return int(now.timestamp()) // self.interval_seconds
+
+
+class JobRunner:
+    """
+    ジョブの実行
+
+    Args:
+        session_factory: ジョブごとのDBセッションを作成する関数
+        recurring: 定期実行ジョブ
+        concurrency: 同時に実行するジョブ数
+        poll_interval: 実行待ちのジョブがない場合の待機秒数
+        timeout: この秒数を超えて実行中のジョブは、ワーカーの異常終了とみなして再実行する
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        recurring: Optional[List[RecurringJob]] = None,
+        concurrency: int = 2,
+        poll_interval: float = 1.0,
+        timeout: int = 600,
+    ):
+        self.session_factory = session_factory
+        self.recurring = recurring or []
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._scheduled_slots: Dict[str, int] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    # --- 同期処理（スレッドプールで実行） ---
+
+    def schedule_recurring(self, now: Optional[datetime] = None) -> None:
+        """定期実行ジョブのうち、現在の時間枠でまだ登録されていないものを登録する"""
+        now = now or datetime.utcnow()
+        for recurring in self.recurring:
+            slot = recurring.slot(now)
+            if self._scheduled_slots.get(recurring.job_type) == slot:
+                continue
+            db = self.session_factory()
+            try:
+                enqueue(
+                    db,
+                    recurring.job_type,
+                    recurring.payload,
+                    run_at=now,
+                    unique_key=f"recurring:{recurring.job_type}:{slot}",
+                )
+                db.commit()
+            except IntegrityError:
+                # 他のワーカーが登録済み
+                db.rollback()
+            finally:
+                db.close()
+            self._scheduled_slots[recurring.job_type] = slot
+
+    def requeue_stale(self, now: Optional[datetime] = None) -> int:
+        """タイムアウトした実行中のジョブを実行待ちに戻す"""
+        now = now or datetime.utcnow()
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(Job)
+                .where(Job.status == JOB_RUNNING, Job.started_at < now - timedelta(seconds=self.timeout))
+                .values(status=JOB_PENDING, run_at=now)
+            )
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+    def claim(self, db: Session, now: Optional[datetime] = None) -> Optional[Job]:
+        """実行待ちのジョブを1件取得して実行中にする（他のワーカーと競合した場合は次の候補を試す）"""
+        now = now or datetime.utcnow()
+        for _ in range(5):
+            job_id = (
+                db.query(Job.id)
+                .filter(Job.status == JOB_PENDING, Job.run_at <= now)
+                .order_by(Job.run_at, Job.id)
+                .limit(1)
+                .scalar()
+            )
+            if job_id is None:
+                return None
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JOB_PENDING)
+                .values(status=JOB_RUNNING, started_at=now, attempts=Job.attempts + 1)
+            ).rowcount
+            db.commit()
+            if claimed:
+                return db.get(Job, job_id)
+        return None
+
+    def run_next(self) -> bool:
+        """実行待ちのジョブを1件実行する（実行した場合はTrue）"""
+        db = self.session_factory()
+        try:
+            job = self.claim(db)
+            if job is None:
+                return False
+            self._execute(db, job)
+            return True
+        finally:
+            db.close()
+
+    def run_pending(self) -> int:
+        """実行待ちのジョブがなくなるまで実行する（テストや手動実行用）"""
+        count = 0
+        while self.run_next():
+            count += 1
+        return count
+
+    def _execute(self, db: Session, job: Job) -> None:
+        handler = get_handler(job.type)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job type '{job.type}'")
+            result = handler(db, dict(job.payload or {}))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.exception("Job %s (%s) failed", job.id, job.type)
+            self._record_failure(db, job, e)
+            return
+
+        job.status = JOB_SUCCEEDED
+        job.result = result
+        job.error = None
+        job.finished_at = datetime.utcnow()
+        db.commit()
+
+    def _record_failure(self, db: Session, job: Job, error: Exception) -> None:
+        job.error = "".join(traceback.format_exception_only(type(error), error)).strip()
+        if job.attempts < job.max_attempts and not isinstance(error, NON_RETRYABLE_ERRORS):
+            # 指数バックオフで再実行
+            job.status = JOB_PENDING
+            job.run_at = datetime.utcnow() + timedelta(seconds=2**job.attempts)
+        else:
+            job.status = JOB_FAILED
+            job.finished_at = datetime.utcnow()
+        db.commit()
+
+    def tick(self) -> None:
+        self.schedule_recurring()
+        self.requeue_stale()
+
+    # --- イベントループ上の処理 ---
+
+    async def run(self) -> None:
+        """stop() が呼ばれるまでジョブを実行し続ける"""
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job-runner")
+        try:
+            while not self._stopping.is_set():
+                try:
+                    await loop.run_in_executor(self._executor, self.tick)
+                    processed = await asyncio.gather(
+                        *(loop.run_in_executor(self._executor, self.run_next) for _ in range(self.concurrency))
+                    )
+                except Exception:
+                    logger.exception("Job runner iteration failed")
+                    processed = []
+                if not any(processed):
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stop(self) -> None:
+        if self._stopping is not None:
+            self._stopping.set()
+
+
+def default_recurring_jobs() -> List[RecurringJob]:
+    """設定に応じた定期実行ジョブ（間隔が0のものは登録しない）"""
+    jobs = [
+        RecurringJob(
+            "todos.archive_completed",
+            settings.JOB_ARCHIVE_INTERVAL_SECONDS if settings.ARCHIVE_COMPLETED_AFTER_DAYS > 0 else 0,
+            {"after_days": settings.ARCHIVE_COMPLETED_AFTER_DAYS, "batch_size": settings.ARCHIVE_BATCH_SIZE},
+        ),
+        RecurringJob(
+            "todos.purge_deleted",
+            settings.JOB_PURGE_DELETED_INTERVAL_SECONDS if settings.PURGE_DELETED_AFTER_HOURS > 0 else 0,
+            {
+                "after_hours": settings.PURGE_DELETED_AFTER_HOURS,
+                "batch_size": settings.PURGE_DELETED_BATCH_SIZE,
+                "pause_seconds": settings.PURGE_DELETED_BATCH_PAUSE_SECONDS,
+            },
+        ),
+        RecurringJob("maintenance.rebalance_positions", settings.JOB_REBALANCE_INTERVAL_SECONDS),
+        RecurringJob("maintenance.rebuild_todo_stats", settings.JOB_STATS_REBUILD_INTERVAL_SECONDS),
+        RecurringJob("maintenance.purge_refresh_tokens", settings.JOB_TOKEN_PURGE_INTERVAL_SECONDS),
+        RecurringJob(
+            "maintenance.purge_idempotency_keys",
+            settings.JOB_IDEMPOTENCY_PURGE_INTERVAL_SECONDS if settings.IDEMPOTENCY_BACKEND == "database" else 0,
+        ),
+        RecurringJob(
+            "maintenance.purge_jobs",
+            settings.JOB_PURGE_INTERVAL_SECONDS,
+            {"retention_days": settings.JOB_RETENTION_DAYS},
+        ),
+    ]
+    return [job for job in jobs if job.interval_seconds > 0]
+
+
+def create_runner() -> JobRunner:
+    """設定に応じたJobRunnerを作成する"""
+    return JobRunner(
+        recurring=default_recurring_jobs(),
+        concurrency=settings.JOB_CONCURRENCY,
+        poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+        timeout=settings.JOB_TIMEOUT_SECONDS,
+    )
@@ -0,0 +1,72 @@
+"""
+JWTの署名・検証バックエンド
+
+JWT_BACKEND設定で切り替える。
+- jose: python-jose（デフォルト、requirements.txtに含まれる）
+- pyjwt: PyJWT（任意依存。python-joseより検証が高速）
+
+どちらもHS256の標準的なJWTを扱うため、発行済みのトークンは切り替え後もそのまま検証できる。
+"""
+
+from typing import Any, Dict
+
+
+class InvalidTokenError(Exception):
+    """トークンの署名・形式・有効期限のいずれかが不正"""
+
+
+class JoseBackend:
+    """python-joseによる実装"""
+
+    name = "jose"
+
+    def __init__(self):
+        from jose import JWTError, jwt
+
+        self._jwt = jwt
+        self._error = JWTError
+
+    def encode(self, payload: Dict[str, Any], key: str, algorithm: str) -> str:
+        return self._jwt.encode(payload, key, algorithm=algorithm)
+
+    def decode(self, token: str, key: str, algorithm: str) -> Dict[str, Any]:
+        try:
+            return self._jwt.decode(token, key, algorithms=[algorithm])
+        except self._error as e:
+            raise InvalidTokenError(str(e)) from e
+
+
+class PyJWTBackend:
+    """PyJWTによる実装"""
+
+    name = "pyjwt"
+
+    def __init__(self):
+        import jwt
+
+        self._jwt = jwt
+        self._error = jwt.PyJWTError
+
+    def encode(self, payload: Dict[str, Any], key: str, algorithm: str) -> str:
+        return self._jwt.encode(payload, key, algorithm=algorithm)
+
+    def decode(self, token: str, key: str, algorithm: str) -> Dict[str, Any]:
+        try:
+            return self._jwt.decode(token, key, algorithms=[algorithm])
+        except self._error as e:
+            raise InvalidTokenError(str(e)) from e
+
+
+BACKENDS = {
+    JoseBackend.name: JoseBackend,
+    PyJWTBackend.name: PyJWTBackend,
+}
+
+
+def create_backend(name: str):
+    """名前からバックエンドを生成"""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown JWT backend: '{name}'. Must be one of: {', '.join(BACKENDS)}")
+    return backend_class()
@@ -0,0 +1,77 @@
+"""
+データベースによるリース
+
+Gunicornの複数ワーカーや複数インスタンスで、定期的な処理（リマインダーの送信等）を1つのプロセスだけで動かす。
+
+- リースは名前ごとに leases テーブルの1行で、担当のプロセス（holder）と有効期限を記録する
+- 担当のプロセスは有効期限内に acquire() を呼び出して期限を延長し続ける
+- 担当のプロセスが停止すると、有効期限の経過後に acquire() を呼び出した他のプロセスが引き継ぐ
+- 取得は条件付きの UPDATE と主キーの一意制約で行うため、同時に取得を試みても担当は1つになる
+  （SQLite / PostgreSQL のどちらでも動作する）
+"""
+
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.database import SessionLocal
+from app.models.lease import Lease
+
+
+class DatabaseLease:
+    """
+    名前付きのリース
+
+    Args:
+        name: リースの名前（処理ごとに1つ）
+        ttl_seconds: 有効期限（acquire() の呼び出し間隔より十分長くする）
+        session_factory: DBセッションを作成する関数
+        holder: このプロセスを表す値（省略時はホスト名・プロセスID・ランダムな値から生成）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl_seconds: float = 30,
+        session_factory: Callable = SessionLocal,
+        holder: Optional[str] = None,
+    ):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.session_factory = session_factory
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.table = Lease.__table__
+
+    def acquire(self, now: Optional[datetime] = None) -> bool:
+        """リースを取得（保持している場合は延長）し、このプロセスが担当かどうかを返す"""
+        now = now or datetime.utcnow()
+        values = {"holder": self.holder, "expires_at": now + self.ttl}
+        with self.session_factory() as db:
+            result = db.execute(
+                update(self.table)
+                .where(
+                    self.table.c.name == self.name,
+                    or_(self.table.c.holder == self.holder, self.table.c.expires_at <= now),
+                )
+                .values(**values)
+            )
+            if result.rowcount == 0:
+                try:
+                    db.execute(insert(self.table).values(name=self.name, **values))
+                except IntegrityError:
+                    # 他のプロセスが有効なリースを保持している
+                    db.rollback()
+                    return False
+            db.commit()
+            return True
+
+    def release(self) -> None:
+        """保持しているリースを手放す（終了時に呼び出し、他のプロセスがすぐに引き継げるようにする）"""
+        with self.session_factory() as db:
+            db.execute(delete(self.table).where(self.table.c.name == self.name, self.table.c.holder == self.holder))
+            db.commit()
@@ -0,0 +1,32 @@
+"""
+プロセス内状態の管理
+
+キャッシュやカウンター、DB接続プールなどプロセス内に保持する状態を登録しておき、
+ワーカープロセスのフォーク直後に一括でリセットする。
+
+Gunicornの preload_app では親プロセスでアプリケーションを読み込んでからフォークするため、
+親プロセスで作られたDB接続やRedis接続、キャッシュの内容がそのまま子プロセスに複製される。
+接続を共有すると通信が混線するため、子プロセスでは必ず作り直す必要がある。
+"""
+
+import os
+from typing import Callable, List
+
+_reset_callbacks: List[Callable[[], None]] = []
+
+
+def register_reset(callback: Callable[[], None]) -> Callable[[], None]:
+    """フォーク後（およびテスト間）に呼び出すリセット処理を登録する"""
+    _reset_callbacks.append(callback)
+    return callback
+
+
+def reset_process_state() -> None:
+    """登録されたリセット処理をすべて実行する"""
+    for callback in _reset_callbacks:
+        callback()
+
+
+# Gunicorn以外（multiprocessing等）でフォークされた場合にも子プロセスで自動的にリセットする
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_process_state)
@@ -0,0 +1,214 @@
+"""
+サンプリングプロファイラ（本番環境での調査用）
+
+別スレッドから一定間隔で sys._current_frames() を取得し、全スレッド（イベントループと
+同期エンドポイントを実行するスレッドプール）のスタックを集計する。
+計測対象のコードには手を加えないため、オーバーヘッドはサンプリング間隔に応じた
+わずかなもので済む。
+
+結果はflamegraph.pl / speedscope 等で読み込めるcollapsed stack形式で出力する:
+    thread (MainThread);run (asyncio/base_events.py:...);... 12
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import uuid
+from collections import Counter
+from typing import Callable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 待機中のスレッドの末端フレーム（集計から除外する）
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+# 同時に実行できるプロファイルは1つまで（サンプリング自体の負荷を抑えるため）
+_profile_lock = threading.Lock()
+
+
+def _format_frame(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class SamplingProfiler:
+    """
+    全スレッドのスタックを定期的に取得して集計するプロファイラ
+
+    Args:
+        interval: サンプリング間隔（秒）
+        include_idle: 待機中のスレッドも集計するか
+    """
+
+    def __init__(self, interval: float = 0.005, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """全スレッドのスタックを1回取得して集計する"""
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if not self.include_idle and _is_idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_format_frame(frame))
+                frame = frame.f_back
+            stack.append(f"thread ({names.get(thread_id, thread_id)})")
+            self.samples[";".join(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """collapsed stack形式（1行1スタック、末尾にサンプル数）で出力する"""
+        lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def try_acquire() -> bool:
+    """プロファイルの実行権を取得する（他のプロファイルが実行中の場合はFalse）"""
+    return _profile_lock.acquire(blocking=False)
+
+
+def release() -> None:
+    _profile_lock.release()
+
+
+def profile_path(profile_id: str) -> str:
+    return os.path.join(settings.PROFILER_OUTPUT_DIR, f"{profile_id}.folded")
+
+
+def save_profile(profiler: SamplingProfiler) -> str:
+    """プロファイル結果をファイルに保存してIDを返す"""
+    profile_id = uuid.uuid4().hex
+    os.makedirs(settings.PROFILER_OUTPUT_DIR, exist_ok=True)
+    with open(profile_path(profile_id), "w") as f:
+        f.write(profiler.collapsed())
+    return profile_id
+
+
+def load_profile(profile_id: str) -> Optional[str]:
+    """保存したプロファイル結果を読み込む（IDの形式が不正・存在しない場合はNone）"""
+    try:
+        uuid.UUID(hex=profile_id)
+    except ValueError:
+        return None
+    try:
+        with open(profile_path(profile_id)) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _stop_and_save(profiler: SamplingProfiler) -> str:
+    profiler.stop()
+    return save_profile(profiler)
+
+
+class RequestProfilerMiddleware:
+    """
+    リクエスト単位のプロファイル（ASGIミドルウェア）
+
+    管理者のトークンで `X-Profile: 1` ヘッダーを付与したリクエストの処理中だけプロファイラを動かし、
+    結果を保存して `X-Profile-Id` レスポンスヘッダーでIDを返す。
+    結果は GET /api/debug/profile/requests/{id} で取得する。
+    プロセス全体をサンプリングするため、同時に処理中の他のリクエストも結果に含まれる。
+
+    Args:
+        is_admin: Authorizationヘッダーの値から管理者かどうかを判定する関数
+        interval: サンプリング間隔（秒）
+    """
+
+    header = b"x-profile"
+
+    def __init__(self, app, is_admin: Callable[[str], bool], interval: float = 0.005):
+        self.app = app
+        self.is_admin = is_admin
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # 他のプロファイルが実行中の場合はプロファイルせずに処理する
+        if not try_acquire():
+            await self.app(scope, receive, send)
+            return
+
+        profiler = SamplingProfiler(self.interval)
+        start_message = None
+        stopped = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, stopped
+            # レスポンスヘッダーにプロファイルIDを含めるため、本文の送信開始まで保留する
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is not None:
+                # サンプリングのスレッドの終了待ちとファイルの書き込みは、イベントループを止めないよう別スレッドで行う
+                stopped = True
+                profile_id = await asyncio.to_thread(_stop_and_save, profiler)
+                headers = list(start_message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+                await send({**start_message, "headers": headers})
+                start_message = None
+            await send(message)
+
+        try:
+            profiler.start()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            try:
+                if not stopped:
+                    await asyncio.to_thread(profiler.stop)
+            finally:
+                release()
+
+    def _requested(self, scope) -> bool:
+        headers = dict(scope.get("headers", []))
+        if headers.get(self.header) not in (b"1", b"true"):
+            return False
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        return self.is_admin(authorization)
@@ -0,0 +1,169 @@
+"""
+SQLクエリの計測（リクエストごとのクエリ数と実行時間）
+
+SQLAlchemyのEngineイベントで全ステートメントを計測し、リクエスト単位で集計する。
+集計先はcontextvarで保持するため、スレッドプールで実行される同期エンドポイントの
+クエリも同じリクエストに計上される。
+
+- 本番環境以外ではレスポンスに `Server-Timing: db;dur=...` ヘッダーを付与する
+- QUERY_BUDGET_PER_REQUEST を超えたリクエストは警告ログを出す（N+1の検出用）
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 警告ログに含めるステートメントの最大件数
+MAX_RECORDED_STATEMENTS = 20
+
+
+@dataclass
+class QueryStats:
+    """1リクエスト（または計測範囲）内のクエリの集計"""
+
+    count: int = 0
+    duration: float = 0.0  # 秒
+    statements: List[str] = field(default_factory=list)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append(statement)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration * 1000
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _handle_error(context) -> None:
+    # 失敗したステートメントでは after_cursor_execute が呼ばれないため、開始時刻をここで取り除く
+    # （残すとプールされた接続の上で増え続け、以降のステートメントの実行時間もずれる）
+    if context.statement is not None and context.connection is not None:
+        starts = context.connection.info.get("query_start_time")
+        if starts:
+            starts.pop()
+
+
+def install() -> None:
+    """すべてのEngineにクエリ計測のイベントリスナーを登録する（複数回呼び出しても1回だけ登録）"""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _installed = True
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """範囲内で（同じコンテキストから）実行されたクエリを集計する"""
+    install()
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def count_engine_queries(engine: Engine) -> Iterator[QueryStats]:
+    """
+    指定したEngineで実行されたクエリを、実行元のスレッドやコンテキストに関係なく集計する
+
+    TestClientはアプリケーションを別スレッドのイベントループで実行するため、
+    テストからエンドポイントのクエリ数を検証する場合はこちらを使う。
+    """
+    stats = QueryStats()
+    starts: List[float] = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        starts.append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        stats.record(statement, time.perf_counter() - starts.pop())
+
+    def handle_error(context):
+        if context.statement is not None and starts:
+            starts.pop()
+
+    listeners = [("before_cursor_execute", before), ("after_cursor_execute", after), ("handle_error", handle_error)]
+    for name, listener in listeners:
+        event.listen(engine, name, listener)
+    try:
+        yield stats
+    finally:
+        for name, listener in listeners:
+            event.remove(engine, name, listener)
+
+
+def format_server_timing(stats: QueryStats) -> str:
+    return f'db;dur={stats.duration_ms:.1f};desc="{stats.count} queries"'
+
+
+class QueryCounterMiddleware:
+    """
+    リクエストごとにクエリを集計するASGIミドルウェア
+
+    Args:
+        budget: 1リクエストあたりのクエリ数の上限（超えた場合に警告ログを出す、0で無効）
+        server_timing: Server-Timingヘッダーを付与するか（本番環境ではクエリ数を公開しない）
+    """
+
+    def __init__(self, app, budget: int = 0, server_timing: bool = False):
+        self.app = app
+        self.budget = budget
+        self.server_timing = server_timing
+        install()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", format_server_timing(stats).encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        if self.budget and stats.count > self.budget:
+            logger.warning(
+                "Query budget exceeded: %s %s executed %d queries (budget %d, %.1fms)\n%s",
+                scope.get("method"),
+                scope.get("path"),
+                stats.count,
+                self.budget,
+                stats.duration_ms,
+                "\n".join(stats.statements),
+            )
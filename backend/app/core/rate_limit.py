@@ -0,0 +1,229 @@
+"""
+レート制限
+
+スライディングウィンドウカウンター方式でリクエスト数を制限する。
+直前のウィンドウのカウントを経過時間で按分して現在のウィンドウに加算するため、
+固定ウィンドウの境界で制限の2倍までリクエストが通ってしまう問題を避けられる。
+
+ログインではパスワードハッシュの検証（Argon2）より前に判定し、
+クレデンシャルスタッフィングによるCPU枯渇を防ぐ。
+"""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app.core.config import settings
+from app.core.process_state import register_reset
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RateLimitResult:
+    """レート制限の判定結果"""
+
+    allowed: bool
+    count: float
+    limit: int
+    retry_after: int = 0
+
+
+def _weighted_count(previous: int, current: int, window_seconds: int, now: float) -> float:
+    """直前のウィンドウのカウントを経過割合で按分した推定リクエスト数"""
+    elapsed = (now % window_seconds) / window_seconds
+    return previous * (1 - elapsed) + current
+
+
+class InMemoryRateLimitBackend:
+    """
+    プロセス内メモリのカウンター
+
+    プロセスごとに独立するため、複数ワーカー構成ではRedisバックエンドを使用すること。
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> (ウィンドウ番号, 現在のカウント, 直前のカウント)
+        self._counters: Dict[str, Tuple[int, int, int]] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, window_seconds: int, now: float) -> Tuple[int, int]:
+        """カウンターを1増やし、(直前のカウント, 現在のカウント)を返す"""
+        window = int(now // window_seconds)
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[0] < window - 1:
+                current, previous = 0, 0
+            elif entry[0] == window - 1:
+                current, previous = 0, entry[1]
+            else:
+                current, previous = entry[1], entry[2]
+
+            current += 1
+            self._counters[key] = (window, current, previous)
+
+            if len(self._counters) > self.max_keys:
+                self._prune(window)
+        return previous, current
+
+    def _prune(self, window: int) -> None:
+        """有効期限切れ（2ウィンドウ以上前）のカウンターを削除"""
+        expired = [key for key, entry in self._counters.items() if entry[0] < window - 1]
+        for key in expired:
+            del self._counters[key]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+class RedisRateLimitBackend:
+    """
+    Redisのカウンター（全ワーカー・全インスタンスで共有）
+
+    ウィンドウごとに INCR + EXPIRE するだけなので、1回の判定は1往復のパイプラインで済む。
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit"):
+        self.client = client
+        self.prefix = prefix
+
+    def hit(self, key: str, window_seconds: int, now: float) -> Tuple[int, int]:
+        window = int(now // window_seconds)
+        current_key = f"{self.prefix}:{key}:{window}"
+        previous_key = f"{self.prefix}:{key}:{window - 1}"
+
+        pipe = self.client.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, window_seconds * 2)
+        pipe.get(previous_key)
+        current, _, previous = pipe.execute()
+        return int(previous or 0), int(current)
+
+    def reset(self) -> None:
+        for key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(key)
+
+
+class RateLimiter:
+    """キー単位でウィンドウあたりの回数を制限する"""
+
+    def __init__(self, backend: Any, limit: int, window_seconds: int, name: str):
+        self.backend = backend
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.name = name
+
+    def hit(self, key: str, now: Optional[float] = None) -> RateLimitResult:
+        """
+        1回分の試行を記録して判定する
+
+        拒否された試行もカウントに含めるため、試行を続ける限り制限は解除されない。
+        バックエンドの障害時は可用性を優先して許可する。
+        """
+        now = time.time() if now is None else now
+        try:
+            previous, current = self.backend.hit(f"{self.name}:{key}", self.window_seconds, now)
+        except Exception as e:
+            logger.warning("Rate limit backend error (%s): %s", self.name, e)
+            return RateLimitResult(allowed=True, count=0, limit=self.limit)
+
+        count = _weighted_count(previous, current, self.window_seconds, now)
+        if count <= self.limit:
+            return RateLimitResult(allowed=True, count=count, limit=self.limit)
+
+        retry_after = self._retry_after(previous, current, now)
+        return RateLimitResult(allowed=False, count=count, limit=self.limit, retry_after=retry_after)
+
+    def _retry_after(self, previous: int, current: int, now: float) -> int:
+        """これ以上試行しなかった場合に推定カウントが制限以下になるまでの秒数"""
+        elapsed = now % self.window_seconds
+        if current > self.limit:
+            # 次のウィンドウで現在のカウントの按分が制限以下になるまで待つ
+            wait = (self.window_seconds - elapsed) + self.window_seconds * (1 - self.limit / current)
+        else:
+            # 現在のウィンドウ内で直前のカウントの按分が減るまで待つ
+            wait = self.window_seconds * (1 - (self.limit - current) / previous) - elapsed
+        return max(1, math.ceil(wait))
+
+
+def _create_backend() -> Any:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        from app.core.redis_client import get_redis
+
+        return RedisRateLimitBackend(get_redis())
+    return InMemoryRateLimitBackend()
+
+
+_login_limiters: Optional[Tuple[RateLimiter, RateLimiter]] = None
+
+
+def get_login_limiters() -> Tuple[RateLimiter, RateLimiter]:
+    """ログイン用のレート制限（IPアドレス単位, アカウント単位）を取得"""
+    global _login_limiters
+    if _login_limiters is None:
+        backend = _create_backend()
+        window = settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+        _login_limiters = (
+            RateLimiter(backend, settings.LOGIN_RATE_LIMIT_PER_IP, window, name="login:ip"),
+            RateLimiter(backend, settings.LOGIN_RATE_LIMIT_PER_ACCOUNT, window, name="login:account"),
+        )
+    return _login_limiters
+
+
+def reset_rate_limits() -> None:
+    """レート制限の状態を破棄する（テストやフォーク後の初期化用）"""
+    global _login_limiters
+    if _login_limiters is not None and isinstance(_login_limiters[0].backend, InMemoryRateLimitBackend):
+        _login_limiters[0].backend.reset()
+    _login_limiters = None
+
+
+register_reset(reset_rate_limits)
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    クライアントのIPアドレスを取得
+
+    X-Forwarded-For の左側の値はクライアントが自由に設定できるため、信頼できるプロキシが追加した値
+    （右から TRUSTED_PROXY_HOPS 番目）を使う
+    """
+    if settings.TRUST_FORWARDED_FOR:
+        forwarded_for = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",")]
+        forwarded_for = [entry for entry in forwarded_for if entry]
+        if forwarded_for:
+            return forwarded_for[max(len(forwarded_for) - settings.TRUSTED_PROXY_HOPS, 0)]
+    return request.client.host if request.client else "unknown"
+
+
+def login_rate_limit(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """
+    ログイン試行のレート制限（依存性）
+
+    ユーザー検索やパスワード検証より前に評価されるため、
+    制限を超えた試行ではハッシュ計算が一切行われない。
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    ip_limiter, account_limiter = get_login_limiters()
+    results = [
+        ip_limiter.hit(get_client_ip(request)),
+        account_limiter.hit(form_data.username.strip().lower()),
+    ]
+    rejected = [result for result in results if not result.allowed]
+    if rejected:
+        retry_after = max(result.retry_after for result in rejected)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="ログイン試行回数が多すぎます。しばらくしてから再度お試しください",
+            headers={"Retry-After": str(retry_after)},
+        )
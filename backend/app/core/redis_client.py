@@ -0,0 +1,31 @@
+"""
+Redisクライアントの共有インスタンス
+redisパッケージは必要になった時点でインポートする（Redisを使わない構成では不要）
+"""
+
+from typing import Any, Optional
+
+from app.core.config import settings
+from app.core.process_state import register_reset
+
+_client: Optional[Any] = None
+
+
+def get_redis() -> Any:
+    """REDIS_URLに接続するRedisクライアントを取得（初回呼び出し時に生成）"""
+    global _client
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+def set_redis(client: Any) -> None:
+    """使用するRedisクライアントを差し替える（テストやフォーク後の再接続用）"""
+    global _client
+    _client = client
+
+
+# フォーク後の子プロセスでは接続を作り直す
+register_reset(lambda: set_redis(None))
@@ -0,0 +1,336 @@
+"""
+期限日のリマインダー
+
+期限日（から REMINDER_LEAD_SECONDS 前）になったToDoについて、リマインダーのイベントを通知先（sink）に送る。
+
+- 近い将来（REMINDER_HORIZON_SECONDS 以内）に通知するToDoだけをプロセス内の最小ヒープに保持する
+- ヒープは期限日の部分インデックスの範囲検索で少しずつ読み込む（テーブル全体は走査しない）
+- 保持する件数は REMINDER_MAX_PENDING まで。超える分は読み込み範囲を狭めて、後で読み込む
+- 読み込み済みの範囲のToDoの作成・更新・削除は、REMINDER_POLL_SECONDS ごとに updated_at 以降に更新されたToDoを
+  読み込んで反映する。一括UPDATEや他のワーカー・プロセスでの変更も反映される
+- 物理削除やアーカイブは updated_at に現れないため、通知の直前に主キーでToDoを再確認する
+
+全ワーカーで REMINDERS_ENABLED=True にしてよい。通知はデータベースのリース（app.core.leases）を取得した
+1つのプロセスだけが行い、そのプロセスが停止すると REMINDER_LEASE_SECONDS 後に他のプロセスが引き継ぐ
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.leases import DatabaseLease
+from app.models.todo import DUE_INDEX_CONDITION, Todo
+
+logger = logging.getLogger(__name__)
+
+REMINDER_LEASE_NAME = "reminders"
+
+
+@dataclass
+class ReminderEvent:
+    """リマインダーのイベント"""
+
+    todo_id: int
+    title: str
+    due_date: datetime
+    fired_at: datetime
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["due_date"] = self.due_date.isoformat()
+        data["fired_at"] = self.fired_at.isoformat()
+        return data
+
+
+ReminderSink = Callable[[ReminderEvent], None]
+
+
+class LogReminderSink:
+    """リマインダーをログに出力する"""
+
+    def __call__(self, event: ReminderEvent) -> None:
+        logger.info("Reminder: todo %s '%s' is due at %s", event.todo_id, event.title, event.due_date.isoformat())
+
+
+class WebhookReminderSink:
+    """リマインダーをJSONでWebhookにPOSTする（失敗はログに記録して破棄する）"""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, event: ReminderEvent) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(event.to_dict()).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except Exception:
+            logger.exception("Failed to deliver reminder for todo %s", event.todo_id)
+
+
+class ReminderScheduler:
+    """
+    リマインダーのスケジューラー
+
+    Args:
+        sink: リマインダーの通知先
+        session_factory: DBセッションを作成する関数
+        lead_seconds: 期限日の何秒前に通知するか
+        horizon_seconds: 何秒先までの通知をヒープに読み込むか
+        max_pending: ヒープに保持する最大件数
+        poll_seconds: 変更されたToDoを読み込む間隔（作成・変更から通知に反映されるまでの最大秒数）
+        rescan_margin_seconds: 変更の読み込みで前回の読み込み日時からさかのぼる秒数
+            （前回の読み込み後にコミットされた、それより前の updated_at の変更を取りこぼさないため）
+        lease: 複数のプロセスのうち1つだけで通知するためのリース（None の場合は常に通知する）
+    """
+
+    def __init__(
+        self,
+        sink: ReminderSink,
+        session_factory: Callable[[], Session] = SessionLocal,
+        lead_seconds: int = 0,
+        horizon_seconds: int = 3600,
+        max_pending: int = 10_000,
+        poll_seconds: float = 5.0,
+        rescan_margin_seconds: int = 60,
+        lease: Optional[DatabaseLease] = None,
+    ):
+        self.sink = sink
+        self.session_factory = session_factory
+        self.lead = timedelta(seconds=lead_seconds)
+        self.horizon = timedelta(seconds=horizon_seconds)
+        self.max_pending = max(1, max_pending)
+        self.poll_seconds = poll_seconds
+        self.rescan_margin = timedelta(seconds=rescan_margin_seconds)
+        self.lease = lease
+        # (通知日時, ToDoのID)。更新・削除されたエントリは _pending と一致しないものとして読み飛ばす
+        self._heap: List[Tuple[datetime, int]] = []
+        self._pending: Dict[int, datetime] = {}
+        # この日時より前に通知するToDoはすべて読み込み済み
+        self._loaded_until: Optional[datetime] = None
+        # 次の読み込みでは、この日時（から rescan_margin さかのぼった日時）以降に更新されたToDoを反映する
+        self._changed_since: Optional[datetime] = None
+        # この日時までの通知は処理済み（変更の読み込みで同じ通知を重複して送らないため）
+        self._fired_until: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._stopping: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    # --- ヒープの操作 ---
+
+    def _push(self, todo_id: int, fire_at: datetime) -> None:
+        self._pending[todo_id] = fire_at
+        heapq.heappush(self._heap, (fire_at, todo_id))
+
+    def _truncate(self, loaded_until: datetime) -> None:
+        """読み込み範囲を狭め、範囲外のエントリを破棄する（後で refill で読み込み直す）"""
+        self._loaded_until = loaded_until
+        self._pending = {todo_id: fire_at for todo_id, fire_at in self._pending.items() if fire_at < loaded_until}
+        self._heap = [(fire_at, todo_id) for todo_id, fire_at in self._pending.items()]
+        heapq.heapify(self._heap)
+
+    def clear(self) -> None:
+        """読み込んだ状態を破棄する（次の refill で現在時刻から読み込み直す）"""
+        with self._lock:
+            self._heap, self._pending = [], {}
+            self._loaded_until = self._changed_since = self._fired_until = None
+
+    def next_fire_at(self) -> Optional[datetime]:
+        """次に通知する日時"""
+        with self._lock:
+            while self._heap and self._pending.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    # --- 読み込みと通知（スレッドプールで実行） ---
+
+    def refill(self, now: Optional[datetime] = None) -> int:
+        """
+        読み込み済みの範囲に他のプロセスを含むToDoの変更を反映し、通知日時が now + horizon より前のToDoのうち
+        未読み込みのものを読み込む。新たに読み込んだ件数を返す
+        """
+        now = now or datetime.utcnow()
+        db = self.session_factory()
+        try:
+            if self._loaded_until is not None:
+                self._apply_changes(db, now)
+            return self._extend(db, now)
+        finally:
+            db.close()
+
+    def _apply_changes(self, db: Session, now: datetime) -> None:
+        """
+        前回の読み込み以降に更新されたToDo（一括UPDATEや他のワーカー・プロセスでの変更を含む）をヒープに反映する
+
+        updated_at のインデックスの範囲検索のため、読み込む件数はその間の更新件数に比例する
+        """
+        since = self._changed_since - self.rescan_margin
+        rows = db.query(Todo.id, Todo.due_date, Todo.completed, Todo.deleted_at).filter(Todo.updated_at >= since).all()
+        with self._lock:
+            for todo_id, due_date, completed, deleted_at in rows:
+                fire_at = None if due_date is None or completed or deleted_at is not None else due_date - self.lead
+                if self._pending.get(todo_id) == fire_at:
+                    continue
+                self._pending.pop(todo_id, None)
+                # 読み込み範囲外（後で読み込まれる）・通知の処理済みの日時は追加しない
+                if fire_at is None or fire_at >= self._loaded_until:
+                    continue
+                if self._fired_until is not None and fire_at <= self._fired_until:
+                    continue
+                if len(self._pending) >= self.max_pending:
+                    self._truncate(fire_at)
+                    continue
+                self._push(todo_id, fire_at)
+            self._changed_since = now
+
+    def _extend(self, db: Session, now: datetime) -> int:
+        """読み込み範囲を now + horizon まで広げる（期限日の部分インデックスの範囲検索）"""
+        target = now + self.horizon
+        with self._lock:
+            start = self._loaded_until or now
+            capacity = self.max_pending - len(self._pending)
+        if start >= target or capacity <= 0:
+            return 0
+
+        rows = (
+            db.query(Todo.id, Todo.due_date)
+            .filter(*DUE_INDEX_CONDITION, Todo.due_date >= start + self.lead, Todo.due_date < target + self.lead)
+            .order_by(Todo.due_date, Todo.id)
+            .limit(capacity)
+            .all()
+        )
+
+        loaded_until = target
+        if len(rows) == capacity:
+            # 上限に達した場合は、最後の通知日時と同じエントリを除いてそこまでを読み込み済みとする
+            last = rows[-1][1] - self.lead
+            if rows[0][1] - self.lead < last:
+                rows = [row for row in rows if row[1] - self.lead < last]
+                loaded_until = last
+            else:
+                loaded_until = last + timedelta(microseconds=1)
+
+        with self._lock:
+            for todo_id, due_date in rows:
+                if self._pending.get(todo_id) != due_date - self.lead:
+                    self._push(todo_id, due_date - self.lead)
+            self._loaded_until = loaded_until
+            if self._changed_since is None:
+                self._changed_since = now
+        return len(rows)
+
+    def fire_due(self, now: Optional[datetime] = None) -> List[ReminderEvent]:
+        """通知日時を過ぎたToDoのリマインダーを通知先に送り、送ったイベントを返す"""
+        now = now or datetime.utcnow()
+        due: Dict[int, datetime] = {}
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, todo_id = heapq.heappop(self._heap)
+                if self._pending.get(todo_id) == fire_at:
+                    del self._pending[todo_id]
+                    due[todo_id] = fire_at
+            self._fired_until = max(self._fired_until or now, now)
+        if not due:
+            return []
+
+        # 前回の読み込み後に完了・削除・期限変更されたToDoを除く（主キーでの検索）
+        db = self.session_factory()
+        try:
+            rows = db.query(Todo.id, Todo.title, Todo.due_date).filter(Todo.id.in_(due), *DUE_INDEX_CONDITION).all()
+        finally:
+            db.close()
+
+        events = [
+            ReminderEvent(todo_id=todo_id, title=title, due_date=due_date, fired_at=now)
+            for todo_id, title, due_date in sorted(rows, key=lambda row: (row[2], row[0]))
+            if due_date - self.lead == due[todo_id]
+        ]
+        for event in events:
+            try:
+                self.sink(event)
+            except Exception:
+                logger.exception("Reminder sink failed for todo %s", event.todo_id)
+        return events
+
+    def tick(self) -> None:
+        if self.lease is not None and not self.lease.acquire():
+            # 他のプロセスが通知を担当している。担当を引き継いだ場合は現在時刻から読み込み直す
+            self.clear()
+            return
+        self.refill()
+        self.fire_due()
+
+    # --- イベントループ上の処理 ---
+
+    async def run(self) -> None:
+        """stop() が呼ばれるまで、通知日時に合わせてリマインダーを送り続ける"""
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reminders")
+        try:
+            while not self._stopping.is_set():
+                try:
+                    await loop.run_in_executor(executor, self.tick)
+                except Exception:
+                    logger.exception("Reminder scheduler iteration failed")
+
+                # 次の通知日時か、変更の読み込み間隔（ただし読み込み範囲の半分まで）だけ待機する
+                candidates = [self.poll_seconds, self.horizon.total_seconds() / 2]
+                next_fire_at = self.next_fire_at()
+                if next_fire_at is not None:
+                    candidates.append((next_fire_at - datetime.utcnow()).total_seconds())
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=max(0.0, min(candidates)))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self.lease is not None:
+                try:
+                    await loop.run_in_executor(executor, self.lease.release)
+                except Exception:
+                    logger.exception("Failed to release the reminder lease")
+            executor.shutdown(wait=True)
+
+    def stop(self) -> None:
+        if self._stopping is not None:
+            self._stopping.set()
+
+
+def create_sink() -> ReminderSink:
+    """設定に応じた通知先を作成する"""
+    if settings.REMINDER_SINK == "webhook":
+        if not settings.REMINDER_WEBHOOK_URL:
+            raise ValueError("REMINDER_WEBHOOK_URL is required when REMINDER_SINK=webhook")
+        return WebhookReminderSink(settings.REMINDER_WEBHOOK_URL)
+    return LogReminderSink()
+
+
+def create_scheduler() -> ReminderScheduler:
+    """設定に応じたスケジューラーを作成する（通知は reminders リースを取得した1つのプロセスだけが行う）"""
+    return ReminderScheduler(
+        create_sink(),
+        lead_seconds=settings.REMINDER_LEAD_SECONDS,
+        horizon_seconds=settings.REMINDER_HORIZON_SECONDS,
+        max_pending=settings.REMINDER_MAX_PENDING,
+        poll_seconds=settings.REMINDER_POLL_SECONDS,
+        rescan_margin_seconds=settings.REMINDER_RESCAN_MARGIN_SECONDS,
+        lease=DatabaseLease(REMINDER_LEASE_NAME, ttl_seconds=settings.REMINDER_LEASE_SECONDS),
+    )
@@ -0,0 +1,175 @@
+"""
+読み取りレプリカの振り分け
+
+読み取り専用のエンドポイント（一覧・件数の取得など）をレプリカに振り分け、プライマリの負荷を下げる。
+
+- 複数のレプリカにラウンドロビンで振り分ける
+- 一定間隔で `SELECT 1` による死活確認を行い、応答しないレプリカは次の確認まで使わない
+- 書き込みを行ったユーザーは一定時間プライマリから読み取る（read-your-writes）
+  レプリカの遅延により、直前に作成・更新したデータが一覧に表示されない問題を防ぐ
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+    """レプリカ1台分の接続と死活状態"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.healthy = True
+        self.checked_at: Optional[float] = None
+
+    def is_available(self, check_interval: float, now: float) -> bool:
+        """利用可能かどうか（前回の確認から check_interval 秒以上経過していれば再確認する）"""
+        if self.checked_at is None or now - self.checked_at >= check_interval:
+            self.checked_at = now
+            self.healthy = self.ping()
+        return self.healthy
+
+    def ping(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            logger.warning("Read replica %s is unavailable: %s", self.engine.url.render_as_string(), e)
+            return False
+
+    def mark_down(self, now: float) -> None:
+        """クエリの失敗を検知した場合に、次の確認まで振り分け対象から外す"""
+        self.healthy = False
+        self.checked_at = now
+
+
+class ReplicaPool:
+    """
+    レプリカのラウンドロビン
+
+    Args:
+        engines: レプリカのEngine
+        check_interval: 死活確認の間隔（秒）
+    """
+
+    def __init__(self, engines: List[Engine], check_interval: float = 10):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self, now: Optional[float] = None) -> Optional[Replica]:
+        """次に使うレプリカを選ぶ（利用可能なレプリカがない場合はNone = プライマリを使う）"""
+        if not self.replicas:
+            return None
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            start = next(self._counter)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.is_available(self.check_interval, now):
+                return replica
+        return None
+
+    def dispose(self) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose(close=False)
+
+
+class InMemoryWriteTracker:
+    """
+    書き込みを行ったユーザーを記録する（プロセス内）
+
+    複数ワーカー構成ではワーカーごとの記録になるため、READ_YOUR_WRITES_BACKEND=redis を使用する
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._until: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: int, seconds: float, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if len(self._until) >= self.max_entries:
+                self._until = {uid: until for uid, until in self._until.items() if until > now}
+            self._until[user_id] = now + seconds
+
+    def is_sticky(self, user_id: int, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self._until.get(user_id, 0) > now
+
+    def reset(self) -> None:
+        with self._lock:
+            self._until.clear()
+
+
+class RedisWriteTracker:
+    """書き込みを行ったユーザーを記録する（Redis、全ワーカーで共有）"""
+
+    def __init__(self, client: Any, prefix: str = "ryw"):
+        self.client = client
+        self.prefix = prefix
+
+    def mark(self, user_id: int, seconds: float, now: Optional[float] = None) -> None:
+        try:
+            self.client.set(f"{self.prefix}:{user_id}", 1, px=max(1, int(seconds * 1000)))
+        except Exception as e:
+            logger.warning("Failed to record write for read-your-writes: %s", e)
+
+    def is_sticky(self, user_id: int, now: Optional[float] = None) -> bool:
+        try:
+            return bool(self.client.exists(f"{self.prefix}:{user_id}"))
+        except Exception as e:
+            # 判定できない場合は整合性を優先してプライマリを使う
+            logger.warning("Failed to check read-your-writes: %s", e)
+            return True
+
+    def reset(self) -> None:
+        pass
+
+
+def _track_orm_writes(orm_execute_state) -> None:
+    # 一括UPDATE/DELETE（db.execute(update(...)) や query.update()）も書き込みとして扱う
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+def _track_flush(session, flush_context) -> None:
+    session.info["has_writes"] = True
+
+
+def _reject_flush(session, flush_context, instances) -> None:
+    if session.info.get("read_only") and (session.new or session.dirty or session.deleted):
+        raise RuntimeError("Attempted to write through a read replica session")
+
+
+def _after_commit(session) -> None:
+    if session.info.pop("has_writes", False):
+        callback = session.info.get("on_write_commit")
+        if callback is not None:
+            callback()
+
+
+def _after_rollback(session) -> None:
+    session.info.pop("has_writes", None)
+
+
+def install_write_tracking(session_factory) -> None:
+    """セッションの書き込みを検知し、コミット時に session.info["on_write_commit"] を呼び出す"""
+    event.listen(session_factory, "do_orm_execute", _track_orm_writes)
+    event.listen(session_factory, "after_flush", _track_flush)
+    event.listen(session_factory, "before_flush", _reject_flush)
+    event.listen(session_factory, "after_commit", _after_commit)
+    event.listen(session_factory, "after_rollback", _after_rollback)
@@ -1,18 +1,45 @@
+import hashlib
+import secrets
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
-import bcrypt
-from argon2 import PasswordHasher
-from argon2.exceptions import InvalidHashError, VerifyMismatchError
-from jose import JWTError, jwt
+from app.core.config import settings
+from app.core.jwt_backends import InvalidTokenError, create_backend
+from app.core.process_state import register_reset
+from app.core.token_cache import VerifiedTokenCache
 
 # JWT設定
 SECRET_KEY = "your-secret-key-here-change-in-production"  # 本番環境では環境変数で設定
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = 14
 
-# Argon2ハッシャー（新規ハッシュ用）
-ph = PasswordHasher()
+# 暗号ライブラリ（argon2, bcrypt, JWT）は起動時間短縮のため初回使用時に読み込む
+_password_hasher = None
+_jwt_backend = None
+
+
+def get_password_hasher():
+    """Argon2ハッシャー（新規ハッシュ用）を取得"""
+    global _password_hasher
+    if _password_hasher is None:
+        from argon2 import PasswordHasher
+
+        _password_hasher = PasswordHasher()
+    return _password_hasher
+
+
+def get_jwt_backend():
+    """JWTの署名・検証バックエンド（JWT_BACKENDで切り替え）を取得"""
+    global _jwt_backend
+    if _jwt_backend is None:
+        _jwt_backend = create_backend(settings.JWT_BACKEND)
+    return _jwt_backend
+
+
+# 検証済みトークンのキャッシュ（同じトークンの再検証を省略する）
+verified_token_cache = VerifiedTokenCache(max_size=settings.JWT_CACHE_SIZE)
+register_reset(verified_token_cache.clear)
 
 
 def _is_argon2_hash(hashed_password: str) -> bool:
@@ -38,15 +65,20 @@ def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, bo
             - verification_result: 検証が成功したかどうか
             - needs_rehash: 再ハッシュが必要かどうか（bcryptの場合True）
     """
+    from argon2.exceptions import InvalidHashError, VerifyMismatchError
+
     try:
         if _is_argon2_hash(hashed_password):
             # Argon2ハッシュの検証
+            ph = get_password_hasher()
             ph.verify(hashed_password, plain_password)
             # Argon2パラメータが古い場合も再ハッシュを検討できる
             needs_rehash = ph.check_needs_rehash(hashed_password)
             return True, needs_rehash
         elif _is_bcrypt_hash(hashed_password):
             # bcryptハッシュの検証（レガシー）
+            import bcrypt
+
             is_valid = bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
             # bcryptの場合は常に再ハッシュが必要
             return is_valid, is_valid
@@ -67,7 +99,7 @@ def get_password_hash(password: str) -> str:
     Returns:
         Argon2でハッシュ化されたパスワード
     """
-    return ph.hash(password)
+    return get_password_hasher().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -78,20 +110,60 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = get_jwt_backend().encode(to_encode, SECRET_KEY, ALGORITHM)
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[str]:
-    """JWTトークンの検証"""
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    JWTトークンを検証してペイロードを返す（無効な場合はNone）
+
+    検証済みのトークンはキャッシュされ、有効期限内であれば2回目以降は署名検証を省略する
+    """
+    payload = verified_token_cache.get(token)
+    if payload is not None:
+        return payload
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        print(f"[DEBUG] Token payload: {payload}")
-        if email is None:
-            print("[DEBUG] Email is None in payload")
-            return None
-        return email
-    except JWTError as e:
+        payload = get_jwt_backend().decode(token, SECRET_KEY, ALGORITHM)
+    except InvalidTokenError as e:
         print(f"[DEBUG] JWT Error: {e}")
         return None
+
+    verified_token_cache.put(token, payload)
+    return payload
+
+
+def verify_token(token: str) -> Optional[str]:
+    """JWTトークンの検証"""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    email: str = payload.get("sub")
+    if email is None:
+        print("[DEBUG] Email is None in payload")
+        return None
+    return email
+
+
+def create_refresh_token() -> Tuple[str, str]:
+    """
+    リフレッシュトークンの作成
+
+    Returns:
+        (token, token_hash):
+            - token: クライアントに渡すトークン（256ビットの乱数）
+            - token_hash: データベースに保存するハッシュ
+    """
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    リフレッシュトークンのハッシュ化
+
+    トークン自体が十分なエントロピーを持つ乱数のため、パスワードと違い
+    低速なハッシュ（Argon2）は不要で、SHA-256で検索用のハッシュを作る
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
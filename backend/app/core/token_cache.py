@@ -0,0 +1,76 @@
+"""
+検証済みJWTのLRUキャッシュ
+
+同じアクセストークンはセッション中に何百回も送られてくるため、
+一度検証したトークンのペイロードをトークンのダイジェストをキーに保持し、
+2回目以降は署名検証とJSON解析を省略する。
+
+- キーはトークン文字列そのものではなくSHA-256ダイジェスト（メモリ上にトークンを残さない）
+- ペイロードのexpを過ぎたエントリは使用せず破棄する
+- 失効（トークンバージョン）の確認はキャッシュとは別に毎回行われる
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class VerifiedTokenCache:
+    """件数上限付きの検証済みトークンキャッシュ"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        # ダイジェスト -> (ペイロード, 有効期限のUNIX時刻)
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """キャッシュされたペイロードを取得（未登録または期限切れの場合はNone）"""
+        if self.max_size <= 0:
+            return None
+        key = self._key(token)
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return dict(payload)
+
+    def put(self, token: str, payload: Dict[str, Any]) -> None:
+        """検証済みのペイロードを登録（expを持たないトークンはキャッシュしない）"""
+        if self.max_size <= 0:
+            return
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (dict(payload), float(expires_at))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
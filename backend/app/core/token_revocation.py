@@ -0,0 +1,96 @@
+"""
+アクセストークンの失効チェック
+
+アクセストークンにはユーザーIDと発行時点のトークンバージョンが埋め込まれている。
+users.token_version をインクリメントするか is_active を False にすると、
+それ以前に発行されたトークンは失効する。
+
+リクエストごとにusersテーブルを参照しないよう、ユーザーごとの
+（トークンバージョン, 有効フラグ）を TOKEN_REVOCATION_CHECK_SECONDS の間キャッシュする。
+そのため失効はこの秒数以内の遅れで反映される。
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.process_state import register_reset
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+
+class TokenVersionCache:
+    """ユーザーごとのトークンバージョンと有効フラグのTTLキャッシュ"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int = 100_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # user_id -> (token_version, is_active, 取得時刻)
+        self._entries: Dict[int, Tuple[int, bool, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, db: Session) -> Optional[Tuple[int, bool]]:
+        """
+        ユーザーの（トークンバージョン, 有効フラグ）を取得
+
+        キャッシュが有効な間はデータベースにアクセスしない。ユーザーが存在しない場合はNone。
+        """
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and now - entry[2] < self.ttl_seconds:
+            return entry[0], entry[1]
+
+        row = db.query(User.token_version, User.is_active).filter(User.id == user_id).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[user_id] = (row.token_version, bool(row.is_active), now)
+        return row.token_version, bool(row.is_active)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_version_cache = TokenVersionCache(ttl_seconds=settings.TOKEN_REVOCATION_CHECK_SECONDS)
+register_reset(token_version_cache.clear)
+
+
+def revoke_user_tokens(db: Session, user: User) -> None:
+    """
+    ユーザーの発行済みアクセストークンとリフレッシュトークンをすべて失効させる
+
+    コミットは呼び出し側で行う。このプロセスのキャッシュはコミット後に無効化されるが、
+    他のワーカーでは TOKEN_REVOCATION_CHECK_SECONDS 以内に反映される。
+    """
+    user.token_version = (user.token_version or 0) + 1
+    db.query(RefreshToken).filter(RefreshToken.user_id == user.id, RefreshToken.revoked_at.is_(None)).update(
+        {RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False
+    )
+    # コミット前に無効化すると、並行するリクエストが古いバージョンを再びキャッシュしうる
+    db.info.setdefault("revoked_user_ids", set()).add(user.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_revoked(session: Session) -> None:
+    """
+    revoke_user_tokens で失効させたユーザーのキャッシュを、コミット後に無効化する
+
+    ロールバック後に残っていても余分に無効化されるだけなので、ロールバック時は破棄しない
+    （セーブポイントのロールバックでも after_rollback が呼ばれるため）
+    """
+    for user_id in session.info.pop("revoked_user_ids", ()):
+        token_version_cache.invalidate(user_id)
@@ -1,20 +1,66 @@
-from datetime import timedelta
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.core.dependencies import get_current_user
-from app.core.security import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, get_password_hash, verify_password
+from app.core.dependencies import get_current_read_user, get_current_user
+from app.core.rate_limit import login_rate_limit
+from app.core.security import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    create_access_token,
+    create_refresh_token,
+    get_password_hash,
+    hash_refresh_token,
+    verify_password,
+)
+from app.core.token_revocation import revoke_user_tokens
+from app.models.refresh_token import RefreshToken
 from app.models.user import User
-from app.schemas.user import Token
+from app.schemas.user import RefreshTokenRequest, Token
 from app.schemas.user import User as UserSchema
 from app.schemas.user import UserCreate
 
 router = APIRouter()
 
 
+def _create_user_access_token(user: User) -> str:
+    """
+    ユーザーのアクセストークンを作成
+
+    ユーザーID・有効フラグ・トークンバージョンを埋め込み、読み取り系のエンドポイントが
+    usersテーブルを参照せずに認証できるようにする
+    """
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = {"sub": user.email, "uid": user.id, "act": bool(user.is_active), "ver": user.token_version or 0}
+    return create_access_token(data=claims, expires_delta=access_token_expires)
+
+
+def _issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """リフレッシュトークンを発行してセッションに追加（コミットは呼び出し側で行う）"""
+    token, token_hash = create_refresh_token()
+    db.add(
+        RefreshToken(
+            user_id=user_id,
+            token_hash=token_hash,
+            family_id=family_id or secrets.token_hex(16),
+            expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return token
+
+
+def _revoke_token_family(db: Session, family_id: str) -> None:
+    """同じファミリーの未失効リフレッシュトークンをすべて失効させる"""
+    db.query(RefreshToken).filter(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)).update(
+        {RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False
+    )
+
+
 @router.post("/register", response_model=UserSchema)
 def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """新規ユーザー登録"""
@@ -36,8 +82,12 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    """ユーザーログイン"""
+def login_user(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db),
+    _: None = Depends(login_rate_limit),
+):
+    """ユーザーログイン（レート制限を超えた試行はパスワード検証前に拒否される）"""
     # ユーザーの検証
     user = db.query(User).filter(User.email == form_data.username).first()
     if not user:
@@ -68,14 +118,75 @@ def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = D
         db.commit()
         print(f"[INFO] Password rehashed to Argon2 for user: {user.email}")
 
-    # アクセストークンの作成
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
+    # アクセストークンとリフレッシュトークンの作成
+    access_token = _create_user_access_token(user)
+    refresh_token = _issue_refresh_token(db, user.id)
+    db.commit()
+
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/refresh", response_model=Token)
+def refresh_access_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    リフレッシュトークンでアクセストークンを再発行
+
+    パスワード検証は行わず、トークンハッシュの一意インデックス検索とユーザーの主キー検索のみで済む。
+    使用したリフレッシュトークンは失効させ、新しいリフレッシュトークンを発行する（ローテーション）。
+    """
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="リフレッシュトークンが無効です",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    stored = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(request.refresh_token)).first()
+    if stored is None:
+        raise invalid_token_exception
+
+    # 未失効の場合のみ失効させる（同じトークンで同時にリフレッシュしても成功するのは1回だけ）
+    rotated = (
+        db.query(RefreshToken)
+        .filter(RefreshToken.id == stored.id, RefreshToken.revoked_at.is_(None))
+        .update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    )
+    if not rotated:
+        # 失効済みトークンの再利用は漏洩の可能性があるため、ファミリー全体を失効させる
+        _revoke_token_family(db, stored.family_id)
+        db.commit()
+        print(f"[WARNING] Refresh token reuse detected for user_id: {stored.user_id}")
+        raise invalid_token_exception
 
-    return {"access_token": access_token, "token_type": "bearer"}
+    user = db.get(User, stored.user_id)
+    if stored.expires_at <= datetime.utcnow() or user is None or not user.is_active:
+        db.commit()
+        raise invalid_token_exception
+
+    refresh_token = _issue_refresh_token(db, user.id, family_id=stored.family_id)
+    db.commit()
+
+    return {"access_token": _create_user_access_token(user), "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/logout")
+def logout_user(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """ログアウト（リフレッシュトークンのファミリーを失効させる）"""
+    stored = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(request.refresh_token)).first()
+    if stored is not None:
+        _revoke_token_family(db, stored.family_id)
+        db.commit()
+    return {"message": "ログアウトしました"}
+
+
+@router.post("/logout-all")
+def logout_all_sessions(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """すべてのセッションからログアウト（発行済みのアクセストークンとリフレッシュトークンを失効させる）"""
+    revoke_user_tokens(db, current_user)
+    db.commit()
+    return {"message": "すべてのセッションからログアウトしました"}
 
 
 @router.get("/me", response_model=UserSchema)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(current_user: User = Depends(get_current_read_user)):
     """現在のユーザー情報取得"""
     return current_user
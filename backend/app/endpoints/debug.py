@@ -0,0 +1,59 @@
+"""
+本番環境での調査用エンドポイント（管理者のみ、PROFILER_ENABLED=True の場合のみ登録）
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.core import profiler
+from app.core.config import settings
+from app.core.dependencies import get_current_admin_user
+from app.models.user import User
+
+router = APIRouter()
+
+
+@router.get("/debug/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(5, gt=0),
+    interval_ms: Optional[int] = Query(None, ge=1, le=1000),
+    include_idle: bool = False,
+    current_user: User = Depends(get_current_admin_user),
+):
+    """
+    指定した秒数だけワーカープロセス全体をサンプリングし、collapsed stack形式で返す
+
+    flamegraph.pl や speedscope でフレームグラフとして表示できる。
+    計測中はこのリクエスト自身はイベントループ上で待機するだけなので、計測結果を歪めない。
+    """
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be <= {settings.PROFILER_MAX_SECONDS}")
+    if not profiler.try_acquire():
+        raise HTTPException(status_code=409, detail="Another profile is already running")
+
+    interval = (interval_ms or settings.PROFILER_INTERVAL_MS) / 1000
+    try:
+        with profiler.SamplingProfiler(interval, include_idle=include_idle) as sampler:
+            await asyncio.sleep(seconds)
+    finally:
+        profiler.release()
+
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={
+            "X-Profile-Samples": str(sampler.sample_count),
+            "Content-Disposition": 'attachment; filename="profile.folded"',
+        },
+    )
+
+
+@router.get("/debug/profile/requests/{profile_id}", response_class=PlainTextResponse)
+def get_request_profile(profile_id: str, current_user: User = Depends(get_current_admin_user)):
+    """X-Profileヘッダーで取得したリクエスト単位のプロファイル結果を返す"""
+    content = profiler.load_profile(profile_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(content)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.dependencies import get_current_active_user, is_admin_email
+from app.models.job import Job
+from app.models.user import User
+from app.schemas.job import JobResponse
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+    """
+    バックグラウンドジョブの状態を取得するエンドポイント
+
+    ジョブを登録したユーザー（または管理者）のみ参照できる
+    """
+    job = db.get(Job, job_id)
+    if job is None or (job.created_by != current_user.id and not is_admin_email(current_user.email)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,80 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.cache import invalidate_todos
+from app.core.database import get_db
+from app.core.dependencies import get_current_active_user
+from app.models.todo import NOT_DELETED
+from app.models.todo import Todo as TodoModel
+from app.models.todo_list import TodoList
+from app.models.user import User
+from app.schemas.todo import TodoListCreate, TodoListResponse
+
+router = APIRouter()
+
+
+def _get_own_list(db: Session, list_id: int, user: User) -> TodoList:
+    todo_list = db.get(TodoList, list_id)
+    if todo_list is None or todo_list.user_id != user.id:
+        raise HTTPException(status_code=404, detail="List not found")
+    return todo_list
+
+
+@router.get("/lists", response_model=List[TodoListResponse])
+def get_lists(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+    """
+    ログインユーザーのリストの一覧を取得するエンドポイント
+    """
+    return db.query(TodoList).filter(TodoList.user_id == current_user.id).order_by(TodoList.id).all()
+
+
+@router.post("/lists", response_model=TodoListResponse)
+def create_list(
+    todo_list: TodoListCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+):
+    """
+    新しいリストを作成するエンドポイント
+    """
+    db_list = TodoList(user_id=current_user.id, name=todo_list.name)
+    db.add(db_list)
+    db.commit()
+    db.refresh(db_list)
+    return db_list
+
+
+@router.put("/lists/{list_id}", response_model=TodoListResponse)
+def update_list(
+    list_id: int,
+    todo_list: TodoListCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    リストの名前を変更するエンドポイント
+    """
+    db_list = _get_own_list(db, list_id, current_user)
+    db_list.name = todo_list.name
+    db.commit()
+    db.refresh(db_list)
+    return db_list
+
+
+@router.delete("/lists/{list_id}", response_model=TodoListResponse)
+def delete_list(list_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+    """
+    リストを削除するエンドポイント
+
+    ToDoが残っているリストは削除できない（409）。論理削除したToDoは既定のリストに移す（復元した場合は既定のリストに戻る）
+    """
+    db_list = _get_own_list(db, list_id, current_user)
+    if db.query(TodoModel.id).filter(TodoModel.list_id == list_id, NOT_DELETED).first() is not None:
+        raise HTTPException(status_code=409, detail="List is not empty")
+    db.query(TodoModel).filter(TodoModel.list_id == list_id).update(
+        {TodoModel.list_id: None}, synchronize_session=False
+    )
+    db.delete(db_list)
+    db.commit()
+    invalidate_todos()
+    return db_list
@@ -0,0 +1,19 @@
+from typing import List
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.core.database import get_read_db
+from app.core.dependencies import TokenClaims, get_trusted_claims
+from app.schemas.todo import TagCount
+from app.services import tags as tag_service
+
+router = APIRouter()
+
+
+@router.get("/tags", response_model=List[TagCount])
+def get_tags(db: Session = Depends(get_read_db), claims: TokenClaims = Depends(get_trusted_claims)):
+    """
+    タグの一覧を、タグごとのToDoの件数とともに返すエンドポイント（件数の多い順）
+    """
+    return tag_service.tag_counts(db)
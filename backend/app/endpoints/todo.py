@@ -1,18 +1,39 @@
-from typing import Optional
-
-from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple, Union
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
-
-from app.core.database import get_db
-from app.core.dependencies import get_current_active_user
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.core.cache import TODOS_NAMESPACE, get_cache, invalidate_todos
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.dependencies import TokenClaims, get_current_active_user, get_trusted_claims
+from app.core.idempotency import IdempotentRoute
+from app.core.jobs import enqueue
+from app.models.todo import DUE_INDEX_CONDITION, NOT_DELETED
 from app.models.todo import Todo as TodoModel
-from app.models.todo import TodoResponse
+from app.models.todo import TodoArchive, TodoResponse
+from app.models.todo_list import TodoList
 from app.models.user import User
+from app.schemas.job import JobAccepted
+from app.schemas.todo import TodoPatch, TodoStatsResponse
+from app.services import stats as stats_service
+from app.services import subtasks as subtask_service
+from app.services import tags as tag_service
+from app.services import todos as todo_service
+from app.services.archive import ARCHIVED_COLUMNS
+from app.services.todos import BULK_ACTIONS
 
-from datetime import datetime
-
-router = APIRouter()
+# 書き込みは Idempotency-Key ヘッダーを指定すると、同じキーの再送に最初のレスポンスを返す
+router = APIRouter(route_class=IdempotentRoute)
 
 
 class TodoCreate(BaseModel):
@@ -22,56 +43,203 @@ class TodoCreate(BaseModel):
     position: Optional[int] = None
     priority: Optional[int] = 1  # デフォルト優先度を中（1）に設定
     due_date: Optional[datetime] = None  # 期限日
+    tags: Optional[List[str]] = None  # タグ名（更新時に指定した場合は置き換える）
+    list_id: Optional[int] = None  # リスト（未指定の場合は既定のリスト、サブタスクは親のリスト）
+    parent_id: Optional[int] = None  # 親のToDo（サブタスクとして作成する場合）
+    version: Optional[int] = None  # 更新時: クライアントが保持しているバージョン（If-Match ヘッダーでも指定できる）
 
 
-@router.get("/todos", response_model=dict)
-def get_todos(
-    page: int = Query(1, ge=1),
-    limit: int = Query(5, ge=1),
-    search: Optional[str] = None,
-    status: Optional[str] = None,
-    priority: Optional[int] = None,  # Noneの場合はフィルタリングしない
-    sort_by: Optional[str] = Query("none", pattern="^(none|asc|desc)$"),  # ソート対象のカラム
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
-):
+def _todo_list_cache_key(user_id: int, **params) -> str:
+    """ToDo一覧のキャッシュキー（ユーザー・フィルタ・ソート・ページごと）"""
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f"user:{user_id}:{digest}"
+
+
+def _check_list_owner(db: Session, list_id: Optional[int], user_id: int) -> None:
+    """リストが存在し、ユーザーが所有していることを確認する（既定のリストは常に可）"""
+    if list_id is None:
+        return
+    todo_list = db.get(TodoList, list_id)
+    if todo_list is None or todo_list.user_id != user_id:
+        raise HTTPException(status_code=404, detail="List not found")
+
+
+def _validate_parent(db: Session, todo_id: Optional[int], parent_id: int):
+    try:
+        return subtask_service.validate_parent(db, todo_id, parent_id)
+    except subtask_service.InvalidParentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _with_children(row, children_by_parent: dict, tags_by_todo: dict) -> TodoResponse:
+    """行とその子孫をサブタスクを埋め込んだレスポンスに変換する（取得済みの行から組み立て、クエリは発行しない）"""
+    children = [_with_children(child, children_by_parent, tags_by_todo) for child in children_by_parent.get(row.id, [])]
+    return TodoResponse.model_validate(dict(row._mapping, tags=tags_by_todo.get(row.id, []), children=children))
+
+
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _expected_version(if_match: Optional[str], version: Optional[int]) -> Optional[int]:
+    """If-Match ヘッダー（"3" / W/"3"。* は任意のバージョン）または version から、更新を許可するバージョンを返す"""
+    if if_match is not None:
+        if if_match.strip() == "*":
+            return None
+        try:
+            return int(if_match.strip().removeprefix("W/").strip('"'))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid If-Match header")
+    return version
+
+
+def _version_conflict(current) -> HTTPException:
+    """バージョンの不一致（409）。クライアントが再取得せずに済むよう、現在の内容を返す"""
+    return HTTPException(
+        status_code=409, detail={"message": "Todo has been modified", "current": jsonable_encoder(current)}
+    )
+
+
+def _get_or_create_tags(db: Session, names: List[str]):
+    try:
+        return tag_service.get_or_create_tags(db, names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _todo_list_source(status: Optional[str], include_archived: bool):
     """
-    ページネーションとフィルタリング対応の ToDo リスト取得エンドポイント
+    一覧の取得元（archived 列付き）
+
+    通常は todos（論理削除されたToDoを除く）のみを参照する。status=archived の場合は todos_archive のみ、
+    include_archived の場合は両方を UNION ALL で参照する。
     """
-    query = db.query(TodoModel)
 
-    # フィルタリング処理
-    # 検索フィルタリング
+    def columns(table, archived: bool):
+        return select(*[table.c[name] for name in ARCHIVED_COLUMNS], literal(archived).label("archived"))
+
+    active = columns(TodoModel.__table__, False).where(NOT_DELETED)
+    if status == "archived":
+        return columns(TodoArchive.__table__, True).subquery()
+    if include_archived:
+        return union_all(active, columns(TodoArchive.__table__, True)).subquery()
+    return active.subquery()
+
+
+def _structure_filters(source, list_id: Optional[int], include_children: bool) -> list:
+    """リスト・階層による一覧の絞り込み条件"""
+    conditions = []
+    # サブタスクを埋め込む場合は最上位のToDoのみを一覧にする
+    if include_children:
+        conditions.append(source.c.parent_id.is_(None))
+    # リストでの絞り込み（(list_id, position) インデックスの範囲）
+    if list_id is not None:
+        conditions.append(source.c.list_id == list_id)
+    return conditions
+
+
+def _field_filters(source, search: Optional[str], status: Optional[str], priority: Optional[int]) -> list:
+    """タイトルの検索・完了状態・優先度による一覧の絞り込み条件"""
+    conditions = []
     if search:
-        query = query.filter(TodoModel.title.ilike(f"%{search}%"))
-    # ステータスフィルタリング
+        conditions.append(source.c.title.ilike(f"%{search}%"))
     if status == "completed":
-        query = query.filter(TodoModel.completed.is_(True))
+        conditions.append(source.c.completed.is_(True))
     elif status == "incomplete":
-        query = query.filter(TodoModel.completed.is_(False))
-    # 優先度フィルタリング
+        conditions.append(source.c.completed.is_(False))
     if priority is not None:
-        query = query.filter(TodoModel.priority == priority)
+        conditions.append(source.c.priority == priority)
+    return conditions
+
+
+def _due_filters(source, due_before: Optional[datetime], due_after: Optional[datetime], overdue: bool) -> list:
+    """期限日による一覧の絞り込み条件"""
+    conditions = []
+    if due_before is not None:
+        conditions.append(source.c.due_date < due_before)
+    if due_after is not None:
+        conditions.append(source.c.due_date >= due_after)
+    if overdue:
+        conditions += [source.c.completed.is_(False), source.c.due_date < datetime.utcnow()]
+    return conditions
+
+
+def _tag_filters(db: Session, source, tags: Optional[str], tag_mode: str) -> list:
+    """タグによる一覧の絞り込み条件（カンマ区切り、tag_mode=all はすべてのタグ、any はいずれかのタグ）"""
+    tag_names = tag_service.normalize_tag_names(tags.split(",")) if tags else []
+    if not tag_names:
+        return []
+    return [tag_service.tag_filter(db, source.c.id, tag_names, tag_mode)]
+
+
+def _load_todo_page(
+    db: Session,
+    page: int,
+    limit: int,
+    search: Optional[str],
+    status: Optional[str],
+    priority: Optional[int],
+    sort_by: Optional[str],
+    include_archived: bool = False,
+    due_before: Optional[datetime] = None,
+    due_after: Optional[datetime] = None,
+    overdue: bool = False,
+    tags: Optional[str] = None,
+    tag_mode: str = "all",
+    list_id: Optional[int] = None,
+    include_children: bool = False,
+) -> dict:
+    source = _todo_list_source(status, include_archived)
+    query = select(source)
+
+    # フィルタリング処理
+    query = query.where(
+        *_structure_filters(source, list_id, include_children),
+        *_field_filters(source, search, status, priority),
+        *_due_filters(source, due_before, due_after, overdue),
+        *_tag_filters(db, source, tags, tag_mode),
+    )
 
     # 総アイテム数を取得
-    total = query.count()
+    total = db.execute(select(func.count()).select_from(query.subquery())).scalar_one()
 
     # sort_by に基づくソート処理
     if sort_by == "asc":
-        query = query.order_by(TodoModel.priority.asc(), TodoModel.position, TodoModel.id)
+        query = query.order_by(source.c.priority.asc(), source.c.position, source.c.id)
     elif sort_by == "desc":
-        query = query.order_by(TodoModel.priority.desc(), TodoModel.position, TodoModel.id)
+        query = query.order_by(source.c.priority.desc(), source.c.position, source.c.id)
+    elif sort_by == "due_date":
+        # 期限日の近い順（期限日のないToDoは末尾）
+        query = query.order_by(source.c.due_date.is_(None), source.c.due_date, source.c.position, source.c.id)
     else:  # position ソート
-        query = query.order_by(TodoModel.position, TodoModel.id)
+        query = query.order_by(source.c.position, source.c.id)
     # ページネーション処理
-    todos = query.offset((page - 1) * limit).limit(limit).all()
+    rows = db.execute(query.offset((page - 1) * limit).limit(limit)).all()
 
     # 総ページ数を計算
     total_pages = (total + limit - 1) // limit
 
+    # サブタスクを埋め込む場合は、ページ内のToDoの子孫を再帰CTEの1回のクエリでまとめて取得
+    active_ids = [row.id for row in rows if not row.archived]
+    children_by_parent = subtask_service.load_subtrees(db, active_ids) if include_children else {}
+    descendant_ids = [child.id for children in children_by_parent.values() for child in children]
+
+    # ページ内のToDo（と子孫）のタグをまとめて取得（アーカイブ済みのToDoはタグを持たない）
+    tags_by_todo = tag_service.tag_names_by_todo(db, active_ids + descendant_ids)
+
     # Pydantic モデルに変換して返す
+    if include_children:
+        data = [
+            _with_children(row, {} if row.archived else children_by_parent, {} if row.archived else tags_by_todo)
+            for row in rows
+        ]
+    else:
+        data = [
+            TodoResponse.model_validate(dict(row._mapping, tags=[] if row.archived else tags_by_todo.get(row.id, [])))
+            for row in rows
+        ]
     return {
-        "data": [TodoResponse.from_orm(todo) for todo in todos],
+        "data": data,
         "total": total,
         "page": page,
         "limit": limit,
@@ -79,30 +247,161 @@ def get_todos(
     }
 
 
+@router.get("/todos", response_model=dict)
+def get_todos(
+    page: int = Query(1, ge=1),
+    limit: int = Query(5, ge=1),
+    search: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[int] = None,  # Noneの場合はフィルタリングしない
+    sort_by: Optional[str] = Query("none", pattern="^(none|asc|desc|due_date)$"),  # ソート対象のカラム
+    include_archived: bool = False,  # アーカイブ済みのToDoも含める
+    due_before: Optional[datetime] = None,  # 期限日がこの日時より前
+    due_after: Optional[datetime] = None,  # 期限日がこの日時以降
+    overdue: bool = False,  # 期限切れの未完了のToDoのみ
+    tags: Optional[str] = None,  # タグ名（カンマ区切り）
+    tag_mode: str = Query("all", pattern="^(all|any)$"),  # all: すべてのタグ（AND）、any: いずれかのタグ（OR）
+    list_id: Optional[int] = None,  # リスト（未指定の場合はすべてのリスト）
+    include_children: bool = False,  # 最上位のToDoのみを返し、サブタスクを children に埋め込む
+    db: Session = Depends(get_read_db),
+    claims: TokenClaims = Depends(get_trusted_claims),
+):
+    """
+    ページネーションとフィルタリング対応の ToDo リスト取得エンドポイント
+
+    シリアライズ済みのページをキャッシュし、キャッシュヒット時はDBにアクセスしない。
+    レプリカから読み取る場合はキャッシュしない（遅延したレプリカの書き込み前の内容を、書き込み後のバージョンの
+    エントリとして保存し、全ユーザーに返してしまうため）
+    """
+    params = dict(
+        page=page,
+        limit=limit,
+        search=search,
+        status=status,
+        priority=priority,
+        sort_by=sort_by,
+        include_archived=include_archived,
+        due_before=due_before,
+        due_after=due_after,
+        overdue=overdue,
+        tags=tags,
+        tag_mode=tag_mode,
+        list_id=list_id,
+        include_children=include_children,
+    )
+    if not settings.CACHE_ENABLED or db.info.get("read_only"):
+        _check_list_owner(db, list_id, claims.user_id)
+        return _load_todo_page(db, **params)
+
+    def load() -> bytes:
+        # キャッシュキーはユーザーごとのため、所有の確認はキャッシュミス時のみ行う
+        _check_list_owner(db, list_id, claims.user_id)
+        return JSONResponse(jsonable_encoder(_load_todo_page(db, **params))).body
+
+    body = get_cache().get_or_load(TODOS_NAMESPACE, _todo_list_cache_key(claims.user_id, **params), load)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/todos/upcoming", response_model=List[TodoResponse])
+def get_upcoming_todos(
+    days: int = Query(7, ge=1, le=365),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+    claims: TokenClaims = Depends(get_trusted_claims),
+):
+    """
+    期限日が今から days 日以内の未完了のToDoを、期限日の近い順に返すエンドポイント
+
+    期限日の部分インデックスの範囲検索のみで取得する（テーブルの件数によらず、対象件数分の読み取りで済む）
+    """
+    now = datetime.utcnow()
+    return (
+        db.query(TodoModel)
+        .filter(*DUE_INDEX_CONDITION, TodoModel.due_date >= now, TodoModel.due_date < now + timedelta(days=days))
+        .order_by(TodoModel.due_date, TodoModel.id)
+        .limit(limit)
+        .all()
+    )
+
+
+@router.get("/todos/stats", response_model=TodoStatsResponse)
+def get_todo_stats(db: Session = Depends(get_read_db), claims: TokenClaims = Depends(get_trusted_claims)):
+    """
+    ToDoの件数の集計を返すエンドポイント（全件・完了・未完了・期限切れ・優先度ごと）
+
+    件数は更新時に集計済みの1行から読み取る（一覧のページを数える必要はない）
+    """
+    return stats_service.get_stats(db)
+
+
+@router.get("/todos/{id}/subtree", response_model=TodoResponse)
+def get_todo_subtree(id: int, db: Session = Depends(get_read_db), claims: TokenClaims = Depends(get_trusted_claims)):
+    """
+    ToDoとそのすべてのサブタスクを、children に埋め込んで返すエンドポイント
+
+    部分木は再帰CTEの1回のクエリで取得する（階層ごと・ノードごとのクエリは発行しない）
+    """
+    rows_by_parent = subtask_service.load_subtrees(db, [id], include_roots=True)
+    root = next((row for rows in rows_by_parent.values() for row in rows if row.id == id), None)
+    if root is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    tags_by_todo = tag_service.tag_names_by_todo(db, [row.id for rows in rows_by_parent.values() for row in rows])
+    return _with_children(root, rows_by_parent, tags_by_todo)
+
+
 @router.post("/todos", response_model=TodoResponse)
-def create_todo(todo: TodoCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def create_todo(
+    todo: TodoCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
     """
     新しい ToDo を作成するエンドポイント
     """
+    db_todo = _add_todo(db, todo, current_user)
+    db.commit()
+    invalidate_todos()
+    db.refresh(db_todo)
+    response.headers["ETag"] = _etag(db_todo.version)
+    return TodoResponse.from_orm(db_todo)  # Pydantic モデルに変換して返す
+
+
+def _add_todo(db: Session, todo: TodoCreate, current_user: User) -> TodoModel:
+    """ToDoを追加して flush する（コミットは呼び出し側で行う）"""
     todo_data = todo.dict()
-    # positionが指定されていない場合、最大値+1を設定
+    todo_data.pop("version")
+    # サブタスクは、リストが指定されていない場合は親のリストに追加する
+    if todo_data["parent_id"] is not None:
+        parent = _validate_parent(db, None, todo_data["parent_id"])
+        if "list_id" not in todo.model_fields_set:
+            todo_data["list_id"] = parent.list_id
+    _check_list_owner(db, todo_data["list_id"], current_user.id)
+    # positionが指定されていない場合、リスト内の最大値+1を設定
     if todo_data["position"] is None:
-        max_position = db.query(TodoModel).order_by(TodoModel.position.desc()).first()
-        todo_data["position"] = (max_position.position + 1) if max_position else 0
+        todo_data["position"] = todo_service.next_position(db, todo_data["list_id"])
 
     # 優先度が指定されていない場合は中（1）に設定
     if todo_data["priority"] is None:
         todo_data["priority"] = 1
 
+    tag_names = todo_data.pop("tags") or []
     db_todo = TodoModel(**todo_data)
+    db_todo.tags = _get_or_create_tags(db, tag_names)
     db.add(db_todo)
-    db.commit()
-    db.refresh(db_todo)
-    return TodoResponse.from_orm(db_todo)  # Pydantic モデルに変換して返す
+    db.flush()
+    if db_todo.parent_id is not None:
+        # 未完了のサブタスクの追加で、完了済みの親を未完了に戻す
+        subtask_service.roll_up_completion(db, [db_todo.parent_id])
+    return db_todo
 
 
 class TodoReorderRequest(BaseModel):
     todo_ids: list[int]
+    list_id: Optional[int] = None  # 並び替えるリスト（未指定の場合は既定のリスト）
+    versions: Optional[Dict[int, int]] = (
+        None  # ToDoのID → クライアントが保持しているバージョン（指定した場合は確認する）
+    )
 
 
 class BulkUpdateRequest(BaseModel):
@@ -110,12 +409,26 @@ class BulkUpdateRequest(BaseModel):
     action: str  # "complete", "incomplete", or "delete"
 
 
+def _enqueue_todo_job(db: Session, response: Response, job_type: str, payload: dict, user: User) -> JobAccepted:
+    """ToDoの一括処理をジョブとして登録し、202 Accepted を返す"""
+    job = enqueue(db, job_type, payload, created_by=user.id)
+    db.commit()
+    response.status_code = 202
+    return JobAccepted(job_id=job.id, status=job.status, status_url=f"/api/jobs/{job.id}")
+
+
 @router.put("/todos/bulk")
 def bulk_update_todos(
-    request: BulkUpdateRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+    request: BulkUpdateRequest,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
 ):
     """
     ToDo の一括操作エンドポイント
+
+    対象が BULK_ASYNC_THRESHOLD 件を超える場合はバックグラウンドジョブとして登録し、
+    202 とジョブIDを返す（結果は GET /api/jobs/{id} で確認する）
     """
     print(f"Received request: {request}")  # デバッグ用ログ
     print(f"Received todo_ids: {request.todo_ids}")  # デバッグ用ログ
@@ -125,110 +438,410 @@ def bulk_update_todos(
     if not request.todo_ids:
         raise HTTPException(status_code=400, detail="No todo IDs provided")
 
-    if request.action not in ["complete", "incomplete", "delete"]:
+    if request.action not in BULK_ACTIONS:
         print(f"Invalid action received: '{request.action}'")  # デバッグ用ログ
         raise HTTPException(
             status_code=400, detail=f"Invalid action: '{request.action}'. Must be one of: complete, incomplete, delete"
         )
 
-    # 対象のTodoを取得
-    todos = db.query(TodoModel).filter(TodoModel.id.in_(request.todo_ids)).all()
+    if settings.JOBS_ENABLED and len(request.todo_ids) > settings.BULK_ASYNC_THRESHOLD:
+        payload = {"todo_ids": request.todo_ids, "action": request.action}
+        return _enqueue_todo_job(db, response, "todos.bulk_update", payload, current_user)
 
-    if not todos:
+    try:
+        count = todo_service.bulk_update(db, request.todo_ids, request.action)
+    except todo_service.TodosNotFoundError:
         raise HTTPException(status_code=404, detail="No todos found")
-
-    updated_todos = []
+    db.commit()
+    invalidate_todos()
 
     if request.action == "delete":
-        # 削除の場合
-        for todo in todos:
-            db.delete(todo)
-        db.commit()
-        return {"message": f"Deleted {len(todos)} todos successfully"}
-    else:
-        # 完了状態の更新の場合
-        completed_status = request.action == "complete"
-        for todo in todos:
-            todo.completed = completed_status
-            updated_todos.append(TodoResponse.from_orm(todo))
+        return {"message": f"Deleted {count} todos successfully"}
 
-        db.commit()
-        return {"message": f"Updated {len(todos)} todos successfully", "updated_todos": updated_todos}
+    todos = db.query(TodoModel).filter(TodoModel.id.in_(request.todo_ids), NOT_DELETED).order_by(TodoModel.id).all()
+    updated_todos = [TodoResponse.from_orm(todo) for todo in todos]
+    return {"message": f"Updated {count} todos successfully", "updated_todos": updated_todos}
 
 
 @router.put("/todos/reorder")
 def reorder_todos(
-    request: TodoReorderRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+    request: TodoReorderRequest,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
 ):
     """
     ToDo の順序を更新するエンドポイント（最適化版）
+
+    対象が BULK_ASYNC_THRESHOLD 件を超える場合はバックグラウンドジョブとして登録し、202 を返す
     """
     print(f"Received todo_ids: {request.todo_ids}")  # デバッグ用ログ
 
-    # 1. 並び替え対象のTodoを既存のposition順で取得
-    target_todos = (
-        db.query(TodoModel).filter(TodoModel.id.in_(request.todo_ids)).order_by(TodoModel.position, TodoModel.id).all()
-    )
-
-    # 2. 存在チェック
-    if len(target_todos) != len(request.todo_ids):
+    _check_list_owner(db, request.list_id, current_user.id)
+    if settings.JOBS_ENABLED and len(request.todo_ids) > settings.BULK_ASYNC_THRESHOLD:
+        # リストの所有者はジョブの実行時にも確認する（登録後にリストが削除・移譲された場合）
+        payload = {
+            "todo_ids": request.todo_ids,
+            "list_id": request.list_id,
+            "versions": request.versions,
+            "user_id": current_user.id,
+        }
+        return _enqueue_todo_job(db, response, "todos.reorder", payload, current_user)
+
+    try:
+        versions = todo_service.reorder(db, request.todo_ids, request.list_id, request.versions)
+    except todo_service.TodosNotFoundError:
         raise HTTPException(status_code=400, detail="Some todos not found")
+    except todo_service.TodoVersionConflictError as e:
+        db.rollback()
+        current = db.query(TodoModel).filter(TodoModel.id.in_(e.todo_ids)).order_by(TodoModel.id).all()
+        raise _version_conflict([TodoResponse.from_orm(todo) for todo in current])
 
-    # 3. 既存のposition順序を保存
-    original_positions = [todo.position for todo in target_todos]
-    print(f"Target todos (position order): {[(todo.id, todo.position) for todo in target_todos]}")  # デバッグ用ログ
-    print(f"New order request: {request.todo_ids}")  # デバッグ用ログ
+    db.commit()
+    invalidate_todos()
+    # 更新後のバージョンを返す（クライアントは一覧を再取得せずに次の更新に使える）
+    return {"message": "Todos reordered successfully", "versions": versions}
 
-    # 4. 新しい順序の各IDに対して、既存のposition順の値を割り当て
-    position_assignments = []
-    for i, todo_id in enumerate(request.todo_ids):
-        new_position = original_positions[i]  # 同じ添字のpositionを使用
-        position_assignments.append((todo_id, new_position))
 
-    print(f"Position assignments: {position_assignments}")  # デバッグ用ログ
+def _check_version(db_todo: TodoModel, if_match: Optional[str], version: Optional[int]) -> None:
+    """If-Match ヘッダー（または version）を指定した場合に、読み込んだToDoのバージョンと一致することを確認する"""
+    expected_version = _expected_version(if_match, version)
+    if expected_version is not None and db_todo.version != expected_version:
+        raise _version_conflict(TodoResponse.from_orm(db_todo))
 
-    # 5. データベースを更新（対象のTodoのみ）
-    for todo_id, new_position in position_assignments:
-        db_todo = db.query(TodoModel).filter(TodoModel.id == todo_id).first()
-        if db_todo:
-            old_position = db_todo.position
-            db_todo.position = new_position
-            print(f"Todo ID {todo_id}: {old_position} -> {new_position}")  # デバッグ用ログ
 
-    db.commit()
-    return {"message": "Todos reordered successfully"}
+def _prepare_move(db: Session, db_todo: TodoModel, todo_data: dict, current_user: User) -> None:
+    """親・リストの変更を検証し、別のリストへの移動では position が未指定なら移動先の末尾を設定する"""
+    # 親の変更（自身やその子孫を親にすることはできない）
+    if todo_data.get("parent_id") is not None and todo_data["parent_id"] != db_todo.parent_id:
+        _validate_parent(db, db_todo.id, todo_data["parent_id"])
+    # 別のリストへの移動（position が未指定の場合は移動先の末尾に追加）
+    if todo_data.get("list_id") is not None and todo_data["list_id"] != db_todo.list_id:
+        _check_list_owner(db, todo_data["list_id"], current_user.id)
+        if todo_data.get("position") is None:
+            todo_data["position"] = todo_service.next_position(db, todo_data["list_id"])
 
 
 @router.put("/todos/{id}", response_model=TodoResponse)
 def update_todo(
-    id: int, todo: TodoCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+    id: int,
+    todo: TodoCreate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
 ):
     """
     ToDo を更新するエンドポイント
+
+    If-Match ヘッダー（または version）を指定した場合は、バージョンが一致しなければ
+    409 と現在の内容を返す（楽観的排他制御）。読み込み後に他のリクエストが更新した場合も
+    UPDATE の WHERE version = ? で検出して 409 を返す
     """
-    db_todo = db.query(TodoModel).filter(TodoModel.id == id).first()
+    db_todo = db.query(TodoModel).filter(TodoModel.id == id, NOT_DELETED).first()
     if not db_todo:
         raise HTTPException(status_code=404, detail="Todo not found")
 
     # Noneでない値のみを更新（部分更新をサポート）
-    for key, value in todo.dict(exclude_unset=True).items():
-        if value is not None:
-            setattr(db_todo, key, value)
-
-    db.commit()
+    todo_data = todo.dict(exclude_unset=True)
+    _check_version(db_todo, if_match, todo_data.pop("version", None))
+    tag_names = todo_data.pop("tags", None)
+    old_parent_id = db_todo.parent_id
+    _prepare_move(db, db_todo, todo_data, current_user)
+    try:
+        for key, value in todo_data.items():
+            if value is not None:
+                setattr(db_todo, key, value)
+        if tag_names is not None:
+            db_todo.tags = _get_or_create_tags(db, tag_names)
+        # 完了状態・親の変更を親（と祖先）の完了状態に反映する（親がない場合はクエリを発行しない）
+        roll_up_ids = {old_parent_id, db_todo.parent_id} - {None}
+        if roll_up_ids and ("completed" in todo_data or db_todo.parent_id != old_parent_id):
+            db.flush()
+            subtask_service.roll_up_completion(db, roll_up_ids)
+        db.commit()
+    except StaleDataError:
+        # 読み込み後に他のリクエストが更新・削除した
+        db.rollback()
+        current = db.get(TodoModel, id)
+        if current is None or current.deleted_at is not None:
+            raise HTTPException(status_code=404, detail="Todo not found")
+        raise _version_conflict(TodoResponse.from_orm(current))
+
+    invalidate_todos()
     db.refresh(db_todo)
+    response.headers["ETag"] = _etag(db_todo.version)
     return TodoResponse.from_orm(db_todo)  # Pydantic モデルに変換して返す
 
 
+@router.patch("/todos/{id}", response_model=TodoResponse)
+def patch_todo(
+    id: int,
+    todo: TodoPatch,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    ToDo を部分更新するエンドポイント
+
+    指定したフィールドのうち値が変わるものだけを1回の UPDATE ... RETURNING で更新し、
+    更新後の再読み込みは行わない。値が変わらない場合は書き込まない。
+    If-Match ヘッダー（または version）を指定した場合は、バージョンが一致しなければ 409 を返す
+    """
+    updated, changed = _patch_todo(db, id, todo, if_match, current_user)
+    if changed:
+        db.commit()
+        invalidate_todos()
+    response.headers["ETag"] = _etag(updated.version)
+    return updated
+
+
+def _patch_todo(
+    db: Session, id: int, todo: TodoPatch, if_match: Optional[str], current_user: User
+) -> Tuple[TodoResponse, bool]:
+    """ToDoを部分更新し、(更新後のToDo, 変更があったか) を返す（コミットは呼び出し側で行う）"""
+    changes = todo.model_dump(exclude_unset=True)
+    expected_version = _expected_version(if_match, changes.pop("version", None))
+    tag_names = changes.pop("tags", None)
+    if changes.get("list_id") is not None:
+        _check_list_owner(db, changes["list_id"], current_user.id)
+    if changes.get("parent_id") is not None:
+        _validate_parent(db, id, changes["parent_id"])
+
+    try:
+        values, changed = todo_service.patch(db, id, changes, tag_names, expected_version)
+    except todo_service.TodosNotFoundError:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    except todo_service.TodoVersionConflictError:
+        raise _version_conflict(TodoResponse.from_orm(db.get(TodoModel, id)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TodoResponse.model_validate(values), changed
+
+
 @router.delete("/todos/{id}", response_model=TodoResponse)
 def delete_todo(id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
     """
-    ToDo を削除するエンドポイント
+    ToDo を削除するエンドポイント（サブタスクもまとめて削除する）
+
+    論理削除（1回の UPDATE ... RETURNING と件数の集計の更新）のみを行い、物理削除は保存期間の経過後に
+    ジョブで行う。それまでは POST /api/todos/{id}/restore で元に戻せる
     """
-    db_todo = db.query(TodoModel).filter(TodoModel.id == id).first()
-    if not db_todo:
+    response = _delete_todo(db, id)
+    db.commit()
+    invalidate_todos()
+    return response
+
+
+def _delete_todo(db: Session, id: int) -> TodoResponse:
+    """ToDoとそのサブタスクを論理削除し、削除したToDoを返す（コミットは呼び出し側で行う）"""
+    rows = todo_service.soft_delete(db, [id])
+    root = next((row for row in rows if row.id == id), None)
+    if root is None:
         raise HTTPException(status_code=404, detail="Todo not found")
+    return TodoResponse.model_validate(todo_service.todo_values(root))
 
-    db.delete(db_todo)
+
+@router.post("/todos/{id}/restore", response_model=TodoResponse)
+def restore_todo(
+    id: int, response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+):
+    """
+    削除した ToDo を元に戻すエンドポイント（同時に削除したサブタスクも戻す）
+
+    物理削除された後は 404、親が削除されている場合は 409（親を先に戻す）
+    """
+    try:
+        rows = todo_service.restore(db, id)
+    except todo_service.TodosNotFoundError:
+        raise HTTPException(status_code=404, detail="Deleted todo not found")
+    except subtask_service.InvalidParentError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     db.commit()
-    return TodoResponse.from_orm(db_todo)  # Pydantic モデルに変換して返す
+    invalidate_todos()
+    restored = TodoResponse.model_validate(todo_service.todo_values(rows[0]))
+    response.headers["ETag"] = _etag(restored.version)
+    return restored
+
+
+# --- 複数の操作の一括実行（オフライン中の操作の再送用） ---
+
+# ToDoのID、または同じリクエスト内の作成操作の ref（オフライン中に作成したToDoの仮ID）
+TodoRef = Union[int, str]
+
+
+class BatchCreateOperation(BaseModel):
+    op: Literal["create"]
+    ref: Optional[str] = None  # 後続の操作から id として参照する名前
+    data: TodoCreate
+
+
+class BatchUpdateOperation(BaseModel):
+    op: Literal["update"]
+    id: TodoRef
+    data: TodoPatch  # 部分更新（data.version を指定した場合はバージョンを確認する）
+
+
+class BatchDeleteOperation(BaseModel):
+    op: Literal["delete"]
+    id: TodoRef
+
+
+class BatchReorderOperation(BaseModel):
+    op: Literal["reorder"]
+    todo_ids: List[TodoRef]
+    list_id: Optional[int] = None
+    versions: Optional[Dict[int, int]] = None
+
+
+BatchOperation = Annotated[
+    Union[BatchCreateOperation, BatchUpdateOperation, BatchDeleteOperation, BatchReorderOperation],
+    Field(discriminator="op"),
+]
+
+
+class BatchOpsRequest(BaseModel):
+    operations: List[BatchOperation]
+    # transaction: 全体を1トランザクションで実行（失敗があれば全体をロールバック）
+    # savepoint: 操作ごとにセーブポイントを作り、失敗した操作だけを取り消す
+    mode: Literal["transaction", "savepoint"] = "transaction"
+
+
+class BatchOpResult(BaseModel):
+    index: int
+    op: str
+    status: int  # 操作ごとのHTTPステータス（424: 先行する操作の失敗により実行していない）
+    ref: Optional[str] = None
+    todo: Optional[TodoResponse] = None  # 作成・更新・削除したToDo
+    versions: Optional[Dict[int, int]] = None  # 並び替え後のバージョン
+    detail: Optional[Any] = None  # 失敗した場合の理由
+
+
+class BatchOpsResponse(BaseModel):
+    committed: bool  # 変更がコミットされたか（transaction で失敗した場合は False）
+    results: List[BatchOpResult]
+
+
+def _resolve_ref(refs: Dict[str, int], todo_ref: TodoRef) -> int:
+    if isinstance(todo_ref, int):
+        return todo_ref
+    if todo_ref not in refs:
+        raise HTTPException(status_code=400, detail=f"Unknown ref: '{todo_ref}'")
+    return refs[todo_ref]
+
+
+def _run_batch_operation(
+    db: Session, operation: BatchOperation, refs: Dict[str, int], result: BatchOpResult, current_user: User
+) -> None:
+    """1件の操作を実行し、結果を result に設定する（コミットは行わない）"""
+    if operation.op == "create":
+        db_todo = _add_todo(db, operation.data, current_user)
+        if operation.ref is not None:
+            refs[operation.ref] = db_todo.id
+        result.status, result.todo = 201, TodoResponse.from_orm(db_todo)
+    elif operation.op == "update":
+        result.todo, _ = _patch_todo(db, _resolve_ref(refs, operation.id), operation.data, None, current_user)
+        result.status = 200
+    elif operation.op == "delete":
+        result.status, result.todo = 200, _delete_todo(db, _resolve_ref(refs, operation.id))
+    else:
+        todo_ids = [_resolve_ref(refs, todo_ref) for todo_ref in operation.todo_ids]
+        _check_list_owner(db, operation.list_id, current_user.id)
+        try:
+            result.versions = todo_service.reorder(db, todo_ids, operation.list_id, operation.versions)
+        except todo_service.TodosNotFoundError:
+            raise HTTPException(status_code=400, detail="Some todos not found")
+        except todo_service.TodoVersionConflictError as e:
+            current = db.query(TodoModel).filter(TodoModel.id.in_(e.todo_ids)).order_by(TodoModel.id).all()
+            raise _version_conflict([TodoResponse.from_orm(todo) for todo in current])
+        result.status = 200
+
+
+def _execute_batch_operation(
+    db: Session,
+    mode: str,
+    operation: BatchOperation,
+    refs: Dict[str, int],
+    result: BatchOpResult,
+    current_user: User,
+) -> bool:
+    """
+    1件の操作を mode に応じて実行し、失敗した場合は理由を result に設定する
+
+    savepoint モードでは失敗した操作だけを取り消す。
+    transaction モードで失敗した場合はトランザクション全体をロールバックし、True を返す
+    """
+    try:
+        if mode == "savepoint":
+            with db.begin_nested():
+                _run_batch_operation(db, operation, refs, result, current_user)
+        else:
+            _run_batch_operation(db, operation, refs, result, current_user)
+    except (HTTPException, SQLAlchemyError, LookupError, ValueError, RuntimeError) as e:
+        status_code, detail = _batch_error(e)
+        result.status, result.todo, result.versions, result.detail = status_code, None, None, detail
+        if mode == "transaction":
+            db.rollback()
+            return True
+    return False
+
+
+def _batch_error(error: Exception) -> Tuple[int, Any]:
+    """操作の失敗を操作ごとのステータスと理由に変換する（他の操作の結果を返せるよう、500 にはしない）"""
+    if isinstance(error, HTTPException):
+        return error.status_code, error.detail
+    if isinstance(error, todo_service.TodosNotFoundError):
+        return 404, "Todo not found"
+    if isinstance(error, (StaleDataError, todo_service.TodoVersionConflictError)):
+        return 409, "Todo has been modified"
+    if isinstance(error, IntegrityError):
+        # 存在しない親・リストの参照等の制約違反
+        return 422, "Operation violates a database constraint"
+    if isinstance(error, SQLAlchemyError):
+        return 409, "Operation could not be applied"
+    return 422, str(error)
+
+
+def _mark_rolled_back(results: List[BatchOpResult]) -> None:
+    """ロールバックで取り消された先行の操作も失敗とする（結果のToDoは保存されていない）"""
+    for result in results:
+        if result.status < 300:
+            result.status, result.todo, result.versions = 424, None, None
+            result.detail = "Rolled back because a later operation failed"
+
+
+@router.post("/todos/batch-ops", response_model=BatchOpsResponse)
+def batch_todo_operations(
+    request: BatchOpsRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+):
+    """
+    作成・更新・削除・並び替えの操作を、指定した順に1回のリクエストで実行するエンドポイント
+
+    オフライン中に溜まった操作の再送用。認証・セッション・コミットは全体で1回のみ。
+    操作ごとの結果（ステータスと更新後のToDo）を返す。作成操作の ref は後続の操作の id に使える
+    """
+    if len(request.operations) > settings.BATCH_OPS_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"Too many operations (max {settings.BATCH_OPS_MAX_OPERATIONS})")
+
+    refs: Dict[str, int] = {}
+    results: List[BatchOpResult] = []
+    failed = False
+    for index, operation in enumerate(request.operations):
+        result = BatchOpResult(index=index, op=operation.op, status=424, ref=getattr(operation, "ref", None))
+        results.append(result)
+        if failed:
+            result.detail = "Skipped because an earlier operation failed"
+            continue
+        if _execute_batch_operation(db, request.mode, operation, refs, result, current_user):
+            failed = True
+            _mark_rolled_back(results[:index])
+
+    succeeded = [result for result in results if result.status < 300]
+    if failed or not succeeded:
+        return BatchOpsResponse(committed=False, results=results)
+
+    db.commit()
+    invalidate_todos()
+    return BatchOpsResponse(committed=True, results=results)
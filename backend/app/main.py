@@ -1,23 +1,61 @@
 # filepath: backend/app/main.py
+"""
+アプリケーションのエントリーポイント
+
+create_app() でアプリケーションを構築する（アプリケーションファクトリ）。
+`app.main:app` は初回アクセス時に create_app() で生成されるため、
+このモジュールのインポート自体ではルーターや暗号ライブラリの読み込み、DB接続は発生しない。
+データベースの初期化（create_all）はlifespanで起動時に行う。
+"""
+
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.core.database import init_db
-from app.endpoints.auth import router as auth_router
-from app.endpoints.todo import router as todo_router
 
-app = FastAPI()
 
-# Initialize the database
-init_db()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動・終了時の処理"""
+    # スキーマをAlembicで管理している場合は DB_AUTO_CREATE=False で create_all を省略する
+    if settings.DB_AUTO_CREATE:
+        from app.core.database import init_db
+
+        init_db()
+
+    # バックグラウンドジョブの実行（リクエストを処理するスレッドプールとは別のスレッドで実行する）
+    runner_task = None
+    if settings.JOBS_ENABLED and settings.JOB_RUNNER_ENABLED:
+        import asyncio
+
+        import app.services.job_handlers  # noqa: F401  ジョブの処理を登録
+        from app.core.jobs import create_runner
+
+        runner = create_runner()
+        runner_task = asyncio.create_task(runner.run())
+
+    # 期限日のリマインダー（全ワーカーで起動し、リースを取得した1つのプロセスだけが通知する）
+    reminders_task = None
+    if settings.REMINDERS_ENABLED:
+        import asyncio
+
+        from app.core.reminders import create_scheduler
 
-app.include_router(todo_router, prefix="/api", tags=["todos"])
-app.include_router(auth_router, prefix="/api/auth", tags=["authentication"])
+        scheduler = create_scheduler()
+        reminders_task = asyncio.create_task(scheduler.run())
+
+    yield
+
+    if reminders_task is not None:
+        scheduler.stop()
+        await reminders_task
+    if runner_task is not None:
+        runner.stop()
+        await runner_task
 
 
 # セキュリティヘッダーのミドルウェア
-@app.middleware("http")
 async def add_security_headers(request: Request, call_next):
     response = await call_next(request)
 
@@ -47,7 +85,6 @@ async def add_security_headers(request: Request, call_next):
     return response
 
 
-@app.middleware("http")
 async def log_requests(request: Request, call_next):
     """リクエストとレスポンスのログを記録するミドルウェア"""
     print(f"yeah!Request: {request.method} {request.url}")
@@ -56,42 +93,109 @@ async def log_requests(request: Request, call_next):
     return response
 
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.get_cors_origins(),
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-
-@app.get("/")
 def read_root():
     return {"message": "Hello, FastAPI!"}
 
 
-@app.get("/api/health")
 async def health_check():
     """ヘルスチェックエンドポイント（Railway用）"""
     from datetime import datetime
     from sqlalchemy import text
-    
+
     try:
         # データベース接続確認
         from app.core.database import SessionLocal
+
         db = SessionLocal()
         db.execute(text("SELECT 1"))
         db.close()
-        
+
         return {
             "status": "healthy",
             "timestamp": datetime.utcnow().isoformat(),
             "environment": settings.ENVIRONMENT,
-            "version": "1.0.0"
+            "version": "1.0.0",
         }
     except Exception as e:
-        return {
-            "status": "unhealthy",
-            "error": str(e),
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        return {"status": "unhealthy", "error": str(e), "timestamp": datetime.utcnow().isoformat()}
+
+
+def create_app() -> FastAPI:
+    """アプリケーションを構築する"""
+    from fastapi.middleware.cors import CORSMiddleware
+
+    from app.core.compression import CompressionMiddleware
+    from app.core.query_counter import QueryCounterMiddleware
+    from app.endpoints.auth import router as auth_router
+    from app.endpoints.jobs import router as jobs_router
+    from app.endpoints.lists import router as lists_router
+    from app.endpoints.tags import router as tags_router
+    from app.endpoints.todo import router as todo_router
+
+    app = FastAPI(lifespan=lifespan)
+
+    app.include_router(todo_router, prefix="/api", tags=["todos"])
+    app.include_router(auth_router, prefix="/api/auth", tags=["authentication"])
+    app.include_router(jobs_router, prefix="/api", tags=["jobs"])
+    app.include_router(tags_router, prefix="/api", tags=["tags"])
+    app.include_router(lists_router, prefix="/api", tags=["lists"])
+
+    app.middleware("http")(add_security_headers)
+    app.middleware("http")(log_requests)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.get_cors_origins(),
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # レスポンス圧縮（nginx等のプロキシが圧縮する構成ではCOMPRESSION_ENABLED=Falseにする）
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+            brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+            proxy_header=settings.COMPRESSION_PROXY_HEADER,
+        )
+
+    # リクエストごとのSQLクエリ数の計測（本番環境以外ではServer-Timingヘッダーで返す）
+    if settings.QUERY_COUNTER_ENABLED:
+        app.add_middleware(
+            QueryCounterMiddleware,
+            budget=settings.QUERY_BUDGET_PER_REQUEST,
+            server_timing=not settings.is_production,
+        )
+
+    # サンプリングプロファイラ（管理者のみ、無効時はエンドポイントもミドルウェアも登録しない）
+    if settings.PROFILER_ENABLED:
+        from app.core.dependencies import is_admin_authorization
+        from app.core.profiler import RequestProfilerMiddleware
+        from app.endpoints.debug import router as debug_router
+
+        app.include_router(debug_router, prefix="/api", tags=["debug"])
+        app.add_middleware(
+            RequestProfilerMiddleware,
+            is_admin=is_admin_authorization,
+            interval=settings.PROFILER_INTERVAL_MS / 1000,
+        )
+
+    app.add_api_route("/", read_root, methods=["GET"])
+    app.add_api_route("/api/health", health_check, methods=["GET"])
+
+    return app
+
+
+_app = None
+
+
+def __getattr__(name: str):
+    """`app.main:app` へのアクセス時にアプリケーションを構築する（PEP 562）"""
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, LargeBinary, String
+
+from app.core.database import Base  # database.py から Base をインポート
+
+
+class IdempotencyKey(Base):
+    """
+    冪等キーと保存したレスポンス（IDEMPOTENCY_BACKEND=database の場合の保存先）
+
+    値は app.core.idempotency の StoredResponse をエンコードしたもの。
+    有効期限を過ぎた行は読み取りの対象外とし、定期実行ジョブ（maintenance.purge_idempotency_keys）で削除する。
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(300), primary_key=True)  # "ユーザーID:Idempotency-Key"
+    value = Column(LargeBinary, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
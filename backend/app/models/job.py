@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Index, Integer, String, Text
+
+from app.core.database import Base  # database.py から Base をインポート
+
+# ジョブの状態
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class Job(Base):
+    """
+    バックグラウンドジョブ
+
+    ジョブの状態はDBに保存されるため、プロセスの再起動後も実行待ちのジョブは失われない。
+    実行の取得は status='pending' を条件にした UPDATE で行い、複数のワーカーが同じジョブを
+    重複して実行しないようにする。
+    unique_key は定期実行ジョブの重複登録の防止に使う（同じ時間枠のジョブは1件だけ登録される）。
+    """
+
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    type = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default=JOB_PENDING)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    unique_key = Column(String(200), unique=True, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    # 実行待ちのジョブの取得（status, run_at の順で絞り込む）
+    __table_args__ = (Index("ix_jobs_status_run_at", "status", "run_at"),)
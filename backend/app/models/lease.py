@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, String
+
+from app.core.database import Base  # database.py から Base をインポート
+
+
+class Lease(Base):
+    """
+    リース（複数のワーカー・インスタンスのうち1つのプロセスだけで動かす処理の担当者）
+
+    名前ごとに1行で、担当のプロセスは有効期限内に更新し続ける。
+    更新が途絶えた（プロセスが停止した）場合は、有効期限の経過後に他のプロセスが引き継ぐ。
+    取得・更新は app.core.leases.DatabaseLease で行う。
+    """
+
+    __tablename__ = "leases"
+
+    name = Column(String(100), primary_key=True)
+    holder = Column(String(200), nullable=False)  # "ホスト名:プロセスID:ランダムな値"
+    expires_at = Column(DateTime, nullable=False)
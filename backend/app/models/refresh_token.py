@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from app.core.database import Base  # database.py から Base をインポート
+
+
+class RefreshToken(Base):
+    """
+    リフレッシュトークン
+
+    トークン本体は保存せず、SHA-256ハッシュのみを一意インデックス付きで保存する。
+    ローテーションのたびに同じfamily_idで新しいトークンを発行し、
+    失効済みトークンの再利用を検知した場合はファミリー全体を失効させる。
+    """
+
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    family_id = Column(String(32), index=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Table
+
+from app.core.database import Base  # database.py から Base をインポート
+
+# タグ名の最大長
+TAG_NAME_MAX_LENGTH = 50
+
+# ToDoとタグの対応（転置インデックス）
+# 主キー (todo_id, tag_id) はToDoのタグの取得に、(tag_id, todo_id) のインデックスはタグでの絞り込みに使う。
+# タグでの絞り込みは tag_id ごとのインデックスの範囲検索の積集合（AND）/和集合（OR）になる
+todo_tags = Table(
+    "todo_tags",
+    Base.metadata,
+    Column("todo_id", Integer, ForeignKey("todos.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_todo_tags_tag_id_todo_id", "tag_id", "todo_id"),
+)
+
+
+class Tag(Base):
+    """ToDoのタグ（ラベル）"""
+
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(TAG_NAME_MAX_LENGTH), unique=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,10 +1,13 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, ConfigDict
-from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from pydantic import BaseModel, ConfigDict, field_validator
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, event
+from sqlalchemy.orm import relationship
 
 from app.core.database import Base  # database.py から Base をインポート
+from app.models.tag import Tag, todo_tags
+from app.models.todo_list import TodoList  # noqa: F401  todos.list_id の参照先
 
 
 class Todo(Base):
@@ -14,9 +17,93 @@ class Todo(Base):
     title = Column(String, index=True)
     description = Column(String, nullable=True)
     completed = Column(Boolean, default=False)
-    position = Column(Integer, default=0)  # ドラッグ&ドロップの順序を管理
+    position = Column(Integer, default=0)  # ドラッグ&ドロップの順序を管理（リストごと）
     priority = Column(Integer, default=1)  # 優先度: 0=高, 1=中, 2=低
     due_date = Column(DateTime, nullable=True)  # 期限日（新規追加）
+    list_id = Column(Integer, ForeignKey("todo_lists.id", ondelete="SET NULL"), nullable=True)  # NULLは既定のリスト
+    # 親のToDo（サブタスクの場合）。部分木・祖先は app.services.subtasks の再帰CTEで取得する
+    parent_id = Column(Integer, ForeignKey("todos.id", ondelete="CASCADE"), nullable=True, index=True)
+    completed_at = Column(DateTime, nullable=True, index=True)  # 完了日時（アーカイブ対象の判定に使用）
+    # 楽観的排他制御のバージョン（ORMによるUPDATEは WHERE version = ? 付きで実行され、1ずつ増える）
+    # 一括UPDATE（Core）では呼び出し側で version + 1 を設定する
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # 論理削除の日時（削除は1回のUPDATEで行い、物理削除は todos.purge_deleted ジョブでまとめて行う）
+    deleted_at = Column(DateTime, nullable=True)
+    # 最終更新日時。onupdate はORMの更新に加えて一括UPDATE（Core）にも適用される。
+    # リマインダーは他のプロセスでの変更をこの列で検出する（app.core.reminders）
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # タグ（ToDoの取得時にまとめて読み込む。1件ずつのクエリは発行しない）
+    tags = relationship(Tag, secondary=todo_tags, lazy="selectin", order_by=Tag.name)
+
+    # 期限日による検索（期限切れ・期限が近いToDo）用の部分インデックス。
+    # 対象は期限日のある未完了のToDoのみのため、完了済みのToDoが増えてもインデックスは大きくならない。
+    # 部分インデックスを使うには、クエリの条件に DUE_INDEX_CONDITION を含める必要がある。
+    # 論理削除されたToDoはいずれのインデックスにも含めない（NOT_DELETED を条件に含める）
+    __table_args__ = (
+        # リスト内の順序での一覧・末尾の position の取得用
+        Index(
+            "ix_todos_list_id_position",
+            "list_id",
+            "position",
+            sqlite_where=deleted_at.is_(None),
+            postgresql_where=deleted_at.is_(None),
+        ),
+        Index(
+            "ix_todos_due_date_incomplete",
+            "due_date",
+            sqlite_where=(completed.is_(False)) & (due_date.isnot(None)) & (deleted_at.is_(None)),
+            postgresql_where=(completed.is_(False)) & (due_date.isnot(None)) & (deleted_at.is_(None)),
+        ),
+        # 物理削除の対象の検索用（論理削除されたToDoのみ）
+        Index(
+            "ix_todos_deleted_at",
+            "deleted_at",
+            sqlite_where=deleted_at.isnot(None),
+            postgresql_where=deleted_at.isnot(None),
+        ),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+
+# 論理削除されていないToDoの条件（todos を参照するクエリには常に含める）
+NOT_DELETED = Todo.deleted_at.is_(None)
+
+# 期限日の部分インデックスの条件（クエリ側でも同じ条件を指定する）
+DUE_INDEX_CONDITION = (Todo.completed.is_(False), Todo.due_date.isnot(None), NOT_DELETED)
+
+
+@event.listens_for(Todo.completed, "set", active_history=True)
+def _set_completed_at(target, value, oldvalue, initiator):
+    """完了状態の変更に合わせて完了日時を記録する（一括UPDATEでは呼び出し側で設定する）"""
+    if value and oldvalue is not True:
+        target.completed_at = datetime.utcnow()
+    elif not value:
+        target.completed_at = None
+
+
+class TodoArchive(Base):
+    """
+    アーカイブ済みのToDo
+
+    完了から一定期間が経過したToDoを todos から移動して保存する。
+    todos を実行中の作業だけの小さなテーブルに保ち、一覧・件数・並び替えのクエリを軽くする。
+    IDは移動前の値をそのまま使う。
+    """
+
+    __tablename__ = "todos_archive"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String)
+    description = Column(String, nullable=True)
+    completed = Column(Boolean, default=True)
+    position = Column(Integer, default=0)
+    priority = Column(Integer, default=1)
+    due_date = Column(DateTime, nullable=True)
+    list_id = Column(Integer, nullable=True)
+    parent_id = Column(Integer, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    archived_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 
 class TodoResponse(BaseModel):
@@ -29,3 +116,18 @@ class TodoResponse(BaseModel):
     position: int
     priority: int
     due_date: Optional[datetime]
+    list_id: Optional[int] = None
+    parent_id: Optional[int] = None
+    completed_at: Optional[datetime] = None
+    version: int = 1  # 更新時に If-Match ヘッダー（または version）で指定する
+    deleted_at: Optional[datetime] = None  # 論理削除の日時（削除・復元のレスポンスのみ）
+    archived: bool = False
+    tags: List[str] = []
+    # サブタスク（埋め込みを指定した場合のみ。指定しない場合はNone）
+    children: Optional[List["TodoResponse"]] = None
+
+    @field_validator("tags", mode="before")
+    @classmethod
+    def tag_names(cls, value):
+        # ORMのTagオブジェクトはタグ名に変換する
+        return [getattr(tag, "name", tag) for tag in value or []]
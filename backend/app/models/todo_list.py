@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from app.core.database import Base  # database.py から Base をインポート
+
+
+class TodoList(Base):
+    """
+    ToDoのリスト（プロジェクト）
+
+    ToDoの position はリストごとの順序を表す。一覧・並び替え・末尾への追加は
+    (list_id, position) インデックスの範囲で行うため、コストは表示中のリストの件数で決まる。
+    リストに属さないToDo（list_id が NULL）は既定のリストとして扱う。
+    """
+
+    __tablename__ = "todo_lists"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(100), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
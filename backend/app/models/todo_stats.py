@@ -0,0 +1,188 @@
+import random
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, String, event, func, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import Base  # database.py から Base をインポート
+from app.models.todo import NOT_DELETED, Todo
+
+# ToDoは全ユーザーで共有のため、集計は1つ（scope="global"）にまとめる
+GLOBAL_SCOPE = "global"
+
+# 優先度ごとの件数のカラム（0=高, 1=中, 2=低）
+PRIORITY_COLUMNS: Dict[int, str] = {0: "priority_high", 1: "priority_medium", 2: "priority_low"}
+COUNTER_COLUMNS = ("total", "completed", *PRIORITY_COLUMNS.values())
+
+
+class TodoStats(Base):
+    """
+    ToDoの件数の集計
+
+    ToDoの追加・変更・削除と同じトランザクションで増減させ、集計の取得を数行の合計の読み取りで済ませる。
+    集計は TODO_STATS_SLOTS 個の行（slot）に分けて持ち、取得時に合計する。書き込みは接続ごとに決めた1行だけを
+    更新するため、同時に書き込むトランザクションが1行のロックを待ち合わせない。
+    論理削除されたToDoは数えない（論理削除・復元の際に増減させる）。
+    ORMのflushによる変更は after_flush で自動的に反映する。一括UPDATE/DELETEは flush を経由しないため、
+    呼び出し側で変更した行（RETURNING）から増減を求めて apply_delta で反映する。
+    ずれが生じた場合は定期実行ジョブ（maintenance.rebuild_todo_stats）で集計し直す。
+    """
+
+    __tablename__ = "todo_stats"
+
+    scope = Column(String(50), primary_key=True)
+    slot = Column(Integer, primary_key=True, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    priority_high = Column(Integer, nullable=False, default=0)
+    priority_medium = Column(Integer, nullable=False, default=0)
+    priority_low = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def todo_delta(completed: bool, priority: Optional[int], count: int = 1) -> Counter:
+    """ToDoを count 件追加した場合の集計の増減（削除の場合は負の count）"""
+    delta = Counter(total=count)
+    if completed:
+        delta["completed"] += count
+    if priority in PRIORITY_COLUMNS:
+        delta[PRIORITY_COLUMNS[priority]] += count
+    return delta
+
+
+def _slot(connection: Connection) -> int:
+    """
+    この接続で更新する集計の行
+
+    DB接続ごとに固定する（1つのトランザクションで複数の行をロックせず、トランザクション間でデッドロックしない）
+    """
+    slot = connection.info.get("todo_stats_slot")
+    if slot is None or slot >= settings.TODO_STATS_SLOTS:
+        slot = connection.info["todo_stats_slot"] = random.randrange(settings.TODO_STATS_SLOTS)
+    return slot
+
+
+def read_stats(connection: Connection) -> Optional[dict]:
+    """集計の行を合計した値（集計の行がない場合は None）"""
+    table = TodoStats.__table__
+    row = connection.execute(
+        select(func.count(), *[func.coalesce(func.sum(table.c[column]), 0) for column in COUNTER_COLUMNS]).where(
+            table.c.scope == GLOBAL_SCOPE
+        )
+    ).one()
+    if not row[0]:
+        return None
+    return dict(zip(COUNTER_COLUMNS, row[1:]))
+
+
+def rebuild_values(connection: Connection) -> dict:
+    """todos テーブル全体（論理削除されたToDoを除く）から集計し直した値"""
+    delta = Counter()
+    for completed, priority, count in connection.execute(
+        select(Todo.completed, Todo.priority, func.count()).where(NOT_DELETED).group_by(Todo.completed, Todo.priority)
+    ):
+        delta.update(todo_delta(completed, priority, count))
+    return {column: delta[column] for column in COUNTER_COLUMNS}
+
+
+def _create_rows(connection: Connection, slots: Iterable[int], now: datetime) -> None:
+    """値が0の集計の行を作成する（既にある行、同時に作成された行はそのまま）"""
+    table = TodoStats.__table__
+    zeros = {column: 0 for column in COUNTER_COLUMNS}
+    insert = postgresql_insert if connection.dialect.name == "postgresql" else sqlite_insert
+    connection.execute(
+        insert(table)
+        .values([dict(zeros, scope=GLOBAL_SCOPE, slot=slot, updated_at=now) for slot in slots])
+        .on_conflict_do_nothing(index_elements=["scope", "slot"])
+    )
+
+
+def rebuild_stats(connection: Connection) -> dict:
+    """todos テーブル全体から集計し直して保存し（slot 0 に全件、他の行は0）、集計し直した値を返す"""
+    table = TodoStats.__table__
+    scope = table.c.scope == GLOBAL_SCOPE
+    now = datetime.utcnow()
+    zeros = {column: 0 for column in COUNTER_COLUMNS}
+    _create_rows(connection, range(settings.TODO_STATS_SLOTS), now)
+    # 集計し直す前に全ての行をロックし、増減を書き込み中のトランザクションの完了を待つ
+    # （以降に増減を書き込むトランザクションは、集計し直した値に対して増減させる）
+    # 同時に集計し直すトランザクション同士がデッドロックしないよう、slot の順にロックする
+    connection.execute(select(table.c.slot).where(scope).order_by(table.c.slot).with_for_update())
+    values = rebuild_values(connection)
+    connection.execute(update(table).where(scope, table.c.slot != 0).values(**zeros, updated_at=now))
+    connection.execute(update(table).where(scope, table.c.slot == 0).values(**values, updated_at=now))
+    return values
+
+
+def apply_delta(connection: Connection, delta: Counter) -> None:
+    """
+    集計を増減させる（この接続の slot の行のみ更新する）
+
+    行がない場合（TODO_STATS_SLOTS を増やした直後など）は、値が0の行を作成してから増減させる。
+    行は合計して読み取るため、他の行の値はそのままでよい（todos 全体を集計し直さない）。
+    """
+    delta = {column: count for column, count in delta.items() if count}
+    if not delta:
+        return
+    table = TodoStats.__table__
+    slot = _slot(connection)
+    now = datetime.utcnow()
+    values = {column: table.c[column] + count for column, count in delta.items()}
+    statement = (
+        update(table).where(table.c.scope == GLOBAL_SCOPE, table.c.slot == slot).values(**values, updated_at=now)
+    )
+    if not connection.execute(statement).rowcount:
+        _create_rows(connection, [slot], now)
+        connection.execute(statement)
+
+
+def transition_delta(old: Dict[int, Tuple[bool, Optional[int]]], rows: Iterable) -> Counter:
+    """
+    一括UPDATEで変更した行の集計の増減
+
+    old は変更前の (完了状態, 優先度)（ToDoのID → 値）、rows は UPDATE ... RETURNING の行（id, completed, priority）
+    """
+    delta = Counter()
+    for row in rows:
+        completed, priority = old[row.id]
+        delta.update(todo_delta(completed, priority, -1))
+        delta.update(todo_delta(row.completed, row.priority))
+    return delta
+
+
+def _committed_value(state, key: str):
+    """flush前（DB上）の属性値"""
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return state.attrs[key].value
+
+
+@event.listens_for(Session, "after_flush")
+def _track_todo_changes(session: Session, flush_context) -> None:
+    """ORMによるToDoの追加・変更・削除を、同じトランザクションで集計に反映する"""
+    delta = Counter()
+    for obj in session.new:
+        if isinstance(obj, Todo):
+            delta.update(todo_delta(obj.completed, obj.priority))
+    for obj in session.deleted:
+        if isinstance(obj, Todo):
+            state = inspect(obj)
+            delta.update(todo_delta(_committed_value(state, "completed"), _committed_value(state, "priority"), -1))
+    for obj in session.dirty:
+        if isinstance(obj, Todo):
+            state = inspect(obj)
+            if not (state.attrs.completed.history.has_changes() or state.attrs.priority.history.has_changes()):
+                continue
+            delta.update(todo_delta(_committed_value(state, "completed"), _committed_value(state, "priority"), -1))
+            delta.update(todo_delta(obj.completed, obj.priority))
+    if any(delta.values()):
+        apply_delta(session.connection(), delta)
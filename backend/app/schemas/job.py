@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+# ジョブの状態レスポンス用のスキーマ
+class JobResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    type: str
+    status: str
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+# ジョブを受け付けた場合（202 Accepted）のレスポンス用のスキーマ
+class JobAccepted(BaseModel):
+    job_id: int
+    status: str
+    status_url: str
@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+
+# ToDoの件数の集計レスポンス用のスキーマ
+class TodoStatsResponse(BaseModel):
+    total: int
+    completed: int
+    incomplete: int
+    overdue: int
+    by_priority: Dict[str, int]  # 優先度（"0"=高, "1"=中, "2"=低）ごとの件数
+
+
+# タグごとのToDoの件数レスポンス用のスキーマ
+class TagCount(BaseModel):
+    name: str
+    count: int
+
+
+# リストの作成・更新用のスキーマ
+class TodoListCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+
+
+# リストのレスポンス用のスキーマ
+class TodoListResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    created_at: datetime
+
+
+# ToDoの部分更新（PATCH）用のスキーマ
+# 指定したフィールドだけを更新する。description / due_date / list_id / parent_id は null で解除できる
+class TodoPatch(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    completed: Optional[bool] = None
+    position: Optional[int] = None
+    priority: Optional[int] = None
+    due_date: Optional[datetime] = None
+    list_id: Optional[int] = None
+    parent_id: Optional[int] = None
+    tags: Optional[List[str]] = None  # 指定した場合は置き換える
+    version: Optional[int] = None  # クライアントが保持しているバージョン（If-Match ヘッダーでも指定できる）
+
+    @field_validator("title", "completed", "position", "priority", "tags")
+    @classmethod
+    def not_null(cls, value):
+        # null で解除できないフィールド（指定しない場合は変更しない）
+        if value is None:
+            raise ValueError("must not be null")
+        return value
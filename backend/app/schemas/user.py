@@ -30,6 +30,12 @@ class User(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+# リフレッシュトークン送信用のスキーマ
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 # トークンデータ用のスキーマ
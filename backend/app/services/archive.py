@@ -0,0 +1,106 @@
+"""
+完了済みToDoのアーカイブ
+
+完了から一定期間が経過したToDoを todos から todos_archive へバッチ単位で移動する。
+バッチごとに INSERT ... SELECT と DELETE（と件数の集計の更新）を1トランザクションで実行してコミットするため、
+大量の対象があってもロックの保持時間とトランザクションの大きさは一定に保たれる。
+サブタスクが残っているToDoは移動しない（子を先に移動し、次のバッチで親を移動する）。
+論理削除されたToDoは移動しない（物理削除の対象）。
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import DateTime, delete, exists, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models.tag import todo_tags
+from app.models.todo import Todo, TodoArchive
+from app.models.todo_stats import apply_delta, todo_delta
+from app.services.tags import delete_todo_tags
+
+# todos と todos_archive で共通のカラム
+ARCHIVED_COLUMNS: List[str] = [
+    "id",
+    "title",
+    "description",
+    "completed",
+    "position",
+    "priority",
+    "due_date",
+    "list_id",
+    "parent_id",
+    "completed_at",
+    "version",
+]
+
+
+def archive_completed(db: Session, completed_before: datetime, batch_size: int = 1000) -> int:
+    """
+    completed_before より前に完了したToDoをアーカイブし、移動した件数を返す
+
+    バッチごとにコミットする（途中で失敗しても、それまでに移動したバッチは確定している）。
+    対象の行はロックして選び（他のトランザクションがロック中の行は飛ばす）、移動・削除でも対象の条件を
+    再度確認する（選択後に未完了に戻された・論理削除された・子が追加されたToDoは移動しない）
+    """
+    todos = Todo.__table__
+    archived = 0
+    while True:
+        ids = _lock_batch(db, completed_before, batch_size)
+        if not ids:
+            return archived
+
+        criteria = [todos.c.id.in_(ids), *_archivable(completed_before)]
+        now = datetime.utcnow()
+        source = select(*[todos.c[name] for name in ARCHIVED_COLUMNS], literal(now, DateTime).label("archived_at"))
+        moved = [
+            todo_id
+            for (todo_id,) in db.execute(
+                insert(TodoArchive.__table__)
+                .from_select(ARCHIVED_COLUMNS + ["archived_at"], source.where(*criteria))
+                .returning(TodoArchive.__table__.c.id)
+            )
+        ]
+        if moved:
+            # タグはアーカイブしない
+            delete_todo_tags(db, todo_tags.c.todo_id.in_(moved))
+            # 件数の集計は削除した行から減らす
+            rows = db.execute(
+                delete(todos)
+                .where(todos.c.id.in_(moved), *_archivable(completed_before))
+                .returning(todos.c.completed, todos.c.priority)
+            )
+            delta = Counter()
+            for row in rows:
+                delta.update(todo_delta(row.completed, row.priority, -1))
+            apply_delta(db.connection(), delta)
+        db.commit()
+        archived += len(moved)
+
+
+def _archivable(completed_before: datetime) -> list:
+    """アーカイブの対象の条件（完了から一定期間が経過し、論理削除されておらず、サブタスクがない）"""
+    todos = Todo.__table__
+    children = todos.alias("children")
+    return [
+        todos.c.completed.is_(True),
+        todos.c.completed_at < completed_before,
+        todos.c.deleted_at.is_(None),
+        ~exists().where(children.c.parent_id == todos.c.id),
+    ]
+
+
+def _lock_batch(db: Session, completed_before: datetime, batch_size: int) -> List[int]:
+    """アーカイブの対象のIDをロックして取得する（他のトランザクションがロック中の行は次回に回す）"""
+    todos = Todo.__table__
+    return [
+        todo_id
+        for (todo_id,) in db.execute(
+            select(todos.c.id)
+            .where(*_archivable(completed_before))
+            .order_by(todos.c.completed_at, todos.c.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True, of=todos)
+        )
+    ]
@@ -0,0 +1,113 @@
+"""
+バックグラウンドジョブの処理
+
+このモジュールをインポートするとジョブの処理が登録される（JobRunnerの起動時にインポートする）
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import invalidate_todos
+from app.core.jobs import PermanentJobError, job_handler
+from app.models.idempotency_key import IdempotencyKey
+from app.models.job import JOB_FAILED, JOB_SUCCEEDED, Job
+from app.models.refresh_token import RefreshToken
+from app.models.todo_list import TodoList
+from app.models.todo_stats import COUNTER_COLUMNS, rebuild_stats
+from app.services import todos
+from app.services.archive import archive_completed
+from app.services.purge import purge_deleted
+
+
+@job_handler("todos.bulk_update")
+def bulk_update_todos(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    count = todos.bulk_update(db, payload["todo_ids"], payload["action"])
+    db.commit()
+    invalidate_todos()
+    return {"action": payload["action"], "count": count}
+
+
+@job_handler("todos.reorder")
+def reorder_todos(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    # 登録したユーザーがリストを所有していることを実行時にも確認する（user_id のないジョブは実行しない）
+    list_id = payload.get("list_id")
+    if list_id is not None:
+        todo_list = db.get(TodoList, list_id)
+        if todo_list is None or todo_list.user_id != payload.get("user_id"):
+            raise LookupError("List not found")
+    # JSONのキーは文字列のため、ToDoのIDに戻す
+    versions = {int(todo_id): version for todo_id, version in (payload.get("versions") or {}).items()}
+    try:
+        todos.reorder(db, payload["todo_ids"], payload.get("list_id"), versions)
+    except todos.TodoVersionConflictError as e:
+        # 登録時のバージョンが古くなっている（再実行しても成功しない）
+        raise PermanentJobError(f"Todos have been modified: {e.todo_ids}") from e
+    db.commit()
+    invalidate_todos()
+    return {"count": len(payload["todo_ids"])}
+
+
+@job_handler("todos.archive_completed")
+def archive_completed_todos(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """完了から一定日数が経過したToDoをアーカイブする"""
+    completed_before = datetime.utcnow() - timedelta(days=payload["after_days"])
+    count = archive_completed(db, completed_before, payload.get("batch_size", 1000))
+    if count:
+        invalidate_todos()
+    return {"archived": count}
+
+
+@job_handler("todos.purge_deleted")
+def purge_deleted_todos(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """論理削除から一定時間が経過したToDoを物理削除する（一覧の内容は変わらないため、キャッシュは無効化しない）"""
+    deleted_before = datetime.utcnow() - timedelta(hours=payload["after_hours"])
+    count = purge_deleted(db, deleted_before, payload.get("batch_size", 500), payload.get("pause_seconds", 0))
+    return {"purged": count}
+
+
+@job_handler("maintenance.rebalance_positions")
+def rebalance_positions(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    count = todos.rebalance_positions(db)
+    db.commit()
+    if count:
+        invalidate_todos()
+    return {"updated": count}
+
+
+@job_handler("maintenance.rebuild_todo_stats")
+def rebuild_todo_stats(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """ToDoの件数の集計を todos テーブル全体から集計し直す（増減の反映漏れの修正）"""
+    values = rebuild_stats(db.connection())
+    return {column: values[column] for column in COUNTER_COLUMNS}
+
+
+@job_handler("maintenance.purge_refresh_tokens")
+def purge_refresh_tokens(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """有効期限切れのリフレッシュトークンを削除する"""
+    deleted = (
+        db.query(RefreshToken).filter(RefreshToken.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+    )
+    return {"deleted": deleted}
+
+
+@job_handler("maintenance.purge_idempotency_keys")
+def purge_idempotency_keys(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """有効期限切れの冪等キー（IDEMPOTENCY_BACKEND=database の保存先）を削除する"""
+    deleted = (
+        db.query(IdempotencyKey).filter(IdempotencyKey.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+    )
+    return {"deleted": deleted}
+
+
+@job_handler("maintenance.purge_jobs")
+def purge_jobs(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """保存期間を過ぎた完了済み・失敗したジョブを削除する"""
+    cutoff = datetime.utcnow() - timedelta(days=payload.get("retention_days", 7))
+    deleted = (
+        db.query(Job)
+        .filter(Job.status.in_([JOB_SUCCEEDED, JOB_FAILED]), Job.finished_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    return {"deleted": deleted}
@@ -0,0 +1,49 @@
+"""
+論理削除したToDoの物理削除
+
+削除から一定期間（復元できる期間）が経過したToDoを、バッチ単位で todos から削除する。
+バッチごとにタグとの対応の DELETE と todos の DELETE を1トランザクションで実行してコミットし、
+バッチの間に待機するため、大量の対象があってもロックの保持時間と書き込みの負荷は一定に保たれる。
+件数の集計は論理削除の際に反映済みのため、ここでは変更しない。
+"""
+
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.models.tag import todo_tags
+from app.models.todo import Todo
+from app.services.tags import delete_todo_tags
+
+
+def purge_deleted(db: Session, deleted_before: datetime, batch_size: int = 500, pause_seconds: float = 0) -> int:
+    """
+    deleted_before より前に論理削除したToDoを物理削除し、削除した件数を返す
+
+    対象は deleted_at の部分インデックスで検索する。バッチごとにコミットし、次のバッチの前に pause_seconds 秒待機する
+    """
+    todos = Todo.__table__
+    purged = 0
+    while True:
+        ids = [
+            todo_id
+            for (todo_id,) in db.execute(
+                select(todos.c.id)
+                .where(todos.c.deleted_at.isnot(None), todos.c.deleted_at < deleted_before)
+                .order_by(todos.c.deleted_at, todos.c.id)
+                .limit(batch_size)
+            )
+        ]
+        if not ids:
+            return purged
+
+        delete_todo_tags(db, todo_tags.c.todo_id.in_(ids))
+        db.execute(delete(todos).where(todos.c.id.in_(ids)))
+        db.commit()
+        purged += len(ids)
+        if len(ids) < batch_size:
+            return purged
+        if pause_seconds > 0:
+            time.sleep(pause_seconds)
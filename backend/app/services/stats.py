@@ -0,0 +1,37 @@
+"""
+ToDoの件数の集計の取得
+
+件数は todo_stats の行（TODO_STATS_SLOTS 行に分割）に、ToDoの変更と同じトランザクションで増減させて保持している（app.models.todo_stats）。
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.todo import DUE_INDEX_CONDITION, Todo
+from app.models.todo_stats import PRIORITY_COLUMNS, read_stats, rebuild_values
+
+
+def get_stats(db: Session, now: Optional[datetime] = None) -> dict:
+    """
+    ToDoの件数の集計を返す
+
+    total / completed / 優先度ごとの件数は todo_stats の行の合計を読み取る。
+    期限切れの件数は時間の経過で変わるため保持せず、期限日の部分インデックスの範囲で数える。
+    集計の行がまだない場合（集計し直す前の既存のDB）は todos テーブルから集計する。
+    """
+    values = read_stats(db.connection())
+    if values is None:
+        values = rebuild_values(db.connection())
+    overdue = (
+        db.query(func.count(Todo.id)).filter(*DUE_INDEX_CONDITION, Todo.due_date < (now or datetime.utcnow())).scalar()
+    )
+    return {
+        "total": values["total"],
+        "completed": values["completed"],
+        "incomplete": values["total"] - values["completed"],
+        "overdue": overdue,
+        "by_priority": {str(priority): values[column] for priority, column in PRIORITY_COLUMNS.items()},
+    }
@@ -0,0 +1,146 @@
+"""
+ToDoのサブタスク（親子関係）
+
+親子関係は todos.parent_id による隣接リストで表し、部分木・祖先は再帰CTE（WITH RECURSIVE）の1回のクエリで求める
+（ノードごとのクエリは発行しない）。
+
+完了状態のロールアップ: 子がすべて完了した親は完了、未完了の子がある親は未完了にする。
+変更されたToDoの祖先を1回のクエリで求め、深い階層から順に階層ごとの一括UPDATEで反映する
+（クエリの回数は祖先の件数ではなく階層の深さで決まる）。
+
+論理削除されたToDoは部分木・親・ロールアップの対象に含めない。
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import and_, exists, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.models.todo import Todo
+from app.models.todo_stats import apply_delta
+
+# 親子関係の最大の深さ（再帰CTEの打ち切り。循環は更新時に防いでいるが、念のため無限に再帰しないようにする）
+MAX_SUBTASK_DEPTH = 32
+
+todos = Todo.__table__
+
+
+class InvalidParentError(ValueError):
+    """親に指定できないToDo（存在しない・自身の子孫）"""
+
+
+def subtree_cte(todo_ids: Iterable[int], name: str = "subtree", criteria=None, nesting: bool = False):
+    """
+    todo_ids（深さ0）とその子孫のIDと深さの再帰CTE
+
+    criteria を満たすToDoのみを含める（既定は論理削除されていないToDo）。
+    nesting=True の場合はサブクエリ内に WITH を描画する（UPDATE の条件に使っても文が WITH で始まらない）
+    """
+    if criteria is None:
+        criteria = todos.c.deleted_at.is_(None)
+    tree = (
+        select(todos.c.id, literal(0).label("depth"))
+        .where(todos.c.id.in_(list(todo_ids)), criteria)
+        .cte(name, recursive=True, nesting=nesting)
+    )
+    return tree.union_all(
+        select(todos.c.id, tree.c.depth + 1)
+        .join(tree, todos.c.parent_id == tree.c.id)
+        .where(tree.c.depth < MAX_SUBTASK_DEPTH, criteria)
+    )
+
+
+def validate_parent(db: Session, todo_id: Optional[int], parent_id: int) -> Any:
+    """
+    parent_id を todo_id の親にできることを確認し、親の行（id, list_id）を返す
+
+    親が存在しない（論理削除された）場合、または親が todo_id 自身かその子孫（循環）の場合は InvalidParentError
+    """
+    query = select(todos.c.id, todos.c.list_id).where(todos.c.id == parent_id, todos.c.deleted_at.is_(None))
+    if todo_id is not None:
+        tree = subtree_cte([todo_id])
+        query = query.add_columns(todos.c.id.in_(select(tree.c.id)).label("in_subtree"))
+    parent = db.execute(query).first()
+    if parent is None:
+        raise InvalidParentError("Parent todo not found")
+    if todo_id is not None and parent.in_subtree:
+        raise InvalidParentError("A todo cannot be a subtask of itself or its subtasks")
+    return parent
+
+
+def parent_ids(db: Session, todo_ids: Iterable[int]) -> Set[int]:
+    """todo_ids の親のID（一括更新の前に取得し、更新後のロールアップに使う）"""
+    return {
+        parent_id
+        for (parent_id,) in db.execute(
+            select(todos.c.parent_id).where(todos.c.id.in_(list(todo_ids)), todos.c.parent_id.isnot(None)).distinct()
+        )
+    }
+
+
+def load_subtrees(db: Session, root_ids: List[int], include_roots: bool = False) -> Dict[Optional[int], List[Any]]:
+    """
+    root_ids の子孫を1回のクエリで取得し、親のIDごとの子の行（position 順）を返す
+
+    include_roots=True の場合は root_ids 自身の行も含める（キーは各行の parent_id）
+    """
+    if not root_ids:
+        return {}
+    tree = subtree_cte(root_ids)
+    query = select(todos).join(tree, tree.c.id == todos.c.id).order_by(todos.c.position, todos.c.id)
+    if not include_roots:
+        query = query.where(tree.c.depth > 0)
+    children: Dict[Optional[int], List[Any]] = {}
+    for row in db.execute(query):
+        children.setdefault(row.parent_id, []).append(row)
+    return children
+
+
+def roll_up_completion(db: Session, todo_ids: Iterable[int]) -> int:
+    """
+    todo_ids とその祖先の完了状態を、子の完了状態に合わせて更新し、更新した件数を返す
+
+    子を持たないToDoは変更しない（論理削除された子は数えない）。一括UPDATEで反映するため、件数の集計もここで増減させる。
+    """
+    todo_ids = list(todo_ids)
+    if not todo_ids:
+        return 0
+
+    # 祖先（と自身）ごとの、変更されたToDoからの最大の距離（子孫より後に処理するため）
+    ancestors = (
+        select(todos.c.id, literal(0).label("depth")).where(todos.c.id.in_(todo_ids)).cte("ancestors", recursive=True)
+    )
+    ancestors = ancestors.union_all(
+        select(todos.c.parent_id, ancestors.c.depth + 1)
+        .join(ancestors, todos.c.id == ancestors.c.id)
+        .where(todos.c.parent_id.isnot(None), ancestors.c.depth < MAX_SUBTASK_DEPTH)
+    )
+    levels: Dict[int, List[int]] = {}
+    for todo_id, depth in db.execute(select(ancestors.c.id, func.max(ancestors.c.depth)).group_by(ancestors.c.id)):
+        levels.setdefault(depth, []).append(todo_id)
+
+    child = todos.alias("child")
+    is_child = (child.c.parent_id == todos.c.id, child.c.deleted_at.is_(None))
+    has_children = exists().where(*is_child)
+    has_incomplete_children = exists().where(*is_child, child.c.completed.is_(False))
+    now = datetime.utcnow()
+    delta = Counter()
+    changed = 0
+    for depth in sorted(levels):
+        level = and_(todos.c.id.in_(levels[depth]), todos.c.deleted_at.is_(None))
+        completed = db.execute(
+            update(todos)
+            .where(level, todos.c.completed.is_(False), has_children, ~has_incomplete_children)
+            .values(completed=True, completed_at=now, version=todos.c.version + 1)
+        ).rowcount
+        reopened = db.execute(
+            update(todos)
+            .where(level, todos.c.completed.is_(True), has_incomplete_children)
+            .values(completed=False, completed_at=None, version=todos.c.version + 1)
+        ).rowcount
+        delta["completed"] += completed - reopened
+        changed += completed + reopened
+    apply_delta(db.connection(), delta)
+    return changed
@@ -0,0 +1,137 @@
+"""
+ToDoのタグ
+
+タグでの絞り込みは todo_tags の (tag_id, todo_id) インデックスを使い、
+タグごとのToDoのIDの積集合（AND）/和集合（OR）として求める（タイトルの文字列検索は行わない）。
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import ColumnElement, and_, delete, false, func, insert, intersect, literal_column, select, text, union
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.tag import TAG_NAME_MAX_LENGTH, Tag, todo_tags
+from app.models.todo import NOT_DELETED, Todo
+
+TAG_MODES = ("all", "any")
+
+# tag_names_column でタグ名を連結する区切り文字（タグ名には現れない制御文字）
+TAG_NAME_SEPARATOR = "\x1f"
+
+
+def normalize_tag_names(names: Iterable[str]) -> List[str]:
+    """前後の空白と先頭の '#' を除き、空のタグと重複を取り除く（順序は保つ）"""
+    normalized = []
+    for name in names:
+        name = name.strip().lstrip("#").strip()
+        if not name:
+            continue
+        if len(name) > TAG_NAME_MAX_LENGTH:
+            raise ValueError(f"Tag name must be at most {TAG_NAME_MAX_LENGTH} characters")
+        if name not in normalized:
+            normalized.append(name)
+    return normalized
+
+
+def get_or_create_tags(db: Session, names: Iterable[str]) -> List[Tag]:
+    """タグ名に対応するタグを返す（存在しないタグは作成する）"""
+    names = normalize_tag_names(names)
+    if not names:
+        return []
+    tags = {tag.name: tag for tag in db.query(Tag).filter(Tag.name.in_(names))}
+    for name in names:
+        if name in tags:
+            continue
+        try:
+            # 同時に同じタグが作成された場合は、作成済みのタグを使う
+            with db.begin_nested():
+                tag = Tag(name=name)
+                db.add(tag)
+            tags[name] = tag
+        except IntegrityError:
+            tags[name] = db.query(Tag).filter(Tag.name == name).one()
+    return [tags[name] for name in names]
+
+
+def tag_filter(db: Session, todo_id_column: ColumnElement, names: List[str], mode: str = "all") -> ColumnElement:
+    """
+    指定したタグが付いたToDoに絞り込む条件
+
+    mode="all" はすべてのタグが付いたToDo（AND）、mode="any" はいずれかのタグが付いたToDo（OR）
+    """
+    tag_ids = [tag_id for (tag_id,) in db.query(Tag.id).filter(Tag.name.in_(names))]
+    if not tag_ids or (mode == "all" and len(tag_ids) < len(names)):
+        return false()
+    # タグごとに (tag_id, todo_id) インデックスの範囲検索
+    selects = [select(todo_tags.c.todo_id).where(todo_tags.c.tag_id == tag_id) for tag_id in tag_ids]
+    if len(selects) == 1:
+        return todo_id_column.in_(selects[0])
+    combined = intersect(*selects) if mode == "all" else union(*selects)
+    return todo_id_column.in_(select(combined.subquery().c.todo_id))
+
+
+def tag_names_by_todo(db: Session, todo_ids: List[int]) -> Dict[int, List[str]]:
+    """ToDoごとのタグ名（1回のクエリでまとめて取得する）"""
+    if not todo_ids:
+        return {}
+    rows = db.execute(
+        select(todo_tags.c.todo_id, Tag.name)
+        .join(Tag, Tag.id == todo_tags.c.tag_id)
+        .where(todo_tags.c.todo_id.in_(todo_ids))
+        .order_by(Tag.name)
+    )
+    names: Dict[int, List[str]] = {}
+    for todo_id, name in rows:
+        names.setdefault(todo_id, []).append(name)
+    return names
+
+
+def tag_names_column(db: Session):
+    """
+    todos の行のタグ名を区切り文字で連結したスカラーサブクエリ（UPDATE ... RETURNING でタグも返すために使う）
+
+    RETURNING 内ではカラムがテーブル名なしで描画され、相関の条件が誤って解決されるため、
+    カラムはテーブル名付きの文字列で指定する。split_tag_names で分割する
+    """
+    name = literal_column("tags.name")
+    if db.get_bind().dialect.name == "postgresql":
+        aggregated = func.string_agg(name, TAG_NAME_SEPARATOR)
+    else:
+        aggregated = func.group_concat(name, TAG_NAME_SEPARATOR)
+    return (
+        select(aggregated)
+        .select_from(text("todo_tags JOIN tags ON tags.id = todo_tags.tag_id"))
+        .where(literal_column("todo_tags.todo_id") == literal_column("todos.id"))
+        .scalar_subquery()
+    )
+
+
+def split_tag_names(value: Optional[str]) -> List[str]:
+    """tag_names_column の値をタグ名の一覧（名前順）に戻す"""
+    return sorted(value.split(TAG_NAME_SEPARATOR)) if value else []
+
+
+def replace_todo_tags(db: Session, todo_id: int, tags: List[Tag]) -> None:
+    """ToDoのタグを置き換える（ORMを経由しない部分更新で使う）"""
+    delete_todo_tags(db, todo_tags.c.todo_id == todo_id)
+    if tags:
+        db.execute(insert(todo_tags), [{"todo_id": todo_id, "tag_id": tag.id} for tag in tags])
+
+
+def tag_counts(db: Session) -> List[dict]:
+    """タグごとのToDoの件数（件数の多い順。論理削除されたToDoは数えない）"""
+    count = func.count(Todo.id)
+    rows = (
+        db.query(Tag.name, count)
+        .outerjoin(todo_tags, todo_tags.c.tag_id == Tag.id)
+        .outerjoin(Todo, and_(Todo.id == todo_tags.c.todo_id, NOT_DELETED))
+        .group_by(Tag.id, Tag.name)
+        .order_by(count.desc(), Tag.name)
+    )
+    return [{"name": name, "count": todo_count} for name, todo_count in rows]
+
+
+def delete_todo_tags(db: Session, *criteria) -> None:
+    """ToDoとタグの対応を削除する（ORMを経由しない物理削除の前に呼び出す）"""
+    db.execute(delete(todo_tags).where(*criteria))
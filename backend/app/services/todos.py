@@ -0,0 +1,361 @@
+"""
+ToDoの一括操作・部分更新・論理削除
+
+エンドポイント（同期実行）とバックグラウンドジョブ（非同期実行）の両方から使う。
+コミットとキャッシュの無効化は呼び出し側で行う。
+
+削除は deleted_at を設定する論理削除とし、1回の UPDATE ... RETURNING で部分木をまとめて削除する。
+タグとの対応を含む物理削除は、保存期間の経過後に todos.purge_deleted ジョブ（app.services.purge）で行う。
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, case, func, or_, select, true, update
+from sqlalchemy.orm import Session
+
+from app.models.todo import NOT_DELETED
+from app.models.todo import Todo as TodoModel
+from app.models.todo_stats import apply_delta, todo_delta, transition_delta
+from app.services.subtasks import InvalidParentError, parent_ids, roll_up_completion, subtree_cte
+from app.services.tags import (
+    get_or_create_tags,
+    replace_todo_tags,
+    split_tag_names,
+    tag_names_by_todo,
+    tag_names_column,
+)
+
+BULK_ACTIONS = ("complete", "incomplete", "delete")
+
+# 位置の振り直しで1回のUPDATEにまとめる件数
+REBALANCE_BATCH_SIZE = 1000
+
+
+class TodosNotFoundError(LookupError):
+    """対象のToDoが見つからない"""
+
+
+class TodoVersionConflictError(RuntimeError):
+    """ToDoが他の更新によって変更されている（楽観的排他制御）"""
+
+    def __init__(self, todo_ids: List[int]):
+        super().__init__("Todo has been modified by another request")
+        self.todo_ids = todo_ids
+
+
+# 主キーを指定した position の一括UPDATE（executemany）。バージョンも1つ増やす
+_todos = TodoModel.__table__
+_UPDATE_POSITION = (
+    update(_todos)
+    .where(_todos.c.id == bindparam("b_id"))
+    .values(position=bindparam("b_position"), version=_todos.c.version + 1)
+)
+
+
+def bulk_update(db: Session, todo_ids: List[int], action: str) -> int:
+    """
+    ToDoの完了状態の一括更新、または一括削除を行い、対象件数を返す
+
+    1回のUPDATE文でまとめて処理する（1件ずつのクエリを発行しない）。
+    削除ではサブタスクもまとめて論理削除し（返す件数に含む）、親の完了状態は変更後にロールアップする。
+    """
+    if action not in BULK_ACTIONS:
+        raise ValueError(f"Invalid action: '{action}'. Must be one of: {', '.join(BULK_ACTIONS)}")
+
+    if action == "delete":
+        rows = soft_delete(db, todo_ids)
+        if not rows:
+            raise TodosNotFoundError("No todos found")
+        return len(rows)
+
+    parents = parent_ids(db, todo_ids)
+
+    # 一括UPDATEは flush を経由しないため、件数の集計の増減は変更前の値（行ロック付きで読み取り、
+    # UPDATEまで他の更新で変わらない）と UPDATE ... RETURNING の変更後の値から求める
+    old = {
+        row.id: (row.completed, row.priority)
+        for row in db.execute(
+            select(_todos.c.id, _todos.c.completed, _todos.c.priority)
+            .where(_todos.c.id.in_(todo_ids), NOT_DELETED)
+            .with_for_update()
+        )
+    }
+    if not old:
+        raise TodosNotFoundError("No todos found")
+
+    if action == "complete":
+        # 既に完了済みのToDoは完了日時を変えない（未完了のToDoの完了日時は常にNULL）
+        values = {"completed": True, "completed_at": func.coalesce(_todos.c.completed_at, datetime.utcnow())}
+    else:
+        values = {"completed": False, "completed_at": None}
+    rows = db.execute(
+        update(_todos)
+        .where(_todos.c.id.in_(list(old)), NOT_DELETED)
+        .values(**values, version=_todos.c.version + 1)
+        .returning(_todos.c.id, _todos.c.completed, _todos.c.priority)
+    ).all()
+    apply_delta(db.connection(), transition_delta(old, rows))
+    roll_up_completion(db, parents)
+    return len(rows)
+
+
+def soft_delete(db: Session, todo_ids: List[int]) -> List[Any]:
+    """
+    ToDoとそのサブタスクを論理削除し、削除した行（タグ名付き）を返す
+
+    部分木の検索を含めて1回の UPDATE ... RETURNING で削除する（削除済みのToDoは対象外）。
+    件数の集計は返された行から増減させ（UPDATE 1回）、部分木の外の親がある場合のみロールアップする。
+    タグとの対応は復元のために残し、物理削除の際に削除する
+    """
+    tree = subtree_cte(todo_ids, nesting=True)
+    rows = db.execute(
+        update(_todos)
+        .where(_todos.c.id.in_(select(tree.c.id)), NOT_DELETED)
+        .values(deleted_at=datetime.utcnow(), version=_todos.c.version + 1)
+        .returning(*_todos.c, tag_names_column(db).label("tag_names"))
+    ).all()
+    return _removed_or_restored(db, rows, -1)
+
+
+def restore(db: Session, todo_id: int) -> List[Any]:
+    """
+    論理削除したToDoを、同時に削除したサブタスクとともに復元し、復元した行（タグ名付き、先頭が todo_id）を返す
+
+    論理削除されていない（または物理削除済みの）場合は TodosNotFoundError、
+    親が論理削除されている場合は InvalidParentError（親を先に復元する）
+    """
+    parent = _todos.alias("parent")
+    target = db.execute(
+        select(_todos.c.deleted_at, parent.c.deleted_at.label("parent_deleted_at"))
+        .outerjoin(parent, parent.c.id == _todos.c.parent_id)
+        .where(_todos.c.id == todo_id, _todos.c.deleted_at.isnot(None))
+    ).first()
+    if target is None:
+        raise TodosNotFoundError("Deleted todo not found")
+    if target.parent_deleted_at is not None:
+        raise InvalidParentError("Parent todo is deleted")
+
+    # 同じ削除で論理削除された子孫（削除日時が同じ）のみを復元する
+    tree = subtree_cte([todo_id], criteria=_todos.c.deleted_at == target.deleted_at, nesting=True)
+    rows = db.execute(
+        update(_todos)
+        .where(_todos.c.id.in_(select(tree.c.id)), _todos.c.deleted_at == target.deleted_at)
+        .values(deleted_at=None, version=_todos.c.version + 1)
+        .returning(*_todos.c, tag_names_column(db).label("tag_names"))
+    ).all()
+    rows.sort(key=lambda row: row.id != todo_id)
+    return _removed_or_restored(db, rows, 1)
+
+
+def _removed_or_restored(db: Session, rows: List[Any], sign: int) -> List[Any]:
+    """論理削除（sign=-1）・復元（sign=1）した行を件数の集計と親の完了状態に反映する"""
+    delta = Counter()
+    for row in rows:
+        delta.update(todo_delta(row.completed, row.priority, sign))
+    apply_delta(db.connection(), delta)
+    changed_ids = {row.id for row in rows}
+    roll_up_completion(
+        db, {row.parent_id for row in rows if row.parent_id is not None and row.parent_id not in changed_ids}
+    )
+    return rows
+
+
+def in_list(list_id: Optional[int]):
+    """リストに属するToDoの条件（list_id が None の場合は既定のリスト）"""
+    return TodoModel.list_id.is_(None) if list_id is None else TodoModel.list_id == list_id
+
+
+def next_position(db: Session, list_id: Optional[int]) -> int:
+    """リストの末尾に追加する場合の position（(list_id, position) インデックスの末尾の読み取りのみ）"""
+    max_position = db.query(func.max(TodoModel.position)).filter(in_list(list_id), NOT_DELETED).scalar()
+    return 0 if max_position is None else max_position + 1
+
+
+def reorder(
+    db: Session, todo_ids: List[int], list_id: Optional[int] = None, versions: Optional[Dict[int, int]] = None
+) -> Dict[int, int]:
+    """
+    リスト内のToDoの順序を更新し、更新後のバージョン（ToDoのID → バージョン）を返す
+
+    対象のToDoが使っていたpositionの値を、指定された順に割り当て直す。
+    versions（ToDoのID → クライアントが保持しているバージョン）を指定した場合は、
+    いずれかのバージョンが一致しなければ TodoVersionConflictError とする（対象の行はロックして確認する）
+    """
+    # 1. 並び替え対象のTodoの既存のposition値とバージョンを昇順で取得
+    query = (
+        select(_todos.c.id, _todos.c.position, _todos.c.version)
+        .where(_todos.c.id.in_(todo_ids), in_list(list_id), NOT_DELETED)
+        .order_by(_todos.c.position, _todos.c.id)
+    )
+    if versions:
+        query = query.with_for_update()
+    rows = db.execute(query).all()
+
+    # 2. 存在チェック（他のリストのToDo・論理削除されたToDoは対象外）
+    if len(rows) != len(todo_ids):
+        raise TodosNotFoundError("Some todos not found")
+    if versions:
+        conflicts = [todo_id for todo_id, _, version in rows if int(versions.get(todo_id, version)) != version]
+        if conflicts:
+            raise TodoVersionConflictError(conflicts)
+
+    # 3. 新しい順序の各IDに、既存のposition順の値を割り当て（主キー指定の一括UPDATEで1回の executemany にまとめる）
+    db.execute(
+        _UPDATE_POSITION,
+        [{"b_id": todo_id, "b_position": rows[i].position} for i, todo_id in enumerate(todo_ids)],
+    )
+    return {todo_id: version + 1 for todo_id, _, version in rows}
+
+
+def rebalance_positions(db: Session) -> int:
+    """
+    リストごとにpositionを現在の順序のまま 0, 1, 2, ... に振り直し、更新した件数を返す
+
+    削除や末尾への追加で生じた欠番・重複を解消する。値が変わる行のみ更新する。
+    """
+    rows = (
+        db.query(TodoModel.id, TodoModel.list_id, TodoModel.position)
+        .filter(NOT_DELETED)
+        .order_by(TodoModel.list_id, TodoModel.position, TodoModel.id)
+        .all()
+    )
+    changes = []
+    current_list, index = object(), 0
+    for todo_id, list_id, position in rows:
+        if list_id != current_list:
+            current_list, index = list_id, 0
+        if position != index:
+            changes.append({"b_id": todo_id, "b_position": index})
+        index += 1
+    for start in range(0, len(changes), REBALANCE_BATCH_SIZE):
+        db.execute(_UPDATE_POSITION, changes[start : start + REBALANCE_BATCH_SIZE])
+    return len(changes)
+
+
+def patch(
+    db: Session,
+    todo_id: int,
+    changes: Dict[str, Any],
+    tag_names: Optional[List[str]] = None,
+    expected_version: Optional[int] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    ToDoを部分更新し、(更新後のToDoの値, 変更があったか) を返す
+
+    値が変わるカラムだけを1回の UPDATE ... RETURNING で更新し、更新後の再読み込みは行わない。
+    値が変わらない場合は書き込まずに現在の値を返す（この場合のみ SELECT を1回実行する）。
+    完了状態・優先度・親を変更する場合は、変更前の値の読み取り（行ロック付き）と件数の集計の UPDATE を追加で実行する。
+
+    存在しない場合は TodosNotFoundError、expected_version と一致しない場合は TodoVersionConflictError
+    """
+    criteria = [_todos.c.id == todo_id, NOT_DELETED]
+    if expected_version is not None:
+        criteria.append(_todos.c.version == expected_version)
+
+    # タグは変わる場合のみ置き換え、ToDoのバージョンも上げる
+    tags = _changed_tags(db, todo_id, tag_names)
+    if tags is not None:
+        changed = true()
+    elif changes:
+        changed = or_(*[_todos.c[column].is_distinct_from(value) for column, value in changes.items()])
+    else:
+        changed = None
+
+    row = old = None
+    if changed is not None:
+        old = _lock_previous_values(db, criteria, changes)
+        row = db.execute(
+            update(_todos)
+            .where(*criteria, changed)
+            .values(**_patch_values(changes))
+            .returning(*_todos.c, tag_names_column(db).label("tag_names"))
+        ).first()
+
+    if row is None:
+        # 変更なし・バージョンの不一致・存在しないのいずれか（現在の値で判定する）
+        return todo_values(_current_row(db, todo_id, expected_version)), False
+
+    result = todo_values(row)
+    if tags is not None:
+        replace_todo_tags(db, todo_id, tags)
+        result["tags"] = sorted(tag.name for tag in tags)
+    _apply_patch_bookkeeping(db, changes, old, row)
+    return result, True
+
+
+def _changed_tags(db: Session, todo_id: int, tag_names: Optional[List[str]]) -> Optional[list]:
+    """置き換え後のタグ（指定がない場合・現在のタグと同じ場合は None）"""
+    if tag_names is None:
+        return None
+    tags = get_or_create_tags(db, tag_names)
+    if sorted(tag.name for tag in tags) == tag_names_by_todo(db, [todo_id]).get(todo_id, []):
+        return None
+    return tags
+
+
+def _lock_previous_values(db: Session, criteria: list, changes: Dict[str, Any]) -> Optional[Any]:
+    """
+    完了状態・優先度・親を変更する場合に、変更前の値を行ロック付きで読み取る（それ以外は None）
+
+    件数の集計の増減と変更前の親のロールアップに使う（UPDATEまで他の更新で変わらない）
+    """
+    if not {"completed", "priority", "parent_id"} & changes.keys():
+        return None
+    return db.execute(
+        select(_todos.c.parent_id, _todos.c.completed, _todos.c.priority).where(*criteria).with_for_update()
+    ).first()
+
+
+def _patch_values(changes: Dict[str, Any]) -> Dict[str, Any]:
+    """部分更新の UPDATE で設定する値（バージョン・完了日時・リストの移動に伴う position を含む）"""
+    values = dict(changes, version=_todos.c.version + 1)
+    if "completed" in changes:
+        values["completed_at"] = (
+            func.coalesce(_todos.c.completed_at, datetime.utcnow()) if changes["completed"] else None
+        )
+    if "list_id" in changes and "position" not in changes:
+        # 別のリストに移動する場合は移動先の末尾に追加する（末尾の position はUPDATE内のサブクエリで求める）
+        others = _todos.alias("others")
+        in_target = others.c.list_id.is_(None) if changes["list_id"] is None else others.c.list_id == changes["list_id"]
+        tail = (
+            select(func.coalesce(func.max(others.c.position) + 1, 0))
+            .where(in_target, others.c.deleted_at.is_(None))
+            .scalar_subquery()
+        )
+        values["position"] = case(
+            (_todos.c.list_id.is_distinct_from(changes["list_id"]), tail), else_=_todos.c.position
+        )
+    return values
+
+
+def _current_row(db: Session, todo_id: int, expected_version: Optional[int]) -> Any:
+    """更新しなかったToDoの現在の行（存在しない場合・バージョンが一致しない場合は例外）"""
+    row = db.execute(
+        select(*_todos.c, tag_names_column(db).label("tag_names")).where(_todos.c.id == todo_id, NOT_DELETED)
+    ).first()
+    if row is None:
+        raise TodosNotFoundError("Todo not found")
+    if expected_version is not None and row.version != expected_version:
+        raise TodoVersionConflictError([todo_id])
+    return row
+
+
+def _apply_patch_bookkeeping(db: Session, changes: Dict[str, Any], old: Optional[Any], row: Any) -> None:
+    """部分更新した行を件数の集計と親（と祖先）の完了状態に反映する"""
+    if old is not None:
+        # 件数の集計は変更前の値と UPDATE ... RETURNING の変更後の値から増減させる（変わらない場合は書き込まない）
+        apply_delta(db.connection(), transition_delta({row.id: (old.completed, old.priority)}, [row]))
+    # 完了状態・親の変更をロールアップする（親がない場合はクエリを発行しない）
+    roll_up_ids = {old.parent_id, row.parent_id} - {None} if "parent_id" in changes else set()
+    if "completed" in changes and row.parent_id is not None:
+        roll_up_ids.add(row.parent_id)
+    roll_up_completion(db, roll_up_ids)
+
+
+def todo_values(row) -> Dict[str, Any]:
+    """tag_names_column 付きの行をレスポンス用の値（tags はタグ名の一覧）に変換する"""
+    values = dict(row._mapping)
+    values["tags"] = split_tag_names(values.pop("tag_names"))
+    return values
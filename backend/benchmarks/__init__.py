@@ -0,0 +1,5 @@
+"""
+APIのホットパスのベンチマーク
+
+使い方は `python -m benchmarks --help` を参照。
+"""
@@ -0,0 +1,202 @@
+"""
+ベンチマークの計測とベースライン比較
+
+アプリケーションをプロセス内で起動（TestClient）し、指定したデータベースに対して
+各シナリオのレイテンシ（p50/p95/p99）とスループットを計測する。
+ネットワークやサーバープロセスの影響を除き、アプリケーションとDBのコストだけを比較できる。
+"""
+
+import json
+import math
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import BENCH_PASSWORD, bench_email
+
+
+@dataclass
+class ScenarioResult:
+    """1シナリオの計測結果"""
+
+    iterations: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    max_ms: float
+    rps: float
+
+
+@dataclass
+class BenchContext:
+    """シナリオ間で共有する状態"""
+
+    client: TestClient
+    headers: Dict[str, str]
+    todo_count: int
+    user_count: int
+    sample_ids: List[int] = field(default_factory=list)
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: Callable[[BenchContext, int], object]
+    iterations: Optional[int] = None
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """最近順位法によるパーセンタイル"""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(scenario: Scenario, ctx: BenchContext, iterations: int, warmup: int = 3) -> ScenarioResult:
+    """シナリオを繰り返し実行してレイテンシを計測"""
+    for i in range(warmup):
+        _check(scenario.run(ctx, i), scenario.name)
+
+    samples = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        response = scenario.run(ctx, warmup + i)
+        samples.append((time.perf_counter() - t0) * 1000)
+        _check(response, scenario.name)
+    elapsed = time.perf_counter() - started
+
+    return ScenarioResult(
+        iterations=iterations,
+        p50_ms=round(percentile(samples, 50), 3),
+        p95_ms=round(percentile(samples, 95), 3),
+        p99_ms=round(percentile(samples, 99), 3),
+        mean_ms=round(statistics.fmean(samples), 3),
+        max_ms=round(max(samples), 3),
+        rps=round(iterations / elapsed, 1) if elapsed else 0.0,
+    )
+
+
+def _check(response, name: str) -> None:
+    status = getattr(response, "status_code", 200)
+    if status >= 400:
+        raise RuntimeError(f"scenario '{name}' failed: {status} {response.text[:200]}")
+
+
+def _get(path: str) -> Callable[[BenchContext, int], object]:
+    def run(ctx: BenchContext, i: int):
+        return ctx.client.get(path.format(mid_page=max(1, ctx.todo_count // 40)), headers=ctx.headers)
+
+    return run
+
+
+def _reorder(ctx: BenchContext, i: int):
+    ids = ctx.sample_ids[:50]
+    return ctx.client.put("/api/todos/reorder", json={"todo_ids": list(reversed(ids))}, headers=ctx.headers)
+
+
+def _bulk_update(ctx: BenchContext, i: int):
+    action = "complete" if i % 2 == 0 else "incomplete"
+    return ctx.client.put(
+        "/api/todos/bulk", json={"todo_ids": ctx.sample_ids[:100], "action": action}, headers=ctx.headers
+    )
+
+
+def _create(ctx: BenchContext, i: int):
+    return ctx.client.post("/api/todos", json={"title": f"bench create {i}", "priority": i % 3}, headers=ctx.headers)
+
+
+def _login(ctx: BenchContext, i: int):
+    return ctx.client.post(
+        "/api/auth/login", data={"username": bench_email(i % ctx.user_count), "password": BENCH_PASSWORD}
+    )
+
+
+# 計測対象のシナリオ（get_todosはフィルタ・ソートの組み合わせごと）
+SCENARIOS: List[Scenario] = [
+    Scenario("get_todos_default", _get("/api/todos?page=1&limit=20")),
+    Scenario("get_todos_deep_page", _get("/api/todos?page={mid_page}&limit=20")),
+    Scenario("get_todos_search", _get("/api/todos?search=review&limit=20")),
+    Scenario("get_todos_status_completed", _get("/api/todos?status=completed&limit=20")),
+    Scenario("get_todos_status_incomplete", _get("/api/todos?status=incomplete&limit=20")),
+    Scenario("get_todos_priority", _get("/api/todos?priority=0&limit=20")),
+    Scenario("get_todos_sort_asc", _get("/api/todos?sort_by=asc&limit=20")),
+    Scenario("get_todos_sort_desc", _get("/api/todos?sort_by=desc&limit=20")),
+    Scenario("get_todos_combined", _get("/api/todos?status=incomplete&priority=0&sort_by=asc&search=fix&limit=20")),
+    Scenario("reorder_todos_50", _reorder),
+    Scenario("bulk_update_todos_100", _bulk_update),
+    Scenario("create_todo", _create),
+    # Argon2の検証を含むため回数を抑える
+    Scenario("login", _login, iterations=20),
+]
+
+
+def build_context(client: TestClient, db: Session, todo_count: int, user_count: int) -> BenchContext:
+    """ログインしてトークンとサンプルのToDo IDを用意する"""
+    from app.models.todo import Todo
+
+    response = client.post("/api/auth/login", data={"username": bench_email(0), "password": BENCH_PASSWORD})
+    _check(response, "login")
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    sample_ids = [row.id for row in db.query(Todo.id).order_by(Todo.position, Todo.id).limit(100)]
+    return BenchContext(client, headers, todo_count, user_count, sample_ids)
+
+
+def run_scenarios(ctx: BenchContext, iterations: int, only: Optional[List[str]] = None) -> Dict[str, ScenarioResult]:
+    """シナリオを順に計測する（onlyを指定した場合は名前に一致するもののみ）"""
+    results = {}
+    for scenario in SCENARIOS:
+        if only and not any(pattern in scenario.name for pattern in only):
+            continue
+        count = min(iterations, scenario.iterations) if scenario.iterations else iterations
+        results[scenario.name] = measure(scenario, ctx, count)
+    return results
+
+
+def compare(
+    results: Dict[str, dict], baseline: Dict[str, dict], threshold: float, min_delta_ms: float = 0.5
+) -> List[str]:
+    """
+    ベースラインと比較して劣化したシナリオを返す
+
+    p50またはp99がベースラインの (1 + threshold) 倍を超え、かつ差が min_delta_ms 以上の場合に劣化とみなす
+    （ごく短いレイテンシでの揺らぎを劣化と判定しないため）
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            current, previous = result[metric], base[metric]
+            if current > previous * (1 + threshold) and current - previous >= min_delta_ms:
+                change = current / previous - 1
+                regressions.append(f"{name}.{metric}: {previous:.2f}ms -> {current:.2f}ms (+{change:.0%})")
+    return regressions
+
+
+def results_to_dict(results: Dict[str, ScenarioResult]) -> Dict[str, dict]:
+    return {name: asdict(result) for name, result in results.items()}
+
+
+def load_baseline(path: str) -> Dict[str, dict]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def save_results(path: str, meta: dict, results: Dict[str, dict]) -> None:
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2, sort_keys=True)
+
+
+def format_table(results: Dict[str, dict]) -> str:
+    lines = [f"{'scenario':<32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'req/s':>9}"]
+    for name, r in results.items():
+        latencies = " ".join(f"{r[key]:>9.2f}" for key in ("p50_ms", "p95_ms", "p99_ms", "mean_ms"))
+        lines.append(f"{name:<32} {latencies} {r['rps']:>9.1f}")
+    return "\n".join(lines)
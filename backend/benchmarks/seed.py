@@ -0,0 +1,81 @@
+"""
+ベンチマーク用データの投入
+
+実運用に近い分布（完了率・優先度・説明文の有無・期限日）のToDoとユーザーを一括で投入する。
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.core.security import get_password_hash
+from app.models.todo import Todo
+from app.models.user import User
+
+# データセット名 -> (ToDo件数, ユーザー数)
+DATASETS = {
+    "1k": (1_000, 10),
+    "100k": (100_000, 1_000),
+    "1m": (1_000_000, 10_000),
+}
+
+BENCH_PASSWORD = "benchpassword"
+BATCH_SIZE = 10_000
+
+WORDS = ["buy", "write", "review", "call", "fix", "plan", "email", "read", "clean", "deploy", "meeting", "report"]
+
+
+def bench_email(index: int) -> str:
+    return f"bench{index}@example.com"
+
+
+def reset_schema(engine) -> None:
+    """テーブルを作り直す"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def is_seeded(db: Session, todo_count: int, user_count: int) -> bool:
+    """指定の件数のデータが投入済みかどうか"""
+    return (
+        db.query(func.count(Todo.id)).scalar() == todo_count and db.query(func.count(User.id)).scalar() == user_count
+    )
+
+
+def seed(db: Session, todo_count: int, user_count: int, random_seed: int = 42) -> None:
+    """
+    ユーザーとToDoを投入する
+
+    Argon2のハッシュ計算は1回だけ行い、全ユーザーで同じハッシュを使う。
+    """
+    rng = random.Random(random_seed)
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    now = datetime.utcnow()
+
+    for start in range(0, user_count, BATCH_SIZE):
+        rows = [
+            {"email": bench_email(i), "hashed_password": hashed_password, "is_active": True, "created_at": now}
+            for i in range(start, min(start + BATCH_SIZE, user_count))
+        ]
+        db.execute(insert(User), rows)
+
+    for start in range(0, todo_count, BATCH_SIZE):
+        rows = []
+        for i in range(start, min(start + BATCH_SIZE, todo_count)):
+            title = f"{rng.choice(WORDS)} {rng.choice(WORDS)} #{i}"
+            rows.append(
+                {
+                    "title": title,
+                    "description": f"details for {title}" if rng.random() < 0.5 else None,
+                    "completed": rng.random() < 0.6,
+                    "position": i,
+                    "priority": rng.choice([0, 1, 1, 2]),
+                    "due_date": now + timedelta(days=rng.randint(-30, 60)) if rng.random() < 0.4 else None,
+                }
+            )
+        db.execute(insert(Todo), rows)
+        db.commit()
+    db.commit()
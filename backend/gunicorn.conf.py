@@ -0,0 +1,116 @@
+"""
+本番用Gunicorn設定（Uvicornワーカー）
+
+起動方法:
+    gunicorn app.main:app -c gunicorn.conf.py
+
+環境変数:
+    PORT                     : 待ち受けポート（デフォルト: 8000）
+    WEB_CONCURRENCY          : ワーカー数（未指定の場合はCPU数とメモリ量から自動算出）
+    WORKER_MEMORY_MB         : ワーカー1つあたりの想定メモリ使用量（デフォルト: 256）
+    MAX_WORKERS              : 自動算出時のワーカー数の上限（デフォルト: 8）
+    GUNICORN_MAX_REQUESTS    : このリクエスト数を処理したワーカーを再起動する（デフォルト: 1000、0で無効）
+    GUNICORN_TIMEOUT         : 応答のないワーカーを再起動するまでの秒数（デフォルト: 60）
+    GUNICORN_GRACEFUL_TIMEOUT: 終了シグナル後に処理中のリクエストを待つ秒数（デフォルト: 30）
+"""
+
+import multiprocessing
+import os
+
+
+def _memory_limit_bytes():
+    """コンテナのメモリ上限（cgroup）またはホストの物理メモリ量を取得"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # 上限なしの場合は "max" または非常に大きな値になる
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_workers():
+    """
+    ワーカー数を算出する
+
+    CPUバウンドな処理（JSONシリアライズ、パスワードハッシュ等）が中心のため、
+    CPU数 × 2 + 1 を基本とし、メモリ量に収まる数とMAX_WORKERSで制限する。
+    """
+    cpu_based = multiprocessing.cpu_count() * 2 + 1
+    workers = min(cpu_based, int(os.getenv("MAX_WORKERS", "8")))
+
+    memory_limit = _memory_limit_bytes()
+    if memory_limit:
+        worker_memory = int(os.getenv("WORKER_MEMORY_MB", "256")) * 1024 * 1024
+        workers = min(workers, memory_limit // worker_memory)
+
+    return max(1, workers)
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or default_workers()
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# 親プロセスでアプリケーションを読み込んでからフォークする（起動の高速化とメモリ共有）
+# DB接続やキャッシュなどのプロセス内状態はフォーク後に app.core.process_state でリセットされる
+preload_app = True
+
+# メモリ使用量の増加を抑えるため、一定数のリクエストを処理したワーカーを再起動する
+# （ジッターで全ワーカーが同時に再起動しないようにする）
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = max(1, max_requests // 10) if max_requests else 0
+
+# グレースフルシャットダウン: 終了シグナル受信後、処理中のリクエストの完了を待つ
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    """
+    ワーカーの起動前に設定を確認する
+
+    複数ワーカーではプロセス内（memory）の保存先がワーカー間で共有されないため、
+    共有しないと正しく動かないものは無効にする（ワーカーはこの後フォークされ、変更後の設定を引き継ぐ）
+    """
+    from app.core.config import settings
+
+    server.log.info(f"Starting {workers} workers (max_requests={max_requests}, preload_app={preload_app})")
+    if workers <= 1:
+        return
+    if settings.RATE_LIMIT_BACKEND != "redis":
+        server.log.warning(
+            "RATE_LIMIT_BACKEND is not 'redis': rate limit counters are per worker, "
+            "so the effective limit is multiplied by the number of workers"
+        )
+    # 無効化は書き込みを処理したワーカーのキャッシュにしか届かず、他のワーカーはTTLまで古いページを返すため無効にする
+    if settings.CACHE_ENABLED and settings.CACHE_BACKEND != "redis":
+        server.log.warning(
+            "CACHE_BACKEND is not 'redis': invalidation would only reach the worker that handled the write, "
+            "so the todo list cache is disabled"
+        )
+        settings.CACHE_ENABLED = False
+    # 再送が別のワーカーに届くと再実行されるため、全ワーカーで共有するデータベースに保存する
+    if settings.IDEMPOTENCY_ENABLED and settings.IDEMPOTENCY_BACKEND == "memory":
+        server.log.warning(
+            "IDEMPOTENCY_BACKEND is 'memory': retries handled by another worker would run again, "
+            "so idempotency keys are stored in the database instead"
+        )
+        settings.IDEMPOTENCY_BACKEND = "database"
+
+
+def post_fork(server, worker):
+    """フォーク直後の子プロセスで、親プロセスから引き継いだ接続やキャッシュを破棄する"""
+    from app.core.process_state import reset_process_state
+
+    reset_process_state()
@@ -0,0 +1,98 @@
+"""
+インポート時間のプロファイルレポート
+
+`python -X importtime` の出力を集計し、起動時間に大きく影響している
+モジュールを累積時間の順に表示する。
+
+使い方:
+    python scripts/importtime_report.py                  # app.main を計測
+    python scripts/importtime_report.py -m app.endpoints.todo --top 30
+    python scripts/importtime_report.py --json report.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List
+
+# "import time:       123 |       4567 |   package.module"
+LINE_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def run_importtime(module: str) -> str:
+    """別プロセスでモジュールをインポートし、-X importtime の出力を返す"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr}")
+    return result.stderr
+
+
+def parse_importtime(output: str) -> List[Dict]:
+    """-X importtime の出力をパースする"""
+    entries = []
+    for line in output.splitlines():
+        match = LINE_PATTERN.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        entries.append(
+            {
+                "module": name,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": len(indent) // 2,
+            }
+        )
+    return entries
+
+
+def summarize(entries: List[Dict]) -> Dict:
+    """トップレベルのパッケージごとの自己時間と全体の合計を集計する"""
+    packages: Dict[str, int] = {}
+    for entry in entries:
+        top_level = entry["module"].split(".")[0]
+        packages[top_level] = packages.get(top_level, 0) + entry["self_us"]
+    return {
+        "total_us": sum(entry["self_us"] for entry in entries),
+        "module_count": len(entries),
+        "packages": dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="python -X importtime のサマリーを表示する")
+    parser.add_argument("-m", "--module", default="app.main", help="計測するモジュール（デフォルト: app.main）")
+    parser.add_argument("--top", type=int, default=20, help="表示する件数")
+    parser.add_argument("--json", dest="json_path", help="結果をJSONファイルに保存する")
+    args = parser.parse_args()
+
+    entries = parse_importtime(run_importtime(args.module))
+    summary = summarize(entries)
+
+    print(f"import {args.module}: {summary['total_us'] / 1000:.1f} ms ({summary['module_count']} modules)")
+    print()
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for entry in sorted(entries, key=lambda e: e["cumulative_us"], reverse=True)[: args.top]:
+        print(f"{entry['cumulative_us'] / 1000:>14.1f} {entry['self_us'] / 1000:>9.1f}  {entry['module']}")
+    print()
+    print(f"{'self ms':>14}  package")
+    for package, self_us in list(summary["packages"].items())[: args.top]:
+        print(f"{self_us / 1000:>14.1f}  {package}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"module": args.module, "summary": summary, "entries": entries}, f, indent=2)
+        print(f"\nsaved: {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
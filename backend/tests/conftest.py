@@ -4,13 +4,18 @@
 
 print(">>> conftest.py がimportされた")
 
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.core.database import Base, get_db
+from app.core.config import settings
+from app.core.database import Base, get_db, get_read_db
+from app.core.process_state import reset_process_state as reset_all_process_state
+from app.core.query_counter import count_engine_queries
 from app.core.security import get_password_hash
 from app.main import app
 from app.models.user import User
@@ -26,6 +31,20 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def reset_process_state():
+    """テスト間でプロセス内の状態（レート制限カウンター等）を持ち越さない"""
+    reset_all_process_state()
+    yield
+    reset_all_process_state()
+
+
+@pytest.fixture(autouse=True)
+def disable_job_runner(monkeypatch):
+    """TestClientの起動時にバックグラウンドのジョブランナーを動かさない（テストでは明示的に実行する）"""
+    monkeypatch.setattr(settings, "JOB_RUNNER_ENABLED", False)
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """
@@ -57,6 +76,7 @@ def client(db_session):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     with TestClient(app) as test_client:
         print("6. TestClient が作成され、テスト関数に渡される直前")
         yield test_client
@@ -91,3 +111,23 @@ def auth_headers(client, test_user):
     )
     token = response.json()["access_token"]
     return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def assert_max_queries():
+    """
+    ブロック内で実行されたSQLクエリ数が上限以下であることを検証する
+
+    使い方:
+        with assert_max_queries(3):
+            client.get("/api/todos", headers=auth_headers)
+    """
+
+    @contextmanager
+    def _assert_max_queries(limit: int):
+        with count_engine_queries(engine) as stats:
+            yield stats
+        statements = "\n".join(stats.statements)
+        assert stats.count <= limit, f"{stats.count} queries executed (max {limit}):\n{statements}"
+
+    return _assert_max_queries
@@ -0,0 +1,132 @@
+"""
+テスト用のRedis代替実装
+
+redis-pyクライアントのうちアプリケーションが使用するコマンドだけを
+プロセス内のdictで再現する。値はredis-pyと同様にbytesで返す。
+"""
+
+import fnmatch
+import threading
+import time
+
+
+def _to_bytes(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+class FakeRedis:
+    """redis.Redisのインメモリ代替"""
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+
+    def _expire_if_needed(self, key):
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+
+    def get(self, key):
+        with self._lock:
+            self._expire_if_needed(key)
+            return self._data.get(key)
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        with self._lock:
+            self._expire_if_needed(key)
+            if nx and key in self._data:
+                return None
+            self._data[key] = _to_bytes(value)
+            self._expires.pop(key, None)
+            if ex is not None:
+                self._expires[key] = time.monotonic() + ex
+            elif px is not None:
+                self._expires[key] = time.monotonic() + px / 1000
+            return True
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            self._expire_if_needed(key)
+            value = int(self._data.get(key, b"0")) + amount
+            self._data[key] = _to_bytes(value)
+            return value
+
+    def expire(self, key, seconds):
+        with self._lock:
+            self._expire_if_needed(key)
+            if key not in self._data:
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+    def ttl(self, key):
+        with self._lock:
+            self._expire_if_needed(key)
+            if key not in self._data:
+                return -2
+            deadline = self._expires.get(key)
+            return -1 if deadline is None else max(0, int(deadline - time.monotonic()))
+
+    def exists(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._expire_if_needed(key)
+            return sum(1 for key in keys if key in self._data)
+
+    def delete(self, *keys):
+        with self._lock:
+            deleted = 0
+            for key in keys:
+                self._expires.pop(key, None)
+                if self._data.pop(key, None) is not None:
+                    deleted += 1
+            return deleted
+
+    def scan_iter(self, match="*"):
+        with self._lock:
+            keys = list(self._data)
+        for key in keys:
+            if fnmatch.fnmatchcase(key, match) and self.get(key) is not None:
+                yield key
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def ping(self):
+        return True
+
+
+class FakePipeline:
+    """コマンドを溜めてexecute()でまとめて実行するパイプライン"""
+
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        with self._client._lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._commands = []
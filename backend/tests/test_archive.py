@@ -0,0 +1,186 @@
+"""
+完了済みToDoのアーカイブのテスト
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.services.job_handlers  # noqa: F401  ジョブの処理を登録
+from app.core.jobs import JobRunner, enqueue
+from app.models.job import Job
+from app.models.todo import Todo, TodoArchive
+from app.models.todo_stats import read_stats, rebuild_values
+from app.services import archive as archive_module
+from app.services import todos as todo_service
+from app.services.archive import archive_completed
+from tests.conftest import TestingSessionLocal
+
+
+def _add_todo(db_session, title: str, completed_days_ago=None, position: int = 0) -> Todo:
+    todo = Todo(title=title, completed=completed_days_ago is not None, position=position, priority=1)
+    db_session.add(todo)
+    db_session.flush()
+    if completed_days_ago is not None:
+        todo.completed_at = datetime.utcnow() - timedelta(days=completed_days_ago)
+    db_session.commit()
+    return todo
+
+
+def _assert_stats_consistent(db_session) -> None:
+    assert read_stats(db_session.connection()) == rebuild_values(db_session.connection())
+
+
+class TestCompletedAt:
+    """完了日時の記録のテストクラス"""
+
+    def test_set_and_cleared(self, client, auth_headers, db_session):
+        """完了にすると完了日時が記録され、未完了に戻すと消えることを確認"""
+        todo = _add_todo(db_session, "task")
+        response = client.put(f"/api/todos/{todo.id}", json={"title": "task", "completed": True}, headers=auth_headers)
+        completed_at = response.json()["completed_at"]
+        assert completed_at is not None
+
+        # 完了済みのまま更新しても完了日時は変わらない
+        response = client.put(f"/api/todos/{todo.id}", json={"title": "renamed"}, headers=auth_headers)
+        assert response.json()["completed_at"] == completed_at
+
+        response = client.put(f"/api/todos/{todo.id}", json={"title": "task", "completed": False}, headers=auth_headers)
+        assert response.json()["completed_at"] is None
+
+    def test_bulk_update(self, client, auth_headers, db_session):
+        """一括操作でも完了日時が記録・消去されることを確認"""
+        todo = _add_todo(db_session, "task")
+        client.put("/api/todos/bulk", json={"todo_ids": [todo.id], "action": "complete"}, headers=auth_headers)
+        db_session.expire_all()
+        assert db_session.get(Todo, todo.id).completed_at is not None
+
+        client.put("/api/todos/bulk", json={"todo_ids": [todo.id], "action": "incomplete"}, headers=auth_headers)
+        db_session.expire_all()
+        assert db_session.get(Todo, todo.id).completed_at is None
+
+
+class TestArchiveCompleted:
+    """アーカイブ処理のテストクラス"""
+
+    def test_moves_only_old_completed(self, db_session):
+        """完了から一定期間が経過したToDoだけが移動されることを確認"""
+        old_id = _add_todo(db_session, "old", completed_days_ago=40).id
+        recent = _add_todo(db_session, "recent", completed_days_ago=1)
+        active = _add_todo(db_session, "active")
+
+        assert archive_completed(db_session, datetime.utcnow() - timedelta(days=30)) == 1
+
+        db_session.expire_all()
+        assert {todo.id for todo in db_session.query(Todo)} == {recent.id, active.id}
+        archived = db_session.query(TodoArchive).one()
+        assert (archived.id, archived.title, archived.completed) == (old_id, "old", True)
+        assert archived.archived_at is not None
+
+    def test_batches(self, db_session, assert_max_queries):
+        """バッチ単位で移動され、全件が移動されることを確認"""
+        for i in range(5):
+            _add_todo(db_session, f"old {i}", completed_days_ago=40)
+
+        # バッチごとに SELECT（ロック） / INSERT / タグの DELETE / DELETE / 集計の更新（最後に対象なしの SELECT）
+        with assert_max_queries(3 * 5 + 1):
+            assert archive_completed(db_session, datetime.utcnow(), batch_size=2) == 5
+        assert db_session.query(Todo).count() == 0
+        assert db_session.query(TodoArchive).count() == 5
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            {"completed": False, "completed_at": None},
+            {"completed_at": datetime(2100, 1, 1)},
+            {"deleted_at": datetime(2000, 1, 1)},
+        ],
+    )
+    def test_skips_changed_after_select(self, db_session, monkeypatch, change):
+        """対象の選択後に未完了に戻された・完了日時が変わった・論理削除されたToDoは移動しないことを確認"""
+        changed_id = _add_todo(db_session, "changed", completed_days_ago=40).id
+        moved_id = _add_todo(db_session, "moved", completed_days_ago=40).id
+
+        lock_batch = archive_module._lock_batch
+
+        def lock_then_change(db, completed_before, batch_size):
+            ids = lock_batch(db, completed_before, batch_size)
+            # 選択とアーカイブの間に他のリクエストが変更した状況を再現する
+            if "deleted_at" in change:
+                todo_service.soft_delete(db, [changed_id])
+            else:
+                todo = db.get(Todo, changed_id)
+                for key, value in change.items():
+                    setattr(todo, key, value)
+                db.flush()
+            return ids
+
+        monkeypatch.setattr(archive_module, "_lock_batch", lock_then_change)
+        assert archive_completed(db_session, datetime.utcnow() - timedelta(days=30)) == 1
+
+        db_session.expire_all()
+        assert [todo.id for todo in db_session.query(TodoArchive)] == [moved_id]
+        assert db_session.get(Todo, changed_id) is not None
+        _assert_stats_consistent(db_session)
+
+    def test_skips_parent_with_new_child(self, db_session, monkeypatch):
+        """対象の選択後にサブタスクが追加されたToDoは移動しない（子も削除されない）ことを確認"""
+        parent = _add_todo(db_session, "parent", completed_days_ago=40)
+        lock_batch = archive_module._lock_batch
+
+        def lock_then_add_child(db, completed_before, batch_size):
+            ids = lock_batch(db, completed_before, batch_size)
+            if db.query(Todo).count() == 1:
+                db.add(Todo(title="child", position=1, parent_id=parent.id))
+                db.flush()
+            return ids
+
+        monkeypatch.setattr(archive_module, "_lock_batch", lock_then_add_child)
+        assert archive_completed(db_session, datetime.utcnow() - timedelta(days=30)) == 0
+
+        db_session.expire_all()
+        assert db_session.query(TodoArchive).count() == 0
+        assert sorted(todo.title for todo in db_session.query(Todo)) == ["child", "parent"]
+
+    def test_job(self, db_session):
+        """ジョブとして実行できることを確認"""
+        _add_todo(db_session, "old", completed_days_ago=40)
+        enqueue(db_session, "todos.archive_completed", {"after_days": 30})
+        db_session.commit()
+
+        JobRunner(session_factory=TestingSessionLocal).run_pending()
+        db_session.expire_all()
+        assert db_session.query(Job).one().result == {"archived": 1}
+        assert db_session.query(TodoArchive).count() == 1
+
+
+class TestArchivedListing:
+    """アーカイブ済みToDoの一覧取得のテストクラス"""
+
+    @pytest.fixture
+    def todos(self, db_session):
+        archived = _add_todo(db_session, "archived", completed_days_ago=40, position=0)
+        active = _add_todo(db_session, "active", position=1)
+        archive_completed(db_session, datetime.utcnow() - timedelta(days=30))
+        return archived, active
+
+    def test_default_excludes_archived(self, client, auth_headers, todos):
+        """通常の一覧にはアーカイブ済みのToDoが含まれないことを確認"""
+        body = client.get("/api/todos", headers=auth_headers).json()
+        assert [todo["title"] for todo in body["data"]] == ["active"]
+        assert body["data"][0]["archived"] is False
+
+    def test_status_archived(self, client, auth_headers, todos):
+        """status=archived でアーカイブ済みのToDoだけを取得できることを確認"""
+        body = client.get("/api/todos?status=archived", headers=auth_headers).json()
+        assert body["total"] == 1
+        assert body["data"][0]["title"] == "archived"
+        assert body["data"][0]["archived"] is True
+
+    def test_include_archived(self, client, auth_headers, todos):
+        """include_archived で両方を含めて取得でき、フィルタも適用されることを確認"""
+        body = client.get("/api/todos?include_archived=true", headers=auth_headers).json()
+        assert [(todo["title"], todo["archived"]) for todo in body["data"]] == [("archived", True), ("active", False)]
+
+        body = client.get("/api/todos?include_archived=true&status=completed", headers=auth_headers).json()
+        assert [todo["title"] for todo in body["data"]] == ["archived"]
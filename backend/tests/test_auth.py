@@ -2,10 +2,16 @@
 認証エンドポイントのテスト
 """
 
+from datetime import datetime, timedelta
+
 import pytest
+from sqlalchemy import event
 
-from app.core.security import get_password_hash
+from app.core.security import create_access_token, decode_token, get_password_hash, hash_refresh_token
+from app.core.token_revocation import revoke_user_tokens, token_version_cache
+from app.models.refresh_token import RefreshToken
 from app.models.user import User
+from tests.conftest import engine as test_engine
 
 
 class TestAuthEndpoints:
@@ -137,3 +143,180 @@ class TestAuthEndpoints:
             data={"username": "hashtest@example.com", "password": "plainpassword"},
         )
         assert response.status_code == 200
+
+
+class TestRefreshToken:
+    """リフレッシュトークンのテストクラス"""
+
+    def _login(self, client):
+        response = client.post(
+            "/api/auth/login",
+            data={"username": "test@example.com", "password": "testpassword"},
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def test_login_returns_refresh_token(self, client, test_user, db_session):
+        """ログインでリフレッシュトークンが発行され、ハッシュのみが保存されることを確認"""
+        tokens = self._login(client)
+        assert tokens["refresh_token"]
+
+        stored = db_session.query(RefreshToken).one()
+        assert stored.token_hash == hash_refresh_token(tokens["refresh_token"])
+        assert stored.token_hash != tokens["refresh_token"]
+
+    def test_refresh_issues_new_tokens_without_password_hashing(self, client, test_user, monkeypatch):
+        """リフレッシュでパスワード検証なしに新しいトークンが発行されることを確認"""
+        tokens = self._login(client)
+
+        from app.endpoints import auth
+
+        def fail(*args):
+            raise AssertionError("password hashing must not run on refresh")
+
+        monkeypatch.setattr(auth, "verify_password", fail)
+        monkeypatch.setattr(auth, "get_password_hash", fail)
+
+        response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 200
+        refreshed = response.json()
+        assert refreshed["refresh_token"] != tokens["refresh_token"]
+
+        response = client.get("/api/auth/me", headers={"Authorization": f"Bearer {refreshed['access_token']}"})
+        assert response.status_code == 200
+        assert response.json()["email"] == "test@example.com"
+
+    def test_reused_refresh_token_revokes_family(self, client, test_user):
+        """使用済みリフレッシュトークンの再利用でファミリー全体が失効することを確認"""
+        tokens = self._login(client)
+        rotated = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+
+        # 使用済みトークンの再利用は拒否される
+        response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 401
+
+        # ローテーション後のトークンも失効している
+        response = client.post("/api/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+        assert response.status_code == 401
+
+    def test_expired_refresh_token(self, client, test_user, db_session):
+        """期限切れのリフレッシュトークンが拒否されることを確認"""
+        tokens = self._login(client)
+        stored = db_session.query(RefreshToken).one()
+        stored.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db_session.commit()
+
+        response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 401
+
+    def test_refresh_inactive_user(self, client, test_user, db_session):
+        """無効化されたユーザーはリフレッシュできないことを確認"""
+        tokens = self._login(client)
+        test_user.is_active = False
+        db_session.commit()
+
+        response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 401
+
+    def test_unknown_refresh_token(self, client):
+        """存在しないリフレッシュトークンが拒否されることを確認"""
+        response = client.post("/api/auth/refresh", json={"refresh_token": "unknown"})
+        assert response.status_code == 401
+
+    def test_logout_revokes_refresh_token(self, client, test_user):
+        """ログアウト後はリフレッシュできないことを確認"""
+        tokens = self._login(client)
+        response = client.post("/api/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 200
+
+        response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 401
+
+
+class TestTokenClaims:
+    """アクセストークンのクレームによる認証のテストクラス"""
+
+    def test_token_contains_claims(self, client, test_user):
+        """アクセストークンにユーザーID・有効フラグ・トークンバージョンが含まれることを確認"""
+        response = client.post(
+            "/api/auth/login",
+            data={"username": "test@example.com", "password": "testpassword"},
+        )
+        payload = decode_token(response.json()["access_token"])
+        assert payload["uid"] == test_user.id
+        assert payload["act"] is True
+        assert payload["ver"] == 0
+
+    def test_trusted_claims_skip_users_query(self, client, auth_headers):
+        """キャッシュが有効な間は読み取り系エンドポイントでusersテーブルを参照しないことを確認"""
+        client.get("/api/todos", headers=auth_headers)
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(test_engine, "before_cursor_execute", record)
+        try:
+            # 一覧のページキャッシュに当たらないよう別のページを取得する
+            response = client.get("/api/todos?page=2", headers=auth_headers)
+        finally:
+            event.remove(test_engine, "before_cursor_execute", record)
+
+        assert response.status_code == 200
+        assert statements
+        assert not any("FROM users" in statement for statement in statements)
+
+    def test_logout_all_revokes_access_tokens(self, client, auth_headers):
+        """すべてのセッションからのログアウトで発行済みのアクセストークンが失効することを確認"""
+        assert client.get("/api/todos", headers=auth_headers).status_code == 200
+
+        response = client.post("/api/auth/logout-all", headers=auth_headers)
+        assert response.status_code == 200
+
+        assert client.get("/api/todos", headers=auth_headers).status_code == 401
+        assert client.get("/api/auth/me", headers=auth_headers).status_code == 401
+
+    def test_deactivation_applied_after_cache_window(self, client, auth_headers, test_user, db_session, monkeypatch):
+        """ユーザーの無効化がキャッシュの有効期間経過後に反映されることを確認"""
+        assert client.get("/api/todos", headers=auth_headers).status_code == 200
+
+        test_user.is_active = False
+        db_session.commit()
+
+        # キャッシュの有効期間内は以前の状態のまま
+        assert client.get("/api/todos", headers=auth_headers).status_code == 200
+
+        monkeypatch.setattr(token_version_cache, "ttl_seconds", 0)
+        assert client.get("/api/todos", headers=auth_headers).status_code == 400
+
+    @pytest.mark.parametrize(
+        "claims",
+        [
+            pytest.param({}, id="no_uid_or_ver"),
+            pytest.param({"ver": 0}, id="no_uid"),
+            pytest.param({"uid": None}, id="no_ver"),
+        ],
+    )
+    def test_legacy_token_rejected(self, client, test_user, claims):
+        """ユーザーIDとトークンバージョンを含まない旧形式のトークンが拒否されることを確認"""
+        data = {"sub": test_user.email, **claims}
+        if "uid" in data:
+            data["uid"] = test_user.id
+        token = create_access_token(data=data)
+        headers = {"Authorization": f"Bearer {token}"}
+        assert client.get("/api/auth/me", headers=headers).status_code == 401
+        assert client.get("/api/todos", headers=headers).status_code == 401
+        assert client.post("/api/auth/logout-all", headers=headers).status_code == 401
+
+    def test_revocation_invalidates_cache_after_commit(self, test_user, db_session):
+        """トークンバージョンのキャッシュがコミット後に無効化されることを確認"""
+        assert token_version_cache.get(test_user.id, db_session) == (0, True)
+
+        revoke_user_tokens(db_session, test_user)
+        db_session.flush()
+        # コミットまでは無効化しない（並行するリクエストが古いバージョンを再びキャッシュしないように）
+        assert token_version_cache.get(test_user.id, db_session) == (0, True)
+        db_session.commit()
+
+        assert token_version_cache.get(test_user.id, db_session) == (1, True)
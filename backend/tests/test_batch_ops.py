@@ -0,0 +1,153 @@
+"""
+複数の操作の一括実行（POST /api/todos/batch-ops）のテスト
+"""
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.models.todo import NOT_DELETED, Todo
+from app.services import todos as todo_service
+
+
+def _batch(client, headers, operations, mode="transaction"):
+    return client.post("/api/todos/batch-ops", json={"operations": operations, "mode": mode}, headers=headers)
+
+
+class TestBatchOps:
+    """一括実行のテストクラス"""
+
+    def test_mixed_operations(self, client, auth_headers, db_session):
+        """作成・更新・並び替え・削除を順に実行し、ref で作成したToDoを参照できることを確認"""
+        existing = client.post("/api/todos", json={"title": "existing"}, headers=auth_headers).json()
+        operations = [
+            {"op": "create", "ref": "a", "data": {"title": "offline a"}},
+            {"op": "create", "ref": "b", "data": {"title": "offline b"}},
+            {"op": "update", "id": "a", "data": {"completed": True}},
+            {"op": "reorder", "todo_ids": ["b", "a", existing["id"]]},
+            {"op": "delete", "id": existing["id"]},
+        ]
+        response = _batch(client, auth_headers, operations)
+        body = response.json()
+        assert body["committed"] is True
+        assert [result["status"] for result in body["results"]] == [201, 201, 200, 200, 200]
+        created_id = body["results"][0]["todo"]["id"]
+        assert body["results"][2]["todo"]["id"] == created_id
+        assert body["results"][2]["todo"]["completed"] is True
+
+        db_session.expire_all()
+        todos = db_session.query(Todo).filter(NOT_DELETED).order_by(Todo.position).all()
+        assert [(todo.title, todo.completed) for todo in todos] == [("offline b", False), ("offline a", True)]
+
+    def test_single_auth_and_commit(self, client, auth_headers, assert_max_queries):
+        """認証が1回のみで、操作の件数に比例したクエリ以外が発生しないことを確認"""
+        client.post("/api/todos", json={"title": "first"}, headers=auth_headers)  # 集計の行を作成しておく
+        operations = [{"op": "create", "data": {"title": f"todo {i}"}} for i in range(10)]
+        # ユーザー / 作成ごとの末尾の position・INSERT・集計の更新
+        with assert_max_queries(1 + 10 * 3) as stats:
+            assert _batch(client, auth_headers, operations).json()["committed"] is True
+        assert sum("FROM users" in statement for statement in stats.statements) == 1
+
+    def test_transaction_mode_rolls_back(self, client, auth_headers, db_session):
+        """transaction モードでは失敗があれば全体がロールバックされ、以降の操作は実行されないことを確認"""
+        operations = [
+            {"op": "create", "data": {"title": "a"}},
+            {"op": "update", "id": 9999, "data": {"title": "missing"}},
+            {"op": "create", "data": {"title": "b"}},
+        ]
+        body = _batch(client, auth_headers, operations).json()
+        assert body["committed"] is False
+        assert [result["status"] for result in body["results"]] == [424, 404, 424]
+        db_session.expire_all()
+        assert db_session.query(Todo).count() == 0
+
+    def test_transaction_mode_reports_rolled_back(self, client, auth_headers, db_session):
+        """途中で失敗した場合、先行して成功した操作も 424 となり、保存されていないToDoを返さないことを確認"""
+        todo = client.post("/api/todos", json={"title": "task"}, headers=auth_headers).json()
+        operations = [
+            {"op": "create", "ref": "a", "data": {"title": "a"}},
+            {"op": "update", "id": todo["id"], "data": {"completed": True}},
+            {"op": "reorder", "todo_ids": ["a", todo["id"]]},
+            {"op": "delete", "id": 9999},
+            {"op": "create", "data": {"title": "b"}},
+        ]
+        body = _batch(client, auth_headers, operations).json()
+        assert body["committed"] is False
+        assert [result["status"] for result in body["results"]] == [424, 424, 424, 404, 424]
+        for result in body["results"][:3]:
+            assert (result["todo"], result["versions"]) == (None, None)
+            assert result["detail"] == "Rolled back because a later operation failed"
+        assert body["results"][0]["ref"] == "a"
+
+        db_session.expire_all()
+        assert [(row.title, row.completed) for row in db_session.query(Todo)] == [("task", False)]
+
+    def test_savepoint_mode_database_error(self, client, auth_headers, db_session, monkeypatch):
+        """savepoint モードで操作がDBのエラーになっても、その操作だけが失敗し、他の操作はコミットされることを確認"""
+        todo = client.post("/api/todos", json={"title": "task"}, headers=auth_headers).json()
+
+        def violate_constraint(db, todo_ids):
+            raise IntegrityError("DELETE FROM todos", {}, Exception("FOREIGN KEY constraint failed"))
+
+        monkeypatch.setattr(todo_service, "soft_delete", violate_constraint)
+        operations = [
+            {"op": "create", "data": {"title": "a"}},
+            {"op": "delete", "id": todo["id"]},
+            {"op": "create", "data": {"title": "b"}},
+        ]
+        response = _batch(client, auth_headers, operations, mode="savepoint")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["committed"] is True
+        assert [result["status"] for result in body["results"]] == [201, 422, 201]
+        assert body["results"][1]["todo"] is None
+
+        db_session.expire_all()
+        assert sorted(todo.title for todo in db_session.query(Todo)) == ["a", "b", "task"]
+
+    def test_transaction_mode_database_error(self, client, auth_headers, db_session, monkeypatch):
+        """transaction モードで操作がDBのエラーになった場合も、全体をロールバックして操作ごとの結果を返すことを確認"""
+        todo = client.post("/api/todos", json={"title": "task"}, headers=auth_headers).json()
+
+        def stale(*args, **kwargs):
+            raise StaleDataError("UPDATE statement on table 'todos' expected to update 1 row(s); 0 were matched.")
+
+        monkeypatch.setattr(todo_service, "patch", stale)
+        operations = [
+            {"op": "create", "data": {"title": "a"}},
+            {"op": "update", "id": todo["id"], "data": {"title": "renamed"}},
+        ]
+        body = _batch(client, auth_headers, operations).json()
+        assert body["committed"] is False
+        assert [result["status"] for result in body["results"]] == [424, 409]
+
+        db_session.expire_all()
+        assert [todo.title for todo in db_session.query(Todo)] == ["task"]
+
+    def test_savepoint_mode_keeps_successes(self, client, auth_headers, db_session):
+        """savepoint モードでは失敗した操作だけが取り消されることを確認"""
+        todo = client.post("/api/todos", json={"title": "task"}, headers=auth_headers).json()
+        operations = [
+            {"op": "create", "data": {"title": "a"}},
+            {"op": "update", "id": todo["id"], "data": {"title": "stale", "version": 99}},
+            {"op": "update", "id": "unknown", "data": {"title": "x"}},
+            {"op": "create", "data": {"title": "b"}},
+        ]
+        body = _batch(client, auth_headers, operations, mode="savepoint").json()
+        assert body["committed"] is True
+        assert [result["status"] for result in body["results"]] == [201, 409, 400, 201]
+        assert body["results"][1]["detail"]["current"]["title"] == "task"
+
+        db_session.expire_all()
+        assert sorted(todo.title for todo in db_session.query(Todo)) == ["a", "b", "task"]
+
+    def test_validation(self, client, auth_headers, monkeypatch):
+        """不明な操作や上限を超える操作数は受け付けないことを確認"""
+        response = _batch(client, auth_headers, [{"op": "archive", "id": 1}])
+        assert response.status_code == 422
+
+        monkeypatch.setattr("app.endpoints.todo.settings.BATCH_OPS_MAX_OPERATIONS", 1)
+        operations = [{"op": "delete", "id": 1}, {"op": "delete", "id": 2}]
+        assert _batch(client, auth_headers, operations).status_code == 400
+
+    def test_requires_auth(self, client):
+        assert _batch(client, {}, []).status_code == 401
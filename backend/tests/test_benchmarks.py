@@ -0,0 +1,46 @@
+"""
+ベンチマークハーネスのテスト
+"""
+
+import pytest
+
+from benchmarks import harness
+from benchmarks.seed import seed
+
+
+class TestBenchmarkHarness:
+    """ベンチマークの集計とベースライン比較のテストクラス"""
+
+    def test_percentile(self):
+        """最近順位法でパーセンタイルが計算されることを確認"""
+        samples = [float(i) for i in range(1, 101)]
+        assert harness.percentile(samples, 50) == 50.0
+        assert harness.percentile(samples, 99) == 99.0
+        assert harness.percentile([3.0], 99) == 3.0
+
+    def test_compare_detects_regression(self):
+        """閾値を超えて劣化したシナリオが検出されることを確認"""
+        baseline = {"get_todos": {"p50_ms": 10.0, "p99_ms": 20.0}, "login": {"p50_ms": 200.0, "p99_ms": 250.0}}
+        results = {
+            "get_todos": {"p50_ms": 13.0, "p99_ms": 21.0},
+            "login": {"p50_ms": 210.0, "p99_ms": 260.0},
+            "new_scenario": {"p50_ms": 1.0, "p99_ms": 1.0},
+        }
+        regressions = harness.compare(results, baseline, threshold=0.2)
+        assert len(regressions) == 1
+        assert regressions[0].startswith("get_todos.p50_ms")
+
+    def test_compare_ignores_small_absolute_changes(self):
+        """ごく短いレイテンシの揺らぎは劣化とみなさないことを確認"""
+        regressions = harness.compare({"a": {"p50_ms": 0.4, "p99_ms": 0.4}}, {"a": {"p50_ms": 0.2, "p99_ms": 0.2}}, 0.2)
+        assert regressions == []
+
+    @pytest.mark.slow
+    def test_scenarios_run_against_api(self, client, db_session):
+        """すべてのシナリオが現在のAPIに対して成功することを確認（スモークテスト）"""
+        seed(db_session, todo_count=120, user_count=2)
+        ctx = harness.build_context(client, db_session, todo_count=120, user_count=2)
+
+        results = harness.run_scenarios(ctx, iterations=2)
+        assert set(results) == {scenario.name for scenario in harness.SCENARIOS}
+        assert all(result.p50_ms > 0 for result in results.values())
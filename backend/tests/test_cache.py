@@ -0,0 +1,187 @@
+"""
+キャッシュとToDo一覧のページキャッシュのテスト
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import TODOS_NAMESPACE, Cache, InMemoryCacheBackend, RedisCacheBackend, get_cache
+from app.core.config import settings
+from app.core.redis_client import set_redis
+from app.models.todo import Todo
+from tests.fake_redis import FakeRedis
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "redis":
+        return RedisCacheBackend(FakeRedis())
+    return InMemoryCacheBackend()
+
+
+class TestCache:
+    """キャッシュ本体のテストクラス（memory / redis の両バックエンド）"""
+
+    def test_get_or_load(self, backend):
+        """2回目以降はloaderを呼ばずにキャッシュから返すことを確認"""
+        cache = Cache(backend)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return b"value"
+
+        assert cache.get_or_load("ns", "key", loader) == b"value"
+        assert cache.get_or_load("ns", "key", loader) == b"value"
+        assert len(calls) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_bump_version_invalidates(self, backend):
+        """バージョンを上げると既存のエントリが使われなくなることを確認"""
+        cache = Cache(backend)
+        cache.get_or_load("ns", "key", lambda: b"old")
+        cache.bump_version("ns")
+        assert cache.version("ns") == 1
+        assert cache.get_or_load("ns", "key", lambda: b"new") == b"new"
+        # 他の名前空間には影響しない
+        assert cache.version("other") == 0
+
+    def test_ttl(self, backend):
+        """有効期間を過ぎたエントリが使われないことを確認"""
+        cache = Cache(backend, ttl=0.05)
+        cache.get_or_load("ns", "key", lambda: b"old")
+        time.sleep(0.1)
+        assert cache.get_or_load("ns", "key", lambda: b"new") == b"new"
+
+    def test_single_flight(self, backend):
+        """同じキーの同時のキャッシュミスでloaderが1回だけ呼ばれることを確認"""
+        cache = Cache(backend)
+        calls = []
+        results = []
+        started = threading.Barrier(5)
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.1)
+            return b"value"
+
+        def worker():
+            started.wait()
+            results.append(cache.get_or_load("ns", "key", loader))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [b"value"] * 5
+
+    def test_lock_timeout_loads_anyway(self, backend):
+        """ロックを持つリクエストが応答しない場合、待ち時間の経過後に自分で読み込むことを確認"""
+        cache = Cache(backend, lock_timeout=0.05)
+        backend.add("lock:ns:v0:key", b"other", 10)
+        assert cache.get_or_load("ns", "key", lambda: b"value") == b"value"
+
+    def test_backend_error_fails_open(self):
+        """バックエンドの障害時はキャッシュを使わずに読み込むことを確認"""
+
+        class BrokenBackend:
+            def get(self, key):
+                raise ConnectionError("down")
+
+            def incr(self, key):
+                raise ConnectionError("down")
+
+        cache = Cache(BrokenBackend())
+        assert cache.get_or_load("ns", "key", lambda: b"value") == b"value"
+        cache.bump_version("ns")
+
+    def test_in_memory_lru(self):
+        """memoryバックエンドが件数上限を超えると古いエントリから破棄することを確認"""
+        backend = InMemoryCacheBackend(max_entries=2)
+        backend.set("a", b"1")
+        backend.set("b", b"2")
+        backend.get("a")
+        backend.set("c", b"3")
+        assert backend.get("a") == b"1"
+        assert backend.get("b") is None
+
+
+class TestTodoListCache:
+    """ToDo一覧のページキャッシュのテストクラス"""
+
+    @pytest.fixture(params=["memory", "redis"])
+    def cache_backend(self, request, monkeypatch):
+        monkeypatch.setattr(settings, "CACHE_BACKEND", request.param)
+        if request.param == "redis":
+            set_redis(FakeRedis())
+        return request.param
+
+    def _add_todo(self, db_session, title: str) -> Todo:
+        todo = Todo(title=title, completed=False, position=0, priority=1)
+        db_session.add(todo)
+        db_session.commit()
+        return todo
+
+    def test_cached_page_skips_database(self, cache_backend, client, auth_headers, db_session, assert_max_queries):
+        """同じ条件の2回目の一覧取得でDBにアクセスしないことを確認"""
+        self._add_todo(db_session, "cached")
+        first = client.get("/api/todos?search=cache", headers=auth_headers)
+
+        with assert_max_queries(0):
+            second = client.get("/api/todos?search=cache", headers=auth_headers)
+
+        assert second.status_code == 200
+        assert second.headers["content-type"] == "application/json"
+        assert second.json() == first.json()
+        assert get_cache().hits == 1
+        if cache_backend == "redis":
+            assert isinstance(get_cache().backend, RedisCacheBackend)
+
+    def test_key_includes_filters(self, cache_backend, client, auth_headers, db_session):
+        """フィルタやページが異なる場合は別のエントリになることを確認"""
+        self._add_todo(db_session, "alpha")
+        assert client.get("/api/todos?search=alpha", headers=auth_headers).json()["total"] == 1
+        assert client.get("/api/todos?search=beta", headers=auth_headers).json()["total"] == 0
+
+    @pytest.mark.parametrize(
+        "mutate",
+        [
+            lambda client, headers, todo: client.post("/api/todos", json={"title": "new"}, headers=headers),
+            lambda client, headers, todo: client.put(f"/api/todos/{todo.id}", json={"title": "new"}, headers=headers),
+            lambda client, headers, todo: client.delete(f"/api/todos/{todo.id}", headers=headers),
+            lambda client, headers, todo: client.put(
+                "/api/todos/bulk", json={"todo_ids": [todo.id], "action": "complete"}, headers=headers
+            ),
+            lambda client, headers, todo: client.put(
+                "/api/todos/reorder", json={"todo_ids": [todo.id]}, headers=headers
+            ),
+        ],
+        ids=["create", "update", "delete", "bulk", "reorder"],
+    )
+    def test_mutations_invalidate(self, cache_backend, client, auth_headers, db_session, mutate):
+        """ToDoを変更するエンドポイントがキャッシュを無効にすることを確認"""
+        todo = self._add_todo(db_session, "existing")
+        client.get("/api/todos", headers=auth_headers)
+        version = get_cache().version(TODOS_NAMESPACE)
+
+        assert mutate(client, auth_headers, todo).status_code == 200
+        assert get_cache().version(TODOS_NAMESPACE) == version + 1
+
+    def test_reflects_mutation(self, cache_backend, client, auth_headers):
+        """変更後の一覧取得で変更内容が反映されることを確認"""
+        assert client.get("/api/todos", headers=auth_headers).json()["total"] == 0
+        client.post("/api/todos", json={"title": "new"}, headers=auth_headers)
+        assert client.get("/api/todos", headers=auth_headers).json()["total"] == 1
+
+    def test_disabled(self, client, auth_headers, monkeypatch):
+        """CACHE_ENABLED=Falseの場合はキャッシュを使わないことを確認"""
+        monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+        client.get("/api/todos", headers=auth_headers)
+        client.get("/api/todos", headers=auth_headers)
+        assert cache_module._cache is None
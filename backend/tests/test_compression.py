@@ -0,0 +1,126 @@
+"""
+レスポンス圧縮ミドルウェアのテスト
+"""
+
+import gzip
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, parse_accept_encoding, select_encoding
+from app.models.todo import Todo
+
+LARGE_BODY = "todo " * 1000
+
+
+def create_test_app(**options) -> FastAPI:
+    """圧縮ミドルウェアだけを組み込んだテスト用アプリ"""
+    test_app = FastAPI()
+    test_app.add_middleware(CompressionMiddleware, minimum_size=500, proxy_header="X-Proxy-Compression", **options)
+
+    @test_app.get("/large")
+    def large():
+        return PlainTextResponse(LARGE_BODY)
+
+    @test_app.get("/small")
+    def small():
+        return PlainTextResponse("ok")
+
+    @test_app.get("/stream")
+    def stream():
+        def generate():
+            for i in range(3):
+                yield f"chunk-{i} " * 100
+
+        return StreamingResponse(generate(), media_type="text/plain")
+
+    return test_app
+
+
+class TestAcceptEncoding:
+    """Accept-Encodingの解析テスト"""
+
+    def test_parse_quality_values(self):
+        """q値が解析されることを確認"""
+        assert parse_accept_encoding("gzip;q=0.8, br") == {"gzip": 0.8, "br": 1.0}
+
+    def test_prefers_brotli(self):
+        """Brotliが利用可能な場合は優先されることを確認"""
+        assert select_encoding("gzip, br", brotli_available=True) == "br"
+        assert select_encoding("gzip, br", brotli_available=False) == "gzip"
+
+    def test_respects_quality(self):
+        """q値が高いエンコーディングが選ばれることを確認"""
+        assert select_encoding("br;q=0.5, gzip", brotli_available=True) == "gzip"
+        assert select_encoding("gzip;q=0, identity", brotli_available=True) is None
+        assert select_encoding("*", brotli_available=False) == "gzip"
+
+
+class TestCompressionMiddleware:
+    """圧縮ミドルウェアのテストクラス"""
+
+    def test_gzip_large_response(self):
+        """閾値以上のレスポンスがgzip圧縮されることを確認"""
+        client = TestClient(create_test_app())
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) < len(LARGE_BODY)
+        assert response.text == LARGE_BODY
+
+    @pytest.mark.skipif(compression.brotli is None, reason="Brotliがインストールされていない")
+    def test_brotli_large_response(self):
+        """Brotli対応クライアントにはBrotliで圧縮されることを確認"""
+        client = TestClient(create_test_app())
+        response = client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+        assert response.headers["content-encoding"] == "br"
+        assert response.text == LARGE_BODY
+
+    def test_small_response_not_compressed(self):
+        """閾値未満のレスポンスは圧縮されないことを確認"""
+        client = TestClient(create_test_app())
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.text == "ok"
+
+    def test_identity_when_not_accepted(self):
+        """圧縮を受け入れないクライアントには圧縮しないことを確認"""
+        client = TestClient(create_test_app())
+        response = client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.text == LARGE_BODY
+
+    def test_proxy_header_disables_compression(self):
+        """プロキシが圧縮する場合はアプリ側で圧縮しないことを確認"""
+        client = TestClient(create_test_app())
+        response = client.get("/large", headers={"Accept-Encoding": "gzip", "X-Proxy-Compression": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_streaming_response(self):
+        """ストリーミングレスポンスがチャンクごとに圧縮されることを確認"""
+        client = TestClient(create_test_app(gzip_level=6))
+        with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            assert "content-length" not in response.headers
+            raw_chunks = [chunk for chunk in response.iter_raw() if chunk]
+
+        # 各チャンクがフラッシュされているため、途中までのデータでも展開できる
+        decompressor = zlib.decompressobj(31)
+        first = decompressor.decompress(raw_chunks[0])
+        assert first.startswith(b"chunk-0")
+        assert gzip.decompress(b"".join(raw_chunks)).decode() == "".join(f"chunk-{i} " * 100 for i in range(3))
+
+    def test_todo_list_compressed(self, client, auth_headers, db_session):
+        """ToDo一覧のレスポンスが圧縮されることを確認"""
+        for i in range(50):
+            db_session.add(Todo(title=f"Todo {i}", description="description " * 5, position=i, priority=1))
+        db_session.commit()
+
+        response = client.get("/api/todos?limit=50", headers={**auth_headers, "Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()["data"]) == 50
@@ -0,0 +1,73 @@
+"""
+期限日による検索のテスト
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.todo import Todo
+
+
+@pytest.fixture
+def todos(db_session):
+    now = datetime.utcnow()
+    rows = [
+        Todo(title="overdue", completed=False, position=0, priority=1, due_date=now - timedelta(days=1)),
+        Todo(title="tomorrow", completed=False, position=1, priority=1, due_date=now + timedelta(days=1)),
+        Todo(title="next month", completed=False, position=2, priority=1, due_date=now + timedelta(days=30)),
+        Todo(title="no due date", completed=False, position=3, priority=1),
+        Todo(title="done", completed=True, position=4, priority=1, due_date=now + timedelta(days=2)),
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+def _titles(response):
+    body = response.json()
+    return [todo["title"] for todo in (body["data"] if isinstance(body, dict) else body)]
+
+
+class TestDueDateFilters:
+    """一覧の期限日フィルタ・ソートのテストクラス"""
+
+    def test_overdue(self, client, auth_headers, todos):
+        """overdue で期限切れの未完了のToDoだけを取得できることを確認"""
+        assert _titles(client.get("/api/todos?overdue=true", headers=auth_headers)) == ["overdue"]
+
+    def test_due_range(self, client, auth_headers, todos):
+        """due_after / due_before で期限日の範囲を指定できることを確認"""
+        now = datetime.utcnow()
+        params = {"due_after": now.isoformat(), "due_before": (now + timedelta(days=7)).isoformat(), "limit": 10}
+        assert _titles(client.get("/api/todos", params=params, headers=auth_headers)) == ["tomorrow", "done"]
+
+    def test_sort_by_due_date(self, client, auth_headers, todos):
+        """sort_by=due_date で期限日の近い順に並び、期限日のないToDoが末尾になることを確認"""
+        response = client.get("/api/todos?sort_by=due_date&limit=10", headers=auth_headers)
+        assert _titles(response) == ["overdue", "tomorrow", "done", "next month", "no due date"]
+
+
+class TestUpcoming:
+    """期限が近いToDoの取得のテストクラス"""
+
+    def test_upcoming(self, client, auth_headers, todos):
+        """指定日数以内に期限が来る未完了のToDoだけを期限日順に返すことを確認"""
+        assert _titles(client.get("/api/todos/upcoming?days=7", headers=auth_headers)) == ["tomorrow"]
+        assert _titles(client.get("/api/todos/upcoming?days=60", headers=auth_headers)) == ["tomorrow", "next month"]
+
+    def test_requires_auth(self, client):
+        """認証なしでは取得できないことを確認"""
+        assert client.get("/api/todos/upcoming").status_code == 401
+
+    def test_uses_partial_index(self, client, auth_headers, todos, db_session, assert_max_queries):
+        """期限が近いToDoの検索が部分インデックスを使うことを確認"""
+        # ユーザー / ToDo / タグ
+        with assert_max_queries(3) as stats:
+            client.get("/api/todos/upcoming", headers=auth_headers)
+        statement = next(statement for statement in stats.statements if "FROM todos" in statement)
+        # 実行計画はパラメーターの値によらないため、ダミーの値で確認する
+        parameters = tuple(datetime.utcnow() if i < 2 else 10 for i in range(statement.count("?")))
+        connection = db_session.connection().connection
+        plan = " ".join(str(row) for row in connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters))
+        assert "ix_todos_due_date_incomplete" in plan
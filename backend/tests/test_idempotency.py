@@ -0,0 +1,211 @@
+"""
+冪等キー（Idempotency-Key ヘッダー）のテスト
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.responses import JSONResponse
+
+import app.services.job_handlers  # noqa: F401  ジョブの処理を登録
+from app.core import idempotency as idempotency_module
+from app.core.cache import InMemoryCacheBackend, RedisCacheBackend
+from app.core.idempotency import DatabaseIdempotencyBackend, IdempotencyConflictError, IdempotencyStore, StoredResponse
+from app.core.jobs import JobRunner, enqueue
+from app.core.security import get_password_hash
+from app.models.idempotency_key import IdempotencyKey
+from app.models.job import Job
+from app.models.todo import Todo
+from app.models.user import User
+from tests.conftest import TestingSessionLocal
+from tests.fake_redis import FakeRedis
+
+
+@pytest.fixture(params=["memory", "redis", "database"])
+def backend(request, db_session):
+    if request.param == "redis":
+        return RedisCacheBackend(FakeRedis(), prefix="idempotency")
+    if request.param == "database":
+        return DatabaseIdempotencyBackend(TestingSessionLocal)
+    return InMemoryCacheBackend()
+
+
+def _call(calls: list, status_code: int = 201):
+    async def call():
+        calls.append(1)
+        return JSONResponse({"id": len(calls)}, status_code=status_code, headers={"ETag": '"1"'})
+
+    return call
+
+
+class TestIdempotencyStore:
+    """冪等キーの保存先のテストクラス（memory / redis / database の各バックエンド）"""
+
+    async def test_replays_stored_response(self, backend):
+        """同じキーの2回目以降は処理を実行せず、保存したレスポンスを返すことを確認"""
+        store, calls = IdempotencyStore(backend), []
+        first = await store.run("1:key", "fp", _call(calls))
+        second = await store.run("1:key", "fp", _call(calls))
+        assert calls == [1]
+        assert (second.status_code, second.body, second.headers["etag"]) == (201, first.body, '"1"')
+        assert second.headers["idempotent-replayed"] == "true"
+
+    async def test_failure_not_stored(self, backend):
+        """失敗したレスポンス・例外は保存されず、再送で再実行されることを確認"""
+        store, calls = IdempotencyStore(backend), []
+        assert (await store.run("1:key", "fp", _call(calls, 404))).status_code == 404
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await store.run("1:key", "fp", broken)
+        assert (await store.run("1:key", "fp", _call(calls))).status_code == 201
+        assert calls == [1, 1]
+
+    async def test_different_request(self, backend):
+        """内容の異なるリクエストに同じキーを使うと 422 となることを確認"""
+        store, calls = IdempotencyStore(backend), []
+        await store.run("1:key", "fp", _call(calls))
+        with pytest.raises(IdempotencyConflictError) as e:
+            await store.run("1:key", "other", _call(calls))
+        assert e.value.status_code == 422
+
+    async def test_in_progress_timeout(self, backend):
+        """処理中のまま待ち時間を超えた場合は 409 となることを確認"""
+        store = IdempotencyStore(backend, lock_timeout=0.2)
+        backend.add("1:key", StoredResponse("fp").encode(), 30)
+        with pytest.raises(IdempotencyConflictError) as e:
+            await store.run("1:key", "fp", _call([]))
+        assert e.value.status_code == 409
+
+    async def test_ttl(self, backend):
+        """保存したレスポンスは有効期間の経過後に消えることを確認"""
+        store, calls = IdempotencyStore(backend, ttl=0.1), []
+        await store.run("1:key", "fp", _call(calls))
+        await asyncio.sleep(0.2)
+        await store.run("1:key", "fp", _call(calls))
+        assert calls == [1, 1]
+
+
+class TestConcurrentRetries:
+    """同じキーの同時の再送のテストクラス"""
+
+    @pytest.mark.parametrize("redis", [False, True])
+    async def test_executed_once(self, redis):
+        """同時に届いた同じキーのリクエストは1回だけ実行され、全員が同じレスポンスを受け取ることを確認"""
+        backend = RedisCacheBackend(FakeRedis()) if redis else InMemoryCacheBackend()
+        store, calls = IdempotencyStore(backend), []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.2)
+            return JSONResponse({"id": 1}, status_code=201)
+
+        responses = await asyncio.gather(*[store.run("1:key", "fp", slow) for _ in range(5)])
+        assert calls == [1]
+        assert {(response.status_code, bytes(response.body)) for response in responses} == {(201, b'{"id":1}')}
+
+
+class TestIdempotentEndpoints:
+    """ToDoのエンドポイントでの冪等キーのテストクラス"""
+
+    def test_create_retry(self, client, auth_headers, db_session, assert_max_queries):
+        """同じキーでの作成の再送は重複を作らず、データベースにアクセスせずに同じレスポンスを返すことを確認"""
+        headers = {**auth_headers, "Idempotency-Key": "create-1"}
+        first = client.post("/api/todos", json={"title": "task"}, headers=headers)
+        with assert_max_queries(0):
+            retry = client.post("/api/todos", json={"title": "task"}, headers=headers)
+        assert retry.json() == first.json()
+        assert (retry.headers["ETag"], retry.headers["Idempotent-Replayed"]) == (first.headers["ETag"], "true")
+        assert db_session.query(Todo).count() == 1
+
+        # 別のキーでは新しく作成される
+        client.post("/api/todos", json={"title": "task"}, headers={**auth_headers, "Idempotency-Key": "create-2"})
+        assert db_session.query(Todo).count() == 2
+
+    def test_bulk_retry(self, client, auth_headers, db_session):
+        """一括操作の再送は再実行されないことを確認"""
+        todo_id = client.post("/api/todos", json={"title": "task"}, headers=auth_headers).json()["id"]
+        headers = {**auth_headers, "Idempotency-Key": "bulk-1"}
+        body = {"todo_ids": [todo_id], "action": "complete"}
+        first = client.put("/api/todos/bulk", json=body, headers=headers)
+        client.patch(f"/api/todos/{todo_id}", json={"completed": False}, headers=auth_headers)
+
+        retry = client.put("/api/todos/bulk", json=body, headers=headers)
+        assert retry.json() == first.json()
+        db_session.expire_all()
+        assert db_session.get(Todo, todo_id).completed is False
+
+    def test_different_body(self, client, auth_headers):
+        """同じキーで内容の異なるリクエストは 422 となることを確認"""
+        headers = {**auth_headers, "Idempotency-Key": "key"}
+        client.post("/api/todos", json={"title": "a"}, headers=headers)
+        response = client.post("/api/todos", json={"title": "b"}, headers=headers)
+        assert response.status_code == 422
+
+    def test_failure_retried(self, client, auth_headers):
+        """失敗したリクエストは保存されず、再送で再実行されることを確認"""
+        headers = {**auth_headers, "Idempotency-Key": "missing"}
+        for _ in range(2):
+            response = client.put("/api/todos/bulk", json={"todo_ids": [999], "action": "complete"}, headers=headers)
+            assert response.status_code == 404
+            assert "Idempotent-Replayed" not in response.headers
+
+    def test_scoped_per_user(self, client, auth_headers, db_session):
+        """キーはユーザーごとに区別されることを確認"""
+        db_session.add(User(email="other@example.com", hashed_password=get_password_hash("password")))
+        db_session.commit()
+        login = client.post("/api/auth/login", data={"username": "other@example.com", "password": "password"})
+        other_headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        client.post("/api/todos", json={"title": "task"}, headers={**auth_headers, "Idempotency-Key": "same"})
+        response = client.post(
+            "/api/todos", json={"title": "task"}, headers={**other_headers, "Idempotency-Key": "same"}
+        )
+        assert "Idempotent-Replayed" not in response.headers
+        assert db_session.query(Todo).count() == 2
+
+    def test_invalid_key(self, client, auth_headers):
+        """長すぎるキーは 400 となることを確認"""
+        response = client.post(
+            "/api/todos", json={"title": "a"}, headers={**auth_headers, "Idempotency-Key": "x" * 256}
+        )
+        assert response.status_code == 400
+
+    def test_unauthenticated(self, client):
+        """トークンが無効な場合はエンドポイントの認証エラーを返すことを確認"""
+        response = client.post("/api/todos", json={"title": "a"}, headers={"Idempotency-Key": "key"})
+        assert response.status_code == 401
+
+    def test_database_backend(self, client, auth_headers, db_session, monkeypatch):
+        """database バックエンドでも再送に保存したレスポンスを返すことを確認"""
+        store = IdempotencyStore(DatabaseIdempotencyBackend(TestingSessionLocal))
+        monkeypatch.setattr(idempotency_module, "_store", store)
+        headers = {**auth_headers, "Idempotency-Key": "create-1"}
+        first = client.post("/api/todos", json={"title": "task"}, headers=headers)
+        retry = client.post("/api/todos", json={"title": "task"}, headers=headers)
+        assert retry.json() == first.json()
+        assert db_session.query(Todo).count() == db_session.query(IdempotencyKey).count() == 1
+
+
+class TestPurgeIdempotencyKeys:
+    """期限切れの冪等キーの削除のテストクラス"""
+
+    def test_job(self, db_session):
+        """有効期限切れの行だけが削除されることを確認"""
+        now = datetime.utcnow()
+        db_session.add_all(
+            [
+                IdempotencyKey(key="1:old", value=b"x", expires_at=now - timedelta(seconds=1)),
+                IdempotencyKey(key="1:new", value=b"x", expires_at=now + timedelta(hours=1)),
+            ]
+        )
+        enqueue(db_session, "maintenance.purge_idempotency_keys", {})
+        db_session.commit()
+
+        JobRunner(session_factory=TestingSessionLocal).run_pending()
+        db_session.expire_all()
+        assert db_session.query(Job).one().result == {"deleted": 1}
+        assert [row.key for row in db_session.query(IdempotencyKey)] == ["1:new"]
@@ -0,0 +1,312 @@
+"""
+バックグラウンドジョブのテスト
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.services.job_handlers  # noqa: F401  ジョブの処理を登録
+from app.core.config import settings
+from app.core.jobs import JobRunner, PermanentJobError, RecurringJob, enqueue, job_handler
+from app.core.security import get_password_hash
+from app.models.job import JOB_FAILED, JOB_PENDING, JOB_RUNNING, JOB_SUCCEEDED, Job
+from app.models.refresh_token import RefreshToken
+from app.models.todo import Todo
+from app.models.todo_list import TodoList
+from app.models.user import User
+from tests.conftest import TestingSessionLocal
+
+calls = []
+
+
+@job_handler("test.record")
+def record(db, payload):
+    calls.append(payload)
+    return {"ok": True}
+
+
+@job_handler("test.fail")
+def fail(db, payload):
+    raise RuntimeError("boom")
+
+
+@job_handler("test.permanent")
+def permanent(db, payload):
+    raise PermanentJobError("invalid")
+
+
+@pytest.fixture
+def runner(db_session):
+    calls.clear()
+    return JobRunner(session_factory=TestingSessionLocal, concurrency=1, poll_interval=0.01)
+
+
+def _add_todos(db_session, positions):
+    todos = [
+        Todo(title=f"Todo {i}", completed=False, position=position, priority=1) for i, position in enumerate(positions)
+    ]
+    db_session.add_all(todos)
+    db_session.commit()
+    return [todo.id for todo in todos]
+
+
+class TestJobRunner:
+    """ジョブの実行のテストクラス"""
+
+    def test_run_job(self, runner, db_session):
+        """登録したジョブが実行され、結果が保存されることを確認"""
+        job = enqueue(db_session, "test.record", {"value": 1})
+        db_session.commit()
+
+        assert runner.run_pending() == 1
+        db_session.refresh(job)
+        assert job.status == JOB_SUCCEEDED
+        assert job.result == {"ok": True}
+        assert job.attempts == 1
+        assert calls == [{"value": 1}]
+
+    def test_future_job_not_run(self, runner, db_session):
+        """実行予定時刻前のジョブは実行されないことを確認"""
+        enqueue(db_session, "test.record", run_at=datetime.utcnow() + timedelta(hours=1))
+        db_session.commit()
+        assert runner.run_pending() == 0
+
+    def test_failed_job_retried_then_failed(self, runner, db_session, monkeypatch):
+        """失敗したジョブがバックオフ後に再実行され、上限回数で失敗となることを確認"""
+        monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+        job = enqueue(db_session, "test.fail")
+        db_session.commit()
+
+        assert runner.run_pending() == 1
+        db_session.refresh(job)
+        assert job.status == JOB_PENDING
+        assert job.run_at > datetime.utcnow()
+        assert "RuntimeError: boom" in job.error
+
+        job.run_at = datetime.utcnow()
+        db_session.commit()
+        assert runner.run_pending() == 1
+        db_session.refresh(job)
+        assert job.status == JOB_FAILED
+        assert job.attempts == 2
+
+    def test_unknown_job_type(self, runner, db_session):
+        """処理が登録されていないジョブは再実行せず、1回目で失敗となることを確認"""
+        job = enqueue(db_session, "test.unknown")
+        db_session.commit()
+        assert runner.run_pending() == 1
+        db_session.refresh(job)
+        assert (job.status, job.attempts) == (JOB_FAILED, 1)
+        assert job.finished_at is not None
+        assert "No handler registered" in job.error
+
+    @pytest.mark.parametrize(
+        ("job_type", "payload", "error"),
+        [
+            ("test.permanent", {}, "PermanentJobError: invalid"),
+            ("todos.bulk_update", {"todo_ids": [9999], "action": "complete"}, "TodosNotFoundError"),
+            ("todos.bulk_update", {"todo_ids": [1]}, "KeyError: 'action'"),
+        ],
+    )
+    def test_non_retryable_errors(self, runner, db_session, job_type, payload, error):
+        """再実行しても成功しないエラー（対象なし・ペイロード不正等）は1回目で失敗となることを確認"""
+        job = enqueue(db_session, job_type, payload)
+        db_session.commit()
+        assert runner.run_pending() == 1
+        db_session.refresh(job)
+        assert (job.status, job.attempts) == (JOB_FAILED, 1)
+        assert error in job.error
+
+    def test_claim_is_exclusive(self, runner, db_session):
+        """同じジョブを複数回取得できないことを確認"""
+        enqueue(db_session, "test.record")
+        db_session.commit()
+
+        first, second = TestingSessionLocal(), TestingSessionLocal()
+        try:
+            assert runner.claim(first) is not None
+            assert runner.claim(second) is None
+        finally:
+            first.close()
+            second.close()
+
+    def test_recurring_job_scheduled_once_per_slot(self, db_session):
+        """定期実行ジョブが時間枠ごとに1回だけ登録されることを確認（複数ワーカーでも重複しない）"""
+        recurring = [RecurringJob("test.record", interval_seconds=60)]
+        workers = [JobRunner(TestingSessionLocal, recurring=recurring) for _ in range(2)]
+        now = datetime(2026, 1, 1, 12, 0, 10)
+
+        for worker in workers:
+            worker.schedule_recurring(now)
+            worker.schedule_recurring(now + timedelta(seconds=30))
+        assert db_session.query(Job).count() == 1
+
+        workers[0].schedule_recurring(now + timedelta(seconds=60))
+        assert db_session.query(Job).count() == 2
+
+    def test_requeue_stale(self, runner, db_session):
+        """タイムアウトした実行中のジョブが実行待ちに戻されることを確認"""
+        job = enqueue(db_session, "test.record")
+        job.status = JOB_RUNNING
+        job.started_at = datetime.utcnow() - timedelta(seconds=runner.timeout + 1)
+        db_session.commit()
+
+        assert runner.requeue_stale() == 1
+        assert runner.run_pending() == 1
+
+    async def test_async_runner(self, runner, db_session):
+        """イベントループ上のランナーがジョブを実行し、stop()で終了することを確認"""
+        job = enqueue(db_session, "test.record", {"value": "async"})
+        db_session.commit()
+
+        task = asyncio.create_task(runner.run())
+        for _ in range(200):
+            if calls:
+                break
+            await asyncio.sleep(0.01)
+        runner.stop()
+        await asyncio.wait_for(task, 5)
+
+        db_session.refresh(job)
+        assert job.status == JOB_SUCCEEDED
+
+
+class TestAsyncBulkEndpoints:
+    """一括操作のジョブ化のテストクラス"""
+
+    @pytest.fixture(autouse=True)
+    def low_threshold(self, monkeypatch):
+        monkeypatch.setattr(settings, "BULK_ASYNC_THRESHOLD", 2)
+
+    def test_bulk_update_returns_202(self, client, auth_headers, db_session, runner):
+        """閾値を超える一括操作が202とジョブIDを返し、ジョブで実行されることを確認"""
+        todo_ids = _add_todos(db_session, [0, 1, 2])
+        response = client.put(
+            "/api/todos/bulk", json={"todo_ids": todo_ids, "action": "complete"}, headers=auth_headers
+        )
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert response.json()["status_url"] == f"/api/jobs/{job_id}"
+
+        assert client.get(f"/api/jobs/{job_id}", headers=auth_headers).json()["status"] == JOB_PENDING
+
+        runner.run_pending()
+        body = client.get(f"/api/jobs/{job_id}", headers=auth_headers).json()
+        assert body["status"] == JOB_SUCCEEDED
+        assert body["result"] == {"action": "complete", "count": 3}
+        db_session.expire_all()
+        assert all(todo.completed for todo in db_session.query(Todo))
+
+    def test_small_bulk_stays_synchronous(self, client, auth_headers, db_session):
+        """閾値以下の一括操作は同期的に処理されることを確認"""
+        todo_ids = _add_todos(db_session, [0, 1])
+        response = client.put(
+            "/api/todos/bulk", json={"todo_ids": todo_ids, "action": "complete"}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert len(response.json()["updated_todos"]) == 2
+
+    def test_reorder_returns_202(self, client, auth_headers, db_session, runner):
+        """閾値を超える並び替えがジョブで実行されることを確認"""
+        todo_ids = _add_todos(db_session, [0, 1, 2])
+        response = client.put("/api/todos/reorder", json={"todo_ids": list(reversed(todo_ids))}, headers=auth_headers)
+        assert response.status_code == 202
+
+        runner.run_pending()
+        db_session.expire_all()
+        positions = dict(db_session.query(Todo.id, Todo.position))
+        assert [positions[todo_id] for todo_id in reversed(todo_ids)] == [0, 1, 2]
+
+    def test_reorder_other_users_list(self, client, auth_headers, db_session):
+        """他のユーザーのリストの並び替えは、件数によらずジョブを登録せずに404となることを確認"""
+        other = User(email="other@example.com", hashed_password=get_password_hash("password"))
+        db_session.add(other)
+        db_session.commit()
+        todo_list = TodoList(user_id=other.id, name="Other")
+        db_session.add(todo_list)
+        db_session.commit()
+        todo_ids = _add_todos(db_session, [0, 1, 2])
+        db_session.query(Todo).update({Todo.list_id: todo_list.id})
+        db_session.commit()
+
+        response = client.put(
+            "/api/todos/reorder", json={"todo_ids": todo_ids, "list_id": todo_list.id}, headers=auth_headers
+        )
+        assert response.status_code == 404
+        assert db_session.query(Job).count() == 0
+
+    def test_reorder_job_checks_owner(self, db_session, runner):
+        """並び替えのジョブが、登録したユーザーの所有していないリストを更新しないことを確認"""
+        owner = User(email="owner@example.com", hashed_password=get_password_hash("password"))
+        db_session.add(owner)
+        db_session.commit()
+        todo_list = TodoList(user_id=owner.id, name="Owner")
+        db_session.add(todo_list)
+        db_session.commit()
+        todo_ids = _add_todos(db_session, [0, 1, 2])
+        db_session.query(Todo).update({Todo.list_id: todo_list.id})
+        payload = {"todo_ids": list(reversed(todo_ids)), "list_id": todo_list.id, "user_id": owner.id + 1}
+        job = enqueue(db_session, "todos.reorder", payload)
+        db_session.commit()
+
+        runner.run_pending()
+        db_session.expire_all()
+        job = db_session.get(Job, job.id)
+        assert (job.status, job.error) == (JOB_FAILED, "LookupError: List not found")
+        positions = dict(db_session.query(Todo.id, Todo.position))
+        assert [positions[todo_id] for todo_id in todo_ids] == [0, 1, 2]
+
+    def test_jobs_disabled_stays_synchronous(self, client, auth_headers, db_session, monkeypatch):
+        """JOBS_ENABLED=Falseの場合は件数によらず同期的に処理されることを確認"""
+        monkeypatch.setattr(settings, "JOBS_ENABLED", False)
+        todo_ids = _add_todos(db_session, [0, 1, 2])
+        response = client.put("/api/todos/bulk", json={"todo_ids": todo_ids, "action": "delete"}, headers=auth_headers)
+        assert response.status_code == 200
+
+    def test_job_visible_only_to_creator(self, client, auth_headers, db_session):
+        """他のユーザーのジョブは参照できないことを確認"""
+        todo_ids = _add_todos(db_session, [0, 1, 2])
+        response = client.put(
+            "/api/todos/bulk", json={"todo_ids": todo_ids, "action": "complete"}, headers=auth_headers
+        )
+        job_id = response.json()["job_id"]
+
+        db_session.add(User(email="other@example.com", hashed_password=get_password_hash("password")))
+        db_session.commit()
+        login = client.post("/api/auth/login", data={"username": "other@example.com", "password": "password"})
+        other_headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        assert client.get(f"/api/jobs/{job_id}", headers=other_headers).status_code == 404
+        assert client.get("/api/jobs/9999", headers=auth_headers).status_code == 404
+
+
+class TestMaintenanceJobs:
+    """定期メンテナンスジョブのテストクラス"""
+
+    def test_rebalance_positions(self, runner, db_session):
+        """positionが現在の順序のまま詰め直されることを確認"""
+        todo_ids = _add_todos(db_session, [5, 5, 10, 40])
+        enqueue(db_session, "maintenance.rebalance_positions")
+        db_session.commit()
+
+        runner.run_pending()
+        db_session.expire_all()
+        job = db_session.query(Job).one()
+        assert job.result == {"updated": 4}
+        positions = dict(db_session.query(Todo.id, Todo.position))
+        assert [positions[todo_id] for todo_id in todo_ids] == [0, 1, 2, 3]
+
+    def test_purge_refresh_tokens(self, runner, db_session, test_user):
+        """有効期限切れのリフレッシュトークンだけが削除されることを確認"""
+        now = datetime.utcnow()
+        for i, expires_at in enumerate([now - timedelta(days=1), now + timedelta(days=1)]):
+            db_session.add(
+                RefreshToken(user_id=test_user.id, token_hash=f"{i:064d}", family_id="f", expires_at=expires_at)
+            )
+        enqueue(db_session, "maintenance.purge_refresh_tokens")
+        db_session.commit()
+
+        runner.run_pending()
+        assert db_session.query(RefreshToken).count() == 1
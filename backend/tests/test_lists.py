@@ -0,0 +1,120 @@
+"""
+リスト（プロジェクト）のテスト
+"""
+
+import pytest
+
+from app.core.security import get_password_hash
+from app.models.todo import Todo
+from app.models.user import User
+
+
+@pytest.fixture
+def other_headers(client, db_session):
+    db_session.add(User(email="other@example.com", hashed_password=get_password_hash("password")))
+    db_session.commit()
+    login = client.post("/api/auth/login", data={"username": "other@example.com", "password": "password"})
+    return {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+def _create_list(client, headers, name: str) -> int:
+    return client.post("/api/lists", json={"name": name}, headers=headers).json()["id"]
+
+
+def _create_todo(client, headers, title: str, list_id=None) -> dict:
+    return client.post("/api/todos", json={"title": title, "list_id": list_id}, headers=headers).json()
+
+
+class TestListEndpoints:
+    """リストの作成・変更・削除のテストクラス"""
+
+    def test_crud(self, client, auth_headers):
+        """リストを作成・一覧・名前の変更・削除できることを確認"""
+        list_id = _create_list(client, auth_headers, "Work")
+        assert [item["name"] for item in client.get("/api/lists", headers=auth_headers).json()] == ["Work"]
+
+        response = client.put(f"/api/lists/{list_id}", json={"name": "Office"}, headers=auth_headers)
+        assert response.json()["name"] == "Office"
+
+        assert client.delete(f"/api/lists/{list_id}", headers=auth_headers).status_code == 200
+        assert client.get("/api/lists", headers=auth_headers).json() == []
+
+    def test_delete_non_empty(self, client, auth_headers):
+        """ToDoが残っているリストは削除できないことを確認"""
+        list_id = _create_list(client, auth_headers, "Work")
+        _create_todo(client, auth_headers, "task", list_id)
+        assert client.delete(f"/api/lists/{list_id}", headers=auth_headers).status_code == 409
+
+    def test_other_users_list(self, client, auth_headers, other_headers):
+        """他のユーザーのリストは参照・変更・ToDoの追加ができないことを確認"""
+        list_id = _create_list(client, auth_headers, "Private")
+
+        assert client.get("/api/lists", headers=other_headers).json() == []
+        assert client.put(f"/api/lists/{list_id}", json={"name": "x"}, headers=other_headers).status_code == 404
+        assert client.delete(f"/api/lists/{list_id}", headers=other_headers).status_code == 404
+        response = client.post("/api/todos", json={"title": "x", "list_id": list_id}, headers=other_headers)
+        assert response.status_code == 404
+        assert client.get(f"/api/todos?list_id={list_id}", headers=other_headers).status_code == 404
+
+    def test_name_required(self, client, auth_headers):
+        assert client.post("/api/lists", json={"name": ""}, headers=auth_headers).status_code == 422
+
+
+class TestListScopedTodos:
+    """リストごとのToDoの順序のテストクラス"""
+
+    def test_positions_per_list(self, client, auth_headers):
+        """positionがリストごとに0から振られることを確認"""
+        work = _create_list(client, auth_headers, "Work")
+        home = _create_list(client, auth_headers, "Home")
+        assert [_create_todo(client, auth_headers, f"w{i}", work)["position"] for i in range(3)] == [0, 1, 2]
+        assert [_create_todo(client, auth_headers, f"h{i}", home)["position"] for i in range(2)] == [0, 1]
+        assert _create_todo(client, auth_headers, "inbox")["position"] == 0
+
+    def test_list_filter(self, client, auth_headers):
+        """list_id で一覧をリストのToDoに絞り込めることを確認"""
+        work = _create_list(client, auth_headers, "Work")
+        _create_todo(client, auth_headers, "w", work)
+        _create_todo(client, auth_headers, "inbox")
+
+        body = client.get(f"/api/todos?list_id={work}", headers=auth_headers).json()
+        assert [(todo["title"], todo["list_id"]) for todo in body["data"]] == [("w", work)]
+        assert client.get("/api/todos", headers=auth_headers).json()["total"] == 2
+
+    def test_reorder_within_list(self, client, auth_headers, db_session):
+        """並び替えがリスト内の順序だけを変更し、他のリストのToDoは対象外となることを確認"""
+        work = _create_list(client, auth_headers, "Work")
+        ids = [_create_todo(client, auth_headers, f"w{i}", work)["id"] for i in range(3)]
+        inbox_id = _create_todo(client, auth_headers, "inbox")["id"]
+
+        response = client.put(
+            "/api/todos/reorder", json={"todo_ids": list(reversed(ids)), "list_id": work}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        db_session.expire_all()
+        positions = dict(db_session.query(Todo.id, Todo.position))
+        assert [positions[todo_id] for todo_id in reversed(ids)] == [0, 1, 2]
+        assert positions[inbox_id] == 0
+
+        response = client.put("/api/todos/reorder", json={"todo_ids": [ids[0], inbox_id]}, headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_move_to_other_list(self, client, auth_headers):
+        """別のリストに移動したToDoが移動先の末尾に追加されることを確認"""
+        work = _create_list(client, auth_headers, "Work")
+        home = _create_list(client, auth_headers, "Home")
+        _create_todo(client, auth_headers, "h0", home)
+        todo = _create_todo(client, auth_headers, "w0", work)
+
+        response = client.put(f"/api/todos/{todo['id']}", json={"title": "w0", "list_id": home}, headers=auth_headers)
+        assert (response.json()["list_id"], response.json()["position"]) == (home, 1)
+
+    def test_create_reads_list_tail_only(self, client, auth_headers, db_session, assert_max_queries):
+        """作成時の position の決定がリスト内の最大値の取得1回で済むことを確認"""
+        work = _create_list(client, auth_headers, "Work")
+        db_session.add_all([Todo(title=f"{i}", position=i, list_id=work) for i in range(20)])
+        db_session.commit()
+
+        with assert_max_queries(10) as stats:
+            _create_todo(client, auth_headers, "new", work)
+        assert any("max(todos.position)" in statement for statement in stats.statements)
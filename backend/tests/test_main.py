@@ -0,0 +1,135 @@
+"""
+アプリケーションファクトリと起動処理のテスト
+"""
+
+import os
+import runpy
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core.config import settings
+from app.core.jobs import default_recurring_jobs
+from app.core.security import verified_token_cache
+
+
+class TestAppFactory:
+    """アプリケーションファクトリのテストクラス"""
+
+    def test_import_is_lazy(self):
+        """app.mainのインポートだけでは暗号ライブラリやルーターが読み込まれないことを確認"""
+        code = (
+            "import sys, app.main; "
+            "print(','.join(m for m in ('argon2', 'bcrypt', 'jose', 'sqlalchemy', 'app.endpoints.todo') "
+            "if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == ""
+
+    def test_create_app_returns_new_instance(self):
+        """create_appが呼び出しごとに新しいアプリケーションを返すことを確認"""
+        assert main.create_app() is not main.create_app()
+        assert main.app is main.app
+
+    def test_lifespan_skips_create_all(self, monkeypatch):
+        """DB_AUTO_CREATE=Falseの場合は起動時にcreate_allを実行しないことを確認"""
+        calls = []
+        monkeypatch.setattr("app.core.database.init_db", lambda: calls.append("init_db"))
+
+        monkeypatch.setattr(settings, "DB_AUTO_CREATE", False)
+        with TestClient(main.create_app()):
+            pass
+        assert calls == []
+
+        monkeypatch.setattr(settings, "DB_AUTO_CREATE", True)
+        with TestClient(main.create_app()):
+            pass
+        assert calls == ["init_db"]
+
+
+class TestServerConfig:
+    """本番用サーバー設定（gunicorn.conf.py）のテストクラス"""
+
+    def _load_config(self, monkeypatch, **env):
+        for key, value in env.items():
+            monkeypatch.setenv(key, value)
+        return runpy.run_path(str(Path(__file__).resolve().parent.parent / "gunicorn.conf.py"))
+
+    def test_workers_from_environment(self, monkeypatch):
+        """WEB_CONCURRENCYでワーカー数を指定できることを確認"""
+        config = self._load_config(monkeypatch, WEB_CONCURRENCY="3")
+        assert config["workers"] == 3
+        assert config["preload_app"] is True
+        assert config["max_requests"] > 0 and config["max_requests_jitter"] > 0
+
+    def test_workers_bounded_by_memory(self, monkeypatch):
+        """自動算出のワーカー数がメモリ量とMAX_WORKERSで制限されることを確認"""
+        monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+        config = self._load_config(monkeypatch, MAX_WORKERS="64")
+        monkeypatch.setattr(config["multiprocessing"], "cpu_count", lambda: 16)
+
+        monkeypatch.setitem(config["default_workers"].__globals__, "_memory_limit_bytes", lambda: 1024**3)
+        monkeypatch.setenv("WORKER_MEMORY_MB", "256")
+        assert config["default_workers"]() == 4
+
+        monkeypatch.setenv("MAX_WORKERS", "2")
+        assert config["default_workers"]() == 2
+
+    def test_memory_cache_disabled_with_multiple_workers(self, monkeypatch):
+        """複数ワーカーではmemoryバックエンドのキャッシュが無効になることを確認"""
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "CACHE_BACKEND", "memory")
+        server = SimpleNamespace(log=Mock())
+
+        self._load_config(monkeypatch, WEB_CONCURRENCY="1")["when_ready"](server)
+        assert settings.CACHE_ENABLED is True
+
+        self._load_config(monkeypatch, WEB_CONCURRENCY="3")["when_ready"](server)
+        assert settings.CACHE_ENABLED is False
+        assert any("CACHE_BACKEND" in call.args[0] for call in server.log.warning.call_args_list)
+
+        # redisバックエンドはワーカー間で共有されるため有効のまま
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "CACHE_BACKEND", "redis")
+        self._load_config(monkeypatch, WEB_CONCURRENCY="3")["when_ready"](server)
+        assert settings.CACHE_ENABLED is True
+
+    def test_memory_idempotency_moved_to_database(self, monkeypatch):
+        """複数ワーカーではmemoryの冪等キーの保存先がデータベースになることを確認"""
+        monkeypatch.setattr(settings, "IDEMPOTENCY_ENABLED", True)
+        monkeypatch.setattr(settings, "IDEMPOTENCY_BACKEND", "memory")
+        # 複数ワーカーではmemoryバックエンドのキャッシュも無効になるため、テスト後に元に戻す
+        monkeypatch.setattr(settings, "CACHE_ENABLED", settings.CACHE_ENABLED)
+        server = SimpleNamespace(log=Mock())
+
+        self._load_config(monkeypatch, WEB_CONCURRENCY="1")["when_ready"](server)
+        assert settings.IDEMPOTENCY_BACKEND == "memory"
+
+        self._load_config(monkeypatch, WEB_CONCURRENCY="3")["when_ready"](server)
+        assert settings.IDEMPOTENCY_BACKEND == "database"
+        # 期限切れの行を削除する定期実行ジョブも登録される
+        assert "maintenance.purge_idempotency_keys" in [job.job_type for job in default_recurring_jobs()]
+
+
+class TestProcessState:
+    """フォーク後のプロセス内状態のリセットのテストクラス"""
+
+    def test_reset_after_fork(self):
+        """フォークした子プロセスでキャッシュがリセットされることを確認"""
+        verified_token_cache.put("token", {"exp": time.time() + 60})
+        assert len(verified_token_cache) == 1
+
+        pid = os.fork()
+        if pid == 0:  # 子プロセス
+            os._exit(0 if len(verified_token_cache) == 0 else 1)
+
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        # 親プロセスの状態はそのまま
+        assert len(verified_token_cache) == 1
@@ -0,0 +1,130 @@
+"""
+ToDoの更新の楽観的排他制御のテスト
+"""
+
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.endpoints import todo as todo_endpoint
+from app.models.todo import Todo
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def todo(client, auth_headers):
+    return client.post("/api/todos", json={"title": "task"}, headers=auth_headers).json()
+
+
+class TestVersionedUpdate:
+    """If-Match / version による更新のテストクラス"""
+
+    def test_version_increments(self, client, auth_headers, todo):
+        """作成時はバージョン1で、更新ごとに増え、ETag で返されることを確認"""
+        assert todo["version"] == 1
+        headers = {**auth_headers, "If-Match": '"1"'}
+        response = client.put(f"/api/todos/{todo['id']}", json={"title": "renamed"}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["version"] == 2
+        assert response.headers["ETag"] == '"2"'
+
+    def test_stale_if_match(self, client, auth_headers, todo):
+        """古いバージョンでの更新は 409 となり、現在の内容が返されることを確認"""
+        client.put(f"/api/todos/{todo['id']}", json={"title": "first"}, headers=auth_headers)
+
+        headers = {**auth_headers, "If-Match": 'W/"1"'}
+        response = client.put(f"/api/todos/{todo['id']}", json={"title": "second"}, headers=headers)
+        assert response.status_code == 409
+        current = response.json()["detail"]["current"]
+        assert (current["title"], current["version"]) == ("first", 2)
+
+    def test_version_field(self, client, auth_headers, todo):
+        """リクエストボディの version でも確認されることを確認"""
+        response = client.put(f"/api/todos/{todo['id']}", json={"title": "x", "version": 5}, headers=auth_headers)
+        assert response.status_code == 409
+        response = client.put(f"/api/todos/{todo['id']}", json={"title": "x", "version": 1}, headers=auth_headers)
+        assert response.status_code == 200
+
+    def test_unconditional(self, client, auth_headers, todo):
+        """If-Match を指定しない場合や * の場合は、バージョンによらず更新されることを確認"""
+        client.put(f"/api/todos/{todo['id']}", json={"title": "a"}, headers=auth_headers)
+        response = client.put(
+            f"/api/todos/{todo['id']}", json={"title": "b"}, headers={**auth_headers, "If-Match": "*"}
+        )
+        assert response.json()["version"] == 3
+
+    def test_invalid_if_match(self, client, auth_headers, todo):
+        response = client.put(
+            f"/api/todos/{todo['id']}", json={"title": "x"}, headers={**auth_headers, "If-Match": "abc"}
+        )
+        assert response.status_code == 400
+
+    def test_concurrent_write_after_read(self, client, auth_headers, todo, monkeypatch):
+        """読み込み後に他のリクエストが更新した場合も、上書きせずに 409 となることを確認"""
+        expected_version = todo_endpoint._expected_version
+
+        def concurrent_update(if_match, version):
+            # エンドポイントがToDoを読み込んだ後に、別のセッションで更新する
+            other = TestingSessionLocal()
+            other.get(Todo, todo["id"]).title = "concurrent"
+            other.commit()
+            other.close()
+            return expected_version(if_match, version)
+
+        monkeypatch.setattr(todo_endpoint, "_expected_version", concurrent_update)
+        response = client.put(f"/api/todos/{todo['id']}", json={"title": "mine"}, headers=auth_headers)
+        assert response.status_code == 409
+        assert response.json()["detail"]["current"]["title"] == "concurrent"
+
+    def test_orm_update_checks_version(self, db_session, todo):
+        """ORMによるUPDATEが、読み込み時のバージョンを条件に実行されることを確認"""
+        db_todo = db_session.get(Todo, todo["id"])
+        other = TestingSessionLocal()
+        other.get(Todo, todo["id"]).title = "other"
+        other.commit()
+        other.close()
+
+        db_todo.title = "stale"
+        with pytest.raises(StaleDataError):
+            db_session.commit()
+        db_session.rollback()
+
+
+class TestVersionedBulkWrites:
+    """並び替え・一括操作のバージョンのテストクラス"""
+
+    @pytest.fixture
+    def todos(self, client, auth_headers):
+        return [client.post("/api/todos", json={"title": f"{i}"}, headers=auth_headers).json() for i in range(3)]
+
+    def test_reorder_returns_versions(self, client, auth_headers, todos):
+        """並び替えが更新後のバージョンを返し、それを使って続けて更新できることを確認"""
+        ids = [todo["id"] for todo in reversed(todos)]
+        versions = {todo["id"]: todo["version"] for todo in todos}
+        response = client.put("/api/todos/reorder", json={"todo_ids": ids, "versions": versions}, headers=auth_headers)
+        assert response.status_code == 200
+        new_versions = {int(todo_id): version for todo_id, version in response.json()["versions"].items()}
+        assert new_versions == {todo_id: 2 for todo_id in ids}
+
+        response = client.put(
+            "/api/todos/reorder", json={"todo_ids": ids, "versions": new_versions}, headers=auth_headers
+        )
+        assert response.status_code == 200
+
+    def test_reorder_conflict(self, client, auth_headers, db_session, todos):
+        """古いバージョンでの並び替えは 409 となり、順序が変わらないことを確認"""
+        client.put(f"/api/todos/{todos[0]['id']}", json={"title": "edited"}, headers=auth_headers)
+
+        ids = [todo["id"] for todo in reversed(todos)]
+        versions = {todo["id"]: todo["version"] for todo in todos}
+        response = client.put("/api/todos/reorder", json={"todo_ids": ids, "versions": versions}, headers=auth_headers)
+        assert response.status_code == 409
+        assert [(todo["id"], todo["version"]) for todo in response.json()["detail"]["current"]] == [(todos[0]["id"], 2)]
+        db_session.expire_all()
+        assert [db_session.get(Todo, todo["id"]).position for todo in todos] == [0, 1, 2]
+
+    def test_bulk_update_increments_version(self, client, auth_headers, todos):
+        """一括操作でもバージョンが増えることを確認"""
+        response = client.put(
+            "/api/todos/bulk", json={"todo_ids": [todos[0]["id"]], "action": "complete"}, headers=auth_headers
+        )
+        assert response.json()["updated_todos"][0]["version"] == 2
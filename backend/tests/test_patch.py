@@ -0,0 +1,136 @@
+"""
+ToDoの部分更新（PATCH）のテスト
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.models.todo import Todo
+from app.models.todo_stats import read_stats, rebuild_values
+
+
+@pytest.fixture
+def todo(client, auth_headers):
+    return client.post(
+        "/api/todos", json={"title": "task", "due_date": "2026-01-01T09:00:00", "tags": ["work"]}, headers=auth_headers
+    ).json()
+
+
+def _writes(stats) -> list:
+    return [statement for statement in stats.statements if not statement.lstrip().upper().startswith("SELECT")]
+
+
+class TestPatchTodo:
+    """部分更新のテストクラス"""
+
+    def test_toggle_single_round_trip(self, client, auth_headers, todo, assert_max_queries):
+        """完了の切り替えが UPDATE ... RETURNING だけで済み、再読み込みしないことを確認"""
+        # ユーザー / 変更前の値（行ロック） / ToDoの UPDATE ... RETURNING / 集計の UPDATE
+        with assert_max_queries(4) as stats:
+            response = client.patch(f"/api/todos/{todo['id']}", json={"completed": True}, headers=auth_headers)
+        body = response.json()
+        assert (body["completed"], body["version"], body["title"], body["tags"]) == (True, 2, "task", ["work"])
+        assert body["completed_at"] is not None
+        assert response.headers["ETag"] == '"2"'
+        assert any("RETURNING" in statement for statement in stats.statements)
+
+    def test_only_changed_columns(self, client, auth_headers, todo, assert_max_queries):
+        """指定したカラムだけが更新され、他のフィールドは変わらないことを確認"""
+        with assert_max_queries(2) as stats:  # ユーザー / UPDATE ... RETURNING
+            response = client.patch(f"/api/todos/{todo['id']}", json={"title": "renamed"}, headers=auth_headers)
+        assert response.json()["due_date"] == "2026-01-01T09:00:00"
+        (update,) = _writes(stats)
+        assert "SET title=?, version=(todos.version + ?)" in update
+
+    def test_no_change_skips_write(self, client, auth_headers, todo, assert_max_queries):
+        """値が変わらない場合は書き込まず、バージョンも変わらないことを確認"""
+        payload = {"title": "task", "completed": False, "tags": ["work"]}
+        # ユーザー / タグ / 現在のタグ / 変更前の値（行ロック） / ToDoの UPDATE（対象なし） / 現在の値
+        with assert_max_queries(6) as stats:
+            response = client.patch(f"/api/todos/{todo['id']}", json=payload, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["version"] == 1
+        assert not any(statement.lstrip().startswith(("INSERT", "DELETE")) for statement in stats.statements)
+
+    def test_null_clears(self, client, auth_headers, todo):
+        """null で期限日を解除でき、null にできないフィールドは 422 となることを確認"""
+        response = client.patch(f"/api/todos/{todo['id']}", json={"due_date": None}, headers=auth_headers)
+        assert response.json()["due_date"] is None
+        assert client.patch(f"/api/todos/{todo['id']}", json={"title": None}, headers=auth_headers).status_code == 422
+
+    def test_replace_tags(self, client, auth_headers, todo):
+        """タグの置き換えがレスポンスに反映され、バージョンが上がることを確認"""
+        response = client.patch(f"/api/todos/{todo['id']}", json={"tags": ["home", "urgent"]}, headers=auth_headers)
+        assert (response.json()["tags"], response.json()["version"]) == (["home", "urgent"], 2)
+        body = client.get("/api/todos", headers=auth_headers).json()
+        assert body["data"][0]["tags"] == ["home", "urgent"]
+
+    def test_returns_own_tags(self, client, auth_headers, todo):
+        """RETURNING で返すタグが更新したToDoのタグであることを確認"""
+        other = client.post("/api/todos", json={"title": "other", "tags": ["b", "a"]}, headers=auth_headers).json()
+        response = client.patch(f"/api/todos/{other['id']}", json={"title": "renamed"}, headers=auth_headers)
+        assert response.json()["tags"] == ["a", "b"]
+        response = client.patch(f"/api/todos/{todo['id']}", json={"title": "renamed"}, headers=auth_headers)
+        assert response.json()["tags"] == ["work"]
+
+    def test_move_to_list(self, client, auth_headers, todo):
+        """別のリストへの移動で、移動先の末尾に追加されることを確認"""
+        list_id = client.post("/api/lists", json={"name": "Work"}, headers=auth_headers).json()["id"]
+        for title in ("a", "b"):
+            client.post("/api/todos", json={"title": title, "list_id": list_id}, headers=auth_headers)
+
+        response = client.patch(f"/api/todos/{todo['id']}", json={"list_id": list_id}, headers=auth_headers)
+        assert (response.json()["list_id"], response.json()["position"]) == (list_id, 2)
+        # 同じリストの指定では position は変わらない
+        response = client.patch(f"/api/todos/{todo['id']}", json={"list_id": list_id}, headers=auth_headers)
+        assert (response.json()["position"], response.json()["version"]) == (2, 2)
+
+    def test_version_conflict(self, client, auth_headers, todo):
+        """If-Match のバージョンが一致しない場合は 409 となり、更新されないことを確認"""
+        client.patch(f"/api/todos/{todo['id']}", json={"title": "first"}, headers=auth_headers)
+        headers = {**auth_headers, "If-Match": '"1"'}
+        response = client.patch(f"/api/todos/{todo['id']}", json={"title": "second"}, headers=headers)
+        assert response.status_code == 409
+        assert response.json()["detail"]["current"]["title"] == "first"
+
+        response = client.patch(
+            f"/api/todos/{todo['id']}", json={"title": "second", "version": 2}, headers=auth_headers
+        )
+        assert response.json()["title"] == "second"
+
+    def test_not_found(self, client, auth_headers):
+        assert client.patch("/api/todos/9999", json={"title": "x"}, headers=auth_headers).status_code == 404
+
+    def test_stats_stay_consistent(self, client, auth_headers, db_session, todo):
+        """完了状態・優先度の変更が件数の集計に反映されることを確認"""
+        client.post("/api/todos", json={"title": "other", "priority": 0}, headers=auth_headers)
+        for payload in ({"completed": True}, {"completed": True, "priority": 2}, {"priority": 0}, {"completed": False}):
+            client.patch(f"/api/todos/{todo['id']}", json=payload, headers=auth_headers)
+
+            db_session.expire_all()
+            row = read_stats(db_session.connection())
+            expected = rebuild_values(db_session.connection())
+            columns = ("total", "completed", "priority_high", "priority_medium", "priority_low")
+            assert {column: row[column] for column in columns} == {column: expected[column] for column in columns}
+
+    def test_parent_roll_up(self, client, auth_headers, db_session, todo):
+        """完了状態・親の変更で、変更前後の親の完了状態がロールアップされることを確認"""
+        first = client.post("/api/todos", json={"title": "first"}, headers=auth_headers).json()
+        second = client.post("/api/todos", json={"title": "second"}, headers=auth_headers).json()
+        client.patch(f"/api/todos/{todo['id']}", json={"parent_id": first["id"]}, headers=auth_headers)
+
+        client.patch(f"/api/todos/{todo['id']}", json={"completed": True}, headers=auth_headers)
+        db_session.expire_all()
+        assert db_session.get(Todo, first["id"]).completed is True
+
+        client.patch(
+            f"/api/todos/{todo['id']}", json={"completed": False, "parent_id": second["id"]}, headers=auth_headers
+        )
+        db_session.expire_all()
+        assert db_session.get(Todo, first["id"]).completed is True  # 子がなくなった親は変更しない
+        assert db_session.get(Todo, second["id"]).completed is False
+        assert db_session.get(Todo, todo["id"]).parent_id == second["id"]
+
+        response = client.patch(f"/api/todos/{second['id']}", json={"parent_id": todo["id"]}, headers=auth_headers)
+        assert response.status_code == 400
@@ -0,0 +1,165 @@
+"""
+サンプリングプロファイラとデバッグ用エンドポイントのテスト
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.profiler import SamplingProfiler
+from app.core.security import get_password_hash
+from app.models.user import User
+
+
+def _busy_target(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSamplingProfiler:
+    """サンプリングプロファイラのテストクラス"""
+
+    def test_captures_busy_thread(self):
+        """実行中のスレッドのスタックが集計されることを確認"""
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_target, args=(stop,), name="busy-worker")
+        worker.start()
+        try:
+            with SamplingProfiler(interval=0.001) as profiler:
+                time.sleep(0.2)
+        finally:
+            stop.set()
+            worker.join()
+
+        assert profiler.sample_count > 0
+        output = profiler.collapsed()
+        busy = [line for line in output.splitlines() if "_busy_target" in line]
+        assert busy
+        assert busy[0].startswith("thread (busy-worker);")
+        assert "sampling-profiler" not in output
+
+    def test_collapsed_format(self):
+        """collapsed stack形式（スタック + 空白 + サンプル数）で出力されることを確認"""
+        profiler = SamplingProfiler()
+        profiler.samples["thread (main);a (x.py:1);b (x.py:5)"] += 3
+        profiler.samples["thread (main);a (x.py:1)"] += 1
+        assert profiler.collapsed() == "thread (main);a (x.py:1);b (x.py:5) 3\nthread (main);a (x.py:1) 1\n"
+
+    def test_idle_threads_excluded(self):
+        """待機中のスレッドが既定で除外されることを確認"""
+        stop = threading.Event()
+        waiter = threading.Thread(target=stop.wait, name="idle-worker")
+        waiter.start()
+        try:
+            profiler = SamplingProfiler()
+            profiler.sample()
+            with_idle = SamplingProfiler(include_idle=True)
+            with_idle.sample()
+        finally:
+            stop.set()
+            waiter.join()
+
+        assert "idle-worker" not in profiler.collapsed()
+        assert "idle-worker" in with_idle.collapsed()
+
+
+class TestDebugEndpoints:
+    """プロファイル用エンドポイントのテストクラス"""
+
+    @pytest.fixture
+    def profiler_client(self, monkeypatch, tmp_path, db_session):
+        monkeypatch.setattr(settings, "PROFILER_ENABLED", True)
+        monkeypatch.setattr(settings, "PROFILER_MAX_SECONDS", 2)
+        monkeypatch.setattr(settings, "PROFILER_OUTPUT_DIR", str(tmp_path))
+        monkeypatch.setattr(settings, "ADMIN_EMAILS", "admin@example.com")
+
+        for email in ("admin@example.com", "user@example.com"):
+            db_session.add(User(email=email, hashed_password=get_password_hash("password"), is_active=True))
+        db_session.commit()
+
+        app = main.create_app()
+        app.dependency_overrides[get_db] = lambda: db_session
+        app.dependency_overrides[get_read_db] = lambda: db_session
+        with TestClient(app) as client:
+            yield client
+
+    def _headers(self, client, email: str) -> dict:
+        response = client.post("/api/auth/login", data={"username": email, "password": "password"})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def test_disabled_by_default(self, client, auth_headers):
+        """PROFILER_ENABLEDが無効の場合はエンドポイントが存在しないことを確認"""
+        response = client.get("/api/debug/profile?seconds=1", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_profile_requires_admin(self, profiler_client):
+        """管理者以外はプロファイルを実行できないことを確認"""
+        response = profiler_client.get(
+            "/api/debug/profile?seconds=0.1", headers=self._headers(profiler_client, "user@example.com")
+        )
+        assert response.status_code == 403
+        assert profiler_client.get("/api/debug/profile?seconds=0.1").status_code == 401
+
+    def test_profile(self, profiler_client):
+        """管理者がcollapsed stack形式のプロファイルを取得できることを確認"""
+        response = profiler_client.get(
+            "/api/debug/profile?seconds=0.2&interval_ms=1&include_idle=true",
+            headers=self._headers(profiler_client, "admin@example.com"),
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert int(response.headers["x-profile-samples"]) > 0
+        for line in response.text.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert stack.startswith("thread (")
+            assert int(count) > 0
+
+    def test_profile_seconds_limit(self, profiler_client):
+        """最大秒数を超える指定が拒否されることを確認"""
+        response = profiler_client.get(
+            "/api/debug/profile?seconds=10", headers=self._headers(profiler_client, "admin@example.com")
+        )
+        assert response.status_code == 400
+
+    def test_per_request_profile(self, profiler_client):
+        """X-Profileヘッダーを付与した管理者のリクエストのプロファイルを取得できることを確認"""
+        headers = self._headers(profiler_client, "admin@example.com")
+        response = profiler_client.get("/api/todos", headers={**headers, "X-Profile": "1"})
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+
+        response = profiler_client.get(f"/api/debug/profile/requests/{profile_id}", headers=headers)
+        assert response.status_code == 200
+        assert profiler_client.get("/api/debug/profile/requests/not-a-uuid", headers=headers).status_code == 404
+
+    def test_per_request_profile_off_event_loop(self, profiler_client, monkeypatch):
+        """リクエスト単位のプロファイルの停止・保存が、イベントループ外で1回だけ行われることを確認"""
+        headers = self._headers(profiler_client, "admin@example.com")
+        calls = []
+        original_stop = SamplingProfiler.stop
+
+        def recording_stop(profiler):
+            try:
+                asyncio.get_running_loop()
+                calls.append("event loop")
+            except RuntimeError:
+                calls.append("thread")
+            original_stop(profiler)
+
+        monkeypatch.setattr(SamplingProfiler, "stop", recording_stop)
+        response = profiler_client.get("/api/todos", headers={**headers, "X-Profile": "1"})
+        assert "x-profile-id" in response.headers
+        assert calls == ["thread"]
+
+    def test_per_request_profile_requires_admin(self, profiler_client):
+        """管理者以外のX-Profileヘッダーは無視されることを確認"""
+        headers = self._headers(profiler_client, "user@example.com")
+        response = profiler_client.get("/api/todos", headers={**headers, "X-Profile": "1"})
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
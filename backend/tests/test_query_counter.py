@@ -0,0 +1,144 @@
+"""
+SQLクエリ計測とエンドポイントごとのクエリ数上限のテスト
+"""
+
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.query_counter import QueryCounterMiddleware, count_engine_queries, track_queries
+from app.models.todo import NOT_DELETED, Todo
+from tests.conftest import engine
+
+
+def _build_app(budget: int, server_timing: bool) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(QueryCounterMiddleware, budget=budget, server_timing=server_timing)
+
+    @app.get("/queries/{count}")
+    def run_queries(count: int):
+        with engine.connect() as conn:
+            for _ in range(count):
+                conn.execute(text("SELECT 1"))
+        return {"count": count}
+
+    return app
+
+
+def _add_todos(db_session, count: int) -> list[int]:
+    todos = [Todo(title=f"Todo {i}", completed=False, position=i, priority=1) for i in range(count)]
+    db_session.add_all(todos)
+    db_session.commit()
+    return [todo.id for todo in todos]
+
+
+class TestQueryCounter:
+    """クエリ計測のテストクラス"""
+
+    def test_track_queries(self):
+        """範囲内のクエリ数が集計されることを確認"""
+        with track_queries() as stats:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+        assert stats.count == 2
+        assert stats.duration >= 0
+        assert stats.statements == ["SELECT 1", "SELECT 2"]
+
+    def test_failed_statements_release_start_times(self):
+        """失敗したステートメントの開始時刻が接続に残らないことを確認"""
+        with count_engine_queries(engine) as stats, track_queries() as tracked:
+            with engine.connect() as conn:
+                for _ in range(3):
+                    with pytest.raises(OperationalError):
+                        conn.execute(text("SELECT * FROM missing_table"))
+                conn.execute(text("SELECT 1"))
+                assert conn.info["query_start_time"] == []
+        assert (stats.count, tracked.count) == (1, 1)
+        assert stats.statements == tracked.statements == ["SELECT 1"]
+
+    def test_server_timing_header(self):
+        """Server-Timingヘッダーにリクエスト内のクエリ数が含まれることを確認"""
+        client = TestClient(_build_app(budget=0, server_timing=True))
+        response = client.get("/queries/3")
+        assert response.status_code == 200
+        assert 'desc="3 queries"' in response.headers["server-timing"]
+        assert response.headers["server-timing"].startswith("db;dur=")
+
+    def test_server_timing_disabled(self):
+        """無効時（本番環境）はServer-Timingヘッダーを付与しないことを確認"""
+        client = TestClient(_build_app(budget=0, server_timing=False))
+        response = client.get("/queries/1")
+        assert "server-timing" not in response.headers
+
+    def test_budget_exceeded_warning(self, caplog):
+        """上限を超えたリクエストで警告ログが出ることを確認"""
+        client = TestClient(_build_app(budget=2, server_timing=False))
+        with caplog.at_level(logging.WARNING, logger="app.core.query_counter"):
+            client.get("/queries/2")
+            assert not caplog.records
+            client.get("/queries/3")
+        assert len(caplog.records) == 1
+        assert "/queries/3 executed 3 queries (budget 2" in caplog.records[0].getMessage()
+
+    def test_app_returns_server_timing(self, client, auth_headers):
+        """アプリケーション全体でServer-Timingヘッダーが返ることを確認（本番環境以外）"""
+        response = client.get("/api/todos", headers=auth_headers)
+        assert response.status_code == 200
+        assert "queries" in response.headers["server-timing"]
+
+
+class TestQueryBudgets:
+    """エンドポイントごとのクエリ数上限（件数に比例してクエリが増えないこと）のテストクラス"""
+
+    def test_get_todos(self, client, auth_headers, db_session, assert_max_queries):
+        """一覧取得が件数・トークンキャッシュの状態によらず一定のクエリ数であることを確認"""
+        _add_todos(db_session, 30)
+        # ユーザー / 件数 / ページ / ページ内のToDoのタグ
+        with assert_max_queries(4):
+            response = client.get("/api/todos?limit=30", headers=auth_headers)
+        assert len(response.json()["data"]) == 30
+
+    def test_reorder_todos(self, client, auth_headers, db_session, assert_max_queries):
+        """並び替えで対象件数に比例したクエリが発行されないことを確認"""
+        todo_ids = _add_todos(db_session, 50)
+        with assert_max_queries(3):
+            response = client.put(
+                "/api/todos/reorder", json={"todo_ids": list(reversed(todo_ids))}, headers=auth_headers
+            )
+        assert response.status_code == 200
+
+        positions = dict(db_session.query(Todo.id, Todo.position).all())
+        assert [positions[todo_id] for todo_id in reversed(todo_ids)] == list(range(50))
+
+    def test_bulk_complete(self, client, auth_headers, db_session, assert_max_queries):
+        """一括更新で対象件数に比例したクエリが発行されないことを確認"""
+        todo_ids = _add_todos(db_session, 50)
+        # ユーザー / 親のID / 件数の集計 / UPDATE / 集計の更新 / 更新後のToDo / そのタグ（親がなければロールアップなし）
+        with assert_max_queries(7):
+            response = client.put(
+                "/api/todos/bulk", json={"todo_ids": todo_ids, "action": "complete"}, headers=auth_headers
+            )
+        assert response.status_code == 200
+        assert len(response.json()["updated_todos"]) == 50
+        assert all(todo["completed"] for todo in response.json()["updated_todos"])
+
+    def test_bulk_delete(self, client, auth_headers, db_session, assert_max_queries):
+        """一括削除で対象件数に比例したクエリが発行されないことを確認"""
+        todo_ids = _add_todos(db_session, 50)
+        # ユーザー / 部分木の論理削除（UPDATE ... RETURNING） / 集計の更新
+        with assert_max_queries(3):
+            response = client.put(
+                "/api/todos/bulk", json={"todo_ids": todo_ids, "action": "delete"}, headers=auth_headers
+            )
+        assert response.json()["message"] == "Deleted 50 todos successfully"
+        assert db_session.query(Todo).filter(NOT_DELETED).count() == 0
+
+    def test_bulk_not_found(self, client, auth_headers):
+        """対象が存在しない場合に404を返すことを確認"""
+        response = client.put("/api/todos/bulk", json={"todo_ids": [999], "action": "complete"}, headers=auth_headers)
+        assert response.status_code == 404
@@ -0,0 +1,145 @@
+"""
+ログインのレート制限のテスト
+"""
+
+import pytest
+from starlette.requests import Request
+
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.rate_limit import InMemoryRateLimitBackend, RateLimiter, RedisRateLimitBackend
+from tests.fake_redis import FakeRedis
+
+
+class TestSlidingWindow:
+    """スライディングウィンドウカウンターのテスト"""
+
+    @pytest.mark.parametrize(
+        "backend_factory",
+        [InMemoryRateLimitBackend, lambda: RedisRateLimitBackend(FakeRedis())],
+        ids=["memory", "redis"],
+    )
+    def test_limit_within_window(self, backend_factory):
+        """ウィンドウ内で制限回数を超えると拒否されることを確認"""
+        limiter = RateLimiter(backend_factory(), limit=3, window_seconds=60, name="test")
+        now = 6000.0
+        results = [limiter.hit("key", now=now + i) for i in range(4)]
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert results[-1].retry_after > 0
+
+        # 別のキーには影響しない
+        assert limiter.hit("other", now=now).allowed
+
+    def test_previous_window_is_weighted(self):
+        """直前のウィンドウのカウントが経過割合で按分されることを確認"""
+        limiter = RateLimiter(InMemoryRateLimitBackend(), limit=3, window_seconds=60, name="test")
+        for i in range(3):
+            assert limiter.hit("key", now=6000.0 + i).allowed
+
+        # 次のウィンドウの直後は直前の3回がほぼそのまま残る
+        assert not limiter.hit("key", now=6061.0).allowed
+        # ウィンドウの後半になれば按分が減って許可される
+        assert limiter.hit("key", now=6110.0).allowed
+
+        # 2ウィンドウ以上経過すればリセットされる
+        assert limiter.hit("key", now=6300.0).count == 1
+
+    def test_backend_error_fails_open(self):
+        """バックエンド障害時は許可されることを確認"""
+
+        class BrokenBackend:
+            def hit(self, *args):
+                raise ConnectionError("unavailable")
+
+        limiter = RateLimiter(BrokenBackend(), limit=1, window_seconds=60, name="test")
+        assert limiter.hit("key").allowed
+
+
+class TestLoginRateLimit:
+    """ログインエンドポイントのレート制限のテスト"""
+
+    def test_account_limit_rejects_before_hashing(self, client, test_user, monkeypatch):
+        """アカウント単位の制限を超えるとパスワード検証前に429が返ることを確認"""
+        monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_PER_ACCOUNT", 2)
+
+        from app.endpoints import auth
+
+        calls = []
+        original_verify = auth.verify_password
+
+        def counting_verify(*args):
+            calls.append(args)
+            return original_verify(*args)
+
+        monkeypatch.setattr(auth, "verify_password", counting_verify)
+
+        for _ in range(2):
+            response = client.post("/api/auth/login", data={"username": "test@example.com", "password": "wrong"})
+            assert response.status_code == 401
+
+        response = client.post("/api/auth/login", data={"username": "TEST@example.com", "password": "testpassword"})
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+        # 拒否された試行ではパスワード検証が行われていない
+        assert len(calls) == 2
+
+    def test_ip_limit(self, client, test_user, monkeypatch):
+        """IPアドレス単位の制限が異なるアカウントにまたがって適用されることを確認"""
+        monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_PER_IP", 3)
+
+        for i in range(3):
+            response = client.post("/api/auth/login", data={"username": f"user{i}@example.com", "password": "x"})
+            assert response.status_code == 401
+
+        response = client.post("/api/auth/login", data={"username": "user9@example.com", "password": "x"})
+        assert response.status_code == 429
+
+    def test_spoofed_forwarded_for(self, client, test_user, monkeypatch):
+        """X-Forwarded-For の左側（クライアントが設定した値）を変えても、IPアドレス単位の制限を回避できないことを確認"""
+        monkeypatch.setattr(settings, "TRUST_FORWARDED_FOR", True)
+        monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_PER_IP", 3)
+
+        for i in range(4):
+            # プロキシ（nginx）は受け取った値の末尾に接続元のIPアドレスを追加する
+            headers = {"X-Forwarded-For": f"10.0.0.{i}, 203.0.113.7"}
+            response = client.post(
+                "/api/auth/login", data={"username": f"user{i}@example.com", "password": "x"}, headers=headers
+            )
+            assert response.status_code == (429 if i == 3 else 401)
+
+    @pytest.mark.parametrize(
+        ("forwarded_for", "hops", "expected"),
+        [
+            ("203.0.113.7", 1, "203.0.113.7"),
+            ("1.2.3.4, 203.0.113.7", 1, "203.0.113.7"),
+            ("1.2.3.4, 203.0.113.7, 10.0.0.2", 2, "203.0.113.7"),
+            ("203.0.113.7", 2, "203.0.113.7"),
+        ],
+    )
+    def test_client_ip_from_right(self, monkeypatch, forwarded_for, hops, expected):
+        """クライアントIPを X-Forwarded-For の右から TRUSTED_PROXY_HOPS 番目の値とすることを確認"""
+        monkeypatch.setattr(settings, "TRUST_FORWARDED_FOR", True)
+        monkeypatch.setattr(settings, "TRUSTED_PROXY_HOPS", hops)
+        request = Request({"type": "http", "headers": [(b"x-forwarded-for", forwarded_for.encode())], "client": None})
+        assert rate_limit.get_client_ip(request) == expected
+
+    def test_redis_backend(self, client, test_user, monkeypatch):
+        """Redisバックエンドでもログインが制限されることを確認"""
+        monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "redis")
+        monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_PER_ACCOUNT", 1)
+        monkeypatch.setattr("app.core.redis_client._client", FakeRedis())
+        rate_limit.reset_rate_limits()
+
+        response = client.post("/api/auth/login", data={"username": "test@example.com", "password": "testpassword"})
+        assert response.status_code == 200
+        response = client.post("/api/auth/login", data={"username": "test@example.com", "password": "testpassword"})
+        assert response.status_code == 429
+
+    def test_disabled(self, client, test_user, monkeypatch):
+        """RATE_LIMIT_ENABLED=Falseの場合は制限されないことを確認"""
+        monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+        monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_PER_ACCOUNT", 1)
+
+        for _ in range(3):
+            response = client.post("/api/auth/login", data={"username": "test@example.com", "password": "wrong"})
+            assert response.status_code == 401
@@ -0,0 +1,343 @@
+"""
+期限日のリマインダーのテスト
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.leases import DatabaseLease
+from app.core.reminders import ReminderEvent, ReminderScheduler, WebhookReminderSink
+from app.models.todo import Todo
+from tests.conftest import TestingSessionLocal
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def scheduler(events):
+    return ReminderScheduler(events.append, session_factory=TestingSessionLocal, horizon_seconds=3600)
+
+
+def _add_todo(db_session, title: str, due_in: timedelta, completed: bool = False) -> Todo:
+    todo = Todo(title=title, completed=completed, position=0, priority=1, due_date=datetime.utcnow() + due_in)
+    db_session.add(todo)
+    db_session.commit()
+    return todo
+
+
+class TestReminderScheduler:
+    """スケジューラーのテストクラス"""
+
+    def test_loads_only_horizon(self, scheduler, db_session):
+        """読み込み範囲内の未完了のToDoだけを読み込むことを確認"""
+        _add_todo(db_session, "soon", timedelta(minutes=10))
+        _add_todo(db_session, "later", timedelta(hours=5))
+        _add_todo(db_session, "done", timedelta(minutes=10), completed=True)
+
+        assert scheduler.refill() == 1
+        assert len(scheduler) == 1
+        # 読み込み済みの範囲は再度読み込まない
+        assert scheduler.refill() == 0
+
+    def test_incremental_refill(self, scheduler, db_session):
+        """時間の経過に合わせて、続きの範囲だけを読み込むことを確認"""
+        _add_todo(db_session, "soon", timedelta(minutes=10))
+        _add_todo(db_session, "later", timedelta(minutes=90))
+        now = datetime.utcnow()
+
+        assert scheduler.refill(now) == 1
+        assert scheduler.refill(now + timedelta(hours=1)) == 1
+        assert len(scheduler) == 2
+
+    def test_fires_in_due_order(self, scheduler, db_session, events):
+        """通知日時を過ぎたToDoのリマインダーが期限日順に1回だけ送られることを確認"""
+        second = _add_todo(db_session, "second", timedelta(minutes=20))
+        first = _add_todo(db_session, "first", timedelta(minutes=10))
+        _add_todo(db_session, "third", timedelta(minutes=50))
+        now = datetime.utcnow()
+        scheduler.refill(now)
+
+        assert scheduler.fire_due(now) == []
+        assert scheduler.next_fire_at() == first.due_date
+        fired = scheduler.fire_due(now + timedelta(minutes=30))
+        assert [event.todo_id for event in fired] == [first.id, second.id]
+        assert events == fired
+        assert scheduler.fire_due(now + timedelta(minutes=30)) == []
+        assert len(scheduler) == 1
+
+    def test_lead_time(self, db_session, events):
+        """期限日の lead_seconds 前に通知されることを確認"""
+        scheduler = ReminderScheduler(events.append, TestingSessionLocal, lead_seconds=600, horizon_seconds=3600)
+        todo = _add_todo(db_session, "task", timedelta(minutes=15))
+        now = datetime.utcnow()
+        scheduler.refill(now)
+        assert scheduler.next_fire_at() == todo.due_date - timedelta(minutes=10)
+        assert len(scheduler.fire_due(now + timedelta(minutes=6))) == 1
+
+    def test_max_pending(self, db_session, events):
+        """保持件数が上限を超えず、残りは後で読み込まれることを確認"""
+        scheduler = ReminderScheduler(events.append, TestingSessionLocal, horizon_seconds=3600, max_pending=2)
+        for minutes in (10, 20, 30):
+            _add_todo(db_session, f"{minutes}", timedelta(minutes=minutes))
+        now = datetime.utcnow()
+
+        scheduler.refill(now)
+        assert len(scheduler) <= 2
+        fired = []
+        for minutes in (15, 25, 35):
+            fired += scheduler.fire_due(now + timedelta(minutes=minutes))
+            scheduler.refill(now + timedelta(minutes=minutes))
+            assert len(scheduler) <= 2
+        fired += scheduler.fire_due(now + timedelta(minutes=35))
+        assert [event.title for event in fired] == ["10", "20", "30"]
+
+    def test_skips_stale_entries(self, scheduler, db_session, events):
+        """ヒープに反映されていない完了・削除は、通知前の確認で除外されることを確認"""
+        completed = _add_todo(db_session, "completed", timedelta(minutes=10))
+        deleted = _add_todo(db_session, "deleted", timedelta(minutes=10))
+        now = datetime.utcnow()
+        scheduler.refill(now)
+
+        completed.completed = True
+        db_session.delete(deleted)
+        db_session.commit()
+        assert scheduler.fire_due(now + timedelta(minutes=30)) == []
+
+    def test_sink_error_does_not_stop(self, db_session):
+        """通知先のエラーで他のリマインダーの送信が止まらないことを確認"""
+        delivered = []
+
+        def sink(event):
+            if event.title == "broken":
+                raise RuntimeError("boom")
+            delivered.append(event.title)
+
+        scheduler = ReminderScheduler(sink, TestingSessionLocal)
+        _add_todo(db_session, "broken", timedelta(minutes=10))
+        _add_todo(db_session, "ok", timedelta(minutes=20))
+        now = datetime.utcnow()
+        scheduler.refill(now)
+        scheduler.fire_due(now + timedelta(minutes=30))
+        assert delivered == ["ok"]
+
+    async def test_run(self, db_session, events):
+        """イベントループ上で通知日時にリマインダーを送り、stop()で終了することを確認"""
+        scheduler = ReminderScheduler(events.append, TestingSessionLocal)
+        todo = _add_todo(db_session, "task", timedelta(milliseconds=200))
+
+        task = asyncio.create_task(scheduler.run())
+        for _ in range(300):
+            if events:
+                break
+            await asyncio.sleep(0.01)
+        scheduler.stop()
+        await asyncio.wait_for(task, 5)
+        assert [event.todo_id for event in events] == [todo.id]
+
+
+class TestChangeDetection:
+    """作成・更新・削除の反映のテストクラス（エンドポイントからの呼び出しではなく updated_at で検出する）"""
+
+    @pytest.fixture(autouse=True)
+    def loaded(self, scheduler, db_session):
+        scheduler.refill()
+
+    def _due(self, minutes: int) -> str:
+        return (datetime.utcnow() + timedelta(minutes=minutes)).isoformat()
+
+    def test_create(self, client, auth_headers, scheduler):
+        """作成したToDoが読み込み範囲内なら次の読み込みでヒープに追加されることを確認"""
+        client.post("/api/todos", json={"title": "soon", "due_date": self._due(10)}, headers=auth_headers)
+        client.post("/api/todos", json={"title": "later", "due_date": self._due(24 * 60)}, headers=auth_headers)
+        assert len(scheduler) == 0
+        scheduler.refill()
+        assert len(scheduler) == 1
+
+    def test_update_and_delete(self, client, auth_headers, scheduler):
+        """期限日の変更・完了（一括操作を含む）・削除が反映されることを確認"""
+        response = client.post("/api/todos", json={"title": "task", "due_date": self._due(10)}, headers=auth_headers)
+        todo_id = response.json()["id"]
+        scheduler.refill()
+
+        client.patch(f"/api/todos/{todo_id}", json={"due_date": self._due(40)}, headers=auth_headers)
+        scheduler.refill()
+        assert scheduler.next_fire_at() > datetime.utcnow() + timedelta(minutes=30)
+
+        client.put("/api/todos/bulk", json={"todo_ids": [todo_id], "action": "complete"}, headers=auth_headers)
+        scheduler.refill()
+        assert len(scheduler) == 0
+
+        client.patch(f"/api/todos/{todo_id}", json={"completed": False}, headers=auth_headers)
+        scheduler.refill()
+        assert len(scheduler) == 1
+        client.delete(f"/api/todos/{todo_id}", headers=auth_headers)
+        scheduler.refill()
+        assert len(scheduler) == 0
+
+    def test_roll_up(self, client, auth_headers, scheduler):
+        """サブタスクの完了による親の完了（集合演算のUPDATE）が反映されることを確認"""
+        parent = client.post("/api/todos", json={"title": "parent", "due_date": self._due(10)}, headers=auth_headers)
+        child = client.post(
+            "/api/todos", json={"title": "child", "parent_id": parent.json()["id"]}, headers=auth_headers
+        )
+        scheduler.refill()
+        assert len(scheduler) == 1
+
+        client.patch(f"/api/todos/{child.json()['id']}", json={"completed": True}, headers=auth_headers)
+        scheduler.refill()
+        assert len(scheduler) == 0
+
+    def test_fired_once(self, db_session, scheduler, events):
+        """通知済みのToDoが変更の読み込みで再び追加されないことを確認"""
+        todo = _add_todo(db_session, "task", timedelta(milliseconds=10))
+        scheduler.refill()
+        time.sleep(0.02)
+        assert [event.todo_id for event in scheduler.fire_due()] == [todo.id]
+
+        scheduler.refill()
+        assert len(scheduler) == 0
+        assert scheduler.fire_due() == []
+
+
+class TestOutOfProcessWrites:
+    """他のプロセスでの変更の反映のテストクラス"""
+
+    def _run_worker(self, database_url: str, code: str) -> None:
+        """別のプロセス（他のワーカー）としてアプリケーションのモデルでデータベースを変更する"""
+        env = {**os.environ, "DATABASE_URL": database_url}
+        subprocess.run([sys.executable, "-c", code], env=env, cwd=BACKEND_DIR, check=True, capture_output=True)
+
+    def test_changes_from_another_process(self, tmp_path, events):
+        """他のプロセスで作成・完了したToDoが、スケジューラーのプロセスに反映されることを確認"""
+        database_url = f"sqlite:///{tmp_path / 'todos.db'}"
+        self._run_worker(
+            database_url,
+            "from datetime import datetime, timedelta\n"
+            "from app.core.database import SessionLocal, init_db\n"
+            "from app.models.todo import Todo\n"
+            "init_db()\n"
+            "with SessionLocal() as db:\n"
+            "    db.add(Todo(title='existing', position=0, due_date=datetime.utcnow() + timedelta(minutes=10)))\n"
+            "    db.commit()\n",
+        )
+        engine = create_engine(database_url)
+        scheduler = ReminderScheduler(events.append, session_factory=sessionmaker(bind=engine))
+        try:
+            scheduler.refill()
+            assert len(scheduler) == 1
+
+            self._run_worker(
+                database_url,
+                "from datetime import datetime, timedelta\n"
+                "from app.core.database import SessionLocal\n"
+                "from app.models.todo import Todo\n"
+                "with SessionLocal() as db:\n"
+                "    db.query(Todo).update({Todo.completed: True}, synchronize_session=False)\n"
+                "    db.add(Todo(title='created', position=1, due_date=datetime.utcnow() + timedelta(milliseconds=300)))\n"
+                "    db.commit()\n",
+            )
+            scheduler.refill()
+            assert len(scheduler) == 1
+            fired = scheduler.fire_due(datetime.utcnow() + timedelta(seconds=1))
+            assert [event.title for event in fired] == ["created"]
+        finally:
+            engine.dispose()
+
+
+class TestLease:
+    """複数のプロセスでの通知の担当（リース）のテストクラス"""
+
+    def test_acquire_and_expire(self, db_session):
+        """有効なリースは1つのプロセスだけが取得でき、期限切れの後は他のプロセスが引き継ぐことを確認"""
+        first = DatabaseLease("reminders", ttl_seconds=30, session_factory=TestingSessionLocal, holder="a")
+        second = DatabaseLease("reminders", ttl_seconds=30, session_factory=TestingSessionLocal, holder="b")
+        now = datetime.utcnow()
+
+        assert first.acquire(now) is True
+        assert second.acquire(now) is False
+        # 保持しているプロセスは延長できる
+        assert first.acquire(now + timedelta(seconds=20)) is True
+        assert second.acquire(now + timedelta(seconds=40)) is False
+
+        assert second.acquire(now + timedelta(seconds=60)) is True
+        assert first.acquire(now + timedelta(seconds=60)) is False
+
+    def test_single_worker_sends(self, db_session):
+        """複数のワーカーでスケジューラーを動かしても、リマインダーは1回だけ送られることを確認"""
+        sent = [[], [], []]
+        workers = [
+            ReminderScheduler(
+                events.append, TestingSessionLocal, lease=DatabaseLease("reminders", 30, TestingSessionLocal)
+            )
+            for events in sent
+        ]
+        todo = _add_todo(db_session, "task", timedelta(milliseconds=100))
+        for worker in workers:
+            worker.tick()
+        time.sleep(0.15)
+        for worker in workers:
+            worker.tick()
+        assert [[event.todo_id for event in events] for events in sent] == [[todo.id], [], []]
+
+        # 担当のワーカーが終了すると、他のワーカーが引き継ぐ
+        workers[0].lease.release()
+        later = _add_todo(db_session, "later", timedelta(milliseconds=100))
+        workers[1].tick()
+        time.sleep(0.15)
+        workers[1].tick()
+        assert [event.todo_id for event in sent[1]] == [later.id]
+
+
+class TestWebhookSink:
+    """Webhookの通知先のテストクラス"""
+
+    def test_posts_json(self):
+        """リマインダーがJSONでPOSTされることを確認"""
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.handle_request)
+        thread.start()
+        try:
+            due_date = datetime(2026, 1, 1, 9, 0)
+            WebhookReminderSink(f"http://127.0.0.1:{server.server_port}/hook")(
+                ReminderEvent(todo_id=1, title="task", due_date=due_date, fired_at=due_date)
+            )
+            thread.join(5)
+        finally:
+            server.server_close()
+        assert received == [
+            {"todo_id": 1, "title": "task", "due_date": "2026-01-01T09:00:00", "fired_at": "2026-01-01T09:00:00"}
+        ]
+
+    def test_failure_is_logged(self, caplog):
+        """送信に失敗しても例外にならないことを確認"""
+        now = datetime.utcnow()
+        WebhookReminderSink("http://127.0.0.1:1/hook", timeout=0.5)(ReminderEvent(1, "task", now, now))
+        assert "Failed to deliver reminder" in caplog.text
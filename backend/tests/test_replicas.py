@@ -0,0 +1,167 @@
+"""
+読み取りレプリカの振り分けのテスト
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import main
+from app.core import database
+from app.core.cache import get_cache
+from app.core.database import Base, SessionLocal
+from app.core.replicas import InMemoryWriteTracker, RedisWriteTracker, ReplicaPool
+from app.core.security import get_password_hash
+from app.models.todo import Todo
+from app.models.user import User
+from tests.conftest import engine as primary_engine
+from tests.fake_redis import FakeRedis
+
+
+def _memory_engine():
+    return create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+class TestReplicaPool:
+    """レプリカのラウンドロビンと死活確認のテストクラス"""
+
+    def test_round_robin(self):
+        """利用可能なレプリカに順番に振り分けることを確認"""
+        engines = [_memory_engine(), _memory_engine()]
+        pool = ReplicaPool(engines)
+        chosen = [pool.choose(now=0).engine for _ in range(4)]
+        assert chosen == [engines[0], engines[1], engines[0], engines[1]]
+
+    def test_unhealthy_replica_skipped(self, monkeypatch):
+        """死活確認に失敗したレプリカが次の確認まで使われないことを確認"""
+        healthy, broken = _memory_engine(), _memory_engine()
+        pool = ReplicaPool([healthy, broken], check_interval=10)
+        monkeypatch.setattr(pool.replicas[1], "ping", lambda: False)
+
+        assert [pool.choose(now=0).engine for _ in range(3)] == [healthy, healthy, healthy]
+
+        # 確認間隔が経過するまでは再確認しない
+        monkeypatch.setattr(pool.replicas[1], "ping", lambda: True)
+        assert {pool.choose(now=5).engine for _ in range(2)} == {healthy}
+        assert {pool.choose(now=10).engine for _ in range(2)} == {healthy, broken}
+
+    def test_all_replicas_down(self, monkeypatch):
+        """利用可能なレプリカがない場合はNone（プライマリ）を返すことを確認"""
+        pool = ReplicaPool([_memory_engine()])
+        monkeypatch.setattr(pool.replicas[0], "ping", lambda: False)
+        assert pool.choose(now=0) is None
+        assert ReplicaPool([]).choose() is None
+
+    def test_mark_down(self):
+        """クエリの失敗で振り分け対象から外れることを確認"""
+        pool = ReplicaPool([_memory_engine()], check_interval=10)
+        replica = pool.choose(now=0)
+        replica.mark_down(now=1)
+        assert pool.choose(now=2) is None
+        assert pool.choose(now=11) is replica
+
+
+class TestWriteTracker:
+    """read-your-writesのための書き込み記録のテストクラス"""
+
+    def test_in_memory(self):
+        """記録したユーザーが指定秒数だけプライマリに固定されることを確認"""
+        tracker = InMemoryWriteTracker()
+        tracker.mark(1, seconds=5, now=100)
+        assert tracker.is_sticky(1, now=104)
+        assert not tracker.is_sticky(1, now=105)
+        assert not tracker.is_sticky(2, now=100)
+
+    def test_redis(self):
+        """Redisに記録した場合も判定できることを確認"""
+        tracker = RedisWriteTracker(FakeRedis())
+        tracker.mark(1, seconds=5)
+        assert tracker.is_sticky(1)
+        assert not tracker.is_sticky(2)
+
+    def test_redis_error_uses_primary(self):
+        """Redisに接続できない場合はプライマリを使う（整合性を優先）ことを確認"""
+
+        class BrokenRedis:
+            def exists(self, *keys):
+                raise ConnectionError("down")
+
+        assert RedisWriteTracker(BrokenRedis()).is_sticky(1)
+
+
+class TestReadRouting:
+    """エンドポイントの読み取り振り分けのテストクラス"""
+
+    @pytest.fixture
+    def replica_engine(self):
+        engine = _memory_engine()
+        Base.metadata.create_all(bind=engine)
+        yield engine
+        Base.metadata.drop_all(bind=engine)
+
+    @pytest.fixture
+    def routed_client(self, monkeypatch, db_session, replica_engine):
+        """プライマリ（テスト用DB）とレプリカ（別のDB）に振り分けるクライアント"""
+        monkeypatch.setitem(SessionLocal.kw, "bind", primary_engine)
+        monkeypatch.setattr(database, "replica_pool", ReplicaPool([replica_engine]))
+
+        # ユーザーはレプリカにも複製されている状態にする
+        for session in (db_session, sessionmaker(bind=replica_engine)()):
+            session.add(User(id=1, email="test@example.com", hashed_password=get_password_hash("password")))
+            session.commit()
+
+        with TestClient(main.create_app()) as client:
+            response = client.post("/api/auth/login", data={"username": "test@example.com", "password": "password"})
+            client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+            yield client
+
+    def test_reads_from_replica(self, routed_client, db_session):
+        """一覧取得と /me がレプリカから読み取られることを確認"""
+        db_session.add(Todo(title="primary only", position=0, priority=1))
+        db_session.commit()
+
+        assert routed_client.get("/api/todos").json()["total"] == 0
+        assert routed_client.get("/api/auth/me").json()["email"] == "test@example.com"
+
+    def test_replica_reads_not_cached(self, routed_client, db_session):
+        """レプリカから読み取った一覧はキャッシュされず、プライマリから読み取った一覧のみキャッシュされることを確認"""
+        cache = get_cache()
+        routed_client.get("/api/todos")
+        routed_client.get("/api/todos")
+        assert (cache.hits, cache.misses) == (0, 0)
+
+        # 書き込み後（プライマリから読み取る間）はキャッシュする
+        routed_client.post("/api/todos", json={"title": "new todo"})
+        for _ in range(2):
+            assert routed_client.get("/api/todos").json()["total"] == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_read_your_writes(self, routed_client):
+        """書き込みを行ったユーザーはプライマリから読み取ることを確認"""
+        response = routed_client.post("/api/todos", json={"title": "new todo"})
+        assert response.status_code == 200
+
+        data = routed_client.get("/api/todos").json()
+        assert [todo["title"] for todo in data["data"]] == ["new todo"]
+
+    def test_replica_down_falls_back_to_primary(self, routed_client, db_session, monkeypatch):
+        """レプリカが利用できない場合はプライマリから読み取ることを確認"""
+        db_session.add(Todo(title="primary only", position=0, priority=1))
+        db_session.commit()
+        replica = database.replica_pool.replicas[0]
+        monkeypatch.setattr(replica, "ping", lambda: False)
+        replica.checked_at = None
+
+        assert routed_client.get("/api/todos").json()["total"] == 1
+
+    def test_replica_session_is_read_only(self, replica_engine, monkeypatch):
+        """レプリカのセッションで書き込もうとするとエラーになることを確認"""
+        monkeypatch.setattr(database, "replica_pool", ReplicaPool([replica_engine]))
+        generator = database.get_read_db()
+        db = next(generator)
+        db.add(Todo(title="x", position=0, priority=1))
+        with pytest.raises(RuntimeError):
+            db.flush()
+        generator.close()
@@ -0,0 +1,117 @@
+"""
+JWT検証のキャッシュとバックエンドのテスト
+"""
+
+import importlib.util
+import time
+from datetime import timedelta
+
+import pytest
+
+from app.core import security
+from app.core.jwt_backends import JoseBackend, create_backend
+from app.core.security import create_access_token, decode_token, verified_token_cache
+from app.core.token_cache import VerifiedTokenCache
+
+
+class TestVerifiedTokenCache:
+    """検証済みトークンのキャッシュのテストクラス"""
+
+    def test_repeat_verification_hits_cache(self, monkeypatch):
+        """同じトークンの2回目以降の検証で署名検証が省略されることを確認"""
+        token = create_access_token({"sub": "test@example.com"}, expires_delta=timedelta(minutes=5))
+
+        calls = []
+        backend = security.get_jwt_backend()
+        original_decode = backend.decode
+
+        def counting_decode(*args):
+            calls.append(args)
+            return original_decode(*args)
+
+        monkeypatch.setattr(backend, "decode", counting_decode)
+
+        for _ in range(5):
+            assert decode_token(token)["sub"] == "test@example.com"
+        assert len(calls) == 1
+        assert verified_token_cache.hits == 4
+
+    def test_returns_copy(self):
+        """キャッシュされたペイロードを変更しても影響しないことを確認"""
+        token = create_access_token({"sub": "test@example.com"})
+        decode_token(token)["sub"] = "tampered"
+        assert decode_token(token)["sub"] == "test@example.com"
+
+    def test_expired_entry_is_not_used(self):
+        """有効期限を過ぎたエントリが使用されないことを確認"""
+        cache = VerifiedTokenCache(max_size=10)
+        cache.put("token", {"sub": "a", "exp": 1000})
+        assert cache.get("token", now=999)["sub"] == "a"
+        assert cache.get("token", now=1000) is None
+        assert len(cache) == 0
+
+    def test_expired_token_rejected(self):
+        """期限切れのトークンがキャッシュ経由でも拒否されることを確認"""
+        token = create_access_token({"sub": "test@example.com"}, expires_delta=timedelta(seconds=-1))
+        assert decode_token(token) is None
+
+    def test_lru_eviction(self):
+        """件数上限を超えると最も古く使われたエントリが破棄されることを確認"""
+        cache = VerifiedTokenCache(max_size=2)
+        exp = time.time() + 60
+        cache.put("a", {"exp": exp})
+        cache.put("b", {"exp": exp})
+        cache.get("a")
+        cache.put("c", {"exp": exp})
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+    def test_invalid_token_not_cached(self):
+        """検証に失敗したトークンはキャッシュされないことを確認"""
+        assert decode_token("invalid.token.value") is None
+        assert len(verified_token_cache) == 0
+
+    def test_disabled_cache(self):
+        """件数上限0でキャッシュが無効になることを確認"""
+        cache = VerifiedTokenCache(max_size=0)
+        cache.put("token", {"exp": time.time() + 60})
+        assert cache.get("token") is None
+
+    @pytest.mark.slow
+    def test_cached_verification_benchmark(self):
+        """キャッシュ済みの検証が署名検証より大幅に高速であることを確認（マイクロベンチマーク）"""
+        token = create_access_token({"sub": "test@example.com", "uid": 1}, expires_delta=timedelta(minutes=5))
+        backend = JoseBackend()
+        iterations = 500
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            backend.decode(token, security.SECRET_KEY, security.ALGORITHM)
+        uncached = (time.perf_counter() - start) / iterations
+
+        decode_token(token)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            decode_token(token)
+        cached = (time.perf_counter() - start) / iterations
+
+        print(f"\n[BENCH] jwt decode: uncached={uncached * 1e6:.1f}us cached={cached * 1e6:.1f}us")
+        assert cached < uncached / 3
+
+
+class TestJWTBackends:
+    """JWTバックエンドの切り替えのテストクラス"""
+
+    def test_unknown_backend(self):
+        """未知のバックエンド名でエラーになることを確認"""
+        with pytest.raises(ValueError):
+            create_backend("unknown")
+
+    @pytest.mark.skipif(importlib.util.find_spec("jwt") is None, reason="PyJWTがインストールされていない")
+    def test_pyjwt_compatible_with_jose(self):
+        """python-joseで発行したトークンをPyJWTで検証できることを確認"""
+        token = create_access_token({"sub": "test@example.com", "uid": 1}, expires_delta=timedelta(minutes=5))
+        payload = create_backend("pyjwt").decode(token, security.SECRET_KEY, security.ALGORITHM)
+        assert payload["sub"] == "test@example.com"
+        assert payload["uid"] == 1
@@ -0,0 +1,203 @@
+"""
+ToDoの論理削除・復元・物理削除のテスト
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.services.job_handlers  # noqa: F401  ジョブの処理を登録
+from app.core.jobs import JobRunner, enqueue
+from app.models.job import Job
+from app.models.tag import todo_tags
+from app.models.todo import NOT_DELETED, Todo
+from app.models.todo_stats import read_stats, rebuild_values
+from app.services.purge import purge_deleted
+from tests.conftest import TestingSessionLocal
+
+
+def _create(client, headers, title: str, parent_id=None, **fields) -> int:
+    body = dict(fields, title=title, parent_id=parent_id)
+    return client.post("/api/todos", json=body, headers=headers).json()["id"]
+
+
+def _titles(client, headers):
+    return [todo["title"] for todo in client.get("/api/todos", headers=headers).json()["data"]]
+
+
+def _assert_stats_consistent(db_session):
+    db_session.expire_all()
+    row = read_stats(db_session.connection())
+    expected = rebuild_values(db_session.connection())
+    assert (row["total"], row["completed"], row["priority_medium"]) == (
+        expected["total"],
+        expected["completed"],
+        expected["priority_medium"],
+    )
+
+
+@pytest.fixture
+def tree(client, auth_headers):
+    """root ─ child ─ grandchild / root ─ sibling（完了済み）"""
+    root = _create(client, auth_headers, "root")
+    child = _create(client, auth_headers, "child", root, tags=["work"])
+    grandchild = _create(client, auth_headers, "grandchild", child)
+    sibling = _create(client, auth_headers, "sibling", root)
+    client.patch(f"/api/todos/{sibling}", json={"completed": True}, headers=auth_headers)
+    return {"root": root, "child": child, "grandchild": grandchild, "sibling": sibling}
+
+
+class TestSoftDelete:
+    """論理削除のテストクラス"""
+
+    def test_hidden_but_kept(self, client, auth_headers, db_session, tree):
+        """削除したToDoとサブタスクは一覧・更新の対象外になり、行とタグは残ることを確認"""
+        response = client.delete(f"/api/todos/{tree['child']}", headers=auth_headers)
+        assert response.status_code == 200
+        assert (response.json()["title"], response.json()["tags"]) == ("child", ["work"])
+        assert response.json()["deleted_at"] is not None
+
+        assert _titles(client, auth_headers) == ["root", "sibling"]
+        assert client.put(f"/api/todos/{tree['child']}", json={"title": "x"}, headers=auth_headers).status_code == 404
+        response = client.patch(f"/api/todos/{tree['grandchild']}", json={"title": "x"}, headers=auth_headers)
+        assert response.status_code == 404
+        assert client.delete(f"/api/todos/{tree['child']}", headers=auth_headers).status_code == 404
+        assert client.get(f"/api/todos/{tree['child']}/subtree", headers=auth_headers).status_code == 404
+        # 削除したToDoはサブタスクの親にできない
+        response = client.post("/api/todos", json={"title": "x", "parent_id": tree["child"]}, headers=auth_headers)
+        assert response.status_code == 400
+
+        db_session.expire_all()
+        assert db_session.query(Todo).count() == 4
+        assert db_session.execute(todo_tags.select()).all() != []
+
+    def test_roll_up_and_stats(self, client, auth_headers, db_session, tree):
+        """削除した未完了の子は親のロールアップで数えられず、件数の集計からも除かれることを確認"""
+        client.delete(f"/api/todos/{tree['child']}", headers=auth_headers)
+        db_session.expire_all()
+        assert db_session.get(Todo, tree["root"]).completed is True
+        assert client.get("/api/todos/stats", headers=auth_headers).json()["total"] == 2
+        _assert_stats_consistent(db_session)
+
+    def test_single_update(self, client, auth_headers, db_session, assert_max_queries):
+        """削除は部分木を含めて1回のUPDATEで行われることを確認（親がない場合）"""
+        todo_id = _create(client, auth_headers, "task")
+        # ユーザー / 論理削除（UPDATE ... RETURNING） / 集計の更新
+        with assert_max_queries(3) as stats:
+            assert client.delete(f"/api/todos/{todo_id}", headers=auth_headers).status_code == 200
+        assert not any(statement.startswith("DELETE") for statement in stats.statements)
+
+    def test_excluded_from_reorder(self, client, auth_headers):
+        """削除したToDoは並び替えの対象にできないことを確認"""
+        first = _create(client, auth_headers, "first")
+        second = _create(client, auth_headers, "second")
+        client.delete(f"/api/todos/{second}", headers=auth_headers)
+        response = client.put("/api/todos/reorder", json={"todo_ids": [second, first]}, headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_list_with_only_deleted_todos(self, client, auth_headers, db_session):
+        """削除したToDoだけが残るリストは削除でき、ToDoは既定のリストに移されることを確認"""
+        list_id = client.post("/api/lists", json={"name": "work"}, headers=auth_headers).json()["id"]
+        todo_id = _create(client, auth_headers, "task", list_id=list_id)
+        client.delete(f"/api/todos/{todo_id}", headers=auth_headers)
+
+        assert client.delete(f"/api/lists/{list_id}", headers=auth_headers).status_code == 200
+        response = client.post(f"/api/todos/{todo_id}/restore", headers=auth_headers)
+        assert response.json()["list_id"] is None
+
+
+class TestRestore:
+    """復元のテストクラス"""
+
+    def test_restores_subtree(self, client, auth_headers, db_session, tree):
+        """同時に削除したサブタスクとタグが復元され、親と件数の集計に反映されることを確認"""
+        client.delete(f"/api/todos/{tree['child']}", headers=auth_headers)
+        response = client.post(f"/api/todos/{tree['child']}/restore", headers=auth_headers)
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["id"], body["tags"], body["deleted_at"]) == (tree["child"], ["work"], None)
+        assert response.headers["ETag"] == f'"{body["version"]}"'
+
+        assert sorted(_titles(client, auth_headers)) == ["child", "grandchild", "root", "sibling"]
+        db_session.expire_all()
+        assert db_session.get(Todo, tree["root"]).completed is False
+        _assert_stats_consistent(db_session)
+
+    def test_keeps_earlier_deletions(self, client, auth_headers, tree):
+        """先に別の操作で削除したサブタスクは復元しないことを確認"""
+        client.delete(f"/api/todos/{tree['grandchild']}", headers=auth_headers)
+        client.delete(f"/api/todos/{tree['root']}", headers=auth_headers)
+        client.post(f"/api/todos/{tree['root']}/restore", headers=auth_headers)
+        assert sorted(_titles(client, auth_headers)) == ["child", "root", "sibling"]
+
+    def test_parent_deleted(self, client, auth_headers, tree):
+        """親が削除されている場合は 409 となり、親を復元した後は復元できることを確認"""
+        client.delete(f"/api/todos/{tree['grandchild']}", headers=auth_headers)
+        client.delete(f"/api/todos/{tree['child']}", headers=auth_headers)
+        assert client.post(f"/api/todos/{tree['grandchild']}/restore", headers=auth_headers).status_code == 409
+        client.post(f"/api/todos/{tree['child']}/restore", headers=auth_headers)
+        assert client.post(f"/api/todos/{tree['grandchild']}/restore", headers=auth_headers).status_code == 200
+
+    def test_not_deleted(self, client, auth_headers, tree):
+        """削除されていない・存在しないToDoの復元は 404 となることを確認"""
+        assert client.post(f"/api/todos/{tree['root']}/restore", headers=auth_headers).status_code == 404
+        assert client.post("/api/todos/9999/restore", headers=auth_headers).status_code == 404
+
+
+class TestPurgeDeleted:
+    """物理削除のテストクラス"""
+
+    def test_purges_only_old(self, client, auth_headers, db_session, tree):
+        """保存期間を過ぎたToDoだけが、タグとの対応とともに削除されることを確認"""
+        client.delete(f"/api/todos/{tree['child']}", headers=auth_headers)
+        cutoff = datetime.utcnow() + timedelta(seconds=1)
+        client.delete(f"/api/todos/{tree['sibling']}", headers=auth_headers)
+        db_session.expire_all()
+        db_session.query(Todo).filter(Todo.id == tree["sibling"]).update({Todo.deleted_at: cutoff})
+        db_session.commit()
+
+        assert purge_deleted(db_session, cutoff) == 2
+        db_session.expire_all()
+        assert {todo.title for todo in db_session.query(Todo)} == {"root", "sibling"}
+        assert db_session.execute(todo_tags.select()).all() == []
+        # 物理削除した後は復元できない
+        assert client.post(f"/api/todos/{tree['child']}/restore", headers=auth_headers).status_code == 404
+        _assert_stats_consistent(db_session)
+
+    def test_batches(self, client, auth_headers, db_session, assert_max_queries):
+        """バッチ単位でコミットし、バッチの間で待機することを確認"""
+        for i in range(5):
+            client.delete(f"/api/todos/{_create(client, auth_headers, f'todo {i}')}", headers=auth_headers)
+
+        started = time.monotonic()
+        # バッチごとに SELECT / タグの DELETE / DELETE（最後のバッチは件数が足りないため、次の SELECT は行わない）
+        with assert_max_queries(3 * 3):
+            assert purge_deleted(db_session, datetime.utcnow() + timedelta(seconds=1), 2, pause_seconds=0.05) == 5
+        assert time.monotonic() - started >= 0.1
+        assert db_session.query(Todo).count() == 0
+
+    def test_uses_partial_index(self, db_session):
+        """物理削除の対象の検索が deleted_at の部分インデックスを使うことを確認"""
+        connection = db_session.connection().connection
+        statement = (
+            "SELECT todos.id FROM todos WHERE todos.deleted_at IS NOT NULL AND todos.deleted_at < ? "
+            "ORDER BY todos.deleted_at, todos.id LIMIT ?"
+        )
+        plan = " ".join(
+            str(row) for row in connection.execute(f"EXPLAIN QUERY PLAN {statement}", (datetime.utcnow(), 10))
+        )
+        assert "ix_todos_deleted_at" in plan
+
+    def test_job(self, client, auth_headers, db_session):
+        """ジョブとして実行できることを確認"""
+        todo_id = _create(client, auth_headers, "task")
+        client.delete(f"/api/todos/{todo_id}", headers=auth_headers)
+        db_session.query(Todo).update({Todo.deleted_at: datetime.utcnow() - timedelta(hours=25)})
+        enqueue(db_session, "todos.purge_deleted", {"after_hours": 24})
+        db_session.commit()
+
+        JobRunner(session_factory=TestingSessionLocal).run_pending()
+        db_session.expire_all()
+        assert db_session.query(Job).one().result == {"purged": 1}
+        assert db_session.query(Todo).filter(NOT_DELETED).count() == db_session.query(Todo).count() == 0
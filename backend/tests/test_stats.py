@@ -0,0 +1,177 @@
+"""
+ToDoの件数の集計のテスト
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.models.todo_stats as todo_stats_module
+import app.services.job_handlers  # noqa: F401  ジョブの処理を登録
+from app.core.jobs import JobRunner, enqueue
+from app.models.todo import Todo
+from app.models.todo_stats import TodoStats, read_stats, rebuild_stats, rebuild_values
+from app.services.archive import archive_completed
+from tests.conftest import TestingSessionLocal
+
+
+def _stats_row(db_session) -> dict:
+    db_session.expire_all()
+    row = read_stats(db_session.connection())
+    return {column: row[column] for column in ("total", "completed", "priority_high", "priority_medium")}
+
+
+def _assert_consistent(db_session) -> None:
+    """保持している集計が todos テーブルから集計し直した値と一致することを確認"""
+    db_session.expire_all()
+    row = read_stats(db_session.connection())
+    expected = rebuild_values(db_session.connection())
+    assert {column: row[column] for column in ("total", "completed", "priority_high")} == {
+        column: expected[column] for column in ("total", "completed", "priority_high")
+    }
+
+
+class TestStatsEndpoint:
+    """集計の取得のテストクラス"""
+
+    def test_stats(self, client, auth_headers, db_session):
+        """件数・完了・優先度ごと・期限切れの件数を返すことを確認"""
+        client.post("/api/todos", json={"title": "a", "priority": 0}, headers=auth_headers)
+        client.post("/api/todos", json={"title": "b", "completed": True}, headers=auth_headers)
+        overdue = (datetime.utcnow() - timedelta(days=1)).isoformat()
+        client.post("/api/todos", json={"title": "c", "priority": 2, "due_date": overdue}, headers=auth_headers)
+
+        response = client.get("/api/todos/stats", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == {
+            "total": 3,
+            "completed": 1,
+            "incomplete": 2,
+            "overdue": 1,
+            "by_priority": {"0": 1, "1": 1, "2": 1},
+        }
+
+    def test_reads_one_row(self, client, auth_headers, db_session, assert_max_queries):
+        """集計の取得が集計の行の読み取りと期限切れの件数の2クエリで済むことを確認"""
+        for i in range(20):
+            client.post("/api/todos", json={"title": f"todo {i}"}, headers=auth_headers)
+
+        # ユーザー / 集計の行 / 期限切れの件数
+        with assert_max_queries(3) as stats:
+            body = client.get("/api/todos/stats", headers=auth_headers).json()
+        assert body["total"] == 20
+        assert not any("GROUP BY" in statement for statement in stats.statements)
+
+    def test_without_row(self, client, auth_headers, db_session):
+        """集計の行がない場合は todos テーブルから集計することを確認"""
+        db_session.add(Todo(title="a", completed=True, position=0, priority=1))
+        db_session.commit()
+        db_session.query(TodoStats).delete()
+        db_session.commit()
+
+        assert client.get("/api/todos/stats", headers=auth_headers).json()["completed"] == 1
+
+    def test_requires_auth(self, client):
+        """認証なしでは取得できないことを確認"""
+        assert client.get("/api/todos/stats").status_code == 401
+
+
+class TestStatsMaintenance:
+    """ToDoの変更に合わせた集計の増減のテストクラス"""
+
+    def test_create_update_delete(self, client, auth_headers, db_session):
+        """作成・更新（完了・優先度の変更）・削除が集計に反映されることを確認"""
+        todo_id = client.post("/api/todos", json={"title": "a", "priority": 0}, headers=auth_headers).json()["id"]
+        assert _stats_row(db_session) == {"total": 1, "completed": 0, "priority_high": 1, "priority_medium": 0}
+
+        client.put(f"/api/todos/{todo_id}", json={"title": "a", "completed": True, "priority": 1}, headers=auth_headers)
+        assert _stats_row(db_session) == {"total": 1, "completed": 1, "priority_high": 0, "priority_medium": 1}
+
+        # 件数に関係しない変更では集計を更新しない
+        client.put(f"/api/todos/{todo_id}", json={"title": "renamed"}, headers=auth_headers)
+        assert _stats_row(db_session)["completed"] == 1
+
+        client.delete(f"/api/todos/{todo_id}", headers=auth_headers)
+        assert _stats_row(db_session) == {"total": 0, "completed": 0, "priority_high": 0, "priority_medium": 0}
+
+    @pytest.mark.parametrize("action", ["complete", "incomplete", "delete"])
+    def test_bulk(self, client, auth_headers, db_session, action):
+        """一括操作が集計に反映されることを確認"""
+        ids = [
+            client.post("/api/todos", json={"title": f"{i}", "completed": i == 0}, headers=auth_headers).json()["id"]
+            for i in range(3)
+        ]
+        client.put("/api/todos/bulk", json={"todo_ids": ids[:2], "action": action}, headers=auth_headers)
+        _assert_consistent(db_session)
+
+    def test_bulk_repeated(self, client, auth_headers, db_session):
+        """完了済みのToDoを再度完了にしても、集計が増えないことを確認（増減は変更前後の値から求める）"""
+        ids = [client.post("/api/todos", json={"title": f"{i}"}, headers=auth_headers).json()["id"] for i in range(3)]
+        for _ in range(2):
+            client.put("/api/todos/bulk", json={"todo_ids": ids[:2], "action": "complete"}, headers=auth_headers)
+            client.patch(f"/api/todos/{ids[2]}", json={"completed": True}, headers=auth_headers)
+            client.put("/api/todos/bulk", json={"todo_ids": ids, "action": "complete"}, headers=auth_headers)
+        assert _stats_row(db_session)["completed"] == 3
+        _assert_consistent(db_session)
+
+    def test_slots_summed(self, db_session):
+        """別々の行（slot）に書き込んだ増減が、取得時に合計されることを確認"""
+        rebuild_stats(db_session.connection())
+        db_session.commit()
+        for slot, title in ((3, "a"), (7, "b")):
+            db_session.connection().info["todo_stats_slot"] = slot
+            db_session.add(Todo(title=title, completed=True, position=0))
+            db_session.commit()
+
+        rows = db_session.query(TodoStats.slot, TodoStats.total).filter(TodoStats.total != 0).order_by(TodoStats.slot)
+        assert rows.all() == [(3, 1), (7, 1)]
+        assert _stats_row(db_session) == {"total": 2, "completed": 2, "priority_high": 0, "priority_medium": 2}
+
+        # 集計し直すと slot 0 に全件が入り、他の行は0になる
+        rebuild_stats(db_session.connection())
+        db_session.commit()
+        assert rows.all() == [(0, 2)]
+        _assert_consistent(db_session)
+
+    def test_missing_slot_created(self, db_session, monkeypatch):
+        """この接続の slot の行がない場合は、集計し直さずに値が0の行を作成して増減させることを確認"""
+        db_session.add(Todo(title="a", position=0))
+        db_session.commit()
+        rebuild_stats(db_session.connection())
+        db_session.query(TodoStats).filter(TodoStats.slot == 5).delete()
+        db_session.commit()
+
+        def fail(connection):
+            raise AssertionError("todos全体を集計し直した")
+
+        monkeypatch.setattr(todo_stats_module, "rebuild_values", fail)
+        db_session.connection().info["todo_stats_slot"] = 5
+        db_session.add(Todo(title="b", completed=True, position=1))
+        db_session.commit()
+        monkeypatch.undo()
+
+        rows = db_session.query(TodoStats.slot, TodoStats.total).filter(TodoStats.total != 0).order_by(TodoStats.slot)
+        assert rows.all() == [(0, 1), (5, 1)]
+        _assert_consistent(db_session)
+
+    def test_archive(self, db_session):
+        """アーカイブで移動したToDoが集計から除かれることを確認"""
+        db_session.add_all([Todo(title="a", completed=True, position=0), Todo(title="b", position=1)])
+        db_session.commit()
+        db_session.query(Todo).filter(Todo.title == "a").update({Todo.completed_at: datetime(2000, 1, 1)})
+        db_session.commit()
+
+        archive_completed(db_session, datetime.utcnow() - timedelta(days=30))
+        assert _stats_row(db_session)["total"] == 1
+        _assert_consistent(db_session)
+
+    def test_rebuild_job(self, db_session):
+        """集計し直すジョブで、ずれた集計が修正されることを確認"""
+        db_session.add(Todo(title="a", completed=True, position=0, priority=0))
+        db_session.commit()
+        db_session.query(TodoStats).update({TodoStats.total: 99, TodoStats.completed: 42})
+        enqueue(db_session, "maintenance.rebuild_todo_stats")
+        db_session.commit()
+
+        JobRunner(session_factory=TestingSessionLocal).run_pending()
+        assert _stats_row(db_session) == {"total": 1, "completed": 1, "priority_high": 1, "priority_medium": 0}
@@ -0,0 +1,182 @@
+"""
+サブタスク（親子関係）のテスト
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.todo import NOT_DELETED, Todo, TodoArchive
+from app.models.todo_stats import read_stats, rebuild_values
+from app.services.archive import archive_completed
+from app.services.subtasks import roll_up_completion
+
+
+def _create(client, headers, title: str, parent_id=None, **fields) -> dict:
+    return client.post("/api/todos", json={"title": title, "parent_id": parent_id, **fields}, headers=headers).json()
+
+
+def _completed(db_session, *todo_ids) -> list:
+    db_session.expire_all()
+    return [db_session.get(Todo, todo_id).completed for todo_id in todo_ids]
+
+
+@pytest.fixture
+def tree(client, auth_headers):
+    """root - child - grandchild / root - sibling の木"""
+    root = _create(client, auth_headers, "root")
+    child = _create(client, auth_headers, "child", root["id"])
+    grandchild = _create(client, auth_headers, "grandchild", child["id"])
+    sibling = _create(client, auth_headers, "sibling", root["id"])
+    return {todo["title"]: todo["id"] for todo in (root, child, grandchild, sibling)}
+
+
+class TestSubtaskHierarchy:
+    """親子関係の作成・変更・取得のテストクラス"""
+
+    def test_create_inherits_list(self, client, auth_headers):
+        """リストを指定しないサブタスクは親のリストに追加されることを確認"""
+        list_id = client.post("/api/lists", json={"name": "Work"}, headers=auth_headers).json()["id"]
+        parent = _create(client, auth_headers, "parent", list_id=list_id)
+        child = client.post("/api/todos", json={"title": "child", "parent_id": parent["id"]}, headers=auth_headers)
+        assert (child.json()["parent_id"], child.json()["list_id"]) == (parent["id"], list_id)
+
+    def test_invalid_parent(self, client, auth_headers, tree):
+        """存在しない親や、自身・子孫を親に指定できないことを確認"""
+        response = client.post("/api/todos", json={"title": "x", "parent_id": 9999}, headers=auth_headers)
+        assert response.status_code == 400
+
+        for parent in ("root", "grandchild"):
+            response = client.put(
+                f"/api/todos/{tree['root']}", json={"title": "root", "parent_id": tree[parent]}, headers=auth_headers
+            )
+            assert response.status_code == 400
+
+        # 子孫でなければ移動できる
+        response = client.put(
+            f"/api/todos/{tree['grandchild']}",
+            json={"title": "grandchild", "parent_id": tree["sibling"]},
+            headers=auth_headers,
+        )
+        assert response.json()["parent_id"] == tree["sibling"]
+
+    def test_subtree(self, client, auth_headers, tree, assert_max_queries):
+        """部分木を入れ子で取得でき、階層の深さによらないクエリ数で済むことを確認"""
+        with assert_max_queries(3):  # ユーザー / 部分木 / タグ
+            response = client.get(f"/api/todos/{tree['root']}/subtree", headers=auth_headers)
+        body = response.json()
+        assert [child["title"] for child in body["children"]] == ["child", "sibling"]
+        assert [todo["title"] for todo in body["children"][0]["children"]] == ["grandchild"]
+        assert body["children"][0]["children"][0]["children"] == []
+
+        assert client.get("/api/todos/9999/subtree", headers=auth_headers).status_code == 404
+
+    def test_list_embeds_children(self, client, auth_headers, tree, assert_max_queries):
+        """include_children で最上位のToDoだけを返し、サブタスクを埋め込むことを確認"""
+        # ユーザー / 件数 / ページ / 子孫 / タグ
+        with assert_max_queries(5):
+            body = client.get("/api/todos?include_children=true", headers=auth_headers).json()
+        assert [todo["title"] for todo in body["data"]] == ["root"]
+        assert body["total"] == 1
+        child = body["data"][0]["children"][0]
+        assert (child["title"], [todo["title"] for todo in child["children"]]) == ("child", ["grandchild"])
+
+        # 指定しない場合はサブタスクも一覧に含まれ、埋め込まれない
+        body = client.get("/api/todos?limit=10", headers=auth_headers).json()
+        assert body["total"] == 4
+        assert all(todo["children"] is None for todo in body["data"])
+
+
+class TestCompletionRollUp:
+    """完了状態のロールアップのテストクラス"""
+
+    def _complete(self, client, headers, todo_id: int, title: str, completed: bool = True):
+        client.put(f"/api/todos/{todo_id}", json={"title": title, "completed": completed}, headers=headers)
+
+    def test_completes_ancestors(self, client, auth_headers, db_session, tree):
+        """子がすべて完了すると、親・祖先が完了になることを確認"""
+        self._complete(client, auth_headers, tree["grandchild"], "grandchild")
+        assert _completed(db_session, tree["child"], tree["root"]) == [True, False]
+
+        self._complete(client, auth_headers, tree["sibling"], "sibling")
+        assert _completed(db_session, tree["child"], tree["root"]) == [True, True]
+        assert db_session.get(Todo, tree["root"]).completed_at is not None
+
+    def test_reopens_ancestors(self, client, auth_headers, db_session, tree):
+        """未完了の子ができると、親・祖先が未完了に戻ることを確認"""
+        client.put(
+            "/api/todos/bulk",
+            json={"todo_ids": [tree["grandchild"], tree["sibling"]], "action": "complete"},
+            headers=auth_headers,
+        )
+        assert _completed(db_session, tree["child"], tree["root"]) == [True, True]
+
+        self._complete(client, auth_headers, tree["grandchild"], "grandchild", completed=False)
+        assert _completed(db_session, tree["child"], tree["root"]) == [False, False]
+
+        # 未完了のサブタスクの追加でも未完了に戻る
+        self._complete(client, auth_headers, tree["grandchild"], "grandchild")
+        assert _completed(db_session, tree["root"]) == [True]
+        _create(client, auth_headers, "new", tree["sibling"])
+        assert _completed(db_session, tree["sibling"], tree["root"]) == [False, False]
+
+    def test_delete_subtree(self, client, auth_headers, db_session, tree):
+        """削除でサブタスクもまとめて削除され、残った子に合わせて親がロールアップされることを確認"""
+        self._complete(client, auth_headers, tree["sibling"], "sibling")
+        response = client.delete(f"/api/todos/{tree['child']}", headers=auth_headers)
+        assert response.json()["title"] == "child"
+
+        db_session.expire_all()
+        assert {todo.title for todo in db_session.query(Todo).filter(NOT_DELETED)} == {"root", "sibling"}
+        assert _completed(db_session, tree["root"]) == [True]
+
+    def test_stats_stay_consistent(self, client, auth_headers, db_session, tree):
+        """ロールアップと部分木の削除が件数の集計に反映されることを確認"""
+        client.put(
+            "/api/todos/bulk",
+            json={"todo_ids": [tree["grandchild"], tree["sibling"]], "action": "complete"},
+            headers=auth_headers,
+        )
+        client.put("/api/todos/bulk", json={"todo_ids": [tree["child"]], "action": "delete"}, headers=auth_headers)
+
+        db_session.expire_all()
+        row = read_stats(db_session.connection())
+        expected = rebuild_values(db_session.connection())
+        assert (row["total"], row["completed"]) == (expected["total"], expected["completed"]) == (2, 2)
+
+    def test_queries_bounded_by_depth(self, db_session, assert_max_queries):
+        """ロールアップのクエリ数が、祖先の件数ではなく階層の深さで決まることを確認"""
+        parents = [Todo(title=f"parent {i}", position=i) for i in range(20)]
+        db_session.add_all(parents)
+        db_session.flush()
+        leaves = [
+            Todo(title=f"leaf {i}", position=i, parent_id=parent.id, completed=True) for i, parent in enumerate(parents)
+        ]
+        db_session.add_all(leaves)
+        db_session.commit()
+        parent_ids = [parent.id for parent in parents]
+
+        # 祖先 / 階層ごとの完了・未完了への UPDATE / 集計の更新
+        with assert_max_queries(4):
+            assert roll_up_completion(db_session, parent_ids) == 20
+        assert all(_completed(db_session, *parent_ids))
+
+
+class TestArchiveSubtasks:
+    """サブタスクのアーカイブのテストクラス"""
+
+    def test_children_before_parent(self, client, auth_headers, db_session, tree):
+        """子が残っているToDoは移動されず、子の移動後に移動されることを確認"""
+        client.put(
+            "/api/todos/bulk",
+            json={"todo_ids": [tree["grandchild"], tree["sibling"]], "action": "complete"},
+            headers=auth_headers,
+        )
+        db_session.query(Todo).update({Todo.completed_at: datetime.utcnow() - timedelta(days=40)})
+        db_session.commit()
+
+        assert archive_completed(db_session, datetime.utcnow() - timedelta(days=30), batch_size=10) == 4
+        db_session.expire_all()
+        assert db_session.query(Todo).count() == 0
+        archived = {todo.title: todo.parent_id for todo in db_session.query(TodoArchive)}
+        assert archived == {"root": None, "child": tree["root"], "grandchild": tree["child"], "sibling": tree["root"]}
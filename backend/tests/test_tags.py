@@ -0,0 +1,113 @@
+"""
+タグのテスト
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.tag import Tag, todo_tags
+from app.services.purge import purge_deleted
+
+
+def _create(client, headers, title: str, tags):
+    return client.post("/api/todos", json={"title": title, "tags": tags}, headers=headers).json()
+
+
+def _titles(client, headers, query: str):
+    return sorted(todo["title"] for todo in client.get(f"/api/todos?limit=50&{query}", headers=headers).json()["data"])
+
+
+class TestTodoTags:
+    """ToDoへのタグ付けのテストクラス"""
+
+    def test_create_and_update(self, client, auth_headers, db_session):
+        """作成・更新でタグを付け替えられることを確認（既存のタグは再利用する）"""
+        todo = _create(client, auth_headers, "task", ["work", "#urgent", " work "])
+        assert todo["tags"] == ["urgent", "work"]
+
+        response = client.put(
+            f"/api/todos/{todo['id']}", json={"title": "task", "tags": ["home"]}, headers=auth_headers
+        )
+        assert response.json()["tags"] == ["home"]
+
+        # tags を指定しない更新ではタグを変更しない
+        response = client.put(f"/api/todos/{todo['id']}", json={"title": "renamed"}, headers=auth_headers)
+        assert response.json()["tags"] == ["home"]
+
+        _create(client, auth_headers, "other", ["work"])
+        assert db_session.query(Tag).count() == 3
+
+    def test_tag_too_long(self, client, auth_headers):
+        """長すぎるタグ名は400を返すことを確認"""
+        response = client.post("/api/todos", json={"title": "task", "tags": ["x" * 51]}, headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_listed_with_tags(self, client, auth_headers):
+        """一覧のToDoにタグが含まれることを確認"""
+        _create(client, auth_headers, "task", ["b", "a"])
+        assert client.get("/api/todos", headers=auth_headers).json()["data"][0]["tags"] == ["a", "b"]
+
+    def test_delete_removes_links(self, client, auth_headers, db_session):
+        """ToDoの削除（単体・一括）後はタグの件数に数えられず、物理削除でタグとの対応が削除されることを確認"""
+        first = _create(client, auth_headers, "first", ["work"])
+        second = _create(client, auth_headers, "second", ["work"])
+        client.delete(f"/api/todos/{first['id']}", headers=auth_headers)
+        client.put("/api/todos/bulk", json={"todo_ids": [second["id"]], "action": "delete"}, headers=auth_headers)
+        assert client.get("/api/tags", headers=auth_headers).json() == [{"name": "work", "count": 0}]
+
+        purge_deleted(db_session, datetime.utcnow() + timedelta(seconds=1))
+        assert db_session.execute(todo_tags.select()).all() == []
+
+
+class TestTagFilter:
+    """タグでの絞り込みのテストクラス"""
+
+    @pytest.fixture(autouse=True)
+    def todos(self, client, auth_headers):
+        _create(client, auth_headers, "work only", ["work"])
+        _create(client, auth_headers, "work urgent", ["work", "urgent"])
+        _create(client, auth_headers, "home urgent", ["home", "urgent"])
+        _create(client, auth_headers, "untagged", [])
+
+    def test_single_tag(self, client, auth_headers):
+        assert _titles(client, auth_headers, "tags=work") == ["work only", "work urgent"]
+
+    def test_all(self, client, auth_headers):
+        """tag_mode=all（既定）ではすべてのタグが付いたToDoに絞り込むことを確認"""
+        assert _titles(client, auth_headers, "tags=work,urgent") == ["work urgent"]
+
+    def test_any(self, client, auth_headers):
+        """tag_mode=any ではいずれかのタグが付いたToDoに絞り込むことを確認"""
+        assert _titles(client, auth_headers, "tags=work,home&tag_mode=any") == [
+            "home urgent",
+            "work only",
+            "work urgent",
+        ]
+
+    def test_unknown_tag(self, client, auth_headers):
+        """存在しないタグを含む場合、all では0件、any では残りのタグで絞り込むことを確認"""
+        assert _titles(client, auth_headers, "tags=work,nothing") == []
+        assert _titles(client, auth_headers, "tags=home,nothing&tag_mode=any") == ["home urgent"]
+
+    def test_combined_with_other_filters(self, client, auth_headers):
+        """他のフィルタと組み合わせられることを確認"""
+        body = client.get("/api/todos?tags=urgent&search=home", headers=auth_headers).json()
+        assert body["total"] == 1
+
+    def test_no_text_scan(self, client, auth_headers, assert_max_queries):
+        """タグでの絞り込みがタイトルの文字列検索ではなく todo_tags のインデックスで行われることを確認"""
+        with assert_max_queries(5) as stats:
+            client.get("/api/todos?tags=work,urgent", headers=auth_headers)
+        statements = "\n".join(stats.statements)
+        assert "LIKE" not in statements
+        assert "INTERSECT" in statements
+
+    def test_tag_counts(self, client, auth_headers):
+        """タグごとのToDoの件数を件数の多い順に返すことを確認"""
+        response = client.get("/api/tags", headers=auth_headers)
+        assert response.json() == [
+            {"name": "urgent", "count": 2},
+            {"name": "work", "count": 2},
+            {"name": "home", "count": 1},
+        ]